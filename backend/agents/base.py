@@ -1,11 +1,31 @@
-"""Abstract base agent."""
+"""Abstract base agent and integer action-id adapter."""
 
+import copy
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Sequence
+
+import numpy as np
 
 
 class AbstractAgent(ABC):
-    """Base class for all agents."""
+    """Base class for all agents.
+
+    Agents may additionally implement the integer action-id protocol
+    (`bind_actions`, `select_action_id`, `update_id`) and set
+    `supports_action_ids = True`; `SimulationRunner` then drives them
+    without any string handling. Other agents are wrapped in
+    `ActionIdAdapter`.
+
+    For lockstep replicate runs agents expose a batch protocol
+    (`reset_batch`, `select_actions`, `update_batch`) over K replicates,
+    each drawing from its own RNG stream. The default keeps one reset copy
+    of the agent per replicate; agents may override it with vectorized
+    implementations that must consume each stream exactly as the scalar
+    methods would.
+    """
+
+    #: Whether select_action_id/update_id are implemented natively.
+    supports_action_ids: bool = False
 
     @abstractmethod
     def select_action(self, state: Any, available_actions: list[str]) -> str:
@@ -17,6 +37,63 @@ class AbstractAgent(ABC):
         """Update agent after observing outcome."""
         pass
 
+    def bind_actions(self, actions: Sequence[str]):
+        """Fix the action-id -> name table used by the integer protocol."""
+        self.action_names = tuple(actions)
+
+    def select_action_id(self, state: Any) -> int:
+        """Choose an action id (index into the bound action table)."""
+        raise NotImplementedError(f"{type(self).__name__} does not support integer action ids")
+
+    def update_id(self, state: Any, action: int, reinforced: bool, next_state: Any):
+        """Update agent after observing the outcome of action id `action`."""
+        raise NotImplementedError(f"{type(self).__name__} does not support integer action ids")
+
+    def set_rng(self, rng: np.random.Generator):
+        """Draw all future randomness from `rng`."""
+        self.rng = rng
+
+    def replicate(self, rng: np.random.Generator) -> "AbstractAgent":
+        """Return an independent deep copy of this agent drawing from `rng`."""
+        replica = copy.deepcopy(self)
+        replica.set_rng(rng)
+        return replica
+
+    def reset_batch(self, rngs: Sequence):
+        """Prepare one freshly reset replicate per RNG stream.
+
+        Call after `bind_actions`.
+        """
+        # Drop replicates of a previous batch so they are not copied
+        self._replicas = self._drivers = []
+        self._replicas = [self.replicate(rng) for rng in rngs]
+        for replica in self._replicas:
+            replica.reset()
+        self._drivers = [action_id_agent(r, self.action_names) for r in self._replicas]
+
+    def select_actions(self, states: Sequence) -> np.ndarray:
+        """Choose one action id per replicate."""
+        return np.array(
+            [d.select_action_id(s) for d, s in zip(self._drivers, states)], dtype=np.intp
+        )
+
+    def update_batch(
+        self,
+        states: Sequence,
+        actions: np.ndarray,
+        reinforced: np.ndarray,
+        next_states: Sequence,
+    ):
+        """Update every replicate with the outcome of its action."""
+        for d, s, a, r, n in zip(
+            self._drivers, states, actions.tolist(), reinforced.tolist(), next_states
+        ):
+            d.update_id(s, a, r, n)
+
+    def get_batch_params(self) -> list[dict]:
+        """Return `get_params()` for every replicate."""
+        return [r.get_params() for r in self._replicas]
+
     @abstractmethod
     def reset(self):
         """Reset agent to initial state."""
@@ -27,8 +104,56 @@ class AbstractAgent(ABC):
         """Return current parameters for logging."""
         pass
 
+    def get_state(self) -> dict:
+        """Return the learned state (JSON-serializable) for inspection."""
+        return {}
+
+    def telemetry_fields(self) -> list[str]:
+        """Names of the values `telemetry()` returns; empty if the agent has none.
+
+        Called after `bind_actions`.
+        """
+        return []
+
+    def telemetry(self, state: Any) -> Sequence[float]:
+        """Cheap snapshot of internal state, one value per `telemetry_fields()` entry.
+
+        `state` is the observation the agent will act on next.
+        """
+        return ()
+
+    def start_op_counts(self):
+        """Begin counting hot-path operations for a profile; a no-op by default."""
+
+    def stop_op_counts(self) -> dict:
+        """Stop counting and return the counts since `start_op_counts()`."""
+        return {}
+
     @property
     @abstractmethod
     def name(self) -> str:
         """Agent name for display."""
         pass
+
+
+class ActionIdAdapter:
+    """Presents a string-action agent through the integer action-id protocol."""
+
+    def __init__(self, agent: AbstractAgent, actions: Sequence[str]):
+        self.agent = agent
+        self.actions = list(actions)
+        self.action_ids = {name: i for i, name in enumerate(self.actions)}
+
+    def select_action_id(self, state: Any) -> int:
+        return self.action_ids[self.agent.select_action(state, self.actions)]
+
+    def update_id(self, state: Any, action: int, reinforced: bool, next_state: Any):
+        self.agent.update(state, self.actions[action], reinforced, next_state)
+
+
+def action_id_agent(agent: AbstractAgent, actions: Sequence[str]):
+    """Return `agent` bound to `actions`, or an adapter if it only speaks strings."""
+    if agent.supports_action_ids:
+        agent.bind_actions(actions)
+        return agent
+    return ActionIdAdapter(agent, actions)
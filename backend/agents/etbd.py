@@ -3,6 +3,7 @@
 import numpy as np
 from typing import Any
 from agents.base import AbstractAgent
+from etbd_internals.counters import OpCounters
 from etbd_internals.organism import Organism
 
 
@@ -44,12 +45,15 @@ class ETBDAgent(AbstractAgent):
     on the environment (two-choice vs grid).
     """
 
+    supports_action_ids = True
+
     def __init__(
         self,
         population_size: int = 100,
         mutation_rate: float = 0.1,
         fitness_decay: float = 0.95,
         environment_type: str = "two_choice",
+        rng: np.random.Generator | None = None,
     ):
         self.population_size = population_size
         self.mutation_rate = mutation_rate
@@ -65,6 +69,7 @@ class ETBDAgent(AbstractAgent):
             population_size=population_size,
             mutation_rate=mutation_rate,
             fitness_decay=fitness_decay,
+            rng=rng,
         )
 
     def select_action(self, state: Any, available_actions: list[str]) -> str:
@@ -72,6 +77,28 @@ class ETBDAgent(AbstractAgent):
         action = phenotype_to_action(phenotype, self.action_map)
         return action
 
+    def bind_actions(self, actions):
+        super().bind_actions(actions)
+        # Phenotype -> action id lookup table and per-id reinforcement targets
+        self._action_lut = [
+            self.action_names.index(phenotype_to_action(p, self.action_map))
+            for p in range(self.organism.max_phenotype)
+        ]
+        self._class_of = np.array(self._action_lut, dtype=np.intp)
+        self._targets = [
+            action_to_target(a, self.action_map) if a in self.action_map else None
+            for a in self.action_names
+        ]
+
+    def select_action_id(self, state: Any) -> int:
+        return self._action_lut[self.organism.emit()]
+
+    def update_id(self, state: Any, action: int, reinforced: bool, next_state: Any):
+        if reinforced:
+            self.organism.reinforce(self._targets[action])
+        else:
+            self.organism.drift()
+
     def update(self, state: Any, action: str, reinforced: bool, next_state: Any):
         if reinforced:
             target = action_to_target(action, self.action_map)
@@ -79,9 +106,34 @@ class ETBDAgent(AbstractAgent):
         else:
             self.organism.drift()
 
+    @property
+    def rng(self):
+        return self.organism.rng
+
+    def set_rng(self, rng: np.random.Generator):
+        self.organism.rng = rng
+
     def reset(self):
         self.organism.reset()
 
+    def telemetry_fields(self) -> list[str]:
+        return [f"proportion_{a}" for a in self.action_names]
+
+    def telemetry(self, state: Any) -> np.ndarray:
+        # Share of the population in each response class
+        classes = self._class_of[np.asarray(self.organism.population)]
+        return np.bincount(classes, minlength=len(self.action_names)) / len(classes)
+
+    def start_op_counts(self):
+        self.organism.counters = OpCounters()
+
+    def stop_op_counts(self) -> dict:
+        counters, self.organism.counters = self.organism.counters, None
+        return counters.to_dict() if counters is not None else {}
+
+    def get_state(self) -> dict:
+        return {"population": list(self.organism.population)}
+
     def get_params(self) -> dict:
         return {
             "population_size": self.population_size,
@@ -1,7 +1,7 @@
 """MPR (Mathematical Principles of Reinforcement) agent."""
 
 import numpy as np
-from typing import Any
+from typing import Any, Sequence
 from agents.base import AbstractAgent
 
 
@@ -18,6 +18,8 @@ class MPRAgent(AbstractAgent):
     Where R is reinforcement rate, a is specific activation, b is arousal.
     """
 
+    supports_action_ids = True
+
     def __init__(
         self,
         environment_type: str = "two_choice",
@@ -27,6 +29,7 @@ class MPRAgent(AbstractAgent):
         learning_rate: float = 0.1,
         schedule_type: str = "VI",
         temperature: float = 1.0,
+        rng: np.random.Generator | None = None,
     ):
         self.environment_type = environment_type
         self.initial_arousal = initial_arousal
@@ -35,6 +38,7 @@ class MPRAgent(AbstractAgent):
         self.learning_rate = learning_rate
         self.schedule_type = schedule_type.upper()
         self.temperature = temperature
+        self.rng = np.random.default_rng() if rng is None else rng
 
         # Track per-action stats
         self.action_counts: dict[str, int] = {}
@@ -75,7 +79,7 @@ class MPRAgent(AbstractAgent):
             a, b = available_actions
             total = couplings[a] + couplings[b]
             p_a = couplings[a] / total
-            return a if np.random.random() < p_a else b
+            return a if self.rng.random() < p_a else b
         else:
             # Softmax over couplings for grid
             values = np.array([couplings[a] for a in available_actions])
@@ -83,20 +87,101 @@ class MPRAgent(AbstractAgent):
             scaled -= scaled.max()  # numerical stability
             exp_vals = np.exp(scaled)
             probs = exp_vals / exp_vals.sum()
-            idx = np.random.choice(len(available_actions), p=probs)
+            idx = self.rng.choice(len(available_actions), p=probs)
             return available_actions[idx]
 
+    def select_action_id(self, state: Any) -> int:
+        names = self.action_names
+
+        if self.environment_type == "two_choice" and len(names) == 2:
+            c_a = self._get_coupling(names[0])
+            c_b = self._get_coupling(names[1])
+            return 0 if self.rng.random() < c_a / (c_a + c_b) else 1
+
+        values = np.array([self._get_coupling(a) for a in names])
+        scaled = values / self.temperature
+        scaled -= scaled.max()
+        exp_vals = np.exp(scaled)
+        # Inverse-CDF draw; consumes the stream exactly like choice(p=...)
+        cdf = np.cumsum(exp_vals / exp_vals.sum())
+        cdf /= cdf[-1]
+        return int(np.searchsorted(cdf, self.rng.random(), side="right"))
+
+    def update_id(self, state: Any, action: int, reinforced: bool, next_state: Any):
+        self.update(state, self.action_names[action], reinforced, next_state)
+
     def update(self, state: Any, action: str, reinforced: bool, next_state: Any):
         self.total_steps += 1
         self.action_counts[action] = self.action_counts.get(action, 0) + 1
         if reinforced:
             self.reinforcement_counts[action] = self.reinforcement_counts.get(action, 0) + 1
 
+    def reset_batch(self, rngs: Sequence):
+        size = len(rngs)
+        n_actions = len(self.action_names)
+        self._batch_rngs = list(rngs)
+        self._batch_index = np.arange(size)
+        self._batch_action_counts = np.zeros((size, n_actions), dtype=np.int64)
+        self._batch_reinforcement_counts = np.zeros((size, n_actions), dtype=np.int64)
+
+    def _batch_couplings(self) -> np.ndarray:
+        """Vectorized `_get_coupling` for every replicate and action."""
+        counts = self._batch_action_counts
+        R = self._batch_reinforcement_counts / np.maximum(counts, 1)
+        a = self.initial_arousal
+        b = self.activation_decay
+        if self.schedule_type in ("FR", "VR"):
+            C = a * np.exp(-b / np.maximum(R, 1e-10))
+        else:
+            C = a * R / (R + b)
+        C = np.maximum(C, self.coupling_floor)
+        C[counts == 0] = self.coupling_floor
+        return C
+
+    def select_actions(self, states: Sequence) -> np.ndarray:
+        C = self._batch_couplings()
+        rngs = self._batch_rngs
+
+        if self.environment_type == "two_choice" and C.shape[1] == 2:
+            p_a = C[:, 0] / (C[:, 0] + C[:, 1])
+            u = np.array([rng.random() for rng in rngs])
+            return (u >= p_a).astype(np.intp)
+
+        scaled = C / self.temperature
+        scaled -= scaled.max(axis=1, keepdims=True)
+        exp_vals = np.exp(scaled)
+        cdf = np.cumsum(exp_vals / exp_vals.sum(axis=1, keepdims=True), axis=1)
+        cdf /= cdf[:, -1:]
+        u = np.array([rng.random() for rng in rngs])
+        return (cdf <= u[:, None]).sum(axis=1)
+
+    def update_batch(self, states, actions: np.ndarray, reinforced: np.ndarray, next_states):
+        self._batch_action_counts[self._batch_index, actions] += 1
+        self._batch_reinforcement_counts[self._batch_index, actions] += reinforced
+
+    def get_batch_params(self) -> list[dict]:
+        return [self.get_params() for _ in self._batch_rngs]
+
     def reset(self):
         self.action_counts = {}
         self.reinforcement_counts = {}
         self.total_steps = 0
 
+    def telemetry_fields(self) -> list[str]:
+        return [f"coupling_{a}" for a in self.action_names]
+
+    def telemetry(self, state: Any) -> list[float]:
+        return [self._get_coupling(a) for a in self.action_names]
+
+    def get_state(self) -> dict:
+        actions = getattr(self, "action_names", None) or list(self.action_counts)
+        return {
+            "total_steps": self.total_steps,
+            "action_counts": dict(self.action_counts),
+            "reinforcement_counts": dict(self.reinforcement_counts),
+            "couplings": {a: float(self._get_coupling(a)) for a in actions},
+        }
+
     def get_params(self) -> dict:
         return {
             "environment_type": self.environment_type,
@@ -6,6 +6,11 @@ from typing import Any
 from agents.base import AbstractAgent
 
 
+def _q_row() -> defaultdict:
+    # Module-level rather than a lambda so Q-tables can be pickled
+    return defaultdict(float)
+
+
 class QLearningAgent(AbstractAgent):
     """Tabular Q-Learning agent.
 
@@ -14,6 +19,8 @@ class QLearningAgent(AbstractAgent):
     Epsilon-greedy action selection.
     """
 
+    supports_action_ids = True
+
     def __init__(
         self,
         alpha: float = 0.1,
@@ -21,15 +28,24 @@ class QLearningAgent(AbstractAgent):
         epsilon: float = 0.1,
         history_window: int = 3,
         use_history_state: bool = True,
+        rng: np.random.Generator | None = None,
     ):
         self.alpha = alpha
         self.gamma = gamma
         self.epsilon = epsilon
         self.history_window = history_window
         self.use_history_state = use_history_state
-        self.q_table: dict[Any, dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.q_table: dict[Any, dict[str, float]] = defaultdict(_q_row)
         self.history: list[str] = []
 
+    def __getstate__(self) -> dict:
+        # Only the last `history_window` actions are ever read, so checkpoints
+        # and keyframes need not grow with the run
+        state = self.__dict__.copy()
+        state["history"] = self.history[-self.history_window:]
+        return state
+
     def _get_state_key(self, state: Any) -> Any:
         if self.use_history_state:
             return tuple(self.history[-self.history_window:])
@@ -40,16 +56,35 @@ class QLearningAgent(AbstractAgent):
     def select_action(self, state: Any, available_actions: list[str]) -> str:
         state_key = self._get_state_key(state)
 
-        if np.random.random() < self.epsilon:
-            return np.random.choice(available_actions)
+        if self.rng.random() < self.epsilon:
+            return self.rng.choice(available_actions)
 
         q_values = self.q_table[state_key]
         if not q_values:
-            return np.random.choice(available_actions)
+            return self.rng.choice(available_actions)
 
         max_q = max(q_values.get(a, 0.0) for a in available_actions)
         best_actions = [a for a in available_actions if q_values.get(a, 0.0) == max_q]
-        return np.random.choice(best_actions)
+        return self.rng.choice(best_actions)
+
+    def select_action_id(self, state: Any) -> int:
+        state_key = self._get_state_key(state)
+        names = self.action_names
+
+        if self.rng.random() < self.epsilon:
+            return int(self.rng.integers(len(names)))
+
+        q_values = self.q_table[state_key]
+        if not q_values:
+            return int(self.rng.integers(len(names)))
+
+        values = [q_values.get(a, 0.0) for a in names]
+        max_q = max(values)
+        best_ids = [i for i, q in enumerate(values) if q == max_q]
+        return best_ids[self.rng.integers(len(best_ids))]
+
+    def update_id(self, state: Any, action: int, reinforced: bool, next_state: Any):
+        self.update(state, self.action_names[action], reinforced, next_state)
 
     def update(self, state: Any, action: str, reinforced: bool, next_state: Any):
         self.history.append(action)
@@ -66,7 +101,7 @@ class QLearningAgent(AbstractAgent):
         )
 
     def reset(self):
-        self.q_table = defaultdict(lambda: defaultdict(float))
+        self.q_table = defaultdict(_q_row)
         self.history = []
 
     def get_params(self) -> dict:
@@ -78,6 +113,22 @@ class QLearningAgent(AbstractAgent):
             "q_table_size": len(self.q_table),
         }
 
+    def telemetry_fields(self) -> list[str]:
+        return [f"q_{a}" for a in self.action_names]
+
+    def telemetry(self, state: Any) -> list[float]:
+        # Q-values of the state about to be acted on; .get() leaves the table unchanged
+        q_values = self.q_table.get(self._get_state_key(state))
+        if not q_values:
+            return [0.0] * len(self.action_names)
+        return [q_values.get(a, 0.0) for a in self.action_names]
+
+    def get_state(self) -> dict:
+        return {
+            "q_table": {str(k): dict(v) for k, v in self.q_table.items()},
+            "history": self.history[-self.history_window:],
+        }
+
     @property
     def name(self) -> str:
         return "q_learning"
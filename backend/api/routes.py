@@ -1,31 +1,133 @@
 """API routes for simulation endpoints."""
 
-import csv
-import io
+import asyncio
 import json
-from fastapi import APIRouter, HTTPException
+import os
+import uuid
+from functools import partial
+from typing import AsyncIterator, Iterator
+from fastapi import APIRouter, Header, HTTPException, Response
 from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
 
-from api.schemas import SimulationRequest, SimulationResponse
+from api.schemas import (
+    JobStatus,
+    ReplicatesRequest,
+    ReplicatesResponse,
+    RunStateResponse,
+    SimulationRequest,
+    SimulationResponse,
+    StepData,
+)
 from schedules.reinforcement import create_schedule
 from environments.two_choice import TwoChoiceEnvironment
 from environments.grid_chamber import GridChamberEnvironment
 from agents.q_learning import QLearningAgent
 from agents.etbd import ETBDAgent
 from agents.mpr import MPRAgent
-from simulation.runner import SimulationRunner
+from simulation.analytics import (
+    Changeovers,
+    InterReinforcementIntervals,
+    PostReinforcementPauses,
+    WindowedRates,
+)
+from simulation.export import (
+    PYARROW_AVAILABLE,
+    arrow_bytes,
+    csv_chunks,
+    npz_bytes,
+    parquet_bytes,
+    step_columns_json,
+    steps_json,
+)
+from simulation.compact import compact_json
+from simulation.jobs import DONE, FAILED, BoundedPool, Job, JobQueue, QueueFull
+from simulation.lru import LRUStore
+from simulation.prefix_cache import PrefixCache, canonical_hash
+from simulation.result_cache import ResultCache, result_nbytes
+from simulation.replicates import (
+    PrecisionTarget,
+    ReplicateAggregate,
+    ReplicateExecutor,
+    replicate_seeds,
+    summary_metrics,
+)
+from simulation.shared_log import share_log
+from simulation.runner import SimulationResult, SimulationRunner, make_rng
+from simulation.stability import StabilityTracker
 
 router = APIRouter(prefix="/api")
 
+# Steps between progress reports of background jobs
+PROGRESS_EVERY = 1000
 
-def _build_environment(req: SimulationRequest):
+# Seconds between events of a job's progress stream: the default, and the least allowed
+EVENT_INTERVAL = 0.5
+MIN_EVENT_INTERVAL = 0.05
+
+# Seconds a client is asked to wait when the job queue is full
+JOB_RETRY_AFTER = 5
+
+# ...or when every simulation thread is busy and the wait list is full
+SIMULATE_RETRY_AFTER = 1
+
+# State after the leading conditions of seeded multi-condition requests
+_prefix_cache = PrefixCache()
+
+# Results of seeded requests, by the hash of the normalized request; shared
+# by /simulate, /simulate/csv and /simulate/json
+_result_cache = ResultCache(
+    max_bytes=int(os.environ.get("AO_RESULT_CACHE_MB", 256)) * 1024 * 1024,
+    spill_dir=os.environ.get("AO_RESULT_CACHE_DIR") or None,
+)
+
+# Rendered bodies of cached results, by (key, format), so that a repeat
+# download is only a copy
+_result_bodies = LRUStore(max_entries=64, max_bytes=_result_cache.max_bytes)
+
+# Keyframes of recent keyframed runs, by run id
+_keyframed_runs = LRUStore(max_entries=32, sizeof=lambda keyframes: keyframes.nbytes)
+
+# Threads running the simulate endpoints' work off the event loop, and how
+# many more requests may wait for one
+_simulation_pool = BoundedPool(
+    workers=int(os.environ.get("AO_SIMULATE_WORKERS", 2)),
+    max_waiting=int(os.environ.get("AO_SIMULATE_QUEUE", 8)),
+)
+
+# Background simulation jobs; results are kept for an hour, within as many
+# megabytes as the result cache
+_jobs = JobQueue(
+    workers=2, max_queued=32, ttl=3600,
+    max_bytes=_result_cache.max_bytes, sizeof=lambda outcome: result_nbytes(outcome[0]),
+)
+
+# Warm worker pool for replicate requests, started on first use
+_replicate_executor = ReplicateExecutor(workers=os.cpu_count() or 1, preload=("api.routes",))
+
+
+def _release_logs(logs):
+    for shared in logs:
+        shared.release()
+
+
+# Shared-memory step logs of recent keep_steps replicate requests, by id;
+# evicted sets release their segments
+_replicate_logs = LRUStore(
+    max_entries=8,
+    sizeof=lambda logs: sum(shared.nbytes for shared in logs),
+    on_evict=_release_logs,
+)
+
+
+def _build_environment(req: SimulationRequest, rng=None):
     """Factory: create the environment from request config."""
     if req.environment == "two_choice":
         if not req.schedule_a or not req.schedule_b:
             raise HTTPException(400, "two_choice requires schedule_a and schedule_b")
         return TwoChoiceEnvironment(
-            schedule_a=create_schedule(req.schedule_a.type, req.schedule_a.value),
-            schedule_b=create_schedule(req.schedule_b.type, req.schedule_b.value),
+            schedule_a=create_schedule(req.schedule_a.type, req.schedule_a.value, rng),
+            schedule_b=create_schedule(req.schedule_b.type, req.schedule_b.value, rng),
             max_steps=req.max_steps,
         )
     elif req.environment == "grid_chamber":
@@ -40,7 +142,7 @@ def _build_environment(req: SimulationRequest):
                 start_pos=(gc.start_row, gc.start_col),
             )
         return GridChamberEnvironment(
-            schedule=create_schedule(req.schedule.type, req.schedule.value),
+            schedule=create_schedule(req.schedule.type, req.schedule.value, rng),
             max_steps=req.max_steps,
             **kwargs,
         )
@@ -48,14 +150,14 @@ def _build_environment(req: SimulationRequest):
         raise HTTPException(400, f"Unknown environment: {req.environment}")
 
 
-def _build_environment_for_condition(req: SimulationRequest, condition):
+def _build_environment_for_condition(req: SimulationRequest, condition, rng=None):
     """Factory: create the environment from a ConditionConfig."""
     if req.environment == "two_choice":
         if not condition.schedule_a or not condition.schedule_b:
             raise HTTPException(400, f"Condition '{condition.label}': two_choice requires schedule_a and schedule_b")
         return TwoChoiceEnvironment(
-            schedule_a=create_schedule(condition.schedule_a.type, condition.schedule_a.value),
-            schedule_b=create_schedule(condition.schedule_b.type, condition.schedule_b.value),
+            schedule_a=create_schedule(condition.schedule_a.type, condition.schedule_a.value, rng),
+            schedule_b=create_schedule(condition.schedule_b.type, condition.schedule_b.value, rng),
             max_steps=condition.max_steps,
         )
     elif req.environment == "grid_chamber":
@@ -70,7 +172,7 @@ def _build_environment_for_condition(req: SimulationRequest, condition):
                 start_pos=(gc.start_row, gc.start_col),
             )
         return GridChamberEnvironment(
-            schedule=create_schedule(condition.schedule.type, condition.schedule.value),
+            schedule=create_schedule(condition.schedule.type, condition.schedule.value, rng),
             max_steps=condition.max_steps,
             **kwargs,
         )
@@ -89,7 +191,36 @@ def _swap_env_schedules(env, cond_dict):
         env.schedule = create_schedule(cond_dict["schedule"]["type"], cond_dict["schedule"]["value"])
 
 
-def _build_agent(req: SimulationRequest):
+def _stability_config(condition, env) -> dict:
+    """Validate a condition's stability criterion and return it as a runner dict."""
+    config = condition.stability.model_dump()
+    if config["action"] is None and isinstance(env, GridChamberEnvironment):
+        config["action"] = "press_lever"
+    try:
+        StabilityTracker.from_config(config, env.get_available_actions())
+    except ValueError as e:
+        raise HTTPException(400, f"Condition '{condition.label}': {e}")
+    return config
+
+
+def _build_analytics(req: SimulationRequest) -> list:
+    """Factory: accumulator factories for the requested analytics."""
+    a = req.analytics
+    if a is None:
+        return []
+    factories = []
+    if a.windowed_rates:
+        factories.append(partial(WindowedRates, window=a.rate_window, sample_every=a.rate_sample_every))
+    if a.changeovers:
+        factories.append(Changeovers)
+    if a.inter_reinforcement:
+        factories.append(InterReinforcementIntervals)
+    if a.post_reinforcement_pause:
+        factories.append(partial(PostReinforcementPauses, bins=a.pause_bins))
+    return factories
+
+
+def _build_agent(req: SimulationRequest, rng=None):
     """Factory: create the agent from request config."""
     if req.algorithm == "q_learning":
         p = req.q_learning_params or {}
@@ -102,6 +233,7 @@ def _build_agent(req: SimulationRequest):
             epsilon=p.get("epsilon", 0.1),
             history_window=p.get("history_window", 3),
             use_history_state=use_history,
+            rng=rng,
         )
     elif req.algorithm == "etbd":
         p = req.etbd_params or {}
@@ -112,6 +244,7 @@ def _build_agent(req: SimulationRequest):
             mutation_rate=p.get("mutation_rate", 0.1),
             fitness_decay=p.get("fitness_decay", 0.95),
             environment_type=req.environment,
+            rng=rng,
         )
     elif req.algorithm == "mpr":
         p = req.mpr_params or {}
@@ -137,19 +270,40 @@ def _build_agent(req: SimulationRequest):
             coupling_floor=p.get("coupling_floor", 0.01),
             temperature=p.get("temperature", 1.0),
             schedule_type=sched_type,
+            rng=rng,
         )
     else:
         raise HTTPException(400, f"Unknown algorithm: {req.algorithm}")
 
 
-def _run_simulation(req: SimulationRequest):
-    """Build components and run simulation."""
+def _run_simulation(req: SimulationRequest, rng=None, on_progress=None):
+    """Build components and run simulation.
+
+    Every component draws from one Generator derived from the request seed,
+    or from `rng` when given, so concurrent requests never share random state.
+    `on_progress` receives the runner's progress reports.
+    """
+    if req.engine not in ("python", "numba"):
+        raise HTTPException(400, f"Unknown engine: {req.engine}")
+    seeded = rng is None and req.seed is not None
+    if rng is None:
+        rng = make_rng(req.seed)
     if req.conditions:
         # Multi-condition path
         first_cond = req.conditions[0]
-        env = _build_environment_for_condition(req, first_cond)
-        agent = _build_agent(req)
-        runner = SimulationRunner(agent, env)
+        env = _build_environment_for_condition(req, first_cond, rng)
+        agent = _build_agent(req, rng)
+        runner = SimulationRunner(
+            agent, env,
+            keyframe_every=req.keyframe_every or 0,
+            analytics=_build_analytics(req),
+            telemetry_every=req.telemetry_every or 0,
+            time_budget=req.time_budget,
+            engine=req.engine,
+            profile=req.profile,
+            progress_every=PROGRESS_EVERY,
+            on_progress=on_progress,
+        )
 
         # Build condition dicts for the runner
         cond_dicts = []
@@ -160,65 +314,585 @@ def _run_simulation(req: SimulationRequest):
                 d["schedule_b"] = {"type": c.schedule_b.type, "value": c.schedule_b.value}
             else:
                 d["schedule"] = {"type": c.schedule.type, "value": c.schedule.value}
+            if c.stability:
+                d["stability"] = _stability_config(c, env)
             cond_dicts.append(d)
 
+        # Only seeded runs are reproducible, so only they can share prefixes.
+        # Truncated conditions are never cached, so the budget is not part of the
+        # key; the engine and profiling do not change the state, so neither are they.
+        cache_key = None
+        if seeded:
+            cache_key = canonical_hash(req.model_dump(exclude={"conditions", "time_budget", "engine", "profile"}))
         return runner.run_multi_condition(
             conditions=cond_dicts,
             swap_env_fn=_swap_env_schedules,
-            seed=req.seed,
+            rng=rng,
+            prefix_cache=_prefix_cache,
+            cache_key=cache_key,
+            record_steps=req.record_steps,
         )
     else:
         # Single-condition path
-        env = _build_environment(req)
-        agent = _build_agent(req)
-        runner = SimulationRunner(agent, env)
-        return runner.run(seed=req.seed)
+        env = _build_environment(req, rng)
+        agent = _build_agent(req, rng)
+        runner = SimulationRunner(
+            agent, env,
+            keyframe_every=req.keyframe_every or 0,
+            analytics=_build_analytics(req),
+            telemetry_every=req.telemetry_every or 0,
+            time_budget=req.time_budget,
+            engine=req.engine,
+            profile=req.profile,
+            progress_every=PROGRESS_EVERY,
+            on_progress=on_progress,
+        )
+        return runner.run(rng=rng, record_steps=req.record_steps)
 
 
-@router.post("/simulate", response_model=SimulationResponse)
-async def simulate(req: SimulationRequest):
-    """Run a simulation and return full results as JSON."""
-    result = _run_simulation(req)
-    return SimulationResponse(
+def _register_keyframes(result, run_id: str | None = None) -> str | None:
+    """Keep the keyframes of `result`, if any, and return their run id
+    (`run_id`, or a new one). None when there are none to keep, or they
+    are too large to keep."""
+    if result.keyframes is None:
+        return None
+    run_id = run_id or uuid.uuid4().hex
+    if not _keyframed_runs.put(run_id, result.keyframes):
+        return None
+    return run_id
+
+
+def _response_chunks(result, run_id: str | None, format: str = "response") -> Iterator[str]:
+    """`result` as a `SimulationResponse` in JSON, a chunk at a time.
+
+    Pydantic writes everything but the steps, which are written straight
+    from the step log by `steps_json`, byte for byte as Pydantic would
+    write them. In the `columnar` and `compact` formats, `step_columns` or
+    `step_compact` take their place.
+    """
+    response = SimulationResponse(
         config=result.config,
         summary=result.summary,
-        steps=result.steps,
+        steps=[],
         condition_summaries=result.condition_summaries,
+        run_id=run_id,
+        telemetry=result.telemetry.to_dict() if result.telemetry is not None else None,
+        truncated=result.truncated,
+        step_reached=result.summary["total_steps"] if result.truncated else None,
     )
+    yield response.model_dump_json(include={"config", "summary"})[:-1]
+    if format == "columnar":
+        yield ',"step_columns":' + step_columns_json(result.steps)
+    elif format == "compact":
+        yield ',"step_compact":' + compact_json(result.steps)
+    else:
+        yield ',"steps":'
+        yield from steps_json(result.steps)
+    yield "," + response.model_dump_json(exclude={"config", "summary", "steps"})[1:]
 
 
-@router.post("/simulate/csv")
-async def simulate_csv(req: SimulationRequest):
-    """Run a simulation and return results as CSV."""
+async def _offload(fn, *args):
+    """Await `fn(*args)` on the simulation pool, or answer 429 when it is full."""
+    try:
+        return await _simulation_pool.run(fn, *args)
+    except QueueFull as e:
+        raise HTTPException(429, f"Server busy: {e}", headers={"Retry-After": str(SIMULATE_RETRY_AFTER)})
+
+
+def _model_response(model: BaseModel) -> Response:
+    """`model` as JSON, serialized by the calling thread rather than on the event loop."""
+    return Response(model.model_dump_json(), media_type="application/json")
+
+
+# Media type and download file name of each result format
+_FORMATS = {
+    "response": ("application/json", None),
+    "columnar": ("application/json", None),
+    "compact": ("application/json", None),
+    "csv": ("text/csv", "simulation_results.csv"),
+    "json": ("application/json", "simulation_results.json"),
+    "npz": ("application/octet-stream", "simulation_results.npz"),
+    "arrow": ("application/vnd.apache.arrow.file", "simulation_results.arrow"),
+    "parquet": ("application/vnd.apache.parquet", "simulation_results.parquet"),
+}
+
+# Columnar binary exports of the step log, and whether each needs pyarrow
+_BINARY_EXPORTS = {"npz": (npz_bytes, False), "arrow": (arrow_bytes, True), "parquet": (parquet_bytes, True)}
+
+# Formats holding a `SimulationResponse`, and so a run id
+_RESPONSE_FORMATS = ("response", "columnar", "compact")
+
+# Response format of each `shape` of /simulate
+_SHAPES = {"rows": "response", "columnar": "columnar", "compact": "compact"}
+
+
+def _check_format(format: str):
+    if format not in _FORMATS:
+        raise HTTPException(400, f"Unknown format: {format}. Must be one of {', '.join(_FORMATS)}")
+    if format in _BINARY_EXPORTS and _BINARY_EXPORTS[format][1] and not PYARROW_AVAILABLE:
+        raise HTTPException(501, f"Format {format} needs pyarrow, which is not installed")
+
+
+def _binary_export(result, format: str) -> bytes:
+    metadata = {
+        "config": result.config,
+        "summary": result.summary,
+        "condition_summaries": result.condition_summaries,
+    }
+    return _BINARY_EXPORTS[format][0](result.steps, metadata)
+
+
+def _result_response(result, format: str, run_id: str | None = None) -> Response:
+    """`result` as a `SimulationResponse`, or as the download of `format`."""
+    if format in _RESPONSE_FORMATS:
+        return StreamingResponse(_response_chunks(result, run_id, format), media_type="application/json")
+    if format == "csv":
+        return _csv_response(result)
+    if format == "json":
+        return _json_download(result)
+    media_type, filename = _FORMATS[format]
+    return Response(
+        _binary_export(result, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+def _result_key(req: SimulationRequest) -> str | None:
+    """Hash of the normalized `req`, or None when its result is not
+    reproducible: unseeded, or profiled (timings differ between runs)."""
+    if req.seed is None or req.profile:
+        return None
+    return canonical_hash(req.model_dump())
+
+
+def _etag(key: str, format: str) -> str:
+    return f'"{key[:32]}-{format}"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if if_none_match is None:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _result_body(result, format: str, run_id: str | None = None) -> bytes:
+    """The body `_result_response` sends, as bytes to keep."""
+    if format in _RESPONSE_FORMATS:
+        return "".join(_response_chunks(result, run_id, format)).encode()
+    if format == "csv":
+        return _csv_text(result).encode()
+    if format == "json":
+        return _json_text(result).encode()
+    return _binary_export(result, format)
+
+
+def _cached_result(req: SimulationRequest, key: str) -> tuple[SimulationResult, bool]:
+    """The result of `req` and whether it was already cached. A result that
+    ran out of time is not cached, since its length depends on the clock."""
+    result = _result_cache.get(key)
+    if result is not None:
+        return result, True
+    result = _run_simulation(req)
+    if not result.truncated:
+        _result_cache.put(key, result)
+    return result, False
+
+
+def _kept_body(result, key: str, format: str, run_id: str | None) -> bytes:
+    body = _result_bodies.get((key, format))
+    if body is None:
+        body = _result_body(result, format, run_id)
+        _result_bodies.put((key, format), body)
+    return body
+
+
+# Pool calls in flight, by the key of the work they do; identical requests
+# arriving together await the same call. Only touched on the event loop.
+_in_flight: dict = {}
+
+
+def _landed(key, task: asyncio.Future):
+    if _in_flight.get(key) is task:
+        del _in_flight[key]
+    if not task.cancelled():
+        # Retrieved here in case every request awaiting it went away
+        task.exception()
+
+
+async def _coalesced(key, fn, *args):
+    """Await `fn(*args)` on the simulation pool, or the call for `key`
+    already in flight. The call runs on even if the requests awaiting it
+    are cancelled."""
+    task = _in_flight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_offload(fn, *args))
+        _in_flight[key] = task
+        task.add_done_callback(partial(_landed, key))
+    return await asyncio.shield(task)
+
+
+async def _simulate_as(req: SimulationRequest, format: str, if_none_match: str | None) -> Response:
+    """Answer a simulate request in `format`.
+
+    Seeded requests share results by `_result_key`, and concurrent identical
+    requests share one run and one rendering. A cached result is answered
+    with 304 when `if_none_match` holds its ETag. Cached results keep their
+    keyframes under a run id derived from the key, so the response bytes,
+    and the ETag, depend on the request alone.
+    """
+    key = _result_key(req)
+    if key is None:
+        return await _offload(_serve_uncached, req, format)
+    result, cached = await _coalesced(key, _cached_result, req, key)
+    if result.truncated:
+        run_id = _register_keyframes(result) if format in _RESPONSE_FORMATS else None
+        return await _offload(_result_response, result, format, run_id)
+    run_id = _register_keyframes(result, key[:32]) if format in _RESPONSE_FORMATS else None
+    etag = _etag(key, format)
+    if cached and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    body = _result_bodies.get((key, format))
+    if body is None:
+        body = await _coalesced((key, format), _kept_body, result, key, format, run_id)
+    media_type, filename = _FORMATS[format]
+    headers = {"ETag": etag}
+    if filename is not None:
+        headers["Content-Disposition"] = f"attachment; filename={filename}"
+    return Response(body, media_type=media_type, headers=headers)
+
+
+def _serve_uncached(req: SimulationRequest, format: str) -> Response:
     result = _run_simulation(req)
+    run_id = _register_keyframes(result) if format in _RESPONSE_FORMATS else None
+    return _result_response(result, format, run_id)
 
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=["step", "state", "action", "reinforced", "schedule_id", "condition"])
-    writer.writeheader()
-    for step in result.steps:
-        writer.writerow(step)
 
-    output.seek(0)
+@router.post("/simulate", response_model=SimulationResponse)
+async def simulate(req: SimulationRequest, shape: str = "rows", if_none_match: str | None = Header(None)):
+    """Run a simulation and return full results as JSON: the steps as one
+    object per step, with ``shape=columnar`` as one array per field, or
+    with ``shape=compact`` in the compact encoding of `simulation.compact`."""
+    if shape not in _SHAPES:
+        raise HTTPException(400, f"Unknown shape: {shape}. Must be one of {', '.join(_SHAPES)}")
+    return await _simulate_as(req, _SHAPES[shape], if_none_match)
+
+
+def _replicate_metrics(req: SimulationRequest, rng, keep_steps: bool = False):
+    """Replicate job: run `req` from `rng` and return its metrics and, with
+    `keep_steps`, a handle to its step log in shared memory."""
+    result = _run_simulation(req, rng)
+    env_cls = TwoChoiceEnvironment if req.environment == "two_choice" else GridChamberEnvironment
+    metrics = summary_metrics(result, env_cls.ACTIONS)
+    if keep_steps:
+        return metrics, share_log(result.steps)
+    return metrics
+
+
+def _single_replicate(req: ReplicatesRequest) -> SimulationRequest:
+    """The configuration each replicate of `req` runs."""
+    single = SimulationRequest(**req.model_dump(exclude={"replicates", "keep_steps"}))
+    return single.model_copy(update={
+        "record_steps": req.keep_steps, "keyframe_every": None, "telemetry_every": None,
+        "time_budget": None, "profile": False,
+    })
+
+
+def _precision_target(req: ReplicatesRequest) -> PrecisionTarget | None:
+    if req.precision is None:
+        return None
+    return PrecisionTarget(**req.precision.model_dump())
+
+
+def run_sweep_cell(payload: dict, executor: ReplicateExecutor | None = None) -> dict:
+    """Run one sweep cell, a `ReplicatesRequest` body, for a sharding worker.
+
+    Returns the aggregate metrics as `POST /api/simulate/replicates` would,
+    including the number of replicates run, on `executor` (in this process
+    by default).
+    """
+    req = ReplicatesRequest(**payload).model_copy(update={"keep_steps": False})
+    if req.engine not in ("python", "numba"):
+        raise ValueError(f"Unknown engine: {req.engine}")
+    executor = executor or ReplicateExecutor()
+    return executor.run(
+        partial(_replicate_metrics, _single_replicate(req)),
+        req.replicates,
+        seed=req.seed,
+        target=_precision_target(req),
+    )
+
+
+@router.post("/simulate/replicates", response_model=ReplicatesResponse)
+async def simulate_replicates(req: ReplicatesRequest):
+    """Run replicates of one configuration in parallel and return aggregate metrics."""
+    return await _offload(_simulate_replicates, req)
+
+
+def _simulate_replicates(req: ReplicatesRequest) -> Response:
+    single = _single_replicate(req)
+    target = _precision_target(req)
+    if not req.keep_steps:
+        try:
+            result = _replicate_executor.run(
+                partial(_replicate_metrics, single), req.replicates, seed=req.seed, target=target
+            )
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+        return _model_response(ReplicatesResponse(**result))
+
+    entropy, seeds = replicate_seeds(req.seed, req.replicates)
+    aggregate = ReplicateAggregate()
+    logs = []
+    try:
+        job = partial(_replicate_metrics, single, keep_steps=True)
+        if target is None:
+            results = _replicate_executor.map(job, seeds)
+        else:
+            results = _replicate_executor.map_until(job, seeds, aggregate, target)
+        for index, (metrics, handle) in enumerate(results):
+            aggregate.add(index, metrics)
+            logs.append(handle.attach())
+    except BaseException as e:
+        _release_logs(logs)
+        if isinstance(e, ValueError):
+            raise HTTPException(400, str(e))
+        raise
+    if sum(shared.nbytes for shared in logs) > _replicate_logs.max_bytes:
+        _release_logs(logs)
+        raise HTTPException(413, "Step logs too large to keep; lower replicates or max_steps")
+    replicates_id = uuid.uuid4().hex
+    _replicate_logs.put(replicates_id, logs)
+    return _model_response(ReplicatesResponse(
+        seed=entropy,
+        replicates=aggregate.folded,
+        metrics=aggregate.result(),
+        precision=target.report(aggregate) if target is not None else None,
+        replicates_id=replicates_id,
+    ))
+
+
+@router.get("/replicates/{replicates_id}/{index}/steps", response_model=list[StepData])
+async def replicate_steps(replicates_id: str, index: int):
+    """Step log of replicate `index` of a keep_steps replicate request."""
+    logs = _replicate_logs.get(replicates_id)
+    if logs is None:
+        raise HTTPException(404, f"Unknown or expired replicates: {replicates_id}")
+    if not 0 <= index < len(logs):
+        raise HTTPException(404, f"No replicate {index}")
+    log = logs[index].log
+    if log is None:
+        raise HTTPException(404, f"Unknown or expired replicates: {replicates_id}")
+    return Response(await _offload(_steps_text, log), media_type="application/json")
+
+
+def _steps_text(log) -> str:
+    return "".join(steps_json(log))
+
+
+@router.delete("/replicates/{replicates_id}", status_code=204)
+async def release_replicates(replicates_id: str):
+    """Release the step logs of a keep_steps replicate request."""
+    logs = _replicate_logs.pop(replicates_id)
+    if logs is None:
+        raise HTTPException(404, f"Unknown or expired replicates: {replicates_id}")
+    _release_logs(logs)
+    return Response(status_code=204)
+
+
+@router.get("/runs/{run_id}/state", response_model=RunStateResponse)
+async def run_state(run_id: str, step: int):
+    """Reconstruct agent and environment state after `step` steps of a keyframed run."""
+    keyframes = _keyframed_runs.get(run_id)
+    if keyframes is None:
+        raise HTTPException(404, f"Unknown or expired run: {run_id}")
+    return await _offload(_run_state_response, run_id, keyframes, step)
+
+
+def _run_state_response(run_id: str, keyframes, step: int) -> Response:
+    """Replay `keyframes` to `step`, off the event loop like a simulation."""
+    try:
+        snapshot = keyframes.reconstruct(step, _swap_env_schedules)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return _model_response(RunStateResponse(
+        run_id=run_id,
+        step=snapshot.step,
+        condition=snapshot.condition,
+        state=str(snapshot.observation),
+        agent=snapshot.agent.get_state(),
+        environment=snapshot.environment.get_state(),
+    ))
+
+
+def _csv_text(result) -> str:
+    return "".join(csv_chunks(result.steps))
+
+
+def _csv_response(result) -> StreamingResponse:
+    """The CSV download, formatted a chunk at a time as it is sent."""
     return StreamingResponse(
-        iter([output.getvalue()]),
+        csv_chunks(result.steps),
         media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=simulation_results.csv"},
     )
 
 
-@router.post("/simulate/json")
-async def simulate_json(req: SimulationRequest):
-    """Run a simulation and return results as downloadable JSON."""
-    result = _run_simulation(req)
-    data = {
-        "config": result.config,
-        "summary": result.summary,
-        "steps": result.steps,
-        "condition_summaries": result.condition_summaries,
-    }
-    content = json.dumps(data, indent=2, default=str)
+@router.post("/simulate/csv")
+async def simulate_csv(req: SimulationRequest, if_none_match: str | None = Header(None)):
+    """Run a simulation and return results as CSV."""
+    return await _simulate_as(req, "csv", if_none_match)
+
+
+def _json_chunks(result) -> Iterator[str]:
+    """The JSON download, as ``json.dumps(..., indent=2)`` would write it,
+    with the steps written straight from the step log."""
+    def member(name, value):
+        return f'\n  "{name}": ' + json.dumps(value, indent=2, default=str).replace("\n", "\n  ")
+
+    yield "{" + member("config", result.config) + "," + member("summary", result.summary) + ',\n  "steps": '
+    yield from steps_json(result.steps, indent=2, level=1)
+    yield "," + member("condition_summaries", result.condition_summaries)
+    if result.telemetry is not None:
+        yield "," + member("telemetry", result.telemetry.to_dict())
+    yield "\n}"
+
+
+def _json_text(result) -> str:
+    return "".join(_json_chunks(result))
+
+
+def _json_download(result) -> StreamingResponse:
     return StreamingResponse(
-        iter([content]),
+        _json_chunks(result),
         media_type="application/json",
         headers={"Content-Disposition": "attachment; filename=simulation_results.json"},
     )
+
+
+@router.post("/simulate/json")
+async def simulate_json(req: SimulationRequest, if_none_match: str | None = Header(None)):
+    """Run a simulation and return results as downloadable JSON."""
+    return await _simulate_as(req, "json", if_none_match)
+
+
+@router.post("/simulate/{format}")
+async def simulate_export(format: str, req: SimulationRequest, if_none_match: str | None = Header(None)):
+    """Run a simulation and return its step log, config and summaries as a
+    compressed NPZ, Arrow IPC or Parquet file."""
+    if format not in _BINARY_EXPORTS:
+        raise HTTPException(400, f"Unknown format: {format}. Must be one of {', '.join(_BINARY_EXPORTS)}")
+    _check_format(format)
+    return await _simulate_as(req, format, if_none_match)
+
+
+def _total_steps(req: SimulationRequest) -> int:
+    """Most steps `req` can run (stability criteria may end conditions early)."""
+    if req.conditions:
+        return sum(c.max_steps for c in req.conditions)
+    return req.max_steps
+
+
+def _simulation_job(req: SimulationRequest, report):
+    """Job body: run `req`, reporting progress, and keep its keyframes."""
+    max_steps = _total_steps(req)
+    try:
+        result = _run_simulation(req, on_progress=lambda progress: report({**progress, "max_steps": max_steps}))
+    except HTTPException as e:
+        raise ValueError(e.detail)
+    return result, _register_keyframes(result)
+
+
+@router.post("/jobs", response_model=JobStatus, status_code=202)
+async def submit_job(req: SimulationRequest):
+    """Queue a simulation and return its job id at once."""
+    if req.engine not in ("python", "numba"):
+        raise HTTPException(400, f"Unknown engine: {req.engine}")
+    try:
+        job = _jobs.submit(partial(_simulation_job, req))
+    except QueueFull as e:
+        raise HTTPException(429, str(e), headers={"Retry-After": str(JOB_RETRY_AFTER)})
+    return JobStatus(**job.to_dict())
+
+
+def _get_job(job_id: str) -> Job:
+    job = _jobs.get(job_id)
+    if job is None:
+        raise HTTPException(404, f"Unknown or expired job: {job_id}")
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def job_status(job_id: str):
+    """Status and latest progress of a job."""
+    return JobStatus(**_get_job(job_id).to_dict())
+
+
+@router.get("/jobs/{job_id}/result")
+async def job_result(job_id: str, format: str = "response"):
+    """Result of a finished job as a `SimulationResponse`, or as any download
+    of /simulate/{format}."""
+    job = _get_job(job_id)
+    if job.status == FAILED:
+        raise HTTPException(409, f"Job failed: {job.error}")
+    if job.status != DONE:
+        raise HTTPException(409, f"Job is {job.status}")
+    _check_format(format)
+    result, run_id = job.result
+    return await _offload(_result_response, result, format, run_id)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _job_events(job: Job, interval: float) -> AsyncIterator[str]:
+    """Server-sent events following `job`.
+
+    Every `interval` seconds in which the job reported progress, a
+    ``progress`` event carries its latest report, the reinforcement rate of
+    the current condition so far, and the cumulative record since the last
+    event: total responses of each action, across conditions, at each
+    report. The stream ends with a ``done`` or ``failed`` event holding the
+    job's status.
+    """
+    seen = 0
+    # Responses of the conditions already finished, and the last report read
+    completed: dict[str, int] = {}
+    last = None
+    while True:
+        # Every report is in before the job finishes, so read the status first
+        finished = job.status in (DONE, FAILED)
+        reports = job.reports[seen:]
+        seen += len(reports)
+        if reports:
+            record = []
+            for report in reports:
+                if last is not None and report["condition"] != last["condition"]:
+                    for action, n in last["action_counts"].items():
+                        completed[action] = completed.get(action, 0) + n
+                counts = {a: completed.get(a, 0) + n for a, n in report["action_counts"].items()}
+                record.append({"step": report["steps"], "counts": counts})
+                last = report
+            steps = last["condition_steps"]
+            rate = last["total_reinforcements"] / steps if steps > 0 else 0
+            yield _sse("progress", {**last, "reinforcement_rate": rate, "cumulative_record": record})
+        if finished:
+            yield _sse(job.status, JobStatus(**job.to_dict()).model_dump())
+            return
+        await asyncio.sleep(interval)
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, interval: float = EVENT_INTERVAL):
+    """Stream a job's progress as server-sent events, at most one every
+    `interval` seconds, until it finishes."""
+    if not interval >= MIN_EVENT_INTERVAL:
+        raise HTTPException(400, f"interval must be at least {MIN_EVENT_INTERVAL} seconds")
+    job = _get_job(job_id)
+    return StreamingResponse(
+        _job_events(job, interval),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
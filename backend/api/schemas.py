@@ -1,7 +1,7 @@
 """Pydantic request/response models for the API."""
 
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, Union
 
 
 class ScheduleConfig(BaseModel):
@@ -38,12 +38,40 @@ class GridConfig(BaseModel):
     start_col: int = Field(0, ge=0, description="Start column position")
 
 
+class StabilityCriterion(BaseModel):
+    window: int = Field(100, ge=1, le=100000, description="Steps per block (session)")
+    blocks: int = Field(3, ge=2, le=50, description="Number of most recent blocks compared")
+    metric: str = Field("choice_proportion", description="choice_proportion or reinforcement_rate")
+    action: Optional[str] = Field(
+        None, description="Action whose proportion is tracked (default choice_a / press_lever)"
+    )
+    tolerance: float = Field(0.1, ge=0, description="Max spread of block values, as a fraction of their mean")
+    min_steps: int = Field(0, ge=0, description="Never end the condition before this many steps")
+
+
+class AnalyticsConfig(BaseModel):
+    windowed_rates: bool = Field(True, description="Moving-window response and reinforcement rates")
+    rate_window: int = Field(100, ge=1, le=100000, description="Steps per rate window")
+    rate_sample_every: Optional[int] = Field(
+        None, ge=1, le=100000, description="Steps between rate samples (default rate_window)"
+    )
+    changeovers: bool = Field(True, description="Switches between successive responses")
+    inter_reinforcement: bool = Field(True, description="Steps between successive reinforcers")
+    post_reinforcement_pause: bool = Field(
+        True, description="Steps from each reinforcer until the reinforced response recurs"
+    )
+    pause_bins: int = Field(20, ge=1, le=1000, description="Histogram bins for post-reinforcement pauses")
+
+
 class ConditionConfig(BaseModel):
     label: str = Field(..., description="Condition label (e.g. 'Baseline', 'Extinction')")
     max_steps: int = Field(1000, ge=1, le=100000, description="Steps for this condition")
     schedule_a: Optional[ScheduleConfig] = Field(None, description="Schedule A (two-choice)")
     schedule_b: Optional[ScheduleConfig] = Field(None, description="Schedule B (two-choice)")
     schedule: Optional[ScheduleConfig] = Field(None, description="Lever schedule (grid)")
+    stability: Optional[StabilityCriterion] = Field(
+        None, description="End the condition early once responding is stable"
+    )
 
 
 class SimulationRequest(BaseModel):
@@ -71,6 +99,89 @@ class SimulationRequest(BaseModel):
         description="Up to 6 conditions for multi-phase experiments"
     )
 
+    keyframe_every: Optional[int] = Field(
+        None, ge=1, le=100000,
+        description="Keep a state keyframe every K steps so any step can be inspected"
+    )
+
+    analytics: Optional[AnalyticsConfig] = Field(
+        None, description="Per-condition analytics computed online during the run"
+    )
+    record_steps: bool = Field(True, description="Return per-step records (steps is empty when false)")
+    telemetry_every: Optional[int] = Field(
+        None, ge=1, le=100000,
+        description="Sample the agent's internal-state telemetry every N steps"
+    )
+    time_budget: Optional[float] = Field(
+        None, gt=0, le=3600,
+        description="Seconds the simulation may run; on expiry the partial result is returned"
+    )
+    engine: str = Field(
+        "python",
+        description="Engine: python, or numba to run whole conditions in compiled kernels when Numba is installed"
+    )
+    profile: bool = Field(False, description="Time the phases of the step loop into summary.profile")
+
+
+class PrecisionCriterion(BaseModel):
+    metric: str = Field(..., description="Replicate metric, e.g. reinforcement_rate or proportion_choice_a")
+    half_width: float = Field(..., gt=0, description="Target half-width of the confidence interval of its mean")
+    confidence: float = Field(0.95, gt=0, lt=1, description="Confidence level of the interval")
+    min_replicates: int = Field(10, ge=2, le=10000, description="Replicates in the first wave")
+
+
+class ReplicatesRequest(SimulationRequest):
+    replicates: int = Field(
+        ..., ge=1, le=10000,
+        description="Number of replicates (the maximum, with precision); "
+                    "seed is the root SeedSequence their seeds are spawned from"
+    )
+    keep_steps: bool = Field(
+        False, description="Keep every replicate's step log for /replicates/{replicates_id}/{index}/steps"
+    )
+    precision: Optional[PrecisionCriterion] = Field(
+        None, description="Run replicates in waves until the metric's mean is this precise"
+    )
+
+
+class MetricStats(BaseModel):
+    count: int
+    mean: float
+    sd: Optional[float] = None
+    min: float
+    max: float
+    quantiles: dict[str, Optional[float]] = Field(..., description="Approximate quantiles, keyed by probability")
+
+
+class PrecisionReport(BaseModel):
+    metric: str
+    target: float
+    confidence: float
+    half_width: Optional[float] = Field(None, description="Half-width reached; null with fewer than 2 replicates")
+    met: bool
+
+
+class ReplicatesResponse(BaseModel):
+    seed: int = Field(..., description="Root seed entropy; pass it as seed to reproduce the replicates")
+    replicates: int = Field(..., description="Number of replicates run")
+    metrics: dict[str, MetricStats]
+    precision: Optional[PrecisionReport] = None
+    replicates_id: Optional[str] = Field(None, description="Id of the kept step logs (keep_steps)")
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str = Field(..., description="queued, running, done or failed")
+    created: float = Field(..., description="Submission time (Unix seconds)")
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    progress: Optional[dict] = Field(
+        None,
+        description="Latest progress: steps, max_steps, condition, condition_steps, "
+                    "action_counts and total_reinforcements of the current condition"
+    )
+    error: Optional[str] = Field(None, description="Why a failed job failed")
+
 
 class StepData(BaseModel):
     step: int
@@ -81,6 +192,49 @@ class StepData(BaseModel):
     condition: int = Field(1, description="Condition number (1-indexed)")
 
 
+class StepColumns(BaseModel):
+    """The steps of a ``shape=columnar`` response, one array per field.
+
+    `state`, `action` and `schedule_id` hold codes into `state_names`,
+    `action_names` and `schedule_names`.
+    """
+    step: list[int]
+    state: list[int]
+    action: list[int]
+    reinforced: list[bool]
+    schedule_id: list[int]
+    condition: list[int]
+    state_names: list[str]
+    action_names: list[str]
+    schedule_names: list[str]
+
+
+class StepRuns(BaseModel):
+    """One column as runs: run ``k`` holds ``values[k]`` from index
+    ``starts[k]`` up to the next start."""
+    values: list[int]
+    starts: list[int]
+
+
+class StepCompact(BaseModel):
+    """The steps of a ``shape=compact`` response (see `simulation.compact`).
+
+    `step` holds the step number minus the step index. `reinforced` has
+    either `bits`, the flags as a base64 bitmap, lowest bit first, or `at`,
+    the indices of the reinforced steps.
+    """
+    size: int
+    step: StepRuns
+    state: StepRuns
+    action: StepRuns
+    reinforced: dict[str, Union[str, list[int]]]
+    schedule_id: StepRuns
+    condition: StepRuns
+    state_names: list[str]
+    action_names: list[str]
+    schedule_names: list[str]
+
+
 class ConditionSummary(BaseModel):
     condition: int
     label: str
@@ -90,6 +244,9 @@ class ConditionSummary(BaseModel):
     total_reinforcements: int
     reinforcement_rate: float
     action_counts: dict[str, int]
+    stable_step: Optional[int] = Field(None, description="Global step where stability was reached")
+    analytics: Optional[dict] = Field(None, description="Results of the requested analytics, by name")
+    truncated: bool = Field(False, description="Condition cut short by the time budget")
 
 
 class SimulationResponse(BaseModel):
@@ -97,3 +254,16 @@ class SimulationResponse(BaseModel):
     summary: dict
     steps: list[StepData]
     condition_summaries: list[ConditionSummary] = Field(default_factory=list)
+    run_id: Optional[str] = Field(None, description="Id for /runs/{run_id}/state (keyframed runs)")
+    telemetry: Optional[dict] = Field(None, description="Sampled agent telemetry, one list per field")
+    truncated: bool = Field(False, description="The time budget ran out before the simulation finished")
+    step_reached: Optional[int] = Field(None, description="Last step simulated, when truncated")
+
+
+class RunStateResponse(BaseModel):
+    run_id: str
+    step: int
+    condition: int = Field(..., description="Condition number (1-indexed)")
+    state: str = Field(..., description="Environment state observed after the step")
+    agent: dict
+    environment: dict
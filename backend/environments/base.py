@@ -1,8 +1,11 @@
-"""Abstract base environment and StepResult dataclass."""
+"""Abstract base environment, StepResult dataclass and step buffers."""
 
+import copy
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import Any
+from typing import Any, Sequence
+
+import numpy as np
 
 
 @dataclass
@@ -16,8 +19,63 @@ class StepResult:
     info: dict = field(default_factory=dict)
 
 
+@dataclass(slots=True)
+class StepBuffer:
+    """Reusable output buffer filled in place by environment.step_into().
+
+    `action` is the integer id (index into `environment.ACTIONS`) of the action
+    actually executed, or -1 if the requested action was not recognised.
+    """
+    state: Any = None
+    action: int = 0
+    reinforced: bool = False
+    schedule_id: str = ""
+    done: bool = False
+
+
+@dataclass(slots=True)
+class BatchStepBuffer:
+    """Reusable output buffer filled in place by environment.step_batch().
+
+    Arrays hold one entry per replicate. `states` is replaced, never mutated,
+    on every step. `state_ids` index `environment.batch_states` and
+    `schedule` indexes `environment.batch_schedule_ids`.
+    """
+    states: list
+    state_ids: np.ndarray
+    action: np.ndarray
+    reinforced: np.ndarray
+    schedule: np.ndarray
+    done: np.ndarray
+
+    @classmethod
+    def empty(cls, size: int) -> "BatchStepBuffer":
+        return cls(
+            states=[None] * size,
+            state_ids=np.zeros(size, dtype=np.intp),
+            action=np.zeros(size, dtype=np.intp),
+            reinforced=np.zeros(size, dtype=np.bool_),
+            schedule=np.zeros(size, dtype=np.intp),
+            done=np.zeros(size, dtype=np.bool_),
+        )
+
+
 class AbstractEnvironment(ABC):
-    """Base class for all environments."""
+    """Base class for all environments.
+
+    Besides the string-action `step()` API, environments expose an integer
+    action-id fast path: `ACTIONS` fixes the id -> name table and
+    `step_into(action_id, buffer)` writes the outcome into a caller-owned
+    `StepBuffer` instead of allocating a `StepResult`.
+
+    For lockstep replicate runs, `reset_batch(rngs)` and
+    `step_batch(actions, buffer)` advance K replicates at once, each drawing
+    from its own RNG stream. The default keeps one copy of the environment
+    per replicate; environments override it with array implementations.
+    """
+
+    #: Action names indexed by integer action id.
+    ACTIONS: tuple[str, ...] = ()
 
     @abstractmethod
     def reset(self) -> Any:
@@ -29,6 +87,75 @@ class AbstractEnvironment(ABC):
         """Execute action and return StepResult."""
         pass
 
+    def step_into(self, action: int, out: StepBuffer):
+        """Execute integer action id and write the outcome into `out`.
+
+        The default adapts `step()`; environments override it with a native
+        implementation that performs no per-step allocation.
+        """
+        actions = self.get_available_actions()
+        result = self.step(actions[action])
+        out.state = result.state
+        out.action = actions.index(result.action_taken) if result.action_taken in actions else -1
+        out.reinforced = result.reinforced
+        out.schedule_id = result.schedule_id
+        out.done = result.done
+
+    def set_rng(self, rng: np.random.Generator):
+        """Draw all future randomness (schedule draws) from `rng`."""
+        pass
+
+    def replicate(self, rng: np.random.Generator) -> "AbstractEnvironment":
+        """Return an independent deep copy of this environment drawing from `rng`."""
+        replica = copy.deepcopy(self)
+        replica.set_rng(rng)
+        return replica
+
+    def reset_batch(self, rngs: Sequence) -> list:
+        """Reset one replicate per RNG stream and return their initial states."""
+        # Drop replicates of a previous batch so they are not copied
+        self._replicas = []
+        self._replicas = [self.replicate(rng) for rng in rngs]
+        self._batch_buffer = StepBuffer()
+        self._batch_state_codes = {}
+        self._batch_schedule_codes = {}
+        self.batch_states = []
+        self.batch_schedule_ids = []
+        return [r.reset() for r in self._replicas]
+
+    def _batch_code(self, table: list, codes: dict, value: Any) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(table)
+            table.append(value)
+        return code
+
+    def step_batch(self, actions: np.ndarray, out: BatchStepBuffer):
+        """Execute one action id per replicate and write the outcomes into `out`."""
+        buf = self._batch_buffer
+        states = []
+        for k, (replica, action) in enumerate(zip(self._replicas, actions.tolist())):
+            replica.step_into(action, buf)
+            states.append(buf.state)
+            out.state_ids[k] = self._batch_code(self.batch_states, self._batch_state_codes, buf.state)
+            out.action[k] = buf.action
+            out.reinforced[k] = buf.reinforced
+            out.schedule[k] = self._batch_code(
+                self.batch_schedule_ids, self._batch_schedule_codes, buf.schedule_id
+            )
+            out.done[k] = buf.done
+        out.states = states
+
+    def get_batch_visit_counts(self) -> list[dict] | None:
+        """Per-replicate visit counts, or None if the environment keeps none."""
+        if not hasattr(self, "visit_counts"):
+            return None
+        return [r.visit_counts for r in self._replicas]
+
+    def get_state(self) -> dict:
+        """Return the environment's current state (JSON-serializable) for inspection."""
+        return {}
+
     @abstractmethod
     def get_available_actions(self) -> list[str]:
         """Return list of valid action names."""
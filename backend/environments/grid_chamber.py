@@ -1,7 +1,11 @@
 """Grid operant chamber environment."""
 
-from typing import Any
-from environments.base import AbstractEnvironment, StepResult
+from typing import Any, Sequence
+
+import numpy as np
+
+from environments.base import AbstractEnvironment, BatchStepBuffer, StepBuffer, StepResult
+from schedules.batch import batch_schedule
 from schedules.reinforcement import Schedule
 
 
@@ -20,6 +24,13 @@ class GridChamberEnvironment(AbstractEnvironment):
         "stay": (0, 0),
     }
 
+    ACTIONS = ("up", "down", "left", "right", "stay", "press_lever")
+    ACTION_IDS = {name: i for i, name in enumerate(ACTIONS)}
+    # Movement deltas indexed by action id (movement actions only)
+    MOVES = tuple(map(DIRECTIONS.get, ACTIONS[:5]))
+    STAY = ACTION_IDS["stay"]
+    PRESS_LEVER = ACTION_IDS["press_lever"]
+
     def __init__(
         self,
         rows: int = 5,
@@ -57,6 +68,22 @@ class GridChamberEnvironment(AbstractEnvironment):
         return abs(r - lr) <= 1 and abs(c - lc) <= 1
 
     def step(self, action: str) -> StepResult:
+        out = StepBuffer()
+        self.step_into(self.ACTION_IDS.get(action, -1), out)
+        return StepResult(
+            state=out.state,
+            action_taken=self.ACTIONS[out.action] if out.action >= 0 else action,
+            reinforced=out.reinforced,
+            schedule_id=out.schedule_id,
+            done=out.done,
+            info={
+                "step": self.step_count,
+                "position": self.pos,
+                "visit_counts": dict(self.visit_counts),
+            },
+        )
+
+    def step_into(self, action: int, out: StepBuffer):
         self.step_count += 1
 
         if self.schedule:
@@ -66,14 +93,14 @@ class GridChamberEnvironment(AbstractEnvironment):
         reinforced = False
         schedule_id = ""
 
-        if action == "press_lever":
+        if action == self.PRESS_LEVER:
             if self._is_adjacent_to_lever():
                 reinforced = self.schedule.check(True) if self.schedule else False
                 schedule_id = "lever_schedule"
             else:
-                actual_action = "stay"
-        elif action in self.DIRECTIONS:
-            dr, dc = self.DIRECTIONS[action]
+                actual_action = self.STAY
+        elif action >= 0:
+            dr, dc = self.MOVES[action]
             new_r = max(0, min(self.rows - 1, self.pos[0] + dr))
             new_c = max(0, min(self.cols - 1, self.pos[1] + dc))
             self.pos = (new_r, new_c)
@@ -81,23 +108,102 @@ class GridChamberEnvironment(AbstractEnvironment):
                 self.schedule.check(False)
 
         self._record_visit(self.pos)
-        done = self.step_count >= self.max_steps
 
-        return StepResult(
-            state=self.pos,
-            action_taken=actual_action,
-            reinforced=reinforced,
-            schedule_id=schedule_id,
-            done=done,
-            info={
-                "step": self.step_count,
-                "position": self.pos,
-                "visit_counts": dict(self.visit_counts),
-            },
-        )
+        out.state = self.pos
+        out.action = actual_action
+        out.reinforced = reinforced
+        out.schedule_id = schedule_id
+        out.done = self.step_count >= self.max_steps
+
+    def set_rng(self, rng: np.random.Generator):
+        if self.schedule:
+            self.schedule.set_rng(rng)
+
+    def reset_batch(self, rngs: Sequence) -> list:
+        self._batch_schedule = batch_schedule(self.schedule, rngs) if self.schedule else None
+        if self.schedule and self._batch_schedule is None:
+            self._vectorized = False
+            return super().reset_batch(rngs)
+
+        self._vectorized = True
+        size = len(rngs)
+        self._batch_step = 0
+        self._batch_index = np.arange(size)
+        self._batch_rows = np.full(size, self.start_pos[0], dtype=np.intp)
+        self._batch_cols = np.full(size, self.start_pos[1], dtype=np.intp)
+        # State id = row * cols + col; batch_states maps it back to the position tuple
+        self.batch_states = [(r, c) for r in range(self.rows) for c in range(self.cols)]
+        self.batch_schedule_ids = ["", "lever_schedule"]
+        # Movement deltas per action id; press_lever never moves
+        deltas = np.array(self.MOVES + ((0, 0),), dtype=np.intp)
+        self._batch_dr = deltas[:, 0]
+        self._batch_dc = deltas[:, 1]
+        self._batch_visits = np.zeros((size, self.rows * self.cols), dtype=np.int64)
+        self._batch_first_visit = np.zeros((size, self.rows * self.cols), dtype=np.int64)
+        self._record_batch_visits(self._batch_rows * self.cols + self._batch_cols)
+        return [self.start_pos] * size
+
+    def _record_batch_visits(self, cells: np.ndarray):
+        index = self._batch_index
+        first = self._batch_visits[index, cells] == 0
+        self._batch_first_visit[index[first], cells[first]] = self._batch_step
+        self._batch_visits[index, cells] += 1
+
+    def step_batch(self, actions: np.ndarray, out: BatchStepBuffer):
+        if not self._vectorized:
+            return super().step_batch(actions, out)
+
+        self._batch_step += 1
+        if self._batch_schedule:
+            self._batch_schedule.tick()
+
+        rows, cols = self._batch_rows, self._batch_cols
+        lr, lc = self.lever_pos
+        press = actions == self.PRESS_LEVER
+        adjacent = (np.abs(rows - lr) <= 1) & (np.abs(cols - lc) <= 1)
+        pressed = press & adjacent
+
+        rows += self._batch_dr[actions]
+        cols += self._batch_dc[actions]
+        np.clip(rows, 0, self.rows - 1, out=rows)
+        np.clip(cols, 0, self.cols - 1, out=cols)
+
+        cells = rows * self.cols + cols
+        self._record_batch_visits(cells)
+        cell_states = self.batch_states
+
+        out.states = [cell_states[c] for c in cells.tolist()]
+        out.state_ids[:] = cells
+        np.copyto(out.action, np.where(press & ~adjacent, self.STAY, actions))
+        if self._batch_schedule:
+            out.reinforced[:] = self._batch_schedule.check(pressed)
+        else:
+            out.reinforced[:] = False
+        out.schedule[:] = pressed
+        out.done[:] = self._batch_step >= self.max_steps
+
+    def get_batch_visit_counts(self) -> list[dict]:
+        if not self._vectorized:
+            return super().get_batch_visit_counts()
+        cell_states = self.batch_states
+        counts = []
+        for visits, first in zip(self._batch_visits, self._batch_first_visit):
+            visited = np.flatnonzero(visits)
+            # Match the scalar dict's insertion order: by first visit
+            order = visited[np.argsort(first[visited], kind="stable")]
+            counts.append({cell_states[c]: int(visits[c]) for c in order.tolist()})
+        return counts
+
+    def get_state(self) -> dict:
+        return {
+            "step_count": self.step_count,
+            "position": list(self.pos),
+            "visit_counts": {str(k): v for k, v in self.visit_counts.items()},
+            "schedule": self.schedule.get_state() if self.schedule else None,
+        }
 
     def get_available_actions(self) -> list[str]:
-        return ["up", "down", "left", "right", "stay", "press_lever"]
+        return list(self.ACTIONS)
 
     @property
     def name(self) -> str:
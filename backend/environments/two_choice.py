@@ -1,7 +1,11 @@
 """Two-choice operant chamber environment."""
 
-from typing import Any
-from environments.base import AbstractEnvironment, StepResult
+from typing import Any, Sequence
+
+import numpy as np
+
+from environments.base import AbstractEnvironment, BatchStepBuffer, StepBuffer, StepResult
+from schedules.batch import batch_schedule
 from schedules.reinforcement import Schedule
 
 
@@ -11,6 +15,9 @@ class TwoChoiceEnvironment(AbstractEnvironment):
     Two response options (choice_a, choice_b), each with its own reinforcement schedule.
     """
 
+    ACTIONS = ("choice_a", "choice_b")
+    ACTION_IDS = {name: i for i, name in enumerate(ACTIONS)}
+
     def __init__(self, schedule_a: Schedule, schedule_b: Schedule, max_steps: int = 1000):
         self.schedule_a = schedule_a
         self.schedule_b = schedule_b
@@ -24,6 +31,18 @@ class TwoChoiceEnvironment(AbstractEnvironment):
         return "start"
 
     def step(self, action: str) -> StepResult:
+        out = StepBuffer()
+        self.step_into(self.ACTION_IDS.get(action, -1), out)
+        return StepResult(
+            state=out.state,
+            action_taken=action,
+            reinforced=out.reinforced,
+            schedule_id=out.schedule_id,
+            done=out.done,
+            info={"step": self.step_count},
+        )
+
+    def step_into(self, action: int, out: StepBuffer):
         self.step_count += 1
 
         # Tick interval schedules
@@ -34,28 +53,68 @@ class TwoChoiceEnvironment(AbstractEnvironment):
         reinforced = False
         schedule_id = ""
 
-        if action == "choice_a":
+        if action == 0:
             reinforced = self.schedule_a.check(True)
             self.schedule_b.check(False)
             schedule_id = "schedule_a"
-        elif action == "choice_b":
+        elif action == 1:
             reinforced = self.schedule_b.check(True)
             self.schedule_a.check(False)
             schedule_id = "schedule_b"
 
-        done = self.step_count >= self.max_steps
+        out.state = "start"
+        out.action = action
+        out.reinforced = reinforced
+        out.schedule_id = schedule_id
+        out.done = self.step_count >= self.max_steps
 
-        return StepResult(
-            state="start",
-            action_taken=action,
-            reinforced=reinforced,
-            schedule_id=schedule_id,
-            done=done,
-            info={"step": self.step_count},
-        )
+    def set_rng(self, rng: np.random.Generator):
+        self.schedule_a.set_rng(rng)
+        self.schedule_b.set_rng(rng)
+
+    def reset_batch(self, rngs: Sequence) -> list:
+        self._batch_a = batch_schedule(self.schedule_a, rngs)
+        self._batch_b = batch_schedule(self.schedule_b, rngs)
+        if self._batch_a is None or self._batch_b is None:
+            self._vectorized = False
+            return super().reset_batch(rngs)
+
+        self._vectorized = True
+        self._batch_step = 0
+        self.batch_states = ["start"]
+        self.batch_schedule_ids = ["", "schedule_a", "schedule_b"]
+        self._batch_state_list = ["start"] * len(rngs)
+        return self._batch_state_list
+
+    def step_batch(self, actions: np.ndarray, out: BatchStepBuffer):
+        if not self._vectorized:
+            return super().step_batch(actions, out)
+
+        self._batch_step += 1
+        self._batch_a.tick()
+        self._batch_b.tick()
+
+        chose_a = actions == 0
+        chose_b = actions == 1
+        reinforced_a = self._batch_a.check(chose_a)
+        reinforced_b = self._batch_b.check(chose_b)
+
+        out.states = self._batch_state_list
+        out.state_ids[:] = 0
+        out.action[:] = actions
+        np.logical_or(reinforced_a, reinforced_b, out=out.reinforced)
+        out.schedule[:] = chose_a + 2 * chose_b
+        out.done[:] = self._batch_step >= self.max_steps
+
+    def get_state(self) -> dict:
+        return {
+            "step_count": self.step_count,
+            "schedule_a": self.schedule_a.get_state(),
+            "schedule_b": self.schedule_b.get_state(),
+        }
 
     def get_available_actions(self) -> list[str]:
-        return ["choice_a", "choice_b"]
+        return list(self.ACTIONS)
 
     @property
     def name(self) -> str:
@@ -0,0 +1,31 @@
+"""Operation counters for profiling the ETBD hot path."""
+
+import numpy as np
+
+from etbd_internals.mutation import mutate
+
+
+class OpCounters:
+    """Counts of generations, parent draws and mutation bit flips.
+
+    An Organism counts into the `OpCounters` attached as its `counters`;
+    with none attached its loops call the plain functions and count nothing.
+    """
+
+    def __init__(self):
+        self.generations = 0
+        self.parent_draws = 0
+        self.bit_flips = 0
+
+    def mutate(self, phenotype: int, mutation_rate: float, rng: np.random.Generator) -> int:
+        """`mutate()`, counting the bits it flips."""
+        child = mutate(phenotype, mutation_rate, rng)
+        self.bit_flips += bin(phenotype ^ child).count("1")
+        return child
+
+    def to_dict(self) -> dict:
+        return {
+            "generations": self.generations,
+            "parent_draws": self.parent_draws,
+            "bit_flips": self.bit_flips,
+        }
@@ -5,12 +5,16 @@ import numpy as np
 BITS = 10  # 2^10 = 1024 phenotype values
 
 
-def mutate(phenotype: int, mutation_rate: float = 0.1) -> int:
+def mutate(
+    phenotype: int, mutation_rate: float = 0.1, rng: np.random.Generator | None = None
+) -> int:
     """Apply bit-flip mutation to a phenotype.
 
-    Each bit is flipped with probability mutation_rate.
+    Each bit is flipped with probability mutation_rate, drawing from `rng`.
     """
+    if rng is None:
+        rng = np.random.default_rng()
     for bit in range(BITS):
-        if np.random.random() < mutation_rate:
+        if rng.random() < mutation_rate:
             phenotype ^= (1 << bit)
     return phenotype
@@ -4,38 +4,44 @@ import numpy as np
 from etbd_internals.selection import select_parent
 from etbd_internals.recombination import recombine
 from etbd_internals.mutation import mutate
+from etbd_internals.counters import OpCounters
 
 
 class Organism:
     """An ETBD organism with a population of behavioral phenotypes.
 
     Each phenotype is an integer in [0, 1023] (10-bit representation).
+    While `counters` holds an `OpCounters`, generations count into it.
     """
 
+    # Class default, so organisms pickled before counters existed still load
+    counters: OpCounters | None = None
+
     def __init__(
         self,
         population_size: int = 100,
         mutation_rate: float = 0.1,
         fitness_decay: float = 0.95,
         max_phenotype: int = 1024,
+        rng: np.random.Generator | None = None,
     ):
         self.population_size = population_size
         self.mutation_rate = mutation_rate
         self.fitness_decay = fitness_decay
         self.max_phenotype = max_phenotype
+        self.rng = np.random.default_rng() if rng is None else rng
         self.population: list[int] = []
         self.reset()
 
     def reset(self):
         """Initialize population with random phenotypes."""
-        self.population = [
-            np.random.randint(0, self.max_phenotype)
-            for _ in range(self.population_size)
-        ]
+        self.population = self.rng.integers(
+            0, self.max_phenotype, size=self.population_size
+        ).tolist()
 
     def emit(self) -> int:
         """Emit a response by randomly selecting from the population."""
-        return self.population[np.random.randint(len(self.population))]
+        return self.population[self.rng.integers(len(self.population))]
 
     def reinforce(self, target: int):
         """Apply selection, recombination, and mutation using the given target phenotype.
@@ -43,29 +49,41 @@ class Organism:
         This represents one generation of the genetic algorithm, selecting for
         behaviors near the reinforced target.
         """
+        rng = self.rng
+        counters = self.counters
+        mutate_child = mutate if counters is None else counters.mutate
         new_population = []
         for _ in range(self.population_size):
             parent_a = select_parent(
-                self.population, target, self.max_phenotype, self.fitness_decay
+                self.population, target, self.max_phenotype, self.fitness_decay, rng
             )
             parent_b = select_parent(
-                self.population, target, self.max_phenotype, self.fitness_decay
+                self.population, target, self.max_phenotype, self.fitness_decay, rng
             )
-            child = recombine(parent_a, parent_b)
-            child = mutate(child, self.mutation_rate)
+            child = recombine(parent_a, parent_b, rng)
+            child = mutate_child(child, self.mutation_rate, rng)
             new_population.append(child)
         self.population = new_population
+        if counters is not None:
+            counters.generations += 1
+            counters.parent_draws += 2 * self.population_size
 
     def drift(self):
         """Apply random recombination and mutation without selection pressure.
 
         Used when no reinforcement occurs — parents are selected uniformly.
         """
+        rng = self.rng
+        counters = self.counters
+        mutate_child = mutate if counters is None else counters.mutate
         new_population = []
         for _ in range(self.population_size):
-            parent_a = self.population[np.random.randint(len(self.population))]
-            parent_b = self.population[np.random.randint(len(self.population))]
-            child = recombine(parent_a, parent_b)
-            child = mutate(child, self.mutation_rate)
+            parent_a = self.population[rng.integers(len(self.population))]
+            parent_b = self.population[rng.integers(len(self.population))]
+            child = recombine(parent_a, parent_b, rng)
+            child = mutate_child(child, self.mutation_rate, rng)
             new_population.append(child)
         self.population = new_population
+        if counters is not None:
+            counters.generations += 1
+            counters.parent_draws += 2 * self.population_size
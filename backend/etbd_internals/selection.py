@@ -9,6 +9,7 @@ def select_parent(
     target: int,
     max_val: int = 1024,
     decay: float = 0.95,
+    rng: np.random.Generator | None = None,
 ) -> int:
     """Select a parent from the population using fitness-proportionate selection.
 
@@ -17,16 +18,19 @@ def select_parent(
         target: The reinforced phenotype target.
         max_val: Maximum phenotype value (circular wrap).
         decay: Fitness decay parameter.
+        rng: Generator to draw from (a fresh unseeded one if not given).
 
     Returns:
         Selected phenotype.
     """
+    if rng is None:
+        rng = np.random.default_rng()
     fitnesses = np.array([
         fitness_value(p, target, max_val, decay) for p in population
     ])
     total = fitnesses.sum()
     if total == 0:
-        return population[np.random.randint(len(population))]
+        return population[rng.integers(len(population))]
     probs = fitnesses / total
-    idx = np.random.choice(len(population), p=probs)
+    idx = rng.choice(len(population), p=probs)
     return population[idx]
@@ -0,0 +1,127 @@
+"""Array implementations of FR, VR, FI, VI over K lockstep replicates."""
+
+from abc import ABC, abstractmethod
+from typing import Sequence
+
+import numpy as np
+
+from schedules.reinforcement import FR, VR, FI, VI, Schedule
+
+
+class ScheduleBatch(ABC):
+    """K independent replicates of one schedule, advanced with array operations.
+
+    `check(target)` takes a boolean mask of the replicates that made an
+    in-class response and returns the mask of replicates that were
+    reinforced. Out-of-class checks never change the state of the built-in
+    schedules, so they need no call. Replicate k draws only from `rngs[k]`,
+    in the same order as the scalar schedule would.
+    """
+
+    def __init__(self, schedule: Schedule, rngs: Sequence):
+        self.value = schedule.value
+        self.rngs = list(rngs)
+        self.size = len(self.rngs)
+        self.reset()
+
+    @abstractmethod
+    def reset(self):
+        """Reset every replicate's counters."""
+        pass
+
+    @abstractmethod
+    def check(self, target: np.ndarray) -> np.ndarray:
+        """Return the mask of replicates reinforced for an in-class response.
+
+        Args:
+            target: Mask of the replicates that made an in-class response.
+        """
+        pass
+
+    def tick(self):
+        """Advance every replicate one time step (for interval schedules)."""
+        pass
+
+
+class FRBatch(ScheduleBatch):
+    def reset(self):
+        self.count = np.zeros(self.size, dtype=np.int64)
+
+    def check(self, target: np.ndarray) -> np.ndarray:
+        self.count += target
+        hit = target & (self.count >= self.value)
+        self.count[hit] = 0
+        return hit
+
+
+class VRBatch(ScheduleBatch):
+    def reset(self):
+        self.next_ratio = np.array([self._draw(rng) for rng in self.rngs], dtype=np.int64)
+        self.count = np.zeros(self.size, dtype=np.int64)
+
+    def _draw(self, rng) -> int:
+        return max(1, int(rng.exponential(self.value)))
+
+    def check(self, target: np.ndarray) -> np.ndarray:
+        self.count += target
+        hit = target & (self.count >= self.next_ratio)
+        if hit.any():
+            self.count[hit] = 0
+            for k in np.flatnonzero(hit).tolist():
+                self.next_ratio[k] = self._draw(self.rngs[k])
+        return hit
+
+
+class FIBatch(ScheduleBatch):
+    def reset(self):
+        self.elapsed = np.zeros(self.size, dtype=np.int64)
+        self.armed = np.zeros(self.size, dtype=np.bool_)
+
+    def check(self, target: np.ndarray) -> np.ndarray:
+        hit = self.armed & target
+        self.armed[hit] = False
+        self.elapsed[hit] = 0
+        return hit
+
+    def tick(self):
+        self.elapsed += 1
+        self.armed |= self.elapsed >= self.value
+
+
+class VIBatch(ScheduleBatch):
+    def reset(self):
+        self.elapsed = np.zeros(self.size, dtype=np.int64)
+        self.armed = np.zeros(self.size, dtype=np.bool_)
+        self.next_interval = np.array([self._draw(rng) for rng in self.rngs], dtype=np.int64)
+
+    def _draw(self, rng) -> int:
+        return max(1, int(rng.exponential(self.value)))
+
+    def check(self, target: np.ndarray) -> np.ndarray:
+        hit = self.armed & target
+        if hit.any():
+            self.armed[hit] = False
+            self.elapsed[hit] = 0
+            for k in np.flatnonzero(hit).tolist():
+                self.next_interval[k] = self._draw(self.rngs[k])
+        return hit
+
+    def tick(self):
+        self.elapsed += 1
+        self.armed |= self.elapsed >= self.next_interval
+
+
+BATCH_SCHEDULES = {
+    FR: FRBatch,
+    VR: VRBatch,
+    FI: FIBatch,
+    VI: VIBatch,
+}
+
+
+def batch_schedule(schedule: Schedule, rngs: Sequence) -> ScheduleBatch | None:
+    """Return the array counterpart of `schedule`, or None if it has none."""
+    cls = BATCH_SCHEDULES.get(type(schedule))
+    if cls is None:
+        return None
+    return cls(schedule, rngs)
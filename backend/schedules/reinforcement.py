@@ -5,12 +5,26 @@ from abc import ABC, abstractmethod
 
 
 class Schedule(ABC):
-    """Base reinforcement schedule."""
+    """Base reinforcement schedule.
 
-    def __init__(self, value: int):
+    Variable schedules draw from `rng`, normally the Generator owned by the
+    simulation (a fresh unseeded one if not given).
+    """
+
+    def __init__(self, value: int, rng: np.random.Generator | None = None):
         self.value = value
+        self.rng = np.random.default_rng() if rng is None else rng
         self.reset()
 
+    def set_rng(self, rng: np.random.Generator):
+        """Draw all future randomness from `rng`."""
+        self.rng = rng
+
+    def get_state(self) -> dict:
+        """Return the schedule type, value and counters for inspection."""
+        state = {k: v for k, v in vars(self).items() if k != "rng"}
+        return {"type": type(self).__name__, **state}
+
     @abstractmethod
     def reset(self):
         """Reset internal counters."""
@@ -59,7 +73,7 @@ class VR(Schedule):
 
     def _set_next_ratio(self):
         # Exponential distribution with mean = self.value, rounded to at least 1
-        self.next_ratio = max(1, int(np.random.exponential(self.value)))
+        self.next_ratio = max(1, int(self.rng.exponential(self.value)))
 
     def check(self, is_target_response: bool) -> bool:
         if not is_target_response:
@@ -104,7 +118,7 @@ class VI(Schedule):
         self._set_next_interval()
 
     def _set_next_interval(self):
-        self.next_interval = max(1, int(np.random.exponential(self.value)))
+        self.next_interval = max(1, int(self.rng.exponential(self.value)))
 
     def check(self, is_target_response: bool) -> bool:
         if self.armed and is_target_response:
@@ -120,8 +134,10 @@ class VI(Schedule):
             self.armed = True
 
 
-def create_schedule(schedule_type: str, value: int) -> Schedule:
-    """Factory function to create a schedule by type name."""
+def create_schedule(
+    schedule_type: str, value: int, rng: np.random.Generator | None = None
+) -> Schedule:
+    """Factory function to create a schedule by type name, drawing from `rng`."""
     schedules = {
         "FR": FR,
         "VR": VR,
@@ -131,4 +147,4 @@ def create_schedule(schedule_type: str, value: int) -> Schedule:
     cls = schedules.get(schedule_type.upper())
     if cls is None:
         raise ValueError(f"Unknown schedule type: {schedule_type}. Must be one of {list(schedules.keys())}")
-    return cls(value)
+    return cls(value, rng)
@@ -0,0 +1,197 @@
+"""Online per-condition analytics, updated once per step.
+
+Each accumulator sees one step at a time, as ``update(action_id, reinforced)``,
+and keeps only constant-size state, so analytics never need the step log.
+"""
+
+import math
+from abc import ABC, abstractmethod
+from typing import Sequence
+
+
+class Accumulator(ABC):
+    """One statistic of a condition, computed online.
+
+    Subclasses take the condition's actions as their first argument, so the
+    class itself (or a ``functools.partial`` of it) serves as the factory the
+    runner calls at the start of every condition.
+    """
+
+    name: str
+
+    @abstractmethod
+    def update(self, action: int, reinforced: bool):
+        """Account for one step."""
+
+    @abstractmethod
+    def result(self) -> dict:
+        """JSON-ready summary of the steps seen so far."""
+
+
+class WindowedRates(Accumulator):
+    """Response and reinforcement rates over a moving window of `window` steps.
+
+    A ring buffer holds the last `window` steps: each update adds the newest
+    step to running counts and removes the step falling out of the window.
+    The rates are sampled every `sample_every` steps (default: `window`).
+    """
+
+    name = "windowed_rates"
+
+    def __init__(self, actions: Sequence[str], window: int = 100, sample_every: int | None = None):
+        self.actions = list(actions)
+        self.window = window
+        self.sample_every = sample_every or window
+        self._actions = [0] * window
+        self._reinforced = [False] * window
+        self._counts = [0] * len(self.actions)
+        self._reinforcers = 0
+        self.n = 0
+        self.steps: list[int] = []
+        self.response_rates: list[list[float]] = [[] for _ in self.actions]
+        self.reinforcement_rates: list[float] = []
+
+    def update(self, action: int, reinforced: bool):
+        pos = self.n % self.window
+        if self.n >= self.window:
+            self._counts[self._actions[pos]] -= 1
+            if self._reinforced[pos]:
+                self._reinforcers -= 1
+        self._actions[pos] = action
+        self._reinforced[pos] = reinforced
+        self._counts[action] += 1
+        if reinforced:
+            self._reinforcers += 1
+        self.n += 1
+        if self.n % self.sample_every == 0:
+            span = min(self.n, self.window)
+            self.steps.append(self.n)
+            for rates, count in zip(self.response_rates, self._counts):
+                rates.append(count / span)
+            self.reinforcement_rates.append(self._reinforcers / span)
+
+    def result(self) -> dict:
+        return {
+            "window": self.window,
+            "steps": list(self.steps),
+            "response_rate": {a: list(r) for a, r in zip(self.actions, self.response_rates)},
+            "reinforcement_rate": list(self.reinforcement_rates),
+        }
+
+
+class Changeovers(Accumulator):
+    """Switches between successive responses.
+
+    Only actions in `responses` (default: all) count as responses; other
+    actions, such as movement, neither make nor break a changeover.
+    """
+
+    name = "changeovers"
+
+    def __init__(self, actions: Sequence[str], responses: Sequence[str] | None = None):
+        self.actions = list(actions)
+        tracked = set(responses) if responses is not None else set(self.actions)
+        self._tracked = [a in tracked for a in self.actions]
+        self._previous = -1
+        self.responses = 0
+        self.count = 0
+        self.into = [0] * len(self.actions)
+
+    def update(self, action: int, reinforced: bool):
+        if not self._tracked[action]:
+            return
+        self.responses += 1
+        if action != self._previous:
+            if self._previous >= 0:
+                self.count += 1
+                self.into[action] += 1
+            self._previous = action
+
+    def result(self) -> dict:
+        return {
+            "count": self.count,
+            "rate": self.count / self.responses if self.responses else 0,
+            "into": {a: n for a, n in zip(self.actions, self.into) if n},
+        }
+
+
+class InterReinforcementIntervals(Accumulator):
+    """Steps between successive reinforcers (Welford mean and variance)."""
+
+    name = "inter_reinforcement"
+
+    def __init__(self, actions: Sequence[str]):
+        self.n = 0
+        self._last: int | None = None
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min: int | None = None
+        self.max: int | None = None
+
+    def update(self, action: int, reinforced: bool):
+        self.n += 1
+        if not reinforced:
+            return
+        if self._last is not None:
+            interval = self.n - self._last
+            self.count += 1
+            delta = interval - self.mean
+            self.mean += delta / self.count
+            self._m2 += delta * (interval - self.mean)
+            self.min = interval if self.min is None else min(self.min, interval)
+            self.max = interval if self.max is None else max(self.max, interval)
+        self._last = self.n
+
+    def result(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.mean if self.count else None,
+            "sd": math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else None,
+            "min": self.min,
+            "max": self.max,
+        }
+
+
+class PostReinforcementPauses(Accumulator):
+    """Steps from each reinforcer until the reinforced response recurs.
+
+    `histogram[k]` counts pauses of k steps; the last bin collects pauses of
+    ``bins - 1`` steps or more. A pause still open when another response is
+    reinforced, or when the condition ends, is not counted.
+    """
+
+    name = "post_reinforcement_pause"
+
+    def __init__(self, actions: Sequence[str], bins: int = 20):
+        self.histogram = [0] * bins
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self._pending = -1
+        self._pause = 0
+
+    def update(self, action: int, reinforced: bool):
+        if self._pending >= 0:
+            if action == self._pending:
+                pause = self._pause
+                self.histogram[min(pause, len(self.histogram) - 1)] += 1
+                self.count += 1
+                self.total += pause
+                if pause > self.max:
+                    self.max = pause
+                self._pending = -1
+            else:
+                self._pause += 1
+        if reinforced:
+            self._pending = action
+            self._pause = 0
+
+    def result(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "max": self.max,
+            "histogram": list(self.histogram),
+        }
+
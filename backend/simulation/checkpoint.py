@@ -0,0 +1,176 @@
+"""Compact binary checkpoints of a simulation in progress.
+
+A checkpoint has two sections: the state payload and, optionally, a run of
+step-log rows, ``{"start": k, "columns": {name: array}}``, holding the rows
+from index `k` on. A checkpoint whose rows start at 0 stands alone. One
+whose rows start later only adds to the checkpoints before it, and
+`merge_checkpoints` joins such a chain into one that stands alone.
+"""
+
+import os
+import pickle
+import struct
+import tempfile
+import zlib
+from typing import Sequence
+
+import numpy as np
+
+MAGIC = b"AOSIMCKP"
+VERSION = 3
+
+# Length of the state section, and of each rows frame in a CheckpointFile
+_LENGTH = struct.Struct("<Q")
+
+
+def _compress(obj) -> bytes:
+    return zlib.compress(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+
+def _decompress(section: bytes):
+    return pickle.loads(zlib.decompress(section))
+
+
+def _pack(state: bytes, rows: bytes) -> bytes:
+    return MAGIC + bytes([VERSION]) + _LENGTH.pack(len(state)) + state + rows
+
+
+def _sections(data: bytes) -> tuple[bytes, bytes]:
+    """The compressed state and rows sections of `data` (rows may be empty)."""
+    header = len(MAGIC)
+    if data[:header] != MAGIC:
+        raise ValueError("Not a simulation checkpoint")
+    if data[header] != VERSION:
+        raise ValueError(f"Unsupported checkpoint version: {data[header]}")
+    start = header + 1 + _LENGTH.size
+    (length,) = _LENGTH.unpack_from(data, header + 1)
+    return data[start:start + length], data[start + length:]
+
+
+def dump_checkpoint(payload: dict, rows: dict | None = None) -> bytes:
+    """Serialize a checkpoint payload, and optionally a run of step-log
+    `rows`, to compressed bytes.
+
+    Objects shared between components (such as the one Generator bound to
+    both the agent and the environment) stay shared after `load_checkpoint`.
+    """
+    return _pack(_compress(payload), _compress(rows) if rows is not None else b"")
+
+
+def load_checkpoint(data: bytes) -> dict:
+    """Restore a payload written by `dump_checkpoint`, with its rows, if any,
+    under ``"rows"``. Only load trusted checkpoints."""
+    state, rows = _sections(data)
+    payload = _decompress(state)
+    if rows:
+        payload["rows"] = _decompress(rows)
+    return payload
+
+
+def _merge_rows(parts: Sequence[dict]) -> dict:
+    """One run of rows from `parts` in order. A part replaces the rows it
+    overlaps, and everything after them, so the result ends where the last
+    part ends."""
+    pieces: list[dict] = []
+    start = end = parts[0]["start"]
+    for part in parts:
+        at = part["start"]
+        if not start <= at <= end:
+            raise ValueError(f"Checkpoint rows from {at} do not follow rows {start} to {end}")
+        while pieces and pieces[-1]["start"] >= at:
+            pieces.pop()
+        if pieces:
+            last = pieces[-1]
+            keep = at - last["start"]
+            pieces[-1] = {"start": last["start"], "columns": {k: v[:keep] for k, v in last["columns"].items()}}
+        pieces.append(part)
+        end = at + len(next(iter(part["columns"].values()), ()))
+    columns = {
+        name: np.concatenate([piece["columns"][name] for piece in pieces])
+        for name in parts[-1]["columns"]
+    }
+    return {"start": start, "columns": columns}
+
+
+def merge_checkpoints(chain: Sequence[bytes]) -> bytes:
+    """The last checkpoint of `chain` with the rows of all of them, in
+    order, so that it stands alone when the first one does."""
+    state, _ = _sections(chain[-1])
+    parts = [_decompress(rows) for _, rows in map(_sections, chain) if rows]
+    return _pack(state, _compress(_merge_rows(parts)) if parts else b"")
+
+
+class CheckpointFile:
+    """`on_checkpoint` callback that keeps the latest checkpoint at `path`.
+
+    The state of each checkpoint goes to a temporary file that then
+    replaces `path`, so a crash mid-write never leaves a truncated
+    checkpoint behind. Its rows are appended to ``path + ".rows"``, which a
+    checkpoint with rows from 0 starts afresh, so each write costs only the
+    rows added since the last one. `read()` joins the two into one
+    checkpoint that stands alone.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows_path = path + ".rows"
+        # End of the last whole frame in the rows file, once known
+        self._rows_end: int | None = None
+
+    def __call__(self, data: bytes):
+        state, rows = _sections(data)
+        if rows:
+            self._append_rows(rows)
+        self._replace(_pack(state, rows))
+
+    def _append_rows(self, rows: bytes):
+        if _decompress(rows)["start"] == 0:
+            self._rows_end = 0
+        elif self._rows_end is None:
+            self._rows_end = sum(len(frame) + _LENGTH.size for frame in self._frames())
+        mode = "r+b" if os.path.exists(self.rows_path) else "wb"
+        with open(self.rows_path, mode) as f:
+            # Drop whatever a crash mid-append left after the last whole frame
+            f.seek(self._rows_end)
+            f.truncate()
+            f.write(_LENGTH.pack(len(rows)) + rows)
+        self._rows_end += _LENGTH.size + len(rows)
+
+    def _replace(self, data: bytes):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".checkpoint-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _frames(self) -> list[bytes]:
+        """The whole rows frames in the rows file."""
+        try:
+            with open(self.rows_path, "rb") as f:
+                content = f.read()
+        except FileNotFoundError:
+            return []
+        frames = []
+        at = 0
+        while at + _LENGTH.size <= len(content):
+            (length,) = _LENGTH.unpack_from(content, at)
+            if at + _LENGTH.size + length > len(content):
+                break
+            frames.append(content[at + _LENGTH.size:at + _LENGTH.size + length])
+            at += _LENGTH.size + length
+        return frames
+
+    def read(self) -> bytes:
+        with open(self.path, "rb") as f:
+            data = f.read()
+        state, rows = _sections(data)
+        if not rows:
+            return data
+        # The latest checkpoint's own rows come last, so rows appended after
+        # it (by a write that never finished) are cut off
+        chain = [_pack(b"", frame) for frame in self._frames()]
+        return merge_checkpoints(chain + [data])
@@ -0,0 +1,108 @@
+"""Compact encoding of step logs, for storing and sending long runs.
+
+A run repeats itself: the same action for many steps in a row, the same
+schedule and condition for whole conditions, and consecutive step numbers
+throughout. The encoding keeps each column as runs, and the reinforced
+flags as a bitmap or, when reinforcement is rare, as the indices of the
+reinforced steps. It is a plain JSON object:
+
+``size``
+    Number of steps.
+``step``, ``state``, ``action``, ``schedule_id``, ``condition``
+    Runs, as ``{"values": [...], "starts": [...]}``: run ``k`` holds
+    ``values[k]`` from index ``starts[k]`` up to the next start. `step`
+    holds the step number minus the index, so consecutive steps are one
+    run; `state`, `action` and `schedule_id` hold codes into the name
+    tables. The starts of `condition` are the condition boundaries.
+``reinforced``
+    ``{"bits": ...}``, the flags packed eight to a byte, lowest bit first,
+    in base64, or ``{"at": [...]}``, the indices of the reinforced steps;
+    whichever is shorter.
+``state_names``, ``action_names``, ``schedule_names``
+    Name tables, as in `StepLog`.
+"""
+
+import base64
+import json
+
+import numpy as np
+
+from simulation.steplog import STEP_FIELDS, StepLog
+
+# Step fields encoded as runs, and their StepLog columns
+_RUN_FIELDS = [(name, column) for name, column in zip(STEP_FIELDS, StepLog.COLUMNS) if name != "reinforced"]
+
+
+def encode_runs(values: np.ndarray) -> dict:
+    """`values` as runs of equal values."""
+    if len(values) == 0:
+        return {"values": [], "starts": []}
+    starts = np.flatnonzero(values[1:] != values[:-1]) + 1
+    starts = np.concatenate(([0], starts))
+    return {"values": values[starts].tolist(), "starts": starts.tolist()}
+
+
+def decode_runs(runs: dict, size: int, dtype) -> np.ndarray:
+    """The `size` values that `encode_runs` encoded as `runs`."""
+    starts = np.asarray(runs["starts"], dtype=np.int64)
+    lengths = np.diff(np.append(starts, size))
+    return np.repeat(np.asarray(runs["values"], dtype=dtype), lengths)
+
+
+def encode_flags(flags: np.ndarray) -> dict:
+    """`flags` as a base64 bitmap or as the indices of the set flags,
+    whichever is shorter in JSON."""
+    at = np.flatnonzero(flags)
+    bits = base64.b64encode(np.packbits(flags, bitorder="little").tobytes()).decode()
+    # A decimal index takes its digits and a comma
+    if len(at) * (len(str(len(flags))) + 1) < len(bits):
+        return {"at": at.tolist()}
+    return {"bits": bits}
+
+
+def decode_flags(flags: dict, size: int) -> np.ndarray:
+    """The `size` flags that `encode_flags` encoded as `flags`."""
+    if "at" in flags:
+        decoded = np.zeros(size, dtype=np.bool_)
+        decoded[np.asarray(flags["at"], dtype=np.int64)] = True
+        return decoded
+    packed = np.frombuffer(base64.b64decode(flags["bits"]), dtype=np.uint8)
+    return np.unpackbits(packed, count=size, bitorder="little").astype(np.bool_)
+
+
+def encode_steps(log: StepLog) -> dict:
+    """`log` in the compact encoding (see the module docstring)."""
+    n = log.size
+    encoded: dict = {"size": n}
+    for name, column in _RUN_FIELDS:
+        values = getattr(log, column)[:n]
+        if name == "step":
+            values = values - np.arange(n)
+        encoded[name] = encode_runs(values)
+    encoded["reinforced"] = encode_flags(log.reinforced[:n])
+    for name in ("state_names", "action_names", "schedule_names"):
+        encoded[name] = list(getattr(log, name))
+    return encoded
+
+
+def decode_steps(encoded: dict) -> StepLog:
+    """The `StepLog` that `encode_steps` encoded as `encoded`. States come
+    back as their string forms."""
+    n = encoded["size"]
+    log = StepLog(encoded["action_names"], capacity=n)
+    for name, column in _RUN_FIELDS:
+        values = decode_runs(encoded[name], n, getattr(log, column).dtype)
+        if name == "step":
+            values += np.arange(n)
+        getattr(log, column)[:n] = values
+    log.reinforced[:n] = decode_flags(encoded["reinforced"], n)
+    for names, codes in (("state_names", log.state_codes), ("schedule_names", log.schedule_codes)):
+        setattr(log, names, list(encoded[names]))
+        codes.update((name, code) for code, name in enumerate(encoded[names]))
+    log.size = n
+    return log
+
+
+def compact_json(log: StepLog) -> str:
+    """`encode_steps(log)` as compact JSON."""
+    return json.dumps(encode_steps(log), ensure_ascii=False, separators=(",", ":"))
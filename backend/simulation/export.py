@@ -0,0 +1,211 @@
+"""Step log exports written straight from the columnar `StepLog`."""
+
+import csv
+import io
+import json
+import zipfile
+from typing import Callable, Iterator
+
+import numpy as np
+
+from simulation.steplog import STEP_FIELDS, StepLog
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+#: Rows formatted per chunk
+CHUNK_ROWS = 16384
+
+_CSV_ROW = "%d,%s,%s,%s,%s,%d\r\n"
+
+
+def _rows(
+    log: StepLog,
+    template: str,
+    separator: str,
+    encode: Callable[[str], str],
+    booleans: tuple[str, str],
+    rows: int,
+) -> Iterator[str]:
+    """``template % (step, state, action, reinforced, schedule_id,
+    condition)`` for every step, `separator` between steps, `rows` steps
+    per chunk.
+
+    The state, action and schedule tables are encoded once, with `encode`,
+    each column of a chunk is looked up with one numpy fancy-index, and the
+    chunk is formatted with one ``%`` operation, so no per-step dict is built.
+    """
+    states, actions, schedules = (
+        np.array([encode(name) for name in names] or [""], dtype=object)
+        for names in (log.state_names, log.action_names, log.schedule_names)
+    )
+    reinforced = np.array(booleans, dtype=object)
+    for start in range(0, log.size, rows):
+        stop = min(start + rows, log.size)
+        cells = np.empty((stop - start, 6), dtype=object)
+        cells[:, 0] = log.step[start:stop]
+        cells[:, 1] = states[log.state[start:stop]]
+        cells[:, 2] = actions[log.action[start:stop]]
+        cells[:, 3] = reinforced[log.reinforced[start:stop].view(np.uint8)]
+        cells[:, 4] = schedules[log.schedule[start:stop]]
+        cells[:, 5] = log.condition[start:stop]
+        chunk = (template + separator) * (stop - start) % tuple(cells.ravel().tolist())
+        if stop == log.size and separator:
+            chunk = chunk[: -len(separator)]
+        yield chunk
+
+
+def _csv_field(value: str) -> str:
+    """`value` as the csv module writes it within a row: quoted only when it
+    must be. (A lone empty field is written as ``""``, so it is not.)"""
+    if value == "":
+        return ""
+    output = io.StringIO()
+    # The line terminator decides which line breaks force quoting, so keep
+    # the default and strip it
+    csv.writer(output).writerow([value])
+    return output.getvalue()[:-2]
+
+
+def csv_chunks(log: StepLog, rows: int = CHUNK_ROWS) -> Iterator[str]:
+    """The log as CSV text, `rows` rows per chunk.
+
+    The output is byte for byte what ``csv.DictWriter`` writes for
+    `log.to_dicts()`.
+    """
+    yield ",".join(_csv_field(field) for field in STEP_FIELDS) + "\r\n"
+    yield from _rows(log, _CSV_ROW, "", _csv_field, ("False", "True"), rows)
+
+
+def _json_fields(pattern: str) -> list[str]:
+    # step and condition are integers; the rest are pre-encoded strings
+    return [pattern % (name, "%d" if name in ("step", "condition") else "%s") for name in STEP_FIELDS]
+
+
+def steps_json(
+    log: StepLog, indent: int | None = None, level: int = 0, rows: int = CHUNK_ROWS
+) -> Iterator[str]:
+    """The log as a JSON array of step objects, `rows` steps per chunk.
+
+    Compact by default, byte for byte what Pydantic writes for a
+    ``list[StepData]``. With `indent`, it is what ``json.dumps(...,
+    indent=indent)`` writes for an array nested `level` deep in a document.
+    """
+    if log.size == 0:
+        yield "[]"
+        return
+    if indent is None:
+        template = "{" + ",".join(_json_fields('"%s":%s')) + "}"
+        yield "["
+        yield from _rows(
+            log, template, ",", lambda s: json.dumps(s, ensure_ascii=False), ("false", "true"), rows
+        )
+        yield "]"
+        return
+    outer, inner, field = (" " * indent * (level + k) for k in range(3))
+    template = inner + "{\n" + ",\n".join(_json_fields(field + '"%s": %s')) + "\n" + inner + "}"
+    yield "[\n"
+    yield from _rows(log, template, ",\n", json.dumps, ("false", "true"), rows)
+    yield "\n" + outer + "]"
+
+
+def _array_json(values: np.ndarray) -> str:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(values, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(values.tolist(), separators=(",", ":"))
+
+
+def step_columns_json(log: StepLog) -> str:
+    """The log as a JSON object with one array per field. `state`, `action`
+    and `schedule_id` hold codes into `state_names`, `action_names` and
+    `schedule_names`. The arrays are encoded by orjson when it is installed."""
+    n = log.size
+    parts = [
+        f'"{name}":{_array_json(np.ascontiguousarray(getattr(log, column)[:n]))}'
+        for name, column in zip(STEP_FIELDS, StepLog.COLUMNS)
+    ]
+    for name in ("state_names", "action_names", "schedule_names"):
+        names = json.dumps(getattr(log, name), ensure_ascii=False, separators=(",", ":"))
+        parts.append(f'"{name}":{names}')
+    return "{" + ",".join(parts) + "}"
+
+
+def _columns(log: StepLog) -> dict[str, np.ndarray]:
+    """The filled part of each column, by step field name."""
+    return {name: getattr(log, column)[: log.size] for name, column in zip(STEP_FIELDS, StepLog.COLUMNS)}
+
+
+def _metadata_json(metadata: dict) -> dict[str, str]:
+    return {key: json.dumps(value, default=str) for key, value in metadata.items()}
+
+
+def npz_bytes(log: StepLog, metadata: dict) -> bytes:
+    """The log as a compressed NPZ archive.
+
+    It holds one array per step field, with `state`, `action` and
+    `schedule_id` as codes into the `state_names`, `action_names` and
+    `schedule_names` arrays. Each `metadata` value is a JSON string in a
+    0-d array, so ``np.load`` needs no pickle. The archive is written like
+    ``np.savez_compressed`` does, but with fixed entry times, so the same
+    log always gives the same bytes.
+    """
+    arrays = _columns(log)
+    for name in ("state_names", "action_names", "schedule_names"):
+        arrays[name] = np.array(getattr(log, name), dtype=str)
+    for key, text in _metadata_json(metadata).items():
+        arrays[key] = np.array(text)
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, array in arrays.items():
+            entry = zipfile.ZipInfo(f"{name}.npy", date_time=(1980, 1, 1, 0, 0, 0))
+            entry.compress_type = zipfile.ZIP_DEFLATED
+            with archive.open(entry, "w", force_zip64=True) as f:
+                np.lib.format.write_array(f, np.asanyarray(array), allow_pickle=False)
+    return output.getvalue()
+
+
+def arrow_table(log: StepLog, metadata: dict) -> "pa.Table":
+    """The log as an Arrow table with dictionary-encoded string columns.
+
+    The numeric columns wrap the log's buffers without copying; the codes
+    index the log's name tables directly. `metadata` values are stored as
+    JSON in the schema metadata.
+    """
+    columns = _columns(log)
+    tables = {"state": log.state_names, "action": log.action_names, "schedule_id": log.schedule_names}
+    arrays = {
+        name: (
+            pa.DictionaryArray.from_arrays(values, pa.array(tables[name], type=pa.string()))
+            if name in tables
+            else pa.array(values)
+        )
+        for name, values in columns.items()
+    }
+    return pa.table(arrays, metadata=_metadata_json(metadata))
+
+
+def arrow_bytes(log: StepLog, metadata: dict) -> bytes:
+    """The log as a zstd-compressed Arrow IPC file (Feather v2)."""
+    table = arrow_table(log, metadata)
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression="zstd")
+    with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+        writer.write_table(table, max_chunksize=CHUNK_ROWS * 4)
+    return sink.getvalue().to_pybytes()
+
+
+def parquet_bytes(log: StepLog, metadata: dict) -> bytes:
+    """The log as a zstd-compressed Parquet file."""
+    sink = pa.BufferOutputStream()
+    pq.write_table(arrow_table(log, metadata), sink, compression="zstd")
+    return sink.getvalue().to_pybytes()
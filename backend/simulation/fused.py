@@ -0,0 +1,619 @@
+"""Optional Numba-compiled engine that runs a whole condition in native code.
+
+`fused_condition(agent, environment, state)` packs a supported agent,
+environment and schedules into arrays; `FusedCondition.run()` steps them to
+the end of the condition in one compiled kernel per agent type and writes
+the state back into the objects. Kernels draw from the components' shared
+Generator in the same order as the Python loop.
+
+Without Numba the kernels are plain Python functions: they still work,
+but the runner keeps its own loop instead.
+"""
+
+from typing import Any
+
+import numpy as np
+
+from agents.etbd import ETBDAgent
+from agents.mpr import MPRAgent
+from agents.q_learning import QLearningAgent, _q_row
+from environments.grid_chamber import GridChamberEnvironment
+from environments.two_choice import TwoChoiceEnvironment
+from etbd_internals.mutation import BITS
+from schedules.reinforcement import FI, FR, VI, VR
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(**options):
+        return lambda fn: fn
+
+
+# Schedule type codes and columns of the (slots, 6) schedule state array
+SCHEDULE_CODES = {FR: 0, VR: 1, FI: 2, VI: 3}
+_FR, _VR, _FI, _VI = 0, 1, 2, 3
+_TYPE, _VALUE, _COUNT, _NEXT, _ELAPSED, _ARMED = range(6)
+
+# Entries of the environment state array
+_KIND, _STEP, _MAX, _ROWS, _COLS, _LEVER_R, _LEVER_C, _ROW, _COL, _ORDER = range(10)
+_TWO_CHOICE, _GRID = 0, 1
+_STAY = GridChamberEnvironment.STAY
+_PRESS = GridChamberEnvironment.PRESS_LEVER
+_MOVE_DR = np.array([d[0] for d in GridChamberEnvironment.MOVES] + [0], dtype=np.int64)
+_MOVE_DC = np.array([d[1] for d in GridChamberEnvironment.MOVES] + [0], dtype=np.int64)
+
+# Largest Q-table (in states) the Q-learning kernel preallocates
+MAX_Q_STATES = 1 << 20
+
+
+# ── Schedules and environments ──────────────────────────────────────
+
+@njit(cache=True)
+def _draw(rng, value):
+    return max(1, int(rng.exponential(value)))
+
+
+@njit(cache=True)
+def _tick(sched, k):
+    kind = sched[k, _TYPE]
+    if kind == _FI or kind == _VI:
+        sched[k, _ELAPSED] += 1
+        limit = sched[k, _VALUE] if kind == _FI else sched[k, _NEXT]
+        if sched[k, _ELAPSED] >= limit:
+            sched[k, _ARMED] = 1
+
+
+@njit(cache=True)
+def _check(sched, k, rng):
+    """In-class response on schedule slot `k`; out-of-class checks are no-ops."""
+    kind = sched[k, _TYPE]
+    if kind == _FR or kind == _VR:
+        sched[k, _COUNT] += 1
+        limit = sched[k, _VALUE] if kind == _FR else sched[k, _NEXT]
+        if sched[k, _COUNT] >= limit:
+            sched[k, _COUNT] = 0
+            if kind == _VR:
+                sched[k, _NEXT] = _draw(rng, float(sched[k, _VALUE]))
+            return True
+    elif kind == _FI or kind == _VI:
+        if sched[k, _ARMED]:
+            sched[k, _ARMED] = 0
+            sched[k, _ELAPSED] = 0
+            if kind == _VI:
+                sched[k, _NEXT] = _draw(rng, float(sched[k, _VALUE]))
+            return True
+    return False
+
+
+@njit(cache=True)
+def _env_step(env, sched, visits, first_visit, action, rng):
+    """One `step_into`; returns (taken action, reinforced, state id, schedule id)."""
+    env[_STEP] += 1
+    if env[_KIND] == _TWO_CHOICE:
+        _tick(sched, 0)
+        _tick(sched, 1)
+        if action == 0:
+            return action, _check(sched, 0, rng), 0, 1
+        return action, _check(sched, 1, rng), 0, 2
+
+    _tick(sched, 0)
+    taken = action
+    reinforced = False
+    schedule = 0
+    if action == _PRESS:
+        if abs(env[_ROW] - env[_LEVER_R]) <= 1 and abs(env[_COL] - env[_LEVER_C]) <= 1:
+            reinforced = _check(sched, 0, rng)
+            schedule = 1
+        else:
+            taken = _STAY
+    else:
+        env[_ROW] = max(0, min(env[_ROWS] - 1, env[_ROW] + _MOVE_DR[action]))
+        env[_COL] = max(0, min(env[_COLS] - 1, env[_COL] + _MOVE_DC[action]))
+    cell = env[_ROW] * env[_COLS] + env[_COL]
+    if visits[cell] == 0:
+        first_visit[cell] = env[_ORDER]
+        env[_ORDER] += 1
+    visits[cell] += 1
+    return taken, reinforced, cell, schedule
+
+
+# ── Agent kernels ───────────────────────────────────────────────────
+
+@njit(cache=True)
+def _history_key(hist, length, n_actions):
+    """Id of the history tuple `hist[:length]`: tuples of each length follow the shorter ones."""
+    offset = 0
+    power = 1
+    code = 0
+    for j in range(length):
+        offset += power
+        power *= n_actions
+        code = code * n_actions + hist[j]
+    return offset + code
+
+
+@njit(cache=True)
+def _touch(touched, meta, key):
+    # Record the first access to a Q-table row, as the defaultdict would
+    if touched[key] < 0:
+        touched[key] = meta[1]
+        meta[1] += 1
+
+
+@njit(cache=True)
+def _q_learning_kernel(
+    rng, env, sched, visits, first_visit,
+    q, assigned, touched, hist, meta, use_history, epsilon, alpha, gamma, obs,
+    out_action, out_reinforced, out_state, out_schedule,
+):
+    # meta = [history length, next touch order]
+    n_actions = q.shape[1]
+    window = len(hist)
+    n = 0
+    while True:
+        key = _history_key(hist, meta[0], n_actions) if use_history else obs
+        if rng.random() < epsilon:
+            action = rng.integers(0, n_actions)
+        else:
+            _touch(touched, meta, key)
+            if not assigned[key].any():
+                action = rng.integers(0, n_actions)
+            else:
+                best = q[key].max()
+                ties = 0
+                for a in range(n_actions):
+                    if q[key, a] == best:
+                        ties += 1
+                pick = rng.integers(0, ties)
+                action = 0
+                for a in range(n_actions):
+                    if q[key, a] == best:
+                        if pick == 0:
+                            action = a
+                            break
+                        pick -= 1
+
+        taken, reinforced, state, schedule = _env_step(env, sched, visits, first_visit, action, rng)
+
+        if use_history:
+            if meta[0] < window:
+                hist[meta[0]] = taken
+                meta[0] += 1
+            else:
+                hist[:-1] = hist[1:]
+                hist[-1] = taken
+            key = _history_key(hist, meta[0], n_actions)
+            next_key = key
+        else:
+            key = obs
+            next_key = state
+        _touch(touched, meta, next_key)
+        max_next = 0.0
+        if assigned[next_key].any():
+            max_next = -np.inf
+            for a in range(n_actions):
+                if assigned[next_key, a] and q[next_key, a] > max_next:
+                    max_next = q[next_key, a]
+        _touch(touched, meta, key)
+        current = q[key, taken]
+        assigned[key, taken] = True
+        reward = 1.0 if reinforced else 0.0
+        q[key, taken] = current + alpha * (reward + gamma * max_next - current)
+        obs = state
+
+        out_action[n] = taken
+        out_reinforced[n] = reinforced
+        out_state[n] = state
+        out_schedule[n] = schedule
+        n += 1
+        if env[_STEP] >= env[_MAX]:
+            return n
+
+
+@njit(cache=True)
+def _coupling(total, count, reinforcers, ratio, a, b, floor):
+    if total == 0 or count == 0:
+        return floor
+    rate = reinforcers / count
+    if ratio:
+        c = a * np.exp(-b / max(rate, 1e-10))
+    else:
+        c = a * rate / (rate + b)
+    return max(c, floor)
+
+
+@njit(cache=True)
+def _mpr_kernel(
+    rng, env, sched, visits, first_visit,
+    counts, reinforcers, meta, matching, ratio, a, b, floor, temperature,
+    out_action, out_reinforced, out_state, out_schedule,
+):
+    # meta = [total steps]
+    n_actions = len(counts)
+    couplings = np.empty(n_actions)
+    n = 0
+    while True:
+        for k in range(n_actions):
+            couplings[k] = _coupling(meta[0], counts[k], reinforcers[k], ratio, a, b, floor)
+        if matching:
+            action = 0 if rng.random() < couplings[0] / (couplings[0] + couplings[1]) else 1
+        else:
+            scaled = couplings / temperature
+            scaled -= scaled.max()
+            exp_vals = np.exp(scaled)
+            cdf = np.cumsum(exp_vals / exp_vals.sum())
+            cdf /= cdf[-1]
+            action = np.searchsorted(cdf, rng.random(), side="right")
+
+        taken, reinforced, state, schedule = _env_step(env, sched, visits, first_visit, action, rng)
+
+        meta[0] += 1
+        counts[taken] += 1
+        if reinforced:
+            reinforcers[taken] += 1
+
+        out_action[n] = taken
+        out_reinforced[n] = reinforced
+        out_state[n] = state
+        out_schedule[n] = schedule
+        n += 1
+        if env[_STEP] >= env[_MAX]:
+            return n
+
+
+@njit(cache=True)
+def _offspring(parent_a, parent_b, mutation_rate, rng):
+    # recombine() then mutate()
+    mask = (1 << rng.integers(1, BITS)) - 1
+    child = ((parent_a & mask) | (parent_b & ~mask)) & ((1 << BITS) - 1)
+    for bit in range(BITS):
+        if rng.random() < mutation_rate:
+            child ^= 1 << bit
+    return child
+
+
+@njit(cache=True)
+def _etbd_kernel(
+    rng, env, sched, visits, first_visit,
+    population, lut, targets, mutation_rate, decay, max_phenotype,
+    out_action, out_reinforced, out_state, out_schedule,
+):
+    size = len(population)
+    offspring = np.empty_like(population)
+    fitness = np.empty(size)
+    n = 0
+    while True:
+        action = lut[population[rng.integers(0, size)]]
+
+        taken, reinforced, state, schedule = _env_step(env, sched, visits, first_visit, action, rng)
+
+        if reinforced:
+            # select_parent() sees the same population and target for every
+            # child, so the fitness CDF is computed once per generation
+            target = targets[taken]
+            for j in range(size):
+                dist = abs(population[j] - target)
+                dist = min(dist, max_phenotype - dist)
+                fitness[j] = decay ** float(dist)
+            total = fitness.sum()
+            cdf = np.cumsum(fitness / total)
+            cdf /= cdf[-1]
+            for j in range(size):
+                if total == 0:
+                    parent_a = population[rng.integers(0, size)]
+                    parent_b = population[rng.integers(0, size)]
+                else:
+                    parent_a = population[np.searchsorted(cdf, rng.random(), side="right")]
+                    parent_b = population[np.searchsorted(cdf, rng.random(), side="right")]
+                offspring[j] = _offspring(parent_a, parent_b, mutation_rate, rng)
+        else:
+            for j in range(size):
+                parent_a = population[rng.integers(0, size)]
+                parent_b = population[rng.integers(0, size)]
+                offspring[j] = _offspring(parent_a, parent_b, mutation_rate, rng)
+        population[:] = offspring
+
+        out_action[n] = taken
+        out_reinforced[n] = reinforced
+        out_state[n] = state
+        out_schedule[n] = schedule
+        n += 1
+        if env[_STEP] >= env[_MAX]:
+            return n
+
+
+# ── Packing ─────────────────────────────────────────────────────────
+
+def _pack_schedules(schedules: list, rng) -> np.ndarray | None:
+    sched = np.full((2, 6), 0, dtype=np.int64)
+    sched[:, _TYPE] = -1
+    for k, s in enumerate(schedules):
+        if s is None:
+            continue
+        code = SCHEDULE_CODES.get(type(s))
+        if code is None or not isinstance(s.value, (int, np.integer)) or (code in (_VR, _VI) and s.rng is not rng):
+            return None
+        sched[k, _TYPE] = code
+        sched[k, _VALUE] = s.value
+        if code in (_FR, _VR):
+            sched[k, _COUNT] = s.count
+        else:
+            sched[k, _ELAPSED] = s.elapsed
+            sched[k, _ARMED] = s.armed
+        if code == _VR:
+            sched[k, _NEXT] = s.next_ratio
+        elif code == _VI:
+            sched[k, _NEXT] = s.next_interval
+    return sched
+
+
+def _unpack_schedules(schedules: list, sched: np.ndarray):
+    for k, s in enumerate(schedules):
+        if s is None:
+            continue
+        code = sched[k, _TYPE]
+        if code in (_FR, _VR):
+            s.count = int(sched[k, _COUNT])
+        else:
+            s.elapsed = int(sched[k, _ELAPSED])
+            s.armed = bool(sched[k, _ARMED])
+        if code == _VR:
+            s.next_ratio = int(sched[k, _NEXT])
+        elif code == _VI:
+            s.next_interval = int(sched[k, _NEXT])
+
+
+class _PackedEnvironment:
+    """Array form of a two-choice or grid environment and its schedules."""
+
+    def __init__(self, env, rng):
+        self.env_obj = env
+        self.ok = True
+        if type(env) is TwoChoiceEnvironment:
+            self.schedules = [env.schedule_a, env.schedule_b]
+            self.env = np.array([_TWO_CHOICE, env.step_count, env.max_steps, 0, 0, 0, 0, 0, 0, 0], dtype=np.int64)
+            self.states = ["start"]
+            self.schedule_ids = ["", "schedule_a", "schedule_b"]
+            self.visits = np.zeros(1, dtype=np.int64)
+            self.first_visit = np.zeros(1, dtype=np.int64)
+        elif type(env) is GridChamberEnvironment:
+            self.schedules = [env.schedule]
+            rows, cols = env.rows, env.cols
+            self.states = [(r, c) for r in range(rows) for c in range(cols)]
+            self.schedule_ids = ["", "lever_schedule"]
+            self.visits = np.zeros(rows * cols, dtype=np.int64)
+            self.first_visit = np.zeros(rows * cols, dtype=np.int64)
+            for order, (pos, count) in enumerate(env.visit_counts.items()):
+                cell = self.state_id(pos)
+                if cell is None:
+                    self.ok = False
+                    return
+                self.visits[cell] = count
+                self.first_visit[cell] = order
+            self.env = np.array([
+                _GRID, env.step_count, env.max_steps, rows, cols,
+                env.lever_pos[0], env.lever_pos[1], env.pos[0], env.pos[1], len(env.visit_counts),
+            ], dtype=np.int64)
+        else:
+            self.ok = False
+            return
+        sched = _pack_schedules(self.schedules, rng)
+        self.ok = sched is not None
+        self.sched = sched
+
+    def state_id(self, state: Any) -> int | None:
+        if type(self.env_obj) is TwoChoiceEnvironment:
+            return 0 if state == "start" else None
+        if isinstance(state, (tuple, list)) and len(state) == 2:
+            r, c = state
+            if 0 <= r < self.env_obj.rows and 0 <= c < self.env_obj.cols:
+                return r * self.env_obj.cols + c
+        return None
+
+    def unpack(self):
+        env = self.env_obj
+        env.step_count = int(self.env[_STEP])
+        _unpack_schedules(self.schedules, self.sched)
+        if type(env) is GridChamberEnvironment:
+            env.pos = (int(self.env[_ROW]), int(self.env[_COL]))
+            visited = np.flatnonzero(self.visits)
+            order = visited[np.argsort(self.first_visit[visited], kind="stable")]
+            env.visit_counts = {self.states[c]: int(self.visits[c]) for c in order.tolist()}
+
+
+class FusedCondition:
+    """A supported agent and environment, packed for one kernel call."""
+
+    def __init__(self, packed: _PackedEnvironment, rng, kernel, args: tuple, unpack):
+        self.packed = packed
+        self.rng = rng
+        self.kernel = kernel
+        self.args = args
+        self._unpack_agent = unpack
+        self.states = packed.states
+        self.schedule_ids = packed.schedule_ids
+
+    @property
+    def done(self) -> bool:
+        """Whether the condition has reached its last step."""
+        return bool(self.packed.env[_STEP] >= self.packed.env[_MAX])
+
+    def run(self, steps: int | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Step to the end of the condition, or through at most `steps`
+        steps, and write the state back. Call once per condition; pack the
+        components again to continue.
+
+        Returns the taken action, reinforced flag, state id (into `states`)
+        and schedule id (into `schedule_ids`) of every step.
+        """
+        p = self.packed
+        end = int(p.env[_MAX])
+        if steps is not None:
+            p.env[_MAX] = min(end, int(p.env[_STEP]) + steps)
+        capacity = max(int(p.env[_MAX] - p.env[_STEP]), 1)
+        action = np.zeros(capacity, dtype=np.int64)
+        reinforced = np.zeros(capacity, dtype=np.bool_)
+        state = np.zeros(capacity, dtype=np.int64)
+        schedule = np.zeros(capacity, dtype=np.int64)
+        n = self.kernel(
+            self.rng, p.env, p.sched, p.visits, p.first_visit, *self.args,
+            action, reinforced, state, schedule,
+        )
+        p.env[_MAX] = end
+        action, reinforced, state, schedule = action[:n], reinforced[:n], state[:n], schedule[:n]
+        p.unpack()
+        self._unpack_agent(action, reinforced)
+        return action, reinforced, state, schedule
+
+
+def _q_learning(agent: QLearningAgent, packed: _PackedEnvironment, observation: Any):
+    names = list(agent.action_names)
+    n_actions = len(names)
+    ids = {a: k for k, a in enumerate(names)}
+    window = agent.history_window
+    if agent.use_history_state:
+        n_keys = sum(n_actions ** length for length in range(window + 1))
+        if n_keys > MAX_Q_STATES:
+            return None
+
+        def encode(key):
+            if not isinstance(key, tuple) or len(key) > window or any(a not in ids for a in key):
+                return None
+            return _history_key(np.array([ids[a] for a in key], dtype=np.int64), len(key), n_actions)
+
+        def decode(k):
+            length, power = 0, 1
+            while k >= power:
+                k -= power
+                length += 1
+                power *= n_actions
+            key = []
+            for _ in range(length):
+                k, a = divmod(k, n_actions)
+                key.append(names[a])
+            return tuple(reversed(key))
+    else:
+        n_keys = len(packed.states)
+        encode = packed.state_id
+
+        def decode(k):
+            return packed.states[k]
+
+    q = np.zeros((n_keys, n_actions))
+    assigned = np.zeros((n_keys, n_actions), dtype=np.bool_)
+    touched = np.full(n_keys, -1, dtype=np.int64)
+    for order, (key, row) in enumerate(agent.q_table.items()):
+        k = encode(key)
+        if k is None or any(a not in ids for a in row):
+            return None
+        touched[k] = order
+        for a, value in row.items():
+            q[k, ids[a]] = value
+            assigned[k, ids[a]] = True
+    recent = agent.history[-window:]
+    if any(a not in ids for a in recent):
+        return None
+    hist = np.zeros(window, dtype=np.int64)
+    hist[:len(recent)] = [ids[a] for a in recent]
+    meta = np.array([len(recent), len(agent.q_table)], dtype=np.int64)
+    obs = 0
+    if not agent.use_history_state:
+        obs = packed.state_id(observation)
+        if obs is None:
+            return None
+
+    def unpack(action, reinforced):
+        table = agent.q_table.__class__(_q_row)
+        for k in np.argsort(np.where(touched < 0, len(touched) + n_keys, touched), kind="stable"):
+            if touched[k] < 0:
+                break
+            row = table[decode(int(k))]
+            for a in np.flatnonzero(assigned[k]).tolist():
+                row[names[a]] = float(q[k, a])
+        agent.q_table = table
+        agent.history.extend(names[a] for a in action.tolist())
+
+    args = (
+        q, assigned, touched, hist, meta, agent.use_history_state,
+        float(agent.epsilon), float(agent.alpha), float(agent.gamma), obs,
+    )
+    return _q_learning_kernel, args, unpack
+
+
+def _mpr(agent: MPRAgent, packed: _PackedEnvironment, observation: Any):
+    names = list(agent.action_names)
+    if any(a not in names for a in agent.action_counts):
+        return None
+    counts = np.array([agent.action_counts.get(a, 0) for a in names], dtype=np.int64)
+    reinforcers = np.array([agent.reinforcement_counts.get(a, 0) for a in names], dtype=np.int64)
+    meta = np.array([agent.total_steps], dtype=np.int64)
+    matching = agent.environment_type == "two_choice" and len(names) == 2
+
+    def unpack(action, reinforced):
+        agent.total_steps = int(meta[0])
+        # New keys go in the order the Python loop would first have added them
+        for table, column in (
+            (agent.action_counts, counts),
+            (agent.reinforcement_counts, reinforcers),
+        ):
+            steps = action if table is agent.action_counts else action[reinforced]
+            new, first = np.unique(steps, return_index=True)
+            for a in new[np.argsort(first)].tolist():
+                table.setdefault(names[a], 0)
+            for a in list(table):
+                table[a] = int(column[names.index(a)])
+
+    args = (
+        counts, reinforcers, meta, matching, agent.schedule_type in ("FR", "VR"),
+        float(agent.initial_arousal), float(agent.activation_decay),
+        float(agent.coupling_floor), float(agent.temperature),
+    )
+    return _mpr_kernel, args, unpack
+
+
+def _etbd(agent: ETBDAgent, packed: _PackedEnvironment, observation: Any):
+    organism = agent.organism
+    if any(t is None for t in agent._targets) or len(organism.population) != organism.population_size:
+        return None
+    population = np.array(organism.population, dtype=np.int64)
+    lut = np.asarray(agent._class_of, dtype=np.int64)
+    targets = np.array(agent._targets, dtype=np.int64)
+
+    def unpack(action, reinforced):
+        organism.population = population.tolist()
+
+    args = (
+        population, lut, targets, float(organism.mutation_rate),
+        float(organism.fitness_decay), int(organism.max_phenotype),
+    )
+    return _etbd_kernel, args, unpack
+
+
+_AGENTS = {QLearningAgent: _q_learning, MPRAgent: _mpr, ETBDAgent: _etbd}
+
+
+def fused_condition(agent, environment, observation: Any) -> FusedCondition | None:
+    """Pack `agent` and `environment` for a kernel, or return None if unsupported.
+
+    Supported: Q-learning, MPR and ETBD agents on the two-choice and grid
+    environments with FR, VR, FI and VI schedules (exact classes), where
+    every schedule that draws shares the agent's Generator. The agent must
+    already be bound to the environment's actions.
+    """
+    pack_agent = _AGENTS.get(type(agent))
+    if pack_agent is None or not hasattr(agent, "action_names"):
+        return None
+    rng = agent.rng
+    if not isinstance(rng, np.random.Generator):
+        return None
+    packed = _PackedEnvironment(environment, rng)
+    if not packed.ok:
+        return None
+    packed_agent = pack_agent(agent, packed, observation)
+    if packed_agent is None:
+        return None
+    kernel, args, unpack = packed_agent
+    return FusedCondition(packed, rng, kernel, args, unpack)
@@ -0,0 +1,203 @@
+"""Simulations on bounded thread pools, off the server's event loop.
+
+`JobQueue.submit(fn)` returns a `Job` at once and runs ``fn(report)`` on
+one of `workers` threads; `fn` may call ``report(progress)`` with a
+JSON-ready progress dict while it runs. The job keeps every report, in
+order, for readers that follow it. At most `max_queued` jobs wait
+for a thread, and finished jobs are kept for `ttl` seconds, at most
+`max_finished` of them holding at most `max_bytes` of results.
+
+`BoundedPool.run(fn)` is awaited instead: the event loop stays free while
+`fn` runs on one of the pool's threads.
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class QueueFull(Exception):
+    """Raised by `JobQueue.submit` or `BoundedPool.run` when too many calls
+    are already waiting for a thread."""
+
+
+class Job:
+    """One submitted job: its status, progress reports and outcome.
+
+    `reports` only grows, so a reader that has seen ``reports[:k]`` can
+    pick up the new ones from `k` without locking.
+    """
+
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.status = QUEUED
+        self.created = time.time()
+        self.started: float | None = None
+        self.finished: float | None = None
+        self.progress: dict | None = None
+        self.reports: list[dict] = []
+        self.result: Any = None
+        # Size of the result, as measured by the queue's `sizeof`
+        self.nbytes = 0
+        self.error: str | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "progress": self.progress,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """Runs jobs on `workers` threads, with at most `max_queued` waiting.
+
+    Finished jobs expire `ttl` seconds after they end, or earlier, oldest
+    first, once more than `max_finished` are kept or their results total
+    more than `max_bytes`, as measured by `sizeof(result)`. A result
+    larger than `max_bytes` expires as soon as its job ends.
+
+    `on_expire(job)`, when given, is called for every finished job that
+    expires, e.g. to release resources held by its result.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        max_queued: int = 16,
+        ttl: float = 3600.0,
+        max_finished: int = 64,
+        on_expire: Callable[[Job], None] | None = None,
+        max_bytes: int = 256 * 1024 * 1024,
+        sizeof: Callable[[Any], int] = lambda result: 0,
+    ):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self.max_finished = max_finished
+        self.on_expire = on_expire
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+
+    def _expire(self) -> list[Job]:
+        """Drop finished jobs past the TTL or the limits; caller holds the lock."""
+        finished = sorted((job for job in self._jobs.values() if job.finished is not None), key=lambda j: j.finished)
+        # A result too large to keep goes at once, without pushing out others
+        expired = [job for job in finished if job.nbytes > self.max_bytes]
+        finished = [job for job in finished if job.nbytes <= self.max_bytes]
+        cutoff = time.time() - self.ttl
+        excess = len(finished) - self.max_finished
+        over = sum(job.nbytes for job in finished) - self.max_bytes
+        for k, job in enumerate(finished):
+            if k < excess or job.finished < cutoff or over > 0:
+                expired.append(job)
+                over -= job.nbytes
+        for job in expired:
+            del self._jobs[job.id]
+        return expired
+
+    def _expired(self, jobs: list[Job]):
+        if self.on_expire is not None:
+            for job in jobs:
+                self.on_expire(job)
+
+    def submit(self, fn: Callable[[Callable[[dict], None]], Any]) -> Job:
+        """Queue ``fn(report)``; raises `QueueFull` when too many jobs wait."""
+        with self._lock:
+            expired = self._expire()
+            if sum(job.status == QUEUED for job in self._jobs.values()) >= self.max_queued:
+                raise QueueFull(f"{self.max_queued} jobs already queued")
+            job = Job(uuid.uuid4().hex)
+            self._jobs[job.id] = job
+        self._expired(expired)
+        self._pool.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job: Job, fn: Callable[[Callable[[dict], None]], Any]):
+        job.started = time.time()
+        job.status = RUNNING
+
+        def report(progress: dict):
+            job.reports.append(progress)
+            job.progress = progress
+
+        try:
+            job.result = fn(report)
+            job.nbytes = self.sizeof(job.result)
+        except Exception as exc:
+            job.error = str(exc) or type(exc).__name__
+            status = FAILED
+        else:
+            status = DONE
+        job.finished = time.time()
+        job.status = status
+        # Enforce `max_bytes` now that the result is held
+        with self._lock:
+            expired = self._expire()
+        self._expired(expired)
+
+    def get(self, job_id: str) -> Job | None:
+        """The job with `job_id`, or None if unknown or expired."""
+        with self._lock:
+            expired = self._expire()
+            job = self._jobs.get(job_id)
+        self._expired(expired)
+        return job
+
+    def shutdown(self):
+        self._pool.shutdown(cancel_futures=True)
+
+
+class BoundedPool:
+    """Runs blocking calls for coroutines on `workers` threads.
+
+    At most `max_waiting` calls wait for a free thread; beyond that `run()`
+    raises `QueueFull` at once instead of queueing without bound. A call
+    holds its place until its thread finishes, even if the awaiting
+    coroutine is cancelled.
+    """
+
+    def __init__(self, workers: int = 2, max_waiting: int = 8):
+        self.workers = workers
+        self.max_waiting = max_waiting
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="simulate")
+
+    @property
+    def pending(self) -> int:
+        """Calls running or waiting for a thread."""
+        return self._pending
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Await ``fn(*args, **kwargs)`` run on a pool thread."""
+        with self._lock:
+            if self._pending >= self.workers + self.max_waiting:
+                raise QueueFull(f"{self.workers} simulations running and {self.max_waiting} waiting")
+            self._pending += 1
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self):
+        self._executor.shutdown(cancel_futures=True)
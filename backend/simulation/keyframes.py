@@ -0,0 +1,110 @@
+"""Periodic state keyframes for random access into a finished run."""
+
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Any
+
+from agents.base import AbstractAgent, action_id_agent
+from environments.base import AbstractEnvironment, StepBuffer
+from simulation.checkpoint import dump_checkpoint, load_checkpoint
+
+
+@dataclass
+class RunState:
+    """Agent and environment as they were after `step` steps of a run."""
+    step: int
+    condition: int
+    observation: Any
+    agent: AbstractAgent
+    environment: AbstractEnvironment
+
+
+class Keyframes:
+    """Snapshots of the agent, environment and RNG every `every` steps of one run.
+
+    A keyframe omits the step log, so each costs only the size of the
+    component state. `reconstruct(step)` restores the nearest keyframe at or
+    before `step` and replays at most `every` steps from it.
+    """
+
+    def __init__(self, every: int, conditions: list[dict] | None = None):
+        self.every = every
+        self.conditions = conditions
+        self.steps: list[int] = []
+        self.frames: list[bytes] = []
+        self.total_steps = 0
+        # Global step at which each finished condition ended (conditions may end early)
+        self.condition_ends: list[int] = []
+        self.nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def record(
+        self,
+        step: int,
+        agent: AbstractAgent,
+        environment: AbstractEnvironment,
+        rng,
+        condition_index: int,
+        started: bool,
+        observation: Any,
+    ):
+        """Store the state after `step` steps; steps must be recorded in order."""
+        if self.steps and self.steps[-1] == step:
+            return
+        data = dump_checkpoint({
+            "agent": agent,
+            "environment": environment,
+            "rng": rng,
+            "condition_index": condition_index,
+            "started": started,
+            "observation": observation,
+        })
+        self.steps.append(step)
+        self.frames.append(data)
+        self.nbytes += len(data)
+
+    def reconstruct(self, step: int, swap_env_fn=None) -> RunState:
+        """Return fresh copies of the agent and environment as of `step`.
+
+        Multi-condition runs need the `swap_env_fn` the run was made with.
+        """
+        if not 0 <= step <= self.total_steps:
+            raise ValueError(f"step must be between 0 and {self.total_steps}")
+        k = bisect_right(self.steps, step) - 1
+        frame = load_checkpoint(self.frames[k])
+        agent, env, rng = frame["agent"], frame["environment"], frame["rng"]
+        condition_index = frame["condition_index"]
+        started = frame["started"]
+        observation = frame["observation"]
+
+        def begin_condition():
+            if self.conditions is not None:
+                swap_env_fn(env, self.conditions[condition_index])
+                if rng is not None:
+                    env.set_rng(rng)
+            return env.reset(), action_id_agent(agent, env.get_available_actions())
+
+        driver = action_id_agent(agent, env.get_available_actions()) if started else None
+        out = StepBuffer()
+        ends = self.condition_ends
+        if step == 0:
+            # Step 0 is the first condition just set up, before any response
+            observation, driver = begin_condition()
+            started = True
+        for current in range(self.steps[k] + 1, step + 1):
+            if not started:
+                observation, driver = begin_condition()
+                started = True
+            action = driver.select_action_id(observation)
+            env.step_into(action, out)
+            driver.update_id(observation, out.action, out.reinforced, out.state)
+            observation = out.state
+            if condition_index < len(ends) and current == ends[condition_index]:
+                condition_index += 1
+                started = False
+
+        # A step that ended a condition belongs to that condition
+        condition = condition_index + 1 if started or step == 0 else condition_index
+        return RunState(step, condition, observation, agent, env)
@@ -0,0 +1,88 @@
+"""Thread-safe LRU store bounded by entry count and total size."""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class LRUStore:
+    """LRU map holding at most `max_entries` values totalling at most `max_bytes`.
+
+    `sizeof(value)` gives the size charged for each value. The least
+    recently used values are evicted first; a value larger than
+    `max_bytes` is never stored. `on_evict(value)` is called, outside the
+    lock, for every value the store drops or refuses: evicted, replaced,
+    cleared or too large (but not values returned by `pop`).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 64,
+        max_bytes: int = 256 * 1024 * 1024,
+        sizeof: Callable[[Any], int] = len,
+        on_evict: Callable[[Any], None] | None = None,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.on_evict = on_evict
+        self.total_bytes = 0
+        self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> bool:
+        """Store `value` under `key`; False if it is too large to store."""
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            self._dropped([value])
+            return False
+        dropped = []
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+                if old[0] is not value:
+                    dropped.append(old[0])
+            self._entries[key] = (value, size)
+            self.total_bytes += size
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, (evicted, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                dropped.append(evicted)
+        self._dropped(dropped)
+        return True
+
+    def pop(self, key: Hashable) -> Any | None:
+        """Remove and return the value under `key`, or None."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            self.total_bytes -= entry[1]
+            return entry[0]
+
+    def clear(self):
+        with self._lock:
+            dropped = [value for value, _ in self._entries.values()]
+            self._entries.clear()
+            self.total_bytes = 0
+        self._dropped(dropped)
+
+    def _dropped(self, values: list):
+        if self.on_evict is not None:
+            for value in values:
+                self.on_evict(value)
@@ -0,0 +1,48 @@
+"""Bounded LRU cache of simulation state after leading conditions."""
+
+import hashlib
+import json
+from typing import Any
+
+from simulation.lru import LRUStore
+
+
+def canonical_hash(value: Any) -> str:
+    """SHA-256 of the canonical JSON form of `value` (sorted keys, no whitespace)."""
+    text = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def prefix_key(base_key: str, conditions: list[dict]) -> str:
+    """Cache key for the state after running `conditions` from `base_key`.
+
+    `base_key` must identify everything else that determines the run: the
+    seed, the agent parameters and the environment configuration.
+    """
+    return canonical_hash([base_key, conditions])
+
+
+class PrefixCache(LRUStore):
+    """LRU map from prefix keys to `SimulationRunner.checkpoint()` bytes.
+
+    Holds at most `max_entries` snapshots totalling at most `max_bytes`;
+    the least recently used snapshots are evicted first.
+    """
+
+    def __init__(self, max_entries: int = 64, max_bytes: int = 256 * 1024 * 1024):
+        super().__init__(max_entries, max_bytes)
+        self.hits = 0
+        self.misses = 0
+
+    def longest_prefix(self, base_key: str, conditions: list[dict]) -> tuple[int, bytes | None]:
+        """Return ``(k, snapshot)`` for the longest cached prefix ``conditions[:k]``.
+
+        Returns ``(0, None)`` when no prefix is cached.
+        """
+        for k in range(len(conditions), 0, -1):
+            data = self.get(prefix_key(base_key, conditions[:k]))
+            if data is not None:
+                self.hits += 1
+                return k, data
+        self.misses += 1
+        return 0, None
@@ -0,0 +1,62 @@
+"""Opt-in per-phase timing of the runner's step loop."""
+
+import time
+from typing import Callable
+
+
+class PhaseProfile:
+    """Cumulative wall time and call counts of each phase of the step loop.
+
+    `wrap()` returns timed versions of the loop's select, step and update
+    callables. The ``record`` phase, covering the step log and analytics,
+    is the time from the end of each step to the start of its update.
+    Unprofiled runs use the plain callables and pay nothing.
+    """
+
+    PHASES = ("select_action", "step", "record", "update")
+
+    def __init__(self):
+        self.seconds = [0.0] * len(self.PHASES)
+        self.calls = [0] * len(self.PHASES)
+
+    def wrap(self, select_action: Callable, step_into: Callable, update: Callable) -> tuple:
+        seconds, calls = self.seconds, self.calls
+        clock = time.perf_counter
+        step_end = [0.0]
+
+        def timed_select(state):
+            start = clock()
+            action = select_action(state)
+            seconds[0] += clock() - start
+            calls[0] += 1
+            return action
+
+        def timed_step(action, out):
+            start = clock()
+            step_into(action, out)
+            step_end[0] = end = clock()
+            seconds[1] += end - start
+            calls[1] += 1
+
+        def timed_update(state, action, reinforced, next_state):
+            start = clock()
+            seconds[2] += start - step_end[0]
+            calls[2] += 1
+            update(state, action, reinforced, next_state)
+            seconds[3] += clock() - start
+            calls[3] += 1
+
+        return timed_select, timed_step, timed_update
+
+    def to_dict(self, total_seconds: float, operations: dict) -> dict:
+        """JSON-ready profile; `operations` are the agent's op counts, if any."""
+        profile = {
+            "total_seconds": total_seconds,
+            "phases": {
+                name: {"seconds": s, "calls": n}
+                for name, s, n in zip(self.PHASES, self.seconds, self.calls)
+            },
+        }
+        if operations:
+            profile["operations"] = operations
+        return profile
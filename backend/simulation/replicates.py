@@ -0,0 +1,409 @@
+"""Replicates of one configuration on a process pool, aggregated as they finish.
+
+Replicate k draws from ``default_rng(SeedSequence(seed).spawn(n)[k])``. A
+job turns its Generator into a flat dict of summary metrics; only those
+dicts come back from the workers, and they are folded into running
+statistics in replicate order, so the result does not depend on how many
+workers ran the replicates or in which order they finished.
+
+With a `PrecisionTarget` the replicates run in waves until the confidence
+interval of one metric's mean is narrow enough, so low-variance
+configurations stop early and noisy ones get more replicates.
+"""
+
+import importlib
+import math
+import multiprocessing
+import threading
+from statistics import NormalDist
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Callable, Iterator, Sequence
+
+import numpy as np
+
+from simulation.shared_log import SharedLogHandle
+
+# Imported by every worker at start-up, before the first replicate
+DEFAULT_PRELOAD = (
+    "agents.etbd",
+    "agents.mpr",
+    "agents.q_learning",
+    "environments.grid_chamber",
+    "environments.two_choice",
+    "simulation.runner",
+)
+
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def replicate_seeds(seed: int | None, n: int) -> tuple[int, list[np.random.SeedSequence]]:
+    """Root entropy and the `n` child seed sequences spawned from `seed`."""
+    root = np.random.SeedSequence(seed)
+    return root.entropy, root.spawn(n)
+
+
+class RunningStats:
+    """Count, mean, variance (Welford), minimum and maximum of a stream."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, x: float):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+
+    @property
+    def sd(self) -> float | None:
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else None
+
+
+class QuantileSketch:
+    """Approximate quantiles of a stream in O(k log(n / k)) memory.
+
+    A stack of compactors (as in KLL): level h holds values of weight 2**h.
+    When a level fills up to `k` values it is sorted and every other value
+    moves up a level, the starting offset alternating between compactions.
+    There is no randomness, so the sketch depends only on the order of its
+    input, and it is exact until `k` values have been added.
+    """
+
+    def __init__(self, k: int = 256):
+        self.k = k
+        self.levels: list[list[float]] = [[]]
+        self._offsets: list[int] = [0]
+
+    def update(self, x: float):
+        self.levels[0].append(x)
+        h = 0
+        while len(self.levels[h]) >= self.k:
+            if h + 1 == len(self.levels):
+                self.levels.append([])
+                self._offsets.append(0)
+            values = sorted(self.levels[h])
+            self.levels[h + 1].extend(values[self._offsets[h]::2])
+            self._offsets[h] ^= 1
+            self.levels[h] = []
+            h += 1
+
+    def quantile(self, q: float) -> float | None:
+        """Smallest value whose weighted rank reaches `q` of the total weight."""
+        weighted = sorted((x, 1 << h) for h, level in enumerate(self.levels) for x in level)
+        if not weighted:
+            return None
+        total = sum(w for _, w in weighted)
+        rank = 0
+        for x, w in weighted:
+            rank += w
+            if rank >= q * total:
+                return x
+        return weighted[-1][0]
+
+
+class ReplicateAggregate:
+    """Running statistics of every metric, fed in replicate order.
+
+    `add(index, metrics)` accepts replicates in any order; out-of-order ones
+    wait in a buffer until every earlier replicate has been folded in.
+    """
+
+    def __init__(self, quantiles: Sequence[float] = DEFAULT_QUANTILES, sketch_size: int = 256):
+        self.quantiles = tuple(quantiles)
+        self.sketch_size = sketch_size
+        self.folded = 0
+        self._pending: dict[int, dict[str, float]] = {}
+        self._stats: dict[str, RunningStats] = {}
+        self._sketches: dict[str, QuantileSketch] = {}
+
+    def add(self, index: int, metrics: dict[str, float]):
+        self._pending[index] = metrics
+        while self.folded in self._pending:
+            for name, value in self._pending.pop(self.folded).items():
+                if name not in self._stats:
+                    self._stats[name] = RunningStats()
+                    self._sketches[name] = QuantileSketch(self.sketch_size)
+                self._stats[name].update(value)
+                self._sketches[name].update(value)
+            self.folded += 1
+
+    def stats(self, name: str) -> RunningStats | None:
+        """Running statistics of metric `name` over the replicates folded so far."""
+        return self._stats.get(name)
+
+    def result(self) -> dict:
+        """JSON-ready statistics per metric."""
+        return {
+            name: {
+                "count": stats.count,
+                "mean": stats.mean,
+                "sd": stats.sd,
+                "min": stats.min,
+                "max": stats.max,
+                "quantiles": {str(q): self._sketches[name].quantile(q) for q in self.quantiles},
+            }
+            for name, stats in self._stats.items()
+        }
+
+
+def t_quantile(p: float, df: int) -> float:
+    """Quantile `p` of Student's t distribution with `df` degrees of freedom.
+
+    Hill's (1970) approximation: exact for one and two degrees of freedom,
+    relative error below 1e-6 above that.
+    """
+    if p < 0.5:
+        return -t_quantile(1 - p, df)
+    tail = 2 * (1 - p)
+    if df == 1:
+        return 1 / math.tan(tail * math.pi / 2)
+    if df == 2:
+        return math.sqrt(2 / (tail * (2 - tail)) - 2)
+    a = 1 / (df - 0.5)
+    b = 48 / (a * a)
+    c = ((20700 * a / b - 98) * a - 16) * a + 96.36
+    d = ((94.5 / (b + c) - 3) / b + 1) * math.sqrt(a * math.pi / 2) * df
+    y = (d * tail) ** (2 / df)
+    if y > 0.05 + a:
+        # Far tail: correct the normal quantile
+        x = NormalDist().inv_cdf(tail / 2)
+        y = x * x
+        if df < 5:
+            c += 0.3 * (df - 4.5) * (x + 0.6)
+        c = (((0.05 * d * x - 5) * x - 7) * x - 2) * x + b + c
+        y = (((((0.4 * y + 6.3) * y + 36) * y + 94.5) / c - y - 3) / b + 1) * x
+        y = math.expm1(a * y * y)
+    else:
+        y = ((1 / (((df + 6) / (df * y) - 0.089 * d - 0.822) * (df + 2) * 3) + 0.5 / (df + 4)) * y - 1) \
+            * (df + 1) / (df + 2) + 1 / y
+    return math.sqrt(df * y)
+
+
+class PrecisionTarget:
+    """Sequential stopping rule: run replicates until the `confidence`
+    t-interval of the mean of `metric` has half-width at most `half_width`.
+
+    The first wave has `min_replicates` replicates. Each later wave adds as
+    many as the current standard deviation predicts are still needed, at
+    least one, without exceeding the maximum.
+    """
+
+    def __init__(self, metric: str, half_width: float, confidence: float = 0.95, min_replicates: int = 10):
+        if half_width <= 0:
+            raise ValueError("half_width must be positive")
+        if not 0 < confidence < 1:
+            raise ValueError("confidence must be between 0 and 1")
+        if min_replicates < 2:
+            raise ValueError("min_replicates must be at least 2")
+        self.metric = metric
+        self.half_width = half_width
+        self.confidence = confidence
+        self.min_replicates = min_replicates
+
+    def _stats(self, aggregate: ReplicateAggregate) -> RunningStats:
+        stats = aggregate.stats(self.metric)
+        if stats is None:
+            raise ValueError(f"Unknown metric: {self.metric}")
+        return stats
+
+    def current_half_width(self, aggregate: ReplicateAggregate) -> float | None:
+        stats = self._stats(aggregate)
+        if stats.sd is None:
+            return None
+        return t_quantile((1 + self.confidence) / 2, stats.count - 1) * stats.sd / math.sqrt(stats.count)
+
+    def next_wave(self, aggregate: ReplicateAggregate, maximum: int) -> int:
+        """Replicates to add after those folded into `aggregate`; 0 to stop."""
+        n = aggregate.folded
+        half_width = self.current_half_width(aggregate)
+        if n >= maximum or (half_width is not None and half_width <= self.half_width):
+            return 0
+        if half_width is None:
+            return min(self.min_replicates, maximum) - n
+        # Predicted total for the target, with the current t quantile and sd
+        needed = math.ceil(n * (half_width / self.half_width) ** 2)
+        return min(max(needed - n, 1), maximum - n)
+
+    def report(self, aggregate: ReplicateAggregate) -> dict:
+        half_width = self.current_half_width(aggregate)
+        return {
+            "metric": self.metric,
+            "target": self.half_width,
+            "confidence": self.confidence,
+            "half_width": half_width,
+            "met": half_width is not None and half_width <= self.half_width,
+        }
+
+
+def summary_metrics(result, actions: Sequence[str]) -> dict[str, float]:
+    """Flat metrics of one `SimulationResult`: totals, reinforcement rate and
+    response proportions, overall and (as ``condition_<k>.<metric>``) for
+    every condition of a multi-condition run."""
+    metrics = {}
+
+    def add(prefix: str, summary: dict):
+        steps = summary["total_steps"]
+        counts = summary["action_counts"]
+        metrics[f"{prefix}total_steps"] = steps
+        metrics[f"{prefix}total_reinforcements"] = summary["total_reinforcements"]
+        metrics[f"{prefix}reinforcement_rate"] = summary["reinforcement_rate"]
+        for a in actions:
+            metrics[f"{prefix}proportion_{a}"] = counts.get(a, 0) / steps if steps else 0.0
+
+    add("", result.summary)
+    if "conditions" in result.config:
+        for k, summary in enumerate(result.condition_summaries):
+            add(f"condition_{k + 1}.", summary)
+    return metrics
+
+
+def _preload(modules: Sequence[str]):
+    for module in modules:
+        importlib.import_module(module)
+
+
+def _run_replicate(job: Callable[[np.random.Generator], Any], seed: np.random.SeedSequence) -> Any:
+    return job(np.random.default_rng(seed))
+
+
+def _discard(value: Any):
+    """Release the shared logs in a result nobody will consume."""
+    if isinstance(value, SharedLogHandle):
+        value.discard()
+    elif isinstance(value, (tuple, list)):
+        for item in value:
+            _discard(item)
+
+
+def _discard_future(future: Future):
+    if not future.cancelled() and future.exception() is None:
+        _discard(future.result())
+
+
+class ReplicateExecutor:
+    """Runs replicates on a warm pool of `workers` processes.
+
+    The pool starts on first use and is reused by later calls; each worker
+    imports `preload` before its first replicate. `workers=0` runs the
+    replicates in the calling process. At most `max_pending` replicates per
+    worker are submitted or waiting to be consumed at any time.
+
+    Jobs may return `SharedLogHandle`s from `share_log()` (alone or inside
+    a tuple or list) to pass step logs back without pickling them; results
+    that are never consumed have their logs discarded.
+    """
+
+    max_pending = 4
+
+    def __init__(self, workers: int = 0, preload: Sequence[str] = DEFAULT_PRELOAD):
+        self.workers = workers
+        self.preload = tuple(preload)
+        self._pool: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "ReplicateExecutor":
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Callers may share the executor across threads
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    # Forking a threaded server process is unsafe
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_preload,
+                    initargs=(self.preload,),
+                )
+            return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    def map(self, job: Callable[[np.random.Generator], Any], seeds: Sequence[np.random.SeedSequence]) -> Iterator[Any]:
+        """Yield `job(default_rng(seed))` for each of `seeds`, in order."""
+        if self.workers <= 0:
+            for seed in seeds:
+                yield _run_replicate(job, seed)
+            return
+        pool = self._get_pool()
+        limit = self.max_pending * self.workers
+        running: dict[Future, int] = {}
+        finished: dict[int, Any] = {}
+        submitted = consumed = 0
+        try:
+            while consumed < len(seeds):
+                while submitted < len(seeds) and submitted - consumed < limit:
+                    running[pool.submit(_run_replicate, job, seeds[submitted])] = submitted
+                    submitted += 1
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finished[running.pop(future)] = future.result()
+                while consumed in finished:
+                    yield finished.pop(consumed)
+                    consumed += 1
+        finally:
+            for future in running:
+                if not future.cancel():
+                    future.add_done_callback(_discard_future)
+            for value in finished.values():
+                _discard(value)
+
+    def map_until(
+        self,
+        job: Callable[[np.random.Generator], Any],
+        seeds: Sequence[np.random.SeedSequence],
+        aggregate: ReplicateAggregate,
+        target: PrecisionTarget,
+    ) -> Iterator[Any]:
+        """Like `map()`, but in waves over a prefix of `seeds` chosen by `target`.
+
+        The caller adds each result's metrics to `aggregate` before taking the
+        next result; after each wave, `target` decides from `aggregate` how
+        many replicates the next one runs. Waves depend only on the metrics,
+        so the replicates used do not depend on the number of workers.
+        """
+        used = 0
+        wave = min(target.min_replicates, len(seeds))
+        while wave:
+            yield from self.map(job, seeds[used:used + wave])
+            used += wave
+            wave = target.next_wave(aggregate, len(seeds))
+
+    def run(
+        self,
+        job: Callable[[np.random.Generator], dict],
+        replicates: int,
+        seed: int | None = None,
+        quantiles: Sequence[float] = DEFAULT_QUANTILES,
+        target: PrecisionTarget | None = None,
+    ) -> dict:
+        """Run `replicates` replicates of the picklable `job` and aggregate their metrics.
+
+        With a `target`, `replicates` is the most that may run and the
+        replicates stop as soon as the target precision is reached; the
+        result then also holds `target.report()` under ``precision``.
+        Returns the root seed entropy, the number of replicates run and the
+        statistics of every metric.
+        """
+        entropy, seeds = replicate_seeds(seed, replicates)
+        aggregate = ReplicateAggregate(quantiles)
+        results = self.map(job, seeds) if target is None else self.map_until(job, seeds, aggregate, target)
+        for index, metrics in enumerate(results):
+            aggregate.add(index, metrics)
+        result = {"seed": entropy, "replicates": aggregate.folded, "metrics": aggregate.result()}
+        if target is not None:
+            result["precision"] = target.report(aggregate)
+        return result
@@ -0,0 +1,132 @@
+"""Bounded cache of finished simulation results, with optional disk spill."""
+
+import os
+import pickle
+import shutil
+import tempfile
+import weakref
+from typing import Any, Callable
+
+from simulation.lru import LRUStore
+from simulation.runner import SimulationResult
+
+
+def result_nbytes(result: SimulationResult) -> int:
+    """Approximate memory held by `result`: its step columns and keyframes."""
+    steps = result.steps
+    size = sum(getattr(steps, col).nbytes for col in steps.COLUMNS)
+    if result.keyframes is not None:
+        size += result.keyframes.nbytes
+    return size
+
+
+class ResultCache:
+    """LRU map from request hashes to `SimulationResult`s.
+
+    Holds at most `max_entries` results totalling at most `max_bytes` in
+    memory, as measured by `sizeof`. Without `spill_dir`, evicted results
+    are dropped. With it, they are pickled to a private directory under
+    `spill_dir`, which holds at most `max_disk_bytes` of them (least
+    recently spilled dropped first). A spilled result moves back into memory
+    when it is next requested. The directory is removed with the cache.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 32,
+        max_bytes: int = 256 * 1024 * 1024,
+        spill_dir: str | None = None,
+        max_disk_bytes: int = 1024 * 1024 * 1024,
+        sizeof: Callable[[Any], int] = result_nbytes,
+    ):
+        self._memory = LRUStore(
+            max_entries, max_bytes, sizeof=lambda entry: sizeof(entry[1]), on_evict=self._spill
+        )
+        self._disk = None
+        self.spill_dir = None
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+            self.spill_dir = tempfile.mkdtemp(prefix="results-", dir=spill_dir)
+            weakref.finalize(self, shutil.rmtree, self.spill_dir, True)
+            self._disk = LRUStore(
+                max_entries=1 << 20,
+                max_bytes=max_disk_bytes,
+                sizeof=lambda entry: entry[1],
+                on_evict=lambda entry: _remove(entry[0]),
+            )
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._memory) + (len(self._disk) if self._disk is not None else 0)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._memory or (self._disk is not None and key in self._disk)
+
+    @property
+    def max_bytes(self) -> int:
+        return self._memory.max_bytes
+
+    @property
+    def memory_bytes(self) -> int:
+        return self._memory.total_bytes
+
+    @property
+    def disk_bytes(self) -> int:
+        return self._disk.total_bytes if self._disk is not None else 0
+
+    def get(self, key: str) -> SimulationResult | None:
+        entry = self._memory.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry[1]
+        spilled = self._disk.pop(key) if self._disk is not None else None
+        if spilled is not None:
+            path = spilled[0]
+            try:
+                with open(path, "rb") as f:
+                    result = pickle.load(f)
+            except OSError:
+                result = None
+            finally:
+                _remove(path)
+            if result is not None:
+                self.hits += 1
+                self.put(key, result)
+                return result
+        self.misses += 1
+        return None
+
+    def put(self, key: str, result: SimulationResult):
+        self._memory.put(key, (key, result))
+
+    def clear(self):
+        """Drop every result, in memory and on disk."""
+        disk, self._disk = self._disk, None
+        self._memory.clear()
+        self._disk = disk
+        if disk is not None:
+            disk.clear()
+
+    def _spill(self, entry: tuple[str, SimulationResult]):
+        key, result = entry
+        if self._disk is None or key in self._memory:
+            return
+        # Every spill gets its own file, so a racing spill of the same key
+        # never removes the file that replaced it
+        fd, path = tempfile.mkstemp(prefix=key[:16], dir=self.spill_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            # Spilling is best effort; a result that cannot be written is dropped
+            _remove(path)
+            return
+        self._disk.put(key, (path, os.path.getsize(path)))
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
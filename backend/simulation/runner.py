@@ -1,129 +1,831 @@
 """Simulation runner orchestrator."""
 
+import dataclasses
+import time
 from dataclasses import dataclass, field
-from typing import Any
+from typing import Any, Callable, Sequence
 
 import numpy as np
 
-from agents.base import AbstractAgent
-from environments.base import AbstractEnvironment
+from agents.base import AbstractAgent, action_id_agent
+from environments.base import AbstractEnvironment, BatchStepBuffer, StepBuffer
+from simulation import fused
+from simulation.analytics import Accumulator
+from simulation.checkpoint import dump_checkpoint, load_checkpoint, merge_checkpoints
+from simulation.keyframes import Keyframes, RunState
+from simulation.prefix_cache import PrefixCache, prefix_key
+from simulation.profiling import PhaseProfile
+from simulation.stability import StabilityTracker
+from simulation.steplog import StepLog
+from simulation.telemetry import Telemetry
+
+
+def make_rng(seed: int | None = None) -> np.random.Generator:
+    """Return a Generator owned by one simulation, derived from `seed`."""
+    return np.random.default_rng(np.random.SeedSequence(seed))
 
 
 @dataclass
 class SimulationResult:
     """Container for simulation results."""
     config: dict
-    steps: list[dict]
+    steps: StepLog
     summary: dict
     condition_summaries: list[dict] = field(default_factory=list)
+    keyframes: Keyframes | None = None
+    telemetry: Telemetry | None = None
+    truncated: bool = False
 
 
-class SimulationRunner:
-    """Orchestrates agent-environment interaction loop."""
+@dataclass
+class RunProgress:
+    """Where a run stands between two steps: everything needed to resume it.
+
+    `conditions` is None for a single-condition run. `analytics` holds the
+    accumulator factories applied to every condition, and `steps` counts the
+    steps run so far, which the log only holds when `record_steps` is set.
+    The fields after `summaries` describe the condition currently in progress.
+    """
+    log: StepLog
+    conditions: list[dict] | None = None
+    record_steps: bool = True
+    analytics: list[Callable[[list[str]], Accumulator]] = field(default_factory=list)
+    condition_index: int = 0
+    global_offset: int = 0
+    steps: int = 0
+    telemetry: Telemetry | None = None
+    truncated: bool = False
+    summaries: list[dict] = field(default_factory=list)
+    started: bool = False
+    state: Any = None
+    start: int = 0
+    action_counts: list[int] = field(default_factory=list)
+    # Action ids of the condition in the order they were first taken
+    action_order: list[int] = field(default_factory=list)
+    total_reinforcements: int = 0
+    stability: StabilityTracker | None = None
+    accumulators: list[Accumulator] = field(default_factory=list)
+
+    @property
+    def num_conditions(self) -> int:
+        return 1 if self.conditions is None else len(self.conditions)
+
+    @property
+    def finished(self) -> bool:
+        return self.condition_index >= self.num_conditions
 
-    def __init__(self, agent: AbstractAgent, environment: AbstractEnvironment):
-        self.agent = agent
-        self.environment = environment
 
-    def _run_condition(
+class SimulationRunner:
+    """Orchestrates agent-environment interaction loop.
+
+    Randomness never goes through the global `np.random` state. A run given
+    a `seed` or `rng` binds that one Generator to the agent and environment
+    for its whole duration, so seeded runs in separate threads are
+    reproducible and do not disturb each other.
+
+    With `checkpoint_every=N`, `on_checkpoint` receives a `checkpoint()`
+    snapshot after every N-th step. Each one holds only the step-log rows
+    recorded since the one before, so together they cost no more than the
+    log itself; `CheckpointFile` keeps them. `from_checkpoint` and `resume`
+    continue such a snapshot, given the snapshots before it, with output
+    identical to an uninterrupted run.
+
+    With `keyframe_every=K`, `run` and `run_multi_condition` also keep
+    in-memory keyframes every K steps, and `reconstruct(step)` returns the
+    agent and environment as of any step by replaying at most K steps.
+
+    Each factory in `analytics` is called with the actions at the start of
+    every condition; the `Accumulator` it returns sees every step, and its
+    result goes into the condition summary under ``analytics[name]``.
+
+    With `telemetry_every=N`, the agent's `telemetry()` vector is sampled
+    after every N-th step into `SimulationResult.telemetry`.
+
+    With a `time_budget` (seconds), each `run`, `run_multi_condition` or
+    `resume` call checks the clock every `deadline_check_every` steps and,
+    once the budget is spent, stops with the steps and summaries completed
+    so far and `SimulationResult.truncated` set. `resume()` continues a
+    truncated run.
+
+    With `profile=True`, each `run`, `run_multi_condition` or `resume` call
+    times the phases of the step loop and puts them, with the agent's
+    operation counts, under ``summary["profile"]``.
+
+    With `progress_every=N`, `on_progress` receives a progress report (see
+    `progress_report`) after every N-th step and at the end of every
+    condition.
+
+    With `engine="numba"`, conditions that need no per-step hooks (no
+    checkpoints, keyframes, telemetry, stability criterion, time budget or
+    profile)
+    run in one compiled kernel from `simulation.fused` when Numba is
+    installed and the agent, environment and schedules are supported;
+    otherwise, and always with the default `engine="python"`, they run in
+    the loop below.
+    """
+
+    deadline_check_every = 64
+
+    def __init__(
         self,
-        condition_num: int,
-        label: str,
-        global_step_offset: int,
-    ) -> tuple[list[dict], dict]:
-        """Run one condition phase without resetting the agent.
-
-        Returns (steps, condition_summary).
+        agent: AbstractAgent,
+        environment: AbstractEnvironment,
+        checkpoint_every: int = 0,
+        on_checkpoint: Callable[[bytes], None] | None = None,
+        keyframe_every: int = 0,
+        analytics: Sequence[Callable[[list[str]], Accumulator]] = (),
+        telemetry_every: int = 0,
+        time_budget: float | None = None,
+        engine: str = "python",
+        profile: bool = False,
+        progress_every: int = 0,
+        on_progress: Callable[[dict], None] | None = None,
+    ):
+        if engine not in ("python", "numba"):
+            raise ValueError(f"Unknown engine: {engine}. Must be 'python' or 'numba'")
+        self.agent = agent
+        self.environment = environment
+        self.rng: np.random.Generator | None = None
+        self.checkpoint_every = checkpoint_every
+        self.on_checkpoint = on_checkpoint
+        # Log rows already handed to `on_checkpoint` in this run
+        self._checkpointed = 0
+        self.progress: RunProgress | None = None
+        self.keyframe_every = keyframe_every
+        self.keyframes: Keyframes | None = None
+        self.analytics = list(analytics)
+        self.telemetry_every = telemetry_every
+        self.time_budget = time_budget
+        self._deadline: float | None = None
+        self.engine = engine
+        self.profile = profile
+        self._profile: PhaseProfile | None = None
+        self.progress_every = progress_every if on_progress is not None else 0
+        self.on_progress = on_progress
+
+    def _bind_rng(self, seed: int | None, rng: np.random.Generator | None):
+        """Bind the run's Generator, if one was requested, to both components."""
+        if rng is None and seed is not None:
+            rng = make_rng(seed)
+        self.rng = rng
+        if rng is not None:
+            self.agent.set_rng(rng)
+            self.environment.set_rng(rng)
+
+    def _run_condition(self, progress: RunProgress) -> dict:
+        """Run (or continue) the current condition without resetting the agent.
+
+        Uses the integer action-id protocol: the environment writes each
+        outcome into a reused StepBuffer and, when recording, the step is
+        written directly into the columns of `progress.log`. Returns the
+        condition summary.
         """
-        state = self.environment.reset()
-        available_actions = self.environment.get_available_actions()
-
-        steps = []
-        total_reinforcements = 0
-        action_counts: dict[str, int] = {}
+        env = self.environment
+        log = progress.log
+        actions = env.get_available_actions()
+        if not progress.started:
+            progress.state = env.reset()
+            progress.start = progress.steps
+            progress.action_counts = [0] * len(actions)
+            progress.action_order = []
+            progress.total_reinforcements = 0
+            progress.stability = self._make_tracker(progress, actions)
+            progress.accumulators = [factory(actions) for factory in progress.analytics]
+            progress.started = True
+        agent = action_id_agent(self.agent, actions)
+        if self.engine == "numba" and self._fusable(progress):
+            if self._run_fused(progress, agent, actions):
+                return self._condition_summary(progress, actions)
+        select_action = agent.select_action_id
+        update = agent.update_id
+        step_into = env.step_into
+        if self._profile is not None:
+            select_action, step_into, update = self._profile.wrap(select_action, step_into, update)
+
+        out = StepBuffer()
+        state = progress.state
+        action_counts = progress.action_counts
+        action_order = progress.action_order
+        total_reinforcements = progress.total_reinforcements
+        start = progress.start
+        i = progress.steps
+        record = progress.record_steps
+        if record:
+            log.reserve(max(getattr(env, "max_steps", 0) - (i - start), 0))
+        state_col, action_col = log.state, log.action
+        reinforced_col, schedule_col = log.reinforced, log.schedule
+        state_codes, schedule_codes = log.state_codes, log.schedule_codes
+        stability = progress.stability
+        telemetry = progress.telemetry
+        deadline = self._deadline
+        check_every = self.deadline_check_every
+        progress_every = self.progress_every
+        updates = [acc.update for acc in progress.accumulators]
+        next_mark = self._next_mark(i, progress)
         done = False
-        local_step = 0
 
         while not done:
-            action = self.agent.select_action(state, available_actions)
-            result = self.environment.step(action)
-
-            local_step += 1
-            global_step = global_step_offset + local_step
+            action = select_action(state)
+            step_into(action, out)
 
-            if result.reinforced:
+            taken = out.action
+            next_state = out.state
+            reinforced = out.reinforced
+            if reinforced:
                 total_reinforcements += 1
-            action_counts[result.action_taken] = action_counts.get(result.action_taken, 0) + 1
-
-            steps.append({
-                "step": global_step,
-                "state": str(result.state),
-                "action": result.action_taken,
-                "reinforced": result.reinforced,
-                "schedule_id": result.schedule_id,
-                "condition": condition_num,
-            })
-
-            self.agent.update(state, result.action_taken, result.reinforced, result.state)
-            state = result.state
-            done = result.done
+            if not action_counts[taken]:
+                action_order.append(taken)
+            action_counts[taken] += 1
+
+            if record:
+                if i == len(state_col):
+                    log.size = i
+                    log.reserve(1)
+                    state_col, action_col = log.state, log.action
+                    reinforced_col, schedule_col = log.reinforced, log.schedule
+                code = state_codes.get(next_state)
+                state_col[i] = log.code_state(next_state) if code is None else code
+                code = schedule_codes.get(out.schedule_id)
+                schedule_col[i] = log.code_schedule(out.schedule_id) if code is None else code
+                action_col[i] = taken
+                reinforced_col[i] = reinforced
+            if updates:
+                for update_stat in updates:
+                    update_stat(taken, reinforced)
+            i += 1
+
+            update(state, taken, reinforced, next_state)
+            state = next_state
+            done = out.done
+
+            if i == next_mark:
+                if telemetry is not None and i % telemetry.every == 0:
+                    telemetry.record(i, agent.telemetry(state))
+                if stability is not None and not done and (i - start) % stability.window == 0:
+                    done = stability.observe(i - start, action_counts, total_reinforcements)
+                if deadline is not None and not done and i % check_every == 0 and time.monotonic() >= deadline:
+                    done = progress.truncated = True
+                if progress_every and not done and i % progress_every == 0:
+                    self.on_progress(self.progress_report(progress, i, actions, total_reinforcements))
+                if not done and self._snapshot_due(i):
+                    self._fill_steps(progress, i)
+                    progress.state = state
+                    progress.total_reinforcements = total_reinforcements
+                    self._mark(i)
+                next_mark = self._next_mark(i, progress)
+
+        self._fill_steps(progress, i)
+        progress.state = state
+        progress.total_reinforcements = total_reinforcements
+        return self._condition_summary(progress, actions)
+
+    def _condition_summary(self, progress: RunProgress, actions: Sequence[str]) -> dict:
+        """Summary of the current condition as far as it has run."""
+        local_step = progress.steps - progress.start
+        global_step_offset = progress.global_offset
+        total_reinforcements = progress.total_reinforcements
+        stability = progress.stability
 
         condition_summary = {
-            "condition": condition_num,
-            "label": label,
+            "condition": progress.condition_index + 1,
+            "label": self._condition_label(progress),
             "start_step": global_step_offset + 1,
             "end_step": global_step_offset + local_step,
             "total_steps": local_step,
             "total_reinforcements": total_reinforcements,
             "reinforcement_rate": total_reinforcements / local_step if local_step > 0 else 0,
-            "action_counts": action_counts,
+            "action_counts": {actions[k]: progress.action_counts[k] for k in progress.action_order},
+        }
+        if stability is not None:
+            stable_step = stability.stable_step
+            condition_summary["stable_step"] = (
+                None if stable_step is None else global_step_offset + stable_step
+            )
+        if progress.truncated:
+            condition_summary["truncated"] = True
+        if progress.accumulators:
+            condition_summary["analytics"] = {acc.name: acc.result() for acc in progress.accumulators}
+
+        return condition_summary
+
+    @staticmethod
+    def progress_report(
+        progress: RunProgress, steps: int, actions: Sequence[str], total_reinforcements: int
+    ) -> dict:
+        """JSON-ready progress of a run after `steps` steps: the condition
+        (1-indexed) and steps into it, and its response counts and reinforcers."""
+        return {
+            "steps": steps,
+            "condition": progress.condition_index + 1,
+            "condition_steps": steps - progress.start,
+            "action_counts": dict(zip(actions, progress.action_counts)),
+            "total_reinforcements": total_reinforcements,
         }
 
-        return steps, condition_summary
+    def _fusable(self, progress: RunProgress) -> bool:
+        """Whether the current condition may run in fused kernels: Numba is
+        installed and nothing but progress reports has to happen between
+        two steps."""
+        return (
+            fused.NUMBA_AVAILABLE
+            and not self._intervals()
+            and progress.telemetry is None
+            and progress.stability is None
+            and self._deadline is None
+            and self._profile is None
+        )
 
-    def run(self, seed: int | None = None) -> SimulationResult:
-        """Run a single-condition simulation to completion."""
-        if seed is not None:
-            np.random.seed(seed)
+    def _run_fused(self, progress: RunProgress, agent: AbstractAgent, actions: Sequence[str]) -> bool:
+        """Run the rest of the current condition in fused kernels, one call
+        per progress interval so that reports arrive as from the step loop.
+        False if no kernel supports the components, leaving the rest of the
+        condition to the step loop."""
+        every = self.progress_every
+        while True:
+            condition = fused.fused_condition(agent, self.environment, progress.state)
+            if condition is None:
+                return False
+            i = progress.steps
+            self._write_fused(progress, condition, (i // every + 1) * every - i if every else None)
+            if condition.done:
+                return True
+            self.on_progress(self.progress_report(progress, progress.steps, actions, progress.total_reinforcements))
+
+    def _write_fused(self, progress: RunProgress, condition: "fused.FusedCondition", steps: int | None):
+        """Run `condition`'s kernel for at most `steps` steps and write them
+        into the log, counts and accumulators."""
+        taken, reinforced, state_ids, schedule_ids = condition.run(steps)
+        i = progress.steps
+        n = len(taken)
+        log = progress.log
+        if progress.record_steps:
+            log.size = i
+            log.reserve(n)
+            log.action[i:i + n] = taken
+            log.reinforced[i:i + n] = reinforced
+            # Register codes in order of first use, as the step loop does
+            for ids, names, column, code in (
+                (state_ids, condition.states, log.state, log.code_state),
+                (schedule_ids, condition.schedule_ids, log.schedule, log.code_schedule),
+            ):
+                used, first, inverse = np.unique(ids, return_index=True, return_inverse=True)
+                codes = np.zeros(len(used), dtype=np.int64)
+                for k in np.argsort(first, kind="stable").tolist():
+                    codes[k] = code(names[used[k]])
+                column[i:i + n] = codes[inverse]
+        used, first = np.unique(taken, return_index=True)
+        for k in used[np.argsort(first)].tolist():
+            if not progress.action_counts[k]:
+                progress.action_order.append(k)
+        counts = np.bincount(taken, minlength=len(progress.action_counts))
+        for k, count in enumerate(counts.tolist()):
+            progress.action_counts[k] += count
+        progress.total_reinforcements += int(reinforced.sum())
+        if progress.accumulators:
+            updates = [acc.update for acc in progress.accumulators]
+            for action, hit in zip(taken.tolist(), reinforced.tolist()):
+                for update_stat in updates:
+                    update_stat(action, hit)
+        self._fill_steps(progress, i + n)
+        progress.state = condition.states[state_ids[-1]]
+
+    def _intervals(self) -> list[int]:
+        intervals = []
+        if self.on_checkpoint and self.checkpoint_every > 0:
+            intervals.append(self.checkpoint_every)
+        if self.keyframes is not None:
+            intervals.append(self.keyframes.every)
+        return intervals
+
+    def _next_mark(self, i: int, progress: RunProgress) -> int:
+        """First step after `i` that checks stability or the deadline, takes a
+        checkpoint, keyframe or telemetry sample, or reports progress, or -1."""
+        marks = [(i // n + 1) * n for n in self._intervals()]
+        if progress.telemetry is not None:
+            marks.append((i // progress.telemetry.every + 1) * progress.telemetry.every)
+        if self._deadline is not None:
+            marks.append((i // self.deadline_check_every + 1) * self.deadline_check_every)
+        if self.progress_every:
+            marks.append((i // self.progress_every + 1) * self.progress_every)
+        if progress.stability is not None:
+            marks.append(progress.start + progress.stability.next_boundary(i - progress.start))
+        return min(marks, default=-1)
+
+    @staticmethod
+    def _make_tracker(progress: RunProgress, actions: Sequence[str]) -> StabilityTracker | None:
+        """Stability tracker for the current condition, if it sets a criterion."""
+        if progress.conditions is None:
+            return None
+        config = progress.conditions[progress.condition_index].get("stability")
+        if not config:
+            return None
+        return StabilityTracker.from_config(config, actions)
+
+    def _snapshot_due(self, i: int) -> bool:
+        """Whether a checkpoint or keyframe is due after step `i`."""
+        return any(i % n == 0 for n in self._intervals())
+
+    def _mark(self, i: int):
+        """Take the checkpoint and/or keyframe due after step `i`."""
+        if self.on_checkpoint and self.checkpoint_every > 0 and i % self.checkpoint_every == 0:
+            self.on_checkpoint(self.checkpoint(since=self._checkpointed))
+            self._checkpointed = self.progress.log.size
+        if self.keyframes is not None and i % self.keyframes.every == 0:
+            self._record_keyframe(i)
+
+    def _record_keyframe(self, i: int):
+        progress = self.progress
+        self.keyframes.record(
+            i,
+            self.agent,
+            self.environment,
+            self.rng,
+            progress.condition_index,
+            progress.started,
+            progress.state,
+        )
 
-        self.agent.reset()
-        steps, cond_summary = self._run_condition(
-            condition_num=1,
-            label="Default",
-            global_step_offset=0,
+    def _start_keyframes(self, conditions: list[dict] | None):
+        """Begin keyframes for a fresh run, if requested, with one at step 0."""
+        self.keyframes = None
+        if self.keyframe_every > 0:
+            self.keyframes = Keyframes(self.keyframe_every, conditions)
+            self._record_keyframe(0)
+
+    def _start_telemetry(self, progress: RunProgress, max_steps: int):
+        """Begin telemetry for a fresh run, if requested and the agent provides any."""
+        if self.telemetry_every <= 0:
+            return
+        # Telemetry fields are named after the bound actions
+        agent = action_id_agent(self.agent, self.environment.get_available_actions())
+        fields = agent.telemetry_fields() if agent is self.agent else []
+        if fields:
+            progress.telemetry = Telemetry(self.telemetry_every, fields, max_steps // self.telemetry_every)
+
+    @staticmethod
+    def _fill_steps(progress: RunProgress, end: int):
+        """Advance the step count to `end` and, when recording, write the step
+        and condition columns of the current condition up to it."""
+        progress.steps = end
+        if not progress.record_steps:
+            return
+        log = progress.log
+        log.size = end
+        n = end - progress.start
+        offset = progress.global_offset
+        log.step[progress.start:end] = np.arange(offset + 1, offset + n + 1)
+        log.condition[progress.start:end] = progress.condition_index + 1
+
+    @staticmethod
+    def _condition_label(progress: RunProgress) -> str:
+        if progress.conditions is None:
+            return "Default"
+        return progress.conditions[progress.condition_index]["label"]
+
+    def _drive(
+        self,
+        progress: RunProgress,
+        swap_env_fn=None,
+        prefix_cache: PrefixCache | None = None,
+        cache_key: str | None = None,
+    ) -> SimulationResult:
+        """Run the remaining conditions of `progress` and build the result.
+
+        With a `prefix_cache`, the state after each condition is stored under
+        the key of the conditions run so far. When the time budget runs out,
+        the result ends with the partial condition and `progress` stays
+        resumable.
+        """
+        self.progress = progress
+        progress.truncated = False
+        self._deadline = None
+        if self.time_budget is not None:
+            self._deadline = time.monotonic() + self.time_budget
+        self._profile = None
+        if self.profile:
+            self._profile = PhaseProfile()
+            self.agent.start_op_counts()
+            started = time.perf_counter()
+        summaries = progress.summaries
+        while not progress.finished:
+            if progress.conditions is not None and not progress.started:
+                swap_env_fn(self.environment, progress.conditions[progress.condition_index])
+                if self.rng is not None:
+                    # Swapped-in schedules must draw from the experiment's stream
+                    self.environment.set_rng(self.rng)
+
+            cond_summary = self._run_condition(progress)
+            if self.progress_every:
+                self.on_progress(self.progress_report(
+                    progress, progress.steps, self.environment.get_available_actions(),
+                    progress.total_reinforcements,
+                ))
+            if progress.truncated:
+                # Leave the condition open so that resume() can finish it
+                summaries = summaries + [cond_summary]
+                break
+
+            progress.summaries.append(cond_summary)
+            progress.global_offset += cond_summary["total_steps"]
+            progress.condition_index += 1
+            progress.started = False
+            if self.keyframes is not None:
+                self.keyframes.condition_ends.append(progress.steps)
+            if self.keyframes is not None and progress.steps % self.keyframes.every == 0:
+                # The condition ended on a keyframe step, which the loop skips
+                self._record_keyframe(progress.steps)
+            if prefix_cache is not None:
+                key = prefix_key(cache_key, progress.conditions[:progress.condition_index])
+                if key not in prefix_cache:
+                    prefix_cache.put(key, self.checkpoint())
+
+        if self.keyframes is not None:
+            self.keyframes.total_steps = progress.steps
+        result = self._build_result(
+            progress.log,
+            list(summaries),
+            self.agent.get_params(),
+            getattr(self.environment, "visit_counts", None),
+            conditions=progress.conditions,
         )
+        result.keyframes = self.keyframes
+        result.telemetry = progress.telemetry
+        if progress.truncated:
+            result.truncated = True
+            result.summary["truncated"] = True
+        if self._profile is not None:
+            operations = self.agent.stop_op_counts()
+            result.summary["profile"] = self._profile.to_dict(time.perf_counter() - started, operations)
+            self._profile = None
+        return result
+
+    def reconstruct(self, step: int, swap_env_fn=None) -> RunState:
+        """Return copies of the agent and environment as they were after `step` steps.
+
+        Requires a run made with `keyframe_every`; multi-condition runs need
+        their `swap_env_fn`.
+        """
+        if self.keyframes is None:
+            raise RuntimeError("Run was not recorded with keyframes")
+        return self.keyframes.reconstruct(step, swap_env_fn)
+
+    def checkpoint(self, since: int = 0) -> bytes:
+        """Snapshot the agent, environment, RNG and run progress as compact bytes.
+
+        Between steps of a run this captures a resumable point; after a run
+        it captures the finished run, which `resume(extra_steps=...)` can
+        extend. With `since`, only the step-log rows from index `since` on
+        are included, and restoring needs the checkpoints holding the rows
+        before them too.
+        """
+        progress, rows = self.progress, None
+        if progress is not None:
+            rows = {"start": since, "columns": progress.log.rows(since)}
+            progress = dataclasses.replace(progress, log=progress.log.without_rows())
+        return dump_checkpoint({
+            "agent": self.agent,
+            "environment": self.environment,
+            "rng": self.rng,
+            "progress": progress,
+        }, rows)
+
+    @classmethod
+    def from_checkpoint(
+        cls,
+        data: bytes | Sequence[bytes],
+        checkpoint_every: int = 0,
+        on_checkpoint: Callable[[bytes], None] | None = None,
+    ) -> "SimulationRunner":
+        """Rebuild a runner, with its components, from `checkpoint()` bytes,
+        or from a run's periodic checkpoints up to the one to resume from."""
+        runner = cls(None, None, checkpoint_every=checkpoint_every, on_checkpoint=on_checkpoint)
+        runner._restore(data)
+        runner._checkpointed = runner.progress.log.size
+        return runner
+
+    def _restore(self, data: bytes | Sequence[bytes]):
+        """Replace the agent, environment, RNG and progress with a checkpoint's."""
+        if not isinstance(data, (bytes, bytearray)):
+            data = merge_checkpoints(data)
+        payload = load_checkpoint(data)
+        self.agent = payload["agent"]
+        self.environment = payload["environment"]
+        self.rng = payload["rng"]
+        self.progress = payload["progress"]
+        rows = payload.get("rows")
+        if rows is not None:
+            if rows["start"] != 0:
+                raise ValueError(
+                    f"Checkpoint holds steps from {rows['start']} on; pass the checkpoints before it too"
+                )
+            self.progress.log.set_rows(rows["columns"])
+        self.keyframes = None
+
+    def resume(self, swap_env_fn=None, extra_steps: int = 0) -> SimulationResult:
+        """Continue the run restored by `from_checkpoint` to completion.
+
+        Args:
+            swap_env_fn: Required for multi-condition runs, as in
+                `run_multi_condition`.
+            extra_steps: Lengthen the current condition (the last one, if the
+                run had finished) by this many steps.
+        """
+        progress = self.progress
+        if progress is None:
+            raise RuntimeError("No run to resume")
+        if extra_steps:
+            if progress.finished:
+                # Reopen the last condition
+                progress.condition_index -= 1
+                last = progress.summaries.pop()
+                progress.global_offset -= last["total_steps"]
+                progress.started = True
+            self.environment.max_steps += extra_steps
+        return self._drive(progress, swap_env_fn)
+
+    def _build_result(
+        self,
+        steps: StepLog,
+        condition_summaries: list[dict],
+        agent_params: dict,
+        visit_counts: dict | None,
+        conditions: list[dict] | None = None,
+    ) -> SimulationResult:
+        """Aggregate condition summaries into a SimulationResult."""
+        total_steps = sum(s["total_steps"] for s in condition_summaries)
+        total_reinforcements = sum(s["total_reinforcements"] for s in condition_summaries)
+        combined_action_counts: dict[str, int] = {}
+        for s in condition_summaries:
+            for action, count in s["action_counts"].items():
+                combined_action_counts[action] = combined_action_counts.get(action, 0) + count
 
         summary = {
-            "total_steps": cond_summary["total_steps"],
-            "total_reinforcements": cond_summary["total_reinforcements"],
-            "reinforcement_rate": cond_summary["reinforcement_rate"],
-            "action_counts": cond_summary["action_counts"],
+            "total_steps": total_steps,
+            "total_reinforcements": total_reinforcements,
+            "reinforcement_rate": total_reinforcements / total_steps if total_steps > 0 else 0,
+            "action_counts": combined_action_counts,
             "agent": self.agent.name,
             "environment": self.environment.name,
-            "agent_params": self.agent.get_params(),
+            "agent_params": agent_params,
         }
 
-        if hasattr(self.environment, 'visit_counts'):
-            summary["visit_counts"] = {str(k): v for k, v in self.environment.visit_counts.items()}
+        if visit_counts is not None:
+            summary["visit_counts"] = {str(k): v for k, v in visit_counts.items()}
 
         config = {
             "agent": self.agent.name,
             "environment": self.environment.name,
-            "agent_params": self.agent.get_params(),
+            "agent_params": agent_params,
         }
+        if conditions is not None:
+            config["conditions"] = [c["label"] for c in conditions]
 
         return SimulationResult(
             config=config,
             steps=steps,
             summary=summary,
-            condition_summaries=[cond_summary],
+            condition_summaries=condition_summaries,
         )
 
+    def run(
+        self,
+        seed: int | None = None,
+        rng: np.random.Generator | None = None,
+        record_steps: bool = True,
+    ) -> SimulationResult:
+        """Run a single-condition simulation to completion.
+
+        Draws from `rng` if given, else from ``make_rng(seed)`` if a seed is
+        given, else from whatever streams the components already hold. With
+        `record_steps=False` the result carries an empty step log; summaries
+        and analytics are unaffected.
+        """
+        self._bind_rng(seed, rng)
+
+        self.agent.reset()
+        self.progress = RunProgress(
+            StepLog(self.environment.get_available_actions()),
+            record_steps=record_steps,
+            analytics=list(self.analytics),
+        )
+        self._start_keyframes(None)
+        self._start_telemetry(self.progress, getattr(self.environment, "max_steps", 0))
+        return self._drive(self.progress)
+
+    def run_batch(self, seeds: Sequence[int], record_steps: bool = True) -> list[SimulationResult]:
+        """Run one single-condition replicate per seed, all K in lockstep.
+
+        Each step makes one `select_actions`, one `step_batch` and one
+        `update_batch` call covering every replicate. Replicate k draws only
+        from ``make_rng(seeds[k])``, the same stream `run(seed)` uses, so each
+        result is identical to running that seed alone. With
+        `record_steps=False` the results carry empty step logs.
+
+        This is a convenience for running seeds side by side, not a faster
+        path: most agents still step each replicate in Python, so it takes
+        about as long as `run` per seed. For throughput, spread seeds over
+        processes with `simulation.replicates.ReplicateExecutor`.
+        """
+        agent, env = self.agent, self.environment
+        rngs = [make_rng(seed) for seed in seeds]
+        size = len(rngs)
+        actions = env.get_available_actions()
+
+        agent.bind_actions(actions)
+        agent.reset_batch(rngs)
+        states = env.reset_batch(rngs)
+
+        out = BatchStepBuffer.empty(size)
+        index = np.arange(size)
+        action_counts = np.zeros((size, len(actions)), dtype=np.int64)
+        # Step at which each replicate first took each action, tracked until
+        # every replicate has taken every action
+        first_taken = np.full((size, len(actions)), np.iinfo(np.int64).max)
+        unseen = True
+        total_reinforcements = np.zeros(size, dtype=np.int64)
+        # Step-major logs: row t holds step t + 1 of every replicate
+        capacity = max(getattr(env, "max_steps", 0), 1) if record_steps else 0
+        logs = {
+            "state_ids": np.zeros((capacity, size), dtype=np.intp),
+            "action": np.zeros((capacity, size), dtype=np.intp),
+            "reinforced": np.zeros((capacity, size), dtype=np.bool_),
+            "schedule": np.zeros((capacity, size), dtype=np.intp),
+        }
+        t = 0
+
+        while True:
+            chosen = agent.select_actions(states)
+            env.step_batch(chosen, out)
+
+            if record_steps:
+                if t == len(logs["action"]):
+                    logs = {k: np.concatenate([v, np.zeros_like(v)]) for k, v in logs.items()}
+                for name, column in logs.items():
+                    column[t] = getattr(out, name)
+
+            total_reinforcements += out.reinforced
+            if unseen:
+                fresh = action_counts[index, out.action] == 0
+                first_taken[index[fresh], out.action[fresh]] = t
+            action_counts[index, out.action] += 1
+            if unseen:
+                unseen = not action_counts.all()
+            agent.update_batch(states, out.action, out.reinforced, out.states)
+            states = out.states
+            t += 1
+
+            if out.done.any():
+                if not out.done.all():
+                    raise RuntimeError("Replicates finished out of lockstep")
+                break
+
+        agent_params = agent.get_batch_params()
+        visit_counts = env.get_batch_visit_counts()
+        results = []
+        for k in range(size):
+            if record_steps:
+                steps = StepLog.from_codes(
+                    actions,
+                    states=env.batch_states,
+                    state_ids=logs["state_ids"][:t, k],
+                    action=logs["action"][:t, k],
+                    reinforced=logs["reinforced"][:t, k],
+                    schedule_ids=env.batch_schedule_ids,
+                    schedule=logs["schedule"][:t, k],
+                )
+            else:
+                steps = StepLog(actions)
+            cond_summary = {
+                "condition": 1,
+                "label": "Default",
+                "start_step": 1,
+                "end_step": t,
+                "total_steps": t,
+                "total_reinforcements": int(total_reinforcements[k]),
+                "reinforcement_rate": int(total_reinforcements[k]) / t,
+                "action_counts": {
+                    actions[a]: int(action_counts[k, a])
+                    for a in np.argsort(first_taken[k], kind="stable").tolist()
+                    if action_counts[k, a]
+                },
+            }
+            results.append(self._build_result(
+                steps,
+                [cond_summary],
+                agent_params[k],
+                visit_counts[k] if visit_counts is not None else None,
+            ))
+        return results
+
     def run_multi_condition(
         self,
         conditions: list[dict],
         swap_env_fn,
         seed: int | None = None,
+        rng: np.random.Generator | None = None,
+        prefix_cache: PrefixCache | None = None,
+        cache_key: str | None = None,
+        record_steps: bool = True,
     ) -> SimulationResult:
         """Run a multi-condition experiment.
 
@@ -132,60 +834,39 @@ class SimulationRunner:
         Args:
             conditions: List of condition dicts with label, max_steps, and schedule info.
             swap_env_fn: Callable(env, condition_dict) that swaps schedules/max_steps on the environment.
-            seed: Random seed.
+            seed: Random seed, used as ``make_rng(seed)`` when `rng` is not given.
+            rng: Generator the whole experiment draws from.
+            prefix_cache: Cache of the state after leading conditions. The run
+                resumes from the longest cached prefix of `conditions` and
+                stores the state after each condition it runs. On a hit the
+                runner's agent and environment are replaced by the cached ones.
+                Runs with keyframes skip the cache.
+            cache_key: Identifies the seed, agent and environment configuration
+                (see `canonical_hash`). Caching is skipped without one.
+            record_steps: Keep the per-step log. Summaries and analytics are
+                computed either way.
         """
-        if seed is not None:
-            np.random.seed(seed)
+        # A cached prefix has no keyframes, so keyframed runs neither use
+        # the cache nor fill it
+        if cache_key is None or self.keyframe_every > 0:
+            prefix_cache = None
+        if prefix_cache is not None:
+            _, data = prefix_cache.longest_prefix(cache_key, conditions)
+            if data is not None:
+                self._restore(data)
+                self._checkpointed = 0
+                self.progress.conditions = conditions
+                return self._drive(self.progress, swap_env_fn, prefix_cache, cache_key)
+
+        self._bind_rng(seed, rng)
 
         self.agent.reset()
-
-        all_steps = []
-        all_summaries = []
-        global_offset = 0
-
-        for i, cond in enumerate(conditions):
-            swap_env_fn(self.environment, cond)
-
-            steps, cond_summary = self._run_condition(
-                condition_num=i + 1,
-                label=cond["label"],
-                global_step_offset=global_offset,
-            )
-
-            all_steps.extend(steps)
-            all_summaries.append(cond_summary)
-            global_offset += cond_summary["total_steps"]
-
-        total_steps = sum(s["total_steps"] for s in all_summaries)
-        total_reinforcements = sum(s["total_reinforcements"] for s in all_summaries)
-        combined_action_counts: dict[str, int] = {}
-        for s in all_summaries:
-            for action, count in s["action_counts"].items():
-                combined_action_counts[action] = combined_action_counts.get(action, 0) + count
-
-        summary = {
-            "total_steps": total_steps,
-            "total_reinforcements": total_reinforcements,
-            "reinforcement_rate": total_reinforcements / total_steps if total_steps > 0 else 0,
-            "action_counts": combined_action_counts,
-            "agent": self.agent.name,
-            "environment": self.environment.name,
-            "agent_params": self.agent.get_params(),
-        }
-
-        if hasattr(self.environment, 'visit_counts'):
-            summary["visit_counts"] = {str(k): v for k, v in self.environment.visit_counts.items()}
-
-        config = {
-            "agent": self.agent.name,
-            "environment": self.environment.name,
-            "agent_params": self.agent.get_params(),
-            "conditions": [c["label"] for c in conditions],
-        }
-
-        return SimulationResult(
-            config=config,
-            steps=all_steps,
-            summary=summary,
-            condition_summaries=all_summaries,
+        self.progress = RunProgress(
+            StepLog(self.environment.get_available_actions()),
+            conditions=conditions,
+            record_steps=record_steps,
+            analytics=list(self.analytics),
         )
+        self._start_keyframes(conditions)
+        self._start_telemetry(self.progress, sum(c["max_steps"] for c in conditions))
+        return self._drive(self.progress, swap_env_fn, prefix_cache, cache_key)
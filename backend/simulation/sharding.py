@@ -0,0 +1,387 @@
+"""Distribution of sweep cells to worker processes on any number of hosts.
+
+A sweep is expanded into cells, each a JSON payload, and submitted to a
+broker. Workers claim one cell at a time under a lease, run it and upload
+its (small) result. A worker renews its lease while the cell runs; if it
+crashes, the lease times out and the cell is issued again.
+
+`SQLiteBroker` keeps the cells in a SQLite file that every worker opens
+directly. `BrokerServer` serves any broker over TCP (one JSON request per
+line) to `TCPBroker` clients, for hosts that share no file system.
+`connect()` opens either from a URL.
+"""
+
+import json
+import socket
+import socketserver
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from itertools import product
+from typing import Any, Callable, Sequence
+from urllib.parse import urlparse
+
+STATUSES = ("pending", "leased", "done", "failed")
+
+
+def expand_sweep(base: dict, factors: dict[str, Sequence[Any]]) -> list[dict]:
+    """Every combination of `factors` applied to `base`, in row-major order.
+
+    Factor names are keys of `base`; a dotted name such as
+    ``agent_params.epsilon`` sets a key of a nested dict.
+    """
+    names = list(factors)
+    cells = []
+    for values in product(*(factors[name] for name in names)):
+        cell = json.loads(json.dumps(base))
+        for name, value in zip(names, values):
+            *parents, key = name.split(".")
+            target = cell
+            for parent in parents:
+                target = target.setdefault(parent, {})
+                if not isinstance(target, dict):
+                    raise ValueError(f"Factor {name!r} does not name a nested key")
+            target[key] = value
+        cells.append(cell)
+    return cells
+
+
+class Broker(ABC):
+    """Queue of sweep cells handed out under leases.
+
+    Cells are numbered from 1 in submission order. A claim returns
+    ``{"id", "token", "payload"}``; the token identifies the lease, so a
+    worker whose lease has expired and been reissued can no longer renew or
+    complete the cell.
+    """
+
+    @abstractmethod
+    def submit(self, payloads: Sequence[dict]) -> list[int]:
+        """Queue `payloads` and return their cell ids."""
+
+    @abstractmethod
+    def claim(self, worker: str, lease: float) -> dict | None:
+        """Lease the next pending or expired cell to `worker` for `lease` seconds."""
+
+    @abstractmethod
+    def renew(self, cell_id: int, token: str, lease: float) -> bool:
+        """Extend a lease; False if it is no longer held."""
+
+    @abstractmethod
+    def complete(self, cell_id: int, token: str, result: dict) -> bool:
+        """Store the result of a leased cell; False if the lease is no longer held."""
+
+    @abstractmethod
+    def fail(self, cell_id: int, token: str, error: str) -> bool:
+        """Give up a leased cell after an error. A cell is issued at most
+        `max_attempts` times, counting expired leases, and then fails."""
+
+    @abstractmethod
+    def status(self) -> dict[str, int]:
+        """Number of cells in each of `STATUSES`."""
+
+    @abstractmethod
+    def results(self) -> list[dict]:
+        """``{"id", "payload", "status", "result", "error"}`` of every cell, by id."""
+
+    def finished(self) -> bool:
+        """True once no cell is pending or leased."""
+        counts = self.status()
+        return counts["pending"] == 0 and counts["leased"] == 0
+
+
+class SQLiteBroker(Broker):
+    """Broker state in a SQLite file shared by every worker.
+
+    Each call opens its own connection and claims run in an immediate
+    transaction, so any number of processes may use the same file. Lease
+    expiry is judged by the clock of the process that claims.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3):
+        self.path = path
+        self.max_attempts = max_attempts
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS cells ("
+                " id INTEGER PRIMARY KEY,"
+                " payload TEXT NOT NULL,"
+                " status TEXT NOT NULL DEFAULT 'pending',"
+                " worker TEXT,"
+                " token TEXT,"
+                " lease_expires REAL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " result TEXT,"
+                " error TEXT)"
+            )
+
+    def _connect(self) -> "_Closing":
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return _Closing(db)
+
+    def submit(self, payloads: Sequence[dict]) -> list[int]:
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            ids = [
+                db.execute("INSERT INTO cells (payload) VALUES (?)", (json.dumps(p),)).lastrowid
+                for p in payloads
+            ]
+            db.execute("COMMIT")
+        return ids
+
+    def claim(self, worker: str, lease: float) -> dict | None:
+        now = time.time()
+        token = uuid.uuid4().hex
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            # A cell whose worker died on every attempt is not issued again
+            db.execute(
+                "UPDATE cells SET status = 'failed', error = 'Lease expired', token = NULL"
+                " WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, self.max_attempts),
+            )
+            row = db.execute(
+                "SELECT id, payload FROM cells"
+                " WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?)"
+                " ORDER BY id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is not None:
+                db.execute(
+                    "UPDATE cells SET status = 'leased', worker = ?, token = ?,"
+                    " lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                    (worker, token, now + lease, row["id"]),
+                )
+            db.execute("COMMIT")
+        if row is None:
+            return None
+        return {"id": row["id"], "token": token, "payload": json.loads(row["payload"])}
+
+    def _update_leased(self, sql: str, params: tuple, cell_id: int, token: str) -> bool:
+        with self._connect() as db:
+            cursor = db.execute(
+                sql + " WHERE id = ? AND token = ? AND status = 'leased'",
+                params + (cell_id, token),
+            )
+            return cursor.rowcount == 1
+
+    def renew(self, cell_id: int, token: str, lease: float) -> bool:
+        return self._update_leased("UPDATE cells SET lease_expires = ?", (time.time() + lease,), cell_id, token)
+
+    def complete(self, cell_id: int, token: str, result: dict) -> bool:
+        return self._update_leased(
+            "UPDATE cells SET status = 'done', result = ?, error = NULL, lease_expires = NULL",
+            (json.dumps(result),),
+            cell_id,
+            token,
+        )
+
+    def fail(self, cell_id: int, token: str, error: str) -> bool:
+        return self._update_leased(
+            "UPDATE cells SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,"
+            " error = ?, token = NULL, lease_expires = NULL",
+            (self.max_attempts, error),
+            cell_id,
+            token,
+        )
+
+    def status(self) -> dict[str, int]:
+        counts = dict.fromkeys(STATUSES, 0)
+        with self._connect() as db:
+            for row in db.execute("SELECT status, COUNT(*) AS n FROM cells GROUP BY status"):
+                counts[row["status"]] = row["n"]
+        return counts
+
+    def results(self) -> list[dict]:
+        with self._connect() as db:
+            rows = db.execute("SELECT id, payload, status, result, error FROM cells ORDER BY id").fetchall()
+        return [
+            {
+                "id": row["id"],
+                "payload": json.loads(row["payload"]),
+                "status": row["status"],
+                "result": json.loads(row["result"]) if row["result"] is not None else None,
+                "error": row["error"],
+            }
+            for row in rows
+        ]
+
+
+class _Closing:
+    """Context manager closing a SQLite connection (which by itself only
+    ends a transaction on exit)."""
+
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+
+    def __enter__(self) -> sqlite3.Connection:
+        return self.db
+
+    def __exit__(self, *exc):
+        self.db.close()
+
+
+_METHODS = ("submit", "claim", "renew", "complete", "fail", "status", "results")
+
+
+class _BrokerHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if request.get("method") not in _METHODS:
+                    raise ValueError(f"Unknown method: {request.get('method')!r}")
+                method = getattr(self.server.broker, request["method"])
+                response = {"result": method(*request.get("params", []))}
+            except Exception as exc:
+                response = {"error": f"{type(exc).__name__}: {exc}"}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class BrokerServer(socketserver.ThreadingTCPServer):
+    """Serves `broker` to `TCPBroker` clients on ``(host, port)``.
+
+    Port 0 picks a free port; `address` holds the one bound. Use
+    `serve_forever()` in the foreground or `start()` on a daemon thread.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, broker: Broker, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _BrokerHandler)
+        self.broker = broker
+
+    @property
+    def address(self) -> tuple[str, int]:
+        return self.server_address[:2]
+
+    def start(self) -> "BrokerServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class BrokerError(RuntimeError):
+    """The broker server rejected a request."""
+
+
+class TCPBroker(Broker):
+    """Client of a `BrokerServer`, with one connection per client."""
+
+    def __init__(self, host: str, port: int, timeout: float = 30.0):
+        self.address = (host, port)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sock: socket.socket | None = None
+        self._file = None
+
+    def _call(self, method: str, *params) -> Any:
+        line = json.dumps({"method": method, "params": list(params)}).encode() + b"\n"
+        with self._lock:
+            if self._sock is None:
+                self._sock = socket.create_connection(self.address, timeout=self.timeout)
+                self._file = self._sock.makefile("rb")
+            try:
+                self._sock.sendall(line)
+                reply = self._file.readline()
+                if not reply:
+                    raise ConnectionError("Broker closed the connection")
+            except OSError:
+                self.close()
+                raise
+        response = json.loads(reply)
+        if "error" in response:
+            raise BrokerError(response["error"])
+        return response["result"]
+
+    def close(self):
+        if self._sock is not None:
+            self._file.close()
+            self._sock.close()
+            self._sock = self._file = None
+
+    def submit(self, payloads: Sequence[dict]) -> list[int]:
+        return self._call("submit", list(payloads))
+
+    def claim(self, worker: str, lease: float) -> dict | None:
+        return self._call("claim", worker, lease)
+
+    def renew(self, cell_id: int, token: str, lease: float) -> bool:
+        return self._call("renew", cell_id, token, lease)
+
+    def complete(self, cell_id: int, token: str, result: dict) -> bool:
+        return self._call("complete", cell_id, token, result)
+
+    def fail(self, cell_id: int, token: str, error: str) -> bool:
+        return self._call("fail", cell_id, token, error)
+
+    def status(self) -> dict[str, int]:
+        return self._call("status")
+
+    def results(self) -> list[dict]:
+        return self._call("results")
+
+
+def connect(url: str) -> Broker:
+    """Broker for ``sqlite:///path/to/file`` or ``tcp://host:port``."""
+    parsed = urlparse(url)
+    if parsed.scheme == "sqlite":
+        return SQLiteBroker(parsed.netloc + parsed.path)
+    if parsed.scheme == "tcp":
+        if parsed.hostname is None or parsed.port is None:
+            raise ValueError(f"Broker URL needs a host and port: {url!r}")
+        return TCPBroker(parsed.hostname, parsed.port)
+    raise ValueError(f"Unknown broker URL scheme: {url!r}")
+
+
+def run_worker(
+    broker: Broker,
+    run_cell: Callable[[dict], dict],
+    worker: str | None = None,
+    lease: float = 60.0,
+    poll: float = 1.0,
+) -> int:
+    """Claim and run cells until the broker has none pending or leased.
+
+    `run_cell(payload)` returns the cell's JSON-ready result. The lease is
+    renewed every third of `lease` seconds while the cell runs. A cell
+    whose `run_cell` raises is handed back through `fail()`. Returns the
+    number of cells this worker completed.
+    """
+    worker = worker or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+    completed = 0
+    while True:
+        cell = broker.claim(worker, lease)
+        if cell is None:
+            if broker.finished():
+                return completed
+            time.sleep(poll)
+            continue
+        stop = threading.Event()
+
+        def heartbeat():
+            while not stop.wait(lease / 3):
+                if not broker.renew(cell["id"], cell["token"], lease):
+                    return
+
+        renewer = threading.Thread(target=heartbeat, daemon=True)
+        renewer.start()
+        try:
+            result = run_cell(cell["payload"])
+        except Exception as exc:
+            stop.set()
+            renewer.join()
+            broker.fail(cell["id"], cell["token"], f"{type(exc).__name__}: {exc}")
+            continue
+        stop.set()
+        renewer.join()
+        if broker.complete(cell["id"], cell["token"], result):
+            completed += 1
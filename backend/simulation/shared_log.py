@@ -0,0 +1,132 @@
+"""Zero-copy transfer of step logs between processes through shared memory.
+
+A worker calls `share_log(log)`, which copies the filled columns into a new
+`multiprocessing.shared_memory` segment and returns a small picklable
+`SharedLogHandle`. The receiving process calls `handle.attach()` and gets a
+`SharedLog` whose `StepLog` columns are views of the segment. The receiver
+owns the segment from then on and releases it when done.
+"""
+
+import weakref
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from simulation.steplog import StepLog
+
+_ALIGN = 8
+
+
+def _layout(size: int, dtypes: dict[str, np.dtype]) -> tuple[dict[str, int], int]:
+    """Byte offset of each column and the total segment size."""
+    offsets = {}
+    end = 0
+    for col, dtype in dtypes.items():
+        offsets[col] = end
+        end += -(-size * dtype.itemsize // _ALIGN) * _ALIGN
+    return offsets, end
+
+
+class SharedLogHandle:
+    """Picklable reference to a step log held in a shared memory segment.
+
+    Only the segment name, column layout and code tables are pickled.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        size: int,
+        dtypes: dict[str, str],
+        action_names: list[str],
+        state_names: list[str],
+        schedule_names: list[str],
+    ):
+        self.name = name
+        self.size = size
+        self.dtypes = dtypes
+        self.action_names = action_names
+        self.state_names = state_names
+        self.schedule_names = schedule_names
+
+    def attach(self) -> "SharedLog":
+        """Map the segment into this process, which takes over releasing it."""
+        return SharedLog(self)
+
+    def discard(self):
+        """Release the segment without reading it."""
+        self.attach().release()
+
+
+def share_log(log: StepLog) -> SharedLogHandle:
+    """Copy the filled columns of `log` into a new shared memory segment."""
+    dtypes = {col: getattr(log, col).dtype for col in StepLog.COLUMNS}
+    offsets, nbytes = _layout(log.size, dtypes)
+    shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+    try:
+        for col, dtype in dtypes.items():
+            view = np.ndarray(log.size, dtype=dtype, buffer=shm.buf, offset=offsets[col])
+            view[:] = getattr(log, col)[: log.size]
+            del view
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+    shm.close()
+    return SharedLogHandle(
+        shm.name,
+        log.size,
+        {col: dtype.str for col, dtype in dtypes.items()},
+        list(log.action_names),
+        list(log.state_names),
+        list(log.schedule_names),
+    )
+
+
+def _release(shm: shared_memory.SharedMemory):
+    try:
+        shm.close()
+    except BufferError:
+        # Views of the columns are still alive; the mapping goes with them
+        pass
+    shm.unlink()
+
+
+class SharedLog:
+    """A step log mapped from a shared memory segment owned by this process.
+
+    `log` is a read-only `StepLog` whose columns view the segment, without a
+    copy. `release()` (also on leaving a ``with`` block, or when the
+    `SharedLog` is garbage collected) unlinks the segment; `log` must not be
+    used afterwards.
+    """
+
+    def __init__(self, handle: SharedLogHandle):
+        self._shm = shared_memory.SharedMemory(handle.name)
+        self._finalizer = weakref.finalize(self, _release, self._shm)
+        dtypes = {col: np.dtype(dtype) for col, dtype in handle.dtypes.items()}
+        offsets, self.nbytes = _layout(handle.size, dtypes)
+        log = StepLog(handle.action_names)
+        log.state_names = handle.state_names
+        log.schedule_names = handle.schedule_names
+        for col, dtype in dtypes.items():
+            column = np.ndarray(handle.size, dtype=dtype, buffer=self._shm.buf, offset=offsets[col])
+            column.flags.writeable = False
+            setattr(log, col, column)
+        log.size = handle.size
+        self.log: StepLog | None = log
+
+    def __enter__(self) -> "SharedLog":
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    @property
+    def released(self) -> bool:
+        return not self._finalizer.alive
+
+    def release(self):
+        """Drop the column views and unlink the segment."""
+        self.log = None
+        self._finalizer()
@@ -0,0 +1,82 @@
+"""Steady-state (stability) criterion for ending a condition early."""
+
+from collections import deque
+from typing import Sequence
+
+METRICS = ("choice_proportion", "reinforcement_rate")
+
+
+class StabilityTracker:
+    """Ends a condition once responding is stable.
+
+    The condition is divided into blocks ("sessions") of `window` steps.
+    Each completed block yields one value of `metric`: the proportion of
+    responses that were `action`, or the reinforcers per step. Responding
+    is stable when the last `blocks` values differ by at most `tolerance`
+    times their mean, and at least `min_steps` steps have run.
+
+    The runner only consults the tracker at block boundaries, reading the
+    cumulative counters it already keeps, so tracking adds no per-step work.
+    """
+
+    def __init__(
+        self,
+        window: int,
+        blocks: int = 3,
+        tolerance: float = 0.1,
+        min_steps: int = 0,
+        metric: str = "choice_proportion",
+        action_id: int = 0,
+    ):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown stability metric: {metric}. Must be one of {list(METRICS)}")
+        self.window = window
+        self.blocks = blocks
+        self.tolerance = tolerance
+        self.min_steps = min_steps
+        self.metric = metric
+        self.action_id = action_id
+        self.values: deque[float] = deque(maxlen=blocks)
+        self._last_count = 0
+        self.stable_step: int | None = None
+
+    @classmethod
+    def from_config(cls, config: dict, actions: Sequence[str]) -> "StabilityTracker":
+        """Build a tracker from a condition's ``stability`` dict.
+
+        ``config["action"]`` names the tracked action; it defaults to the
+        first action.
+        """
+        action = config.get("action") or actions[0]
+        if action not in actions:
+            raise ValueError(f"Unknown stability action: {action}. Must be one of {list(actions)}")
+        return cls(
+            window=config["window"],
+            blocks=config.get("blocks", 3),
+            tolerance=config.get("tolerance", 0.1),
+            min_steps=config.get("min_steps", 0),
+            metric=config.get("metric", "choice_proportion"),
+            action_id=list(actions).index(action),
+        )
+
+    def next_boundary(self, local_step: int) -> int:
+        """First block boundary after `local_step` steps of the condition."""
+        return (local_step // self.window + 1) * self.window
+
+    def observe(self, local_step: int, action_counts: Sequence[int], total_reinforcements: int) -> bool:
+        """Close the block ending at `local_step`; return True once stable."""
+        if self.metric == "choice_proportion":
+            count = action_counts[self.action_id]
+        else:
+            count = total_reinforcements
+        self.values.append((count - self._last_count) / self.window)
+        self._last_count = count
+
+        if len(self.values) < self.blocks or local_step < self.min_steps:
+            return False
+        spread = max(self.values) - min(self.values)
+        mean = sum(self.values) / self.blocks
+        if spread <= self.tolerance * mean:
+            self.stable_step = local_step
+            return True
+        return False
@@ -0,0 +1,185 @@
+"""Columnar per-step simulation log."""
+
+from collections.abc import Sequence
+from typing import Any
+
+import numpy as np
+
+STEP_FIELDS = ["step", "state", "action", "reinforced", "schedule_id", "condition"]
+
+
+class StepLog(Sequence):
+    """Columnar record of simulation steps.
+
+    Each field is a preallocated numpy column. `state`, `action` and
+    `schedule_id` are stored as integer codes into the `state_names`,
+    `action_names` and `schedule_names` tables. Indexing or iterating the
+    log yields the familiar step dicts, so it can stand in for a
+    ``list[dict]``.
+
+    States must be hashable; each distinct state is converted to its
+    string form once, when it is first coded.
+    """
+
+    #: Names of the numpy column attributes.
+    COLUMNS = ("step", "state", "action", "reinforced", "schedule", "condition")
+
+    def __init__(self, action_names: Sequence[str], capacity: int = 0):
+        self.action_names = list(action_names)
+        self.state_names: list[str] = []
+        self.schedule_names: list[str] = []
+        self.state_codes: dict[Any, int] = {}
+        self.schedule_codes: dict[str, int] = {}
+        self.size = 0
+        self.step = np.zeros(capacity, dtype=np.int64)
+        self.state = np.zeros(capacity, dtype=np.int32)
+        self.action = np.zeros(capacity, dtype=np.int16)
+        self.reinforced = np.zeros(capacity, dtype=np.bool_)
+        self.schedule = np.zeros(capacity, dtype=np.int16)
+        self.condition = np.zeros(capacity, dtype=np.int16)
+
+    @classmethod
+    def from_codes(
+        cls,
+        action_names: Sequence[str],
+        states: Sequence,
+        state_ids: np.ndarray,
+        action: np.ndarray,
+        reinforced: np.ndarray,
+        schedule_ids: Sequence[str],
+        schedule: np.ndarray,
+        condition: int = 1,
+        step_offset: int = 0,
+    ) -> "StepLog":
+        """Build a log from columns coded against external tables.
+
+        `state_ids` index `states` and `schedule` indexes `schedule_ids`;
+        only the entries that actually occur are registered in the log.
+        """
+        n = len(action)
+        log = cls(action_names, capacity=n)
+        for column, table, values, code in (
+            ("state", states, state_ids, log.code_state),
+            ("schedule", schedule_ids, schedule, log.code_schedule),
+        ):
+            used, inverse = np.unique(values, return_inverse=True)
+            for value in used.tolist():
+                code(table[value])
+            getattr(log, column)[:n] = inverse
+        log.step[:n] = np.arange(step_offset + 1, step_offset + n + 1)
+        log.action[:n] = action
+        log.reinforced[:n] = reinforced
+        log.condition[:n] = condition
+        log.size = n
+        return log
+
+    def __getstate__(self) -> dict:
+        # Pickle only the filled part of each column
+        state = self.__dict__.copy()
+        for col in self.COLUMNS:
+            state[col] = state[col][: self.size].copy()
+        return state
+
+    def rows(self, start: int = 0) -> dict[str, np.ndarray]:
+        """The filled part of each column from row `start` on, by column name."""
+        return {col: getattr(self, col)[start:self.size] for col in self.COLUMNS}
+
+    def without_rows(self) -> "StepLog":
+        """A log with this log's name tables and no rows."""
+        log = StepLog.__new__(StepLog)
+        log.__dict__.update(self.__dict__)
+        for col in self.COLUMNS:
+            setattr(log, col, getattr(self, col)[:0])
+        log.size = 0
+        return log
+
+    def set_rows(self, columns: dict[str, np.ndarray]):
+        """Replace every row with `columns`, as returned by `rows()`."""
+        n = len(columns["step"])
+        self.size = 0
+        self.reserve(n)
+        for col in self.COLUMNS:
+            getattr(self, col)[:n] = columns[col]
+        self.size = n
+
+    @property
+    def capacity(self) -> int:
+        return len(self.step)
+
+    def reserve(self, n: int):
+        """Ensure room for at least `n` more steps beyond the current size."""
+        needed = self.size + n
+        if needed <= self.capacity:
+            return
+        new_capacity = max(needed, 2 * self.capacity)
+        for col in self.COLUMNS:
+            old = getattr(self, col)
+            new = np.zeros(new_capacity, dtype=old.dtype)
+            new[: self.size] = old[: self.size]
+            setattr(self, col, new)
+
+    def code_state(self, state: Any) -> int:
+        """Return the integer code for `state`, registering it if new."""
+        code = self.state_codes.get(state)
+        if code is None:
+            code = self.state_codes[state] = len(self.state_names)
+            self.state_names.append(str(state))
+        return code
+
+    def code_schedule(self, schedule_id: str) -> int:
+        """Return the integer code for `schedule_id`, registering it if new."""
+        code = self.schedule_codes.get(schedule_id)
+        if code is None:
+            code = self.schedule_codes[schedule_id] = len(self.schedule_names)
+            self.schedule_names.append(schedule_id)
+        return code
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(i) for i in range(*index.indices(self.size))]
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("step index out of range")
+        return self._row(index)
+
+    def __iter__(self):
+        return iter(self.to_dicts())
+
+    def _row(self, i: int) -> dict:
+        return {
+            "step": int(self.step[i]),
+            "state": self.state_names[self.state[i]],
+            "action": self.action_names[self.action[i]],
+            "reinforced": bool(self.reinforced[i]),
+            "schedule_id": self.schedule_names[self.schedule[i]],
+            "condition": int(self.condition[i]),
+        }
+
+    def to_dicts(self) -> list[dict]:
+        """Materialize the log as a list of step dicts."""
+        n = self.size
+        states = self.state_names
+        actions = self.action_names
+        schedules = self.schedule_names
+        return [
+            {
+                "step": step,
+                "state": states[state],
+                "action": actions[action],
+                "reinforced": reinforced,
+                "schedule_id": schedules[schedule],
+                "condition": condition,
+            }
+            for step, state, action, reinforced, schedule, condition in zip(
+                self.step[:n].tolist(),
+                self.state[:n].tolist(),
+                self.action[:n].tolist(),
+                self.reinforced[:n].tolist(),
+                self.schedule[:n].tolist(),
+                self.condition[:n].tolist(),
+            )
+        ]
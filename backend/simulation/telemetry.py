@@ -0,0 +1,53 @@
+"""Decimated agent telemetry, sampled during a run."""
+
+from typing import Sequence
+
+import numpy as np
+
+
+class Telemetry:
+    """Agent `telemetry()` vectors sampled every `every` steps.
+
+    Samples go into preallocated columns: `steps` holds the global step of
+    each sample and row k of `values` the vector taken after that step, one
+    column per entry of `fields`. Only the first `size` rows are filled.
+    """
+
+    def __init__(self, every: int, fields: Sequence[str], capacity: int = 0):
+        self.every = every
+        self.fields = list(fields)
+        self.size = 0
+        self.steps = np.zeros(capacity, dtype=np.int64)
+        self.values = np.zeros((capacity, len(self.fields)), dtype=np.float64)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getstate__(self) -> dict:
+        # Pickle only the filled rows
+        state = self.__dict__.copy()
+        state["steps"] = self.steps[: self.size].copy()
+        state["values"] = self.values[: self.size].copy()
+        return state
+
+    def record(self, step: int, values: Sequence[float]):
+        """Append the sample taken after `step`."""
+        if self.size == len(self.steps):
+            capacity = max(2 * self.size, 16)
+            steps = np.zeros(capacity, dtype=np.int64)
+            steps[: self.size] = self.steps
+            grown = np.zeros((capacity, len(self.fields)), dtype=np.float64)
+            grown[: self.size] = self.values
+            self.steps, self.values = steps, grown
+        self.steps[self.size] = step
+        self.values[self.size] = values
+        self.size += 1
+
+    def to_dict(self) -> dict:
+        """Columnar JSON-ready form: sample steps and one list per field."""
+        n = self.size
+        return {
+            "every": self.every,
+            "steps": self.steps[:n].tolist(),
+            "values": {f: self.values[:n, k].tolist() for k, f in enumerate(self.fields)},
+        }
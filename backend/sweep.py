@@ -0,0 +1,108 @@
+"""Command-line entry point for sweeps sharded across worker processes.
+
+    python sweep.py broker --db sweep.db --host 0.0.0.0 --port 7600
+    python sweep.py submit tcp://broker-host:7600 spec.json
+    python sweep.py worker tcp://broker-host:7600 --processes 8
+    python sweep.py results tcp://broker-host:7600 -o results.json
+
+A broker URL is ``tcp://host:port`` for a running `broker`, or
+``sqlite:///path/to/sweep.db`` for workers that share the file directly.
+The spec file holds ``{"base": <ReplicatesRequest body>, "factors":
+{name: [values, ...]}}``; every cell of the factorial design runs the
+base's replicates from the same seed.
+"""
+
+import argparse
+import json
+import sys
+from functools import partial
+
+import numpy as np
+
+from simulation.replicates import ReplicateExecutor
+from simulation.sharding import BrokerServer, SQLiteBroker, connect, expand_sweep, run_worker
+
+
+def _broker(args):
+    server = BrokerServer(SQLiteBroker(args.db), args.host, args.port)
+    host, port = server.address
+    print(f"Serving {args.db} on tcp://{host}:{port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def _submit(args):
+    with open(args.spec) as f:
+        spec = json.load(f)
+    base = dict(spec["base"])
+    if base.get("seed") is None:
+        # Fixed at submission so that reissued cells reproduce
+        base["seed"] = np.random.SeedSequence().entropy
+    cells = expand_sweep(base, spec.get("factors", {}))
+    connect(args.broker).submit(cells)
+    print(f"Submitted {len(cells)} cells with seed {base['seed']}")
+
+
+def _worker(args):
+    from api.routes import run_sweep_cell
+
+    with ReplicateExecutor(workers=args.processes) as executor:
+        done = run_worker(
+            connect(args.broker),
+            partial(run_sweep_cell, executor=executor),
+            worker=args.name,
+            lease=args.lease,
+            poll=args.poll,
+        )
+    print(f"Completed {done} cells")
+
+
+def _results(args):
+    broker = connect(args.broker)
+    output = {"status": broker.status(), "cells": broker.results()}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(output, f)
+    else:
+        json.dump(output, sys.stdout, indent=2)
+        print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    broker = commands.add_parser("broker", help="Serve a SQLite broker file over TCP")
+    broker.add_argument("--db", default="sweep.db")
+    broker.add_argument("--host", default="127.0.0.1")
+    broker.add_argument("--port", type=int, default=7600)
+    broker.set_defaults(func=_broker)
+
+    submit = commands.add_parser("submit", help="Expand a sweep spec into cells and queue them")
+    submit.add_argument("broker")
+    submit.add_argument("spec")
+    submit.set_defaults(func=_submit)
+
+    worker = commands.add_parser("worker", help="Run cells until none are left")
+    worker.add_argument("broker")
+    worker.add_argument("--processes", type=int, default=0, help="Replicate processes per cell (0: in this process)")
+    worker.add_argument("--name", default=None)
+    worker.add_argument("--lease", type=float, default=60.0, help="Lease length in seconds")
+    worker.add_argument("--poll", type=float, default=1.0, help="Seconds between claims while other workers finish")
+    worker.set_defaults(func=_worker)
+
+    results = commands.add_parser("results", help="Print the status and results of every cell")
+    results.add_argument("broker")
+    results.add_argument("-o", "--output", default=None)
+    results.set_defaults(func=_results)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
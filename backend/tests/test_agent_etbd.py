@@ -70,3 +70,44 @@ class TestETBDAgent:
         assert p["population_size"] == 200
         assert p["mutation_rate"] == 0.2
         assert p["fitness_decay"] == 0.9
+
+
+class TestETBDActionIds:
+    def test_lookup_matches_phenotype_to_action(self):
+        agent = ETBDAgent(environment_type="grid_chamber")
+        actions = ["up", "down", "left", "right", "stay", "press_lever"]
+        agent.bind_actions(actions)
+        for p in (0, 170, 171, 513, 854, 855, 1023):
+            assert actions[agent._action_lut[p]] == phenotype_to_action(p, GRID_MAP)
+
+    def test_select_action_id_matches_emit(self):
+        agent = ETBDAgent(environment_type="two_choice")
+        agent.bind_actions(["choice_a", "choice_b"])
+        agent.set_rng(np.random.default_rng(1))
+        by_name = [agent.select_action("s", ["choice_a", "choice_b"]) for _ in range(20)]
+        agent.set_rng(np.random.default_rng(1))
+        by_id = [agent.action_names[agent.select_action_id("s")] for _ in range(20)]
+        assert by_name == by_id
+
+    def test_update_id_matches_update(self):
+        by_id = ETBDAgent(population_size=20, rng=np.random.default_rng(2))
+        by_id.bind_actions(["choice_a", "choice_b"])
+        by_id.update_id("s", 1, True, "s")
+        by_name = ETBDAgent(population_size=20, rng=np.random.default_rng(2))
+        by_name.update("s", "choice_b", True, "s")
+        assert by_id.organism.population == by_name.organism.population
+
+
+class TestETBDState:
+    def test_get_state_copies_population(self):
+        agent = ETBDAgent(population_size=10)
+        state = agent.get_state()
+        assert state["population"] == agent.organism.population
+        assert state["population"] is not agent.organism.population
+
+    def test_telemetry_is_class_proportions(self):
+        agent = ETBDAgent(population_size=10)
+        agent.bind_actions(["choice_a", "choice_b"])
+        agent.organism.population = [0, 100, 511, 512, 1023, 7, 8, 9, 600, 700]
+        assert agent.telemetry_fields() == ["proportion_choice_a", "proportion_choice_b"]
+        assert agent.telemetry("s").tolist() == [0.6, 0.4]
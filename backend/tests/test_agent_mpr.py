@@ -1,5 +1,7 @@
 """Tests for MPR agent."""
 
+import json
+
 import numpy as np
 import pytest
 from agents.mpr import MPRAgent
@@ -100,3 +102,50 @@ class TestMPRAgent:
     def test_case_insensitive_schedule_type(self):
         agent = MPRAgent(schedule_type="vi")
         assert agent.schedule_type == "VI"
+
+
+class TestMPRActionIds:
+    def test_two_choice_same_draws_as_string_api(self):
+        agent = MPRAgent(environment_type="two_choice")
+        actions = ["choice_a", "choice_b"]
+        agent.bind_actions(actions)
+        agent.update("s", "choice_a", True, "s")
+        agent.update("s", "choice_b", False, "s")
+        agent.set_rng(np.random.default_rng(5))
+        by_name = [agent.select_action("s", actions) for _ in range(50)]
+        agent.set_rng(np.random.default_rng(5))
+        by_id = [actions[agent.select_action_id("s")] for _ in range(50)]
+        assert by_name == by_id
+
+    def test_grid_select_in_range(self):
+        agent = MPRAgent(environment_type="grid_chamber")
+        agent.bind_actions(["up", "down", "left", "right", "stay", "press_lever"])
+        for _ in range(20):
+            assert 0 <= agent.select_action_id((0, 0)) < 6
+
+    def test_update_id_counts_by_name(self):
+        agent = MPRAgent()
+        agent.bind_actions(["choice_a", "choice_b"])
+        agent.update_id("s", 1, True, "s")
+        assert agent.action_counts == {"choice_b": 1}
+        assert agent.reinforcement_counts == {"choice_b": 1}
+
+
+class TestMPRState:
+    def test_get_state_is_json_ready(self):
+        agent = MPRAgent(schedule_type="FR")
+        agent.bind_actions(["choice_a", "choice_b"])
+        agent.update("s", "choice_a", True, "s")
+        state = agent.get_state()
+        json.dumps(state)
+        assert state["action_counts"] == {"choice_a": 1}
+        assert set(state["couplings"]) == {"choice_a", "choice_b"}
+        assert state["couplings"]["choice_b"] == agent.coupling_floor
+
+    def test_telemetry_is_couplings(self):
+        agent = MPRAgent(schedule_type="FR")
+        agent.bind_actions(["choice_a", "choice_b"])
+        agent.update("s", "choice_a", True, "s")
+        assert agent.telemetry_fields() == ["coupling_choice_a", "coupling_choice_b"]
+        couplings = agent.get_state()["couplings"]
+        assert agent.telemetry("s") == [couplings["choice_a"], couplings["choice_b"]]
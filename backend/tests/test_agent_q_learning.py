@@ -1,5 +1,8 @@
 """Tests for Q-Learning agent."""
 
+import json
+import pickle
+
 import numpy as np
 import pytest
 from agents.q_learning import QLearningAgent
@@ -95,3 +98,64 @@ class TestQLearningAgent:
         assert p["epsilon"] == 0.3
         assert p["history_window"] == 5
         assert "q_table_size" in p
+
+
+class TestQLearningActionIds:
+    def test_select_action_id_in_range(self):
+        agent = QLearningAgent()
+        agent.bind_actions(["a", "b", "c"])
+        for _ in range(50):
+            assert agent.select_action_id("start") in (0, 1, 2)
+
+    def test_exploits_by_id(self):
+        agent = QLearningAgent(epsilon=0.0, use_history_state=False)
+        agent.bind_actions(["a", "b"])
+        agent.q_table["s"]["b"] = 5.0
+        for _ in range(20):
+            assert agent.select_action_id("s") == 1
+
+    def test_update_id_matches_update(self):
+        a1 = QLearningAgent(alpha=0.5, use_history_state=False)
+        a2 = QLearningAgent(alpha=0.5, use_history_state=False)
+        a2.bind_actions(["a", "b"])
+        a1.update("s", "b", True, "s")
+        a2.update_id("s", 1, True, "s")
+        assert a1.q_table["s"]["b"] == a2.q_table["s"]["b"]
+
+    def test_same_draws_as_string_api(self):
+        agent = QLearningAgent(epsilon=0.5)
+        agent.bind_actions(["a", "b"])
+        agent.set_rng(np.random.default_rng(3))
+        by_name = [agent.select_action("start", ["a", "b"]) for _ in range(30)]
+        agent.set_rng(np.random.default_rng(3))
+        by_id = [agent.action_names[agent.select_action_id("start")] for _ in range(30)]
+        assert by_name == by_id
+
+
+class TestQLearningState:
+    def test_get_state_is_json_ready(self):
+        agent = QLearningAgent(history_window=2)
+        for action in ["a", "b", "a"]:
+            agent.update("s", action, True, "s")
+        state = agent.get_state()
+        json.dumps(state)
+        assert state["history"] == ["b", "a"]
+        assert all(isinstance(k, str) for k in state["q_table"])
+
+    def test_pickle_keeps_history_window(self):
+        agent = QLearningAgent(history_window=2)
+        for action in ["a", "b", "a", "b", "b"]:
+            agent.update("s", action, True, "s")
+        restored = pickle.loads(pickle.dumps(agent))
+        assert restored.history == ["b", "b"]
+        assert len(agent.history) == 5
+        assert restored._get_state_key("s") == agent._get_state_key("s")
+
+    def test_telemetry_is_current_q_values(self):
+        agent = QLearningAgent(use_history_state=False)
+        agent.bind_actions(["a", "b"])
+        agent.update("s", "b", True, "s")
+        assert agent.telemetry_fields() == ["q_a", "q_b"]
+        assert agent.telemetry("s") == [0.0, agent.q_table["s"]["b"]]
+        assert agent.telemetry("unseen") == [0.0, 0.0]
+        assert "unseen" not in agent.q_table
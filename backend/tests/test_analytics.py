@@ -0,0 +1,84 @@
+"""Tests for the online analytics accumulators."""
+
+import numpy as np
+from simulation.analytics import (
+    Changeovers,
+    InterReinforcementIntervals,
+    PostReinforcementPauses,
+    WindowedRates,
+)
+
+ACTIONS = ["choice_a", "choice_b"]
+
+
+def _feed(acc, steps):
+    for action, reinforced in steps:
+        acc.update(action, reinforced)
+    return acc.result()
+
+
+class TestWindowedRates:
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        actions = rng.integers(0, 2, size=257).tolist()
+        reinforced = (rng.random(257) < 0.3).tolist()
+        result = _feed(WindowedRates(ACTIONS, window=20, sample_every=7), zip(actions, reinforced))
+        assert result["steps"] == list(range(7, 258, 7))
+        for k, n in enumerate(result["steps"]):
+            lo = max(0, n - 20)
+            span = n - lo
+            assert result["response_rate"]["choice_b"][k] == sum(actions[lo:n]) / span
+            assert result["reinforcement_rate"][k] == sum(reinforced[lo:n]) / span
+
+    def test_samples_every_window_by_default(self):
+        result = _feed(WindowedRates(ACTIONS, window=5), [(0, False)] * 12)
+        assert result["steps"] == [5, 10]
+        assert result["response_rate"] == {"choice_a": [1.0, 1.0], "choice_b": [0.0, 0.0]}
+
+
+class TestChangeovers:
+    def test_counts_switches(self):
+        result = _feed(Changeovers(ACTIONS), [(0, False), (0, False), (1, True), (0, False), (0, False)])
+        assert result == {"count": 2, "rate": 2 / 5, "into": {"choice_a": 1, "choice_b": 1}}
+
+    def test_ignores_untracked_actions(self):
+        acc = Changeovers(["up", "press", "other"], responses=["press", "other"])
+        result = _feed(acc, [(1, False), (0, False), (1, False), (0, False), (2, False)])
+        assert result["count"] == 1
+        assert result["into"] == {"other": 1}
+
+
+class TestInterReinforcementIntervals:
+    def test_statistics(self):
+        reinforced = [False, True, False, False, True, True, False, False, False, False, True]
+        result = _feed(InterReinforcementIntervals(ACTIONS), [(0, r) for r in reinforced])
+        intervals = [3, 1, 5]
+        assert result["count"] == 3
+        assert result["mean"] == np.mean(intervals)
+        assert np.isclose(result["sd"], np.std(intervals, ddof=1))
+        assert (result["min"], result["max"]) == (1, 5)
+
+    def test_no_intervals(self):
+        result = _feed(InterReinforcementIntervals(ACTIONS), [(0, True), (0, False)])
+        assert result == {"count": 0, "mean": None, "sd": None, "min": None, "max": None}
+
+
+class TestPostReinforcementPauses:
+    def test_pause_until_reinforced_response(self):
+        steps = [
+            (1, True), (0, False), (0, False), (1, False),   # pause 2
+            (1, True), (1, False),                           # pause 0
+            (0, True), (1, True),                            # superseded before choice_a recurs
+            (0, False), (1, False),                          # pause 1
+        ]
+        result = _feed(PostReinforcementPauses(ACTIONS, bins=4), steps)
+        assert result["histogram"] == [1, 1, 1, 0]
+        assert result["count"] == 3
+        assert result["mean"] == 1.0
+        assert result["max"] == 2
+
+    def test_last_bin_collects_long_pauses(self):
+        steps = [(0, True)] + [(1, False)] * 9 + [(0, False)]
+        result = _feed(PostReinforcementPauses(ACTIONS, bins=3), steps)
+        assert result["histogram"] == [0, 0, 1]
+        assert result["max"] == 9
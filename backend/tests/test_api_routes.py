@@ -1,8 +1,11 @@
 """Tests for API routes."""
 
+import asyncio
 import csv
 import io
 import json
+import threading
+import time
 import pytest
 from httpx import ASGITransport, AsyncClient
 from main import app
@@ -14,6 +17,15 @@ def client():
     return AsyncClient(transport=transport, base_url="http://test")
 
 
+@pytest.fixture(autouse=True)
+def fresh_result_cache():
+    """Start every test without cached results, so that its requests run."""
+    from api import routes
+
+    routes._result_cache.clear()
+    routes._result_bodies.clear()
+
+
 def _two_choice_req(algo="q_learning", seed=42, max_steps=50):
     req = {
         "environment": "two_choice",
@@ -123,9 +135,773 @@ class TestSimulateEndpoint:
         resp = await client.post("/api/simulate", json=req)
         assert resp.status_code == 200
 
+    @pytest.mark.asyncio
+    async def test_shared_prefix_matches_fresh_run(self, client):
+        from api.routes import _prefix_cache, _result_cache
+
+        baseline = {"label": "Baseline", "max_steps": 30,
+                    "schedule_a": {"type": "VI", "value": 5},
+                    "schedule_b": {"type": "VR", "value": 3}}
+
+        def req(second):
+            return {
+                "environment": "two_choice", "algorithm": "etbd", "seed": 9,
+                "etbd_params": {"population_size": 20},
+                "conditions": [baseline, {"label": "Test", "max_steps": 20, **second}],
+            }
+
+        extinction = {"schedule_a": {"type": "VI", "value": 10000},
+                      "schedule_b": {"type": "VI", "value": 10000}}
+        reversal = {"schedule_a": {"type": "VR", "value": 3},
+                    "schedule_b": {"type": "VI", "value": 5}}
+        _prefix_cache.clear()
+        fresh = (await client.post("/api/simulate", json=req(reversal))).json()
+        _prefix_cache.clear()
+        await client.post("/api/simulate", json=req(extinction))
+        _result_cache.clear()
+        hits = _prefix_cache.hits
+        reused = (await client.post("/api/simulate", json=req(reversal))).json()
+        assert _prefix_cache.hits == hits + 1
+        assert reused == fresh
+
+    @pytest.mark.asyncio
+    async def test_stability_ends_condition(self, client):
+        fr1 = {"schedule_a": {"type": "FR", "value": 1}, "schedule_b": {"type": "FR", "value": 1}}
+        req = {
+            "environment": "two_choice", "algorithm": "q_learning", "seed": 3,
+            "conditions": [
+                {"label": "A", "max_steps": 500, **fr1,
+                 "stability": {"window": 25, "metric": "reinforcement_rate"}},
+                {"label": "B", "max_steps": 20, **fr1},
+            ],
+        }
+        data = (await client.post("/api/simulate", json=req)).json()
+        first, second = data["condition_summaries"]
+        assert first["stable_step"] == first["end_step"] == 75
+        assert second["stable_step"] is None
+        assert len(data["steps"]) == 95
+
+    @pytest.mark.asyncio
+    async def test_stability_unknown_action(self, client):
+        req = {
+            "environment": "grid_chamber", "algorithm": "q_learning",
+            "conditions": [{"label": "A", "max_steps": 50,
+                            "schedule": {"type": "FR", "value": 1},
+                            "stability": {"window": 10, "action": "choice_a"}}],
+        }
+        resp = await client.post("/api/simulate", json=req)
+        assert resp.status_code == 400
+        assert "Condition 'A'" in resp.json()["detail"]
+
+
+    @pytest.mark.asyncio
+    async def test_analytics_in_condition_summaries(self, client):
+        req = _two_choice_req(max_steps=60)
+        req["analytics"] = {"rate_window": 20, "pause_bins": 5}
+        data = (await client.post("/api/simulate", json=req)).json()
+        analytics = data["condition_summaries"][0]["analytics"]
+        assert set(analytics) == {
+            "windowed_rates", "changeovers", "inter_reinforcement", "post_reinforcement_pause",
+        }
+        assert analytics["windowed_rates"]["steps"] == [20, 40, 60]
+        assert len(analytics["post_reinforcement_pause"]["histogram"]) == 5
+
+    @pytest.mark.asyncio
+    async def test_record_steps_false(self, client):
+        req = _two_choice_req(max_steps=60)
+        full = (await client.post("/api/simulate", json=req)).json()
+        req["record_steps"] = False
+        data = (await client.post("/api/simulate", json=req)).json()
+        assert data["steps"] == []
+        assert data["summary"] == full["summary"]
+
+
+    @pytest.mark.asyncio
+    async def test_telemetry(self, client):
+        req = _grid_req(algo="etbd", max_steps=40)
+        req["telemetry_every"] = 10
+        data = (await client.post("/api/simulate", json=req)).json()
+        telemetry = data["telemetry"]
+        assert telemetry["steps"] == [10, 20, 30, 40]
+        assert len(telemetry["values"]) == 6
+        for k in range(4):
+            assert sum(v[k] for v in telemetry["values"].values()) == pytest.approx(1.0)
+        plain = (await client.post("/api/simulate", json=_grid_req(algo="etbd", max_steps=40))).json()
+        assert plain["telemetry"] is None
+
+
+    @pytest.mark.asyncio
+    async def test_time_budget_truncates(self, client):
+        req = _two_choice_req(max_steps=5000)
+        req["time_budget"] = 1e-9
+        data = (await client.post("/api/simulate", json=req)).json()
+        assert data["truncated"] is True
+        assert data["step_reached"] == len(data["steps"]) < 5000
+        assert data["condition_summaries"][0]["truncated"] is True
+        full = (await client.post("/api/simulate", json=_two_choice_req(max_steps=50))).json()
+        assert full["truncated"] is False and full["step_reached"] is None
+
+    @pytest.mark.asyncio
+    async def test_numba_engine_matches_python(self, client):
+        req = _grid_req(algo="mpr", max_steps=60)
+        req["seed"] = 9
+        expected = (await client.post("/api/simulate", json=req)).json()
+        req["engine"] = "numba"
+        data = (await client.post("/api/simulate", json=req)).json()
+        assert data["steps"] == expected["steps"]
+        assert data["summary"] == expected["summary"]
+
+    @pytest.mark.asyncio
+    async def test_profile(self, client):
+        req = _two_choice_req(algo="etbd", max_steps=30)
+        req["profile"] = True
+        profile = (await client.post("/api/simulate", json=req)).json()["summary"]["profile"]
+        assert profile["phases"]["select_action"]["calls"] == 30
+        assert profile["operations"]["generations"] == 30
+        plain = (await client.post("/api/simulate", json=_two_choice_req(max_steps=30))).json()
+        assert "profile" not in plain["summary"]
+
+    @pytest.mark.asyncio
+    async def test_unknown_engine(self, client):
+        req = _two_choice_req()
+        req["engine"] = "cuda"
+        resp = await client.post("/api/simulate", json=req)
+        assert resp.status_code == 400
+
+
+# ── Run state endpoint ──────────────────────────────────────────────
+
+class TestRunStateEndpoint:
+    @pytest.mark.asyncio
+    async def test_no_run_id_without_keyframes(self, client):
+        resp = await client.post("/api/simulate", json=_two_choice_req())
+        assert resp.json()["run_id"] is None
+
+    @pytest.mark.asyncio
+    async def test_reconstructs_step(self, client):
+        req = _grid_req(algo="mpr", max_steps=40)
+        req["keyframe_every"] = 8
+        data = (await client.post("/api/simulate", json=req)).json()
+        run_id = data["run_id"]
+        resp = await client.get(f"/api/runs/{run_id}/state", params={"step": 13})
+        assert resp.status_code == 200
+        state = resp.json()
+        assert state["step"] == 13
+        assert state["condition"] == 1
+        assert state["state"] == data["steps"][12]["state"]
+        assert state["environment"]["step_count"] == 13
+        assert sum(state["agent"]["action_counts"].values()) == 13
+
+    @pytest.mark.asyncio
+    async def test_multi_condition_run(self, client):
+        req = {
+            "environment": "two_choice", "algorithm": "q_learning", "seed": 5,
+            "keyframe_every": 7,
+            "conditions": [
+                {"label": "A", "max_steps": 10,
+                 "schedule_a": {"type": "VR", "value": 2}, "schedule_b": {"type": "VI", "value": 3}},
+                {"label": "B", "max_steps": 10,
+                 "schedule_a": {"type": "FR", "value": 1}, "schedule_b": {"type": "FR", "value": 1}},
+            ],
+        }
+        run_id = (await client.post("/api/simulate", json=req)).json()["run_id"]
+        state = (await client.get(f"/api/runs/{run_id}/state", params={"step": 15})).json()
+        assert state["condition"] == 2
+        assert state["environment"]["schedule_a"]["type"] == "FR"
+
+    @pytest.mark.asyncio
+    async def test_no_run_id_when_keyframes_too_large(self, client, monkeypatch):
+        from api import routes
+        from simulation.lru import LRUStore
+
+        monkeypatch.setattr(routes, "_keyframed_runs", LRUStore(max_bytes=1, sizeof=lambda k: k.nbytes))
+        req = _two_choice_req(max_steps=10)
+        req["keyframe_every"] = 5
+        assert (await client.post("/api/simulate", json=req)).json()["run_id"] is None
+        assert len(routes._keyframed_runs) == 0
+
+    @pytest.mark.asyncio
+    async def test_unknown_run(self, client):
+        resp = await client.get("/api/runs/missing/state", params={"step": 1})
+        assert resp.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_step_out_of_range(self, client):
+        req = _two_choice_req(max_steps=10)
+        req["keyframe_every"] = 5
+        run_id = (await client.post("/api/simulate", json=req)).json()["run_id"]
+        resp = await client.get(f"/api/runs/{run_id}/state", params={"step": 11})
+        assert resp.status_code == 400
+
+
+# ── Replicates endpoint ─────────────────────────────────────────────
+
+class TestReplicatesEndpoint:
+    @pytest.mark.asyncio
+    async def test_aggregates_replicates(self, client):
+        req = _two_choice_req(algo="mpr", seed=5, max_steps=80)
+        req["replicates"] = 6
+        resp = await client.post("/api/simulate/replicates", json=req)
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["seed"] == 5 and data["replicates"] == 6
+        rate = data["metrics"]["reinforcement_rate"]
+        assert rate["count"] == 6
+        assert rate["min"] <= rate["quantiles"]["0.5"] <= rate["max"]
+        assert data["metrics"]["total_steps"]["mean"] == 80
+        again = (await client.post("/api/simulate/replicates", json=req)).json()
+        assert again == data
+
+    @pytest.mark.asyncio
+    async def test_per_condition_metrics(self, client):
+        req = _two_choice_req(seed=5)
+        req["conditions"] = [
+            {"label": "A", "max_steps": 30, "schedule_a": {"type": "FR", "value": 2}, "schedule_b": {"type": "FR", "value": 4}},
+            {"label": "B", "max_steps": 20, "schedule_a": {"type": "FR", "value": 4}, "schedule_b": {"type": "FR", "value": 2}},
+        ]
+        req["replicates"] = 3
+        metrics = (await client.post("/api/simulate/replicates", json=req)).json()["metrics"]
+        assert metrics["condition_1.total_steps"]["mean"] == 30
+        assert metrics["condition_2.total_steps"]["mean"] == 20
+        assert metrics["total_steps"]["mean"] == 50
+
+    @pytest.mark.asyncio
+    async def test_keep_steps(self, client):
+        req = _two_choice_req(seed=5, max_steps=40)
+        req["replicates"] = 3
+        assert (await client.post("/api/simulate/replicates", json=req)).json()["replicates_id"] is None
+        req["keep_steps"] = True
+        data = (await client.post("/api/simulate/replicates", json=req)).json()
+        replicates_id = data["replicates_id"]
+        steps = [
+            (await client.get(f"/api/replicates/{replicates_id}/{k}/steps")).json() for k in range(3)
+        ]
+        assert all(len(s) == 40 for s in steps)
+        rates = [sum(r["reinforced"] for r in s) / 40 for s in steps]
+        assert data["metrics"]["reinforcement_rate"]["mean"] == pytest.approx(sum(rates) / 3)
+        assert (await client.get(f"/api/replicates/{replicates_id}/3/steps")).status_code == 404
+        assert (await client.delete(f"/api/replicates/{replicates_id}")).status_code == 204
+        assert (await client.get(f"/api/replicates/{replicates_id}/0/steps")).status_code == 404
+        assert (await client.delete(f"/api/replicates/{replicates_id}")).status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_invalid_config(self, client):
+        req = _two_choice_req()
+        del req["schedule_b"]
+        req["replicates"] = 2
+        resp = await client.post("/api/simulate/replicates", json=req)
+        assert resp.status_code == 400
+
 
 # ── CSV endpoint ────────────────────────────────────────────────────
 
+class TestAdaptiveReplicatesEndpoint:
+    @pytest.mark.asyncio
+    async def test_precision_target(self, client):
+        req = _two_choice_req(algo="mpr", seed=5, max_steps=80)
+        req["replicates"] = 200
+        req["precision"] = {"metric": "reinforcement_rate", "half_width": 0.02, "min_replicates": 5}
+        data = (await client.post("/api/simulate/replicates", json=req)).json()
+        assert 5 <= data["replicates"] < 200
+        assert data["metrics"]["reinforcement_rate"]["count"] == data["replicates"]
+        precision = data["precision"]
+        assert precision["met"] and precision["half_width"] <= 0.02
+        assert (precision["metric"], precision["target"], precision["confidence"]) == ("reinforcement_rate", 0.02, 0.95)
+
+        req["keep_steps"] = True
+        kept = (await client.post("/api/simulate/replicates", json=req)).json()
+        assert kept["replicates"] == data["replicates"]
+        last = data["replicates"] - 1
+        assert (await client.get(f"/api/replicates/{kept['replicates_id']}/{last}/steps")).status_code == 200
+        assert (await client.get(f"/api/replicates/{kept['replicates_id']}/{last + 1}/steps")).status_code == 404
+        await client.delete(f"/api/replicates/{kept['replicates_id']}")
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("keep_steps", [False, True])
+    async def test_unknown_metric(self, client, keep_steps):
+        req = _two_choice_req(seed=5, max_steps=20)
+        req.update(replicates=10, keep_steps=keep_steps, precision={"metric": "nope", "half_width": 0.1})
+        resp = await client.post("/api/simulate/replicates", json=req)
+        assert resp.status_code == 400
+        assert "Unknown metric" in resp.json()["detail"]
+
+    @pytest.mark.asyncio
+    async def test_invalid_half_width(self, client):
+        req = _two_choice_req(seed=5)
+        req.update(replicates=10, precision={"metric": "reinforcement_rate", "half_width": 0})
+        assert (await client.post("/api/simulate/replicates", json=req)).status_code == 422
+
+
+class TestRunSweepCell:
+    @pytest.mark.asyncio
+    async def test_matches_replicates_endpoint(self, client):
+        from api.routes import run_sweep_cell
+
+        req = _two_choice_req(algo="mpr", seed=9, max_steps=60)
+        req["replicates"] = 4
+        expected = (await client.post("/api/simulate/replicates", json=req)).json()
+        cell = run_sweep_cell(dict(req, keep_steps=True))
+        assert cell == {k: expected[k] for k in ("seed", "replicates", "metrics")}
+
+    def test_unknown_engine(self):
+        from api.routes import run_sweep_cell
+
+        req = dict(_two_choice_req(), replicates=1, engine="fortran")
+        with pytest.raises(ValueError, match="Unknown engine"):
+            run_sweep_cell(req)
+
+    def test_reports_replicates_used(self):
+        from api.routes import run_sweep_cell
+
+        req = dict(_two_choice_req(algo="mpr", seed=2, max_steps=60), replicates=100)
+        req["precision"] = {"metric": "total_steps", "half_width": 1, "min_replicates": 3}
+        cell = run_sweep_cell(req)
+        assert cell["replicates"] == 3
+        assert cell["precision"]["met"]
+
+
+async def _finished_job(client, job_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        status = (await client.get(f"/api/jobs/{job_id}")).json()
+        if status["status"] in ("done", "failed"):
+            return status
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.01)
+
+
+class TestJobsEndpoint:
+    @pytest.mark.asyncio
+    async def test_result_in_every_format(self, client):
+        req = _two_choice_req(seed=11, max_steps=2500)
+        resp = await client.post("/api/jobs", json=req)
+        assert resp.status_code == 202
+        submitted = resp.json()
+        assert submitted["status"] in ("queued", "running", "done")
+        status = await _finished_job(client, submitted["job_id"])
+        assert status["status"] == "done" and status["error"] is None
+        progress = status["progress"]
+        assert (progress["steps"], progress["max_steps"], progress["condition"]) == (2500, 2500, 1)
+        assert sum(progress["action_counts"].values()) == 2500
+
+        base = f"/api/jobs/{submitted['job_id']}/result"
+        result = (await client.get(base)).json()
+        expected = (await client.post("/api/simulate", json=req)).json()
+        assert result["steps"] == expected["steps"]
+        assert result["summary"] == expected["summary"]
+        csv_body = (await client.get(base, params={"format": "csv"})).text
+        assert csv_body == (await client.post("/api/simulate/csv", json=req)).text
+        json_body = (await client.get(base, params={"format": "json"})).text
+        assert json_body == (await client.post("/api/simulate/json", json=req)).text
+        columnar = (await client.get(base, params={"format": "columnar"})).text
+        assert columnar == (await client.post("/api/simulate", params={"shape": "columnar"}, json=req)).text
+        assert (await client.get(base, params={"format": "xml"})).status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_keyframed_job(self, client):
+        req = _two_choice_req(seed=11, max_steps=100)
+        req["keyframe_every"] = 20
+        job_id = (await client.post("/api/jobs", json=req)).json()["job_id"]
+        await _finished_job(client, job_id)
+        run_id = (await client.get(f"/api/jobs/{job_id}/result")).json()["run_id"]
+        assert (await client.get(f"/api/runs/{run_id}/state", params={"step": 50})).status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_failed_job(self, client):
+        req = _two_choice_req()
+        req["schedule_b"] = None
+        job_id = (await client.post("/api/jobs", json=req)).json()["job_id"]
+        status = await _finished_job(client, job_id)
+        assert status["status"] == "failed"
+        assert status["error"]
+        resp = await client.get(f"/api/jobs/{job_id}/result")
+        assert resp.status_code == 409
+        assert "Job failed" in resp.json()["detail"]
+
+    @pytest.mark.asyncio
+    async def test_unknown_job(self, client):
+        assert (await client.get("/api/jobs/nope")).status_code == 404
+        assert (await client.get("/api/jobs/nope/result")).status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_unknown_engine(self, client):
+        req = dict(_two_choice_req(), engine="fortran")
+        assert (await client.post("/api/jobs", json=req)).status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_full_queue_and_pending_result(self, client, monkeypatch):
+        from api import routes
+        from simulation.jobs import JobQueue
+
+        release = threading.Event()
+        queue = JobQueue(workers=1, max_queued=1)
+        monkeypatch.setattr(routes, "_jobs", queue)
+        original = routes._run_simulation
+
+        def blocked(req, rng=None, on_progress=None):
+            release.wait(5)
+            return original(req, rng, on_progress)
+
+        monkeypatch.setattr(routes, "_run_simulation", blocked)
+        try:
+            req = _two_choice_req(max_steps=20)
+            first = (await client.post("/api/jobs", json=req)).json()["job_id"]
+            second = (await client.post("/api/jobs", json=req)).json()["job_id"]
+            while (await client.get(f"/api/jobs/{first}")).json()["status"] != "running":
+                await asyncio.sleep(0.01)
+            resp = await client.post("/api/jobs", json=req)
+            assert resp.status_code == 429
+            assert resp.headers["Retry-After"] == str(routes.JOB_RETRY_AFTER)
+            pending = await client.get(f"/api/jobs/{second}/result")
+            assert pending.status_code == 409
+            assert pending.json()["detail"] == "Job is queued"
+        finally:
+            release.set()
+            queue.shutdown()
+
+
+def _events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+class TestJobEvents:
+    @pytest.mark.asyncio
+    async def test_follows_job_to_the_end(self, client):
+        req = {
+            **_two_choice_req(seed=5, max_steps=2500),
+            "conditions": [
+                {"label": "A", "max_steps": 2500,
+                 "schedule_a": {"type": "FR", "value": 5}, "schedule_b": {"type": "FR", "value": 5}},
+                {"label": "B", "max_steps": 1500,
+                 "schedule_a": {"type": "VI", "value": 10}, "schedule_b": {"type": "VI", "value": 10}},
+            ],
+        }
+        job_id = (await client.post("/api/jobs", json=req)).json()["job_id"]
+        resp = await client.get(f"/api/jobs/{job_id}/events", params={"interval": 0.05})
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/event-stream")
+        events = _events(resp.text)
+        assert events[-1][0] == "done"
+        assert events[-1][1]["job_id"] == job_id
+        progress = [data for event, data in events if event == "progress"]
+        assert progress
+
+        record = [point for data in progress for point in data["cumulative_record"]]
+        # A report every PROGRESS_EVERY steps and at the end of each condition
+        assert [p["step"] for p in record] == [1000, 2000, 2500, 3000, 4000]
+        result = (await client.get(f"/api/jobs/{job_id}/result")).json()
+        totals = {}
+        for cs in result["condition_summaries"]:
+            for action, n in cs["action_counts"].items():
+                totals[action] = totals.get(action, 0) + n
+        assert {a: n for a, n in record[-1]["counts"].items() if n} == totals
+
+        last = progress[-1]
+        assert (last["steps"], last["max_steps"], last["condition"]) == (4000, 4000, 2)
+        second = result["condition_summaries"][1]
+        assert last["reinforcement_rate"] == pytest.approx(second["reinforcement_rate"])
+
+    @pytest.mark.asyncio
+    async def test_reports_between_events_are_merged(self):
+        from api.routes import _job_events
+        from simulation.jobs import DONE, Job
+
+        job = Job("j")
+        job.reports = [
+            {"steps": s, "condition": 1, "condition_steps": s, "action_counts": {"a": s, "b": 0},
+             "total_reinforcements": s // 10}
+            for s in (10, 20, 30)
+        ]
+        job.status = DONE
+        events = _events("".join([chunk async for chunk in _job_events(job, 0.05)]))
+        assert [event for event, _ in events] == ["progress", "done"]
+        data = events[0][1]
+        assert data["steps"] == 30
+        assert data["reinforcement_rate"] == pytest.approx(0.1)
+        assert [p["step"] for p in data["cumulative_record"]] == [10, 20, 30]
+
+    @pytest.mark.asyncio
+    async def test_failed_job(self, client):
+        req = _two_choice_req()
+        req["schedule_b"] = None
+        job_id = (await client.post("/api/jobs", json=req)).json()["job_id"]
+        resp = await client.get(f"/api/jobs/{job_id}/events", params={"interval": 0.05})
+        event, data = _events(resp.text)[-1]
+        assert event == "failed"
+        assert data["error"]
+
+    @pytest.mark.asyncio
+    async def test_bad_requests(self, client):
+        assert (await client.get("/api/jobs/nope/events")).status_code == 404
+        job_id = (await client.post("/api/jobs", json=_two_choice_req())).json()["job_id"]
+        resp = await client.get(f"/api/jobs/{job_id}/events", params={"interval": 0})
+        assert resp.status_code == 400
+
+
+class TestSimulationPool:
+    @pytest.mark.asyncio
+    async def test_event_loop_free_during_simulation(self, client, monkeypatch):
+        from api import routes
+
+        started, release = threading.Event(), threading.Event()
+        original = routes._run_simulation
+
+        def held(req, rng=None, on_progress=None):
+            started.set()
+            release.wait(5)
+            return original(req, rng, on_progress)
+
+        monkeypatch.setattr(routes, "_run_simulation", held)
+        try:
+            sims = [
+                asyncio.ensure_future(client.post(path, json=_two_choice_req(max_steps=30)))
+                for path in ("/api/simulate", "/api/simulate/csv", "/api/simulate/json")
+            ]
+            while not started.is_set():
+                await asyncio.sleep(0.01)
+            assert (await client.get("/")).status_code == 200
+            assert not any(sim.done() for sim in sims)
+        finally:
+            release.set()
+        assert [(await sim).status_code for sim in sims] == [200, 200, 200]
+
+    @pytest.mark.asyncio
+    async def test_replays_and_kept_steps_use_pool(self, client, monkeypatch):
+        from pydantic import TypeAdapter
+
+        from api import routes
+        from api.schemas import StepData
+
+        req = _two_choice_req(max_steps=20)
+        req["keyframe_every"] = 5
+        run_id = (await client.post("/api/simulate", json=req)).json()["run_id"]
+        req = _two_choice_req(max_steps=20)
+        req["replicates"], req["keep_steps"] = 2, True
+        replicates_id = (await client.post("/api/simulate/replicates", json=req)).json()["replicates_id"]
+        offloaded = []
+        original = routes._offload
+
+        async def recorded(fn, *args):
+            offloaded.append(fn.__name__)
+            return await original(fn, *args)
+
+        monkeypatch.setattr(routes, "_offload", recorded)
+        state = await client.get(f"/api/runs/{run_id}/state", params={"step": 7})
+        steps = await client.get(f"/api/replicates/{replicates_id}/1/steps")
+        assert offloaded == ["_run_state_response", "_steps_text"]
+        assert state.json()["step"] == 7
+        # As Pydantic wrote it when FastAPI validated the rows
+        adapter = TypeAdapter(list[StepData])
+        assert steps.content == adapter.dump_json(adapter.validate_python(steps.json()))
+        assert (await client.get(f"/api/runs/{run_id}/state", params={"step": 21})).status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_busy_server_answers_429(self, client, monkeypatch):
+        from api import routes
+        from simulation.jobs import BoundedPool
+
+        release = threading.Event()
+        pool = BoundedPool(workers=1, max_waiting=0)
+        monkeypatch.setattr(routes, "_simulation_pool", pool)
+        original = routes._run_simulation
+        monkeypatch.setattr(
+            routes, "_run_simulation", lambda req, rng=None, on_progress=None: release.wait(5) and original(req, rng)
+        )
+        try:
+            first = asyncio.ensure_future(client.post("/api/simulate", json=_two_choice_req()))
+            while pool.pending == 0:
+                await asyncio.sleep(0.01)
+            for path in ("/api/simulate", "/api/simulate/csv", "/api/simulate/json"):
+                # A different seed, so it cannot join the run in flight
+                resp = await client.post(path, json=_two_choice_req(seed=7))
+                assert resp.status_code == 429
+                assert resp.headers["Retry-After"] == str(routes.SIMULATE_RETRY_AFTER)
+            release.set()
+            assert (await first).status_code == 200
+        finally:
+            release.set()
+            pool.shutdown()
+
+
+@pytest.fixture
+def counted_runs(monkeypatch):
+    """Count the simulations the routes actually run."""
+    from api import routes
+
+    runs = []
+    original = routes._run_simulation
+
+    def counted(req, rng=None, on_progress=None):
+        runs.append(req)
+        return original(req, rng, on_progress)
+
+    monkeypatch.setattr(routes, "_run_simulation", counted)
+    return runs
+
+
+class TestResultCaching:
+    @pytest.mark.asyncio
+    async def test_formats_share_one_run(self, client, counted_runs):
+        req = _two_choice_req(max_steps=40)
+        first = await client.post("/api/simulate", json=req)
+        csv_resp = await client.post("/api/simulate/csv", json=req)
+        json_resp = await client.post("/api/simulate/json", json=req)
+        # Defaults filled in explicitly normalize to the same request
+        again = await client.post("/api/simulate", json={**req, "engine": "python", "record_steps": True})
+        assert len(counted_runs) == 1
+        assert again.content == first.content
+        assert len(list(csv.DictReader(io.StringIO(csv_resp.text)))) == 40
+        assert json_resp.json()["steps"] == first.json()["steps"]
+        etags = {r.headers["ETag"] for r in (first, csv_resp, json_resp)}
+        assert len(etags) == 3 and all(tag.startswith('"') for tag in etags)
+        assert again.headers["ETag"] == first.headers["ETag"]
+
+    @pytest.mark.asyncio
+    async def test_repeat_download_is_kept_body(self, client, counted_runs):
+        req = _two_choice_req(max_steps=40)
+        first = await client.post("/api/simulate/csv", json=req)
+        second = await client.post("/api/simulate/csv", json=req)
+        assert second.content == first.content
+        assert second.headers["content-type"] == first.headers["content-type"]
+        assert second.headers["content-disposition"] == first.headers["content-disposition"]
+        assert len(counted_runs) == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("tag", ["{etag}", "W/{etag}", '"other", {etag}', "*"])
+    async def test_if_none_match(self, client, counted_runs, tag):
+        req = _two_choice_req(max_steps=40)
+        etag = (await client.post("/api/simulate/json", json=req)).headers["ETag"]
+        resp = await client.post("/api/simulate/json", json=req, headers={"If-None-Match": tag.format(etag=etag)})
+        assert resp.status_code == 304
+        assert resp.headers["ETag"] == etag and resp.content == b""
+        assert len(counted_runs) == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_or_uncached_tag_gets_body(self, client, counted_runs):
+        from api import routes
+
+        req = _two_choice_req(max_steps=40)
+        etag = (await client.post("/api/simulate", json=req)).headers["ETag"]
+        resp = await client.post("/api/simulate", json=req, headers={"If-None-Match": '"other"'})
+        assert resp.status_code == 200
+        routes._result_cache.clear()
+        # Only a result the server still holds is answered with 304
+        resp = await client.post("/api/simulate", json=req, headers={"If-None-Match": etag})
+        assert resp.status_code == 200 and resp.headers["ETag"] == etag
+        assert len(counted_runs) == 2
+
+    @pytest.mark.asyncio
+    async def test_304_keeps_keyframes(self, client):
+        from api import routes
+
+        req = {**_two_choice_req(max_steps=40), "keyframe_every": 10}
+        first = await client.post("/api/simulate", json=req)
+        run_id = first.json()["run_id"]
+        routes._keyframed_runs.clear()
+        resp = await client.post("/api/simulate", json=req, headers={"If-None-Match": first.headers["ETag"]})
+        assert resp.status_code == 304
+        state = await client.get(f"/api/runs/{run_id}/state", params={"step": 15})
+        assert state.status_code == 200
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("change", [{"seed": None}, {"profile": True}])
+    async def test_irreproducible_not_cached(self, client, counted_runs, change):
+        req = {**_two_choice_req(max_steps=40), **change}
+        for _ in range(2):
+            resp = await client.post("/api/simulate", json=req)
+            assert resp.status_code == 200 and "ETag" not in resp.headers
+        assert len(counted_runs) == 2
+
+    @pytest.mark.asyncio
+    async def test_truncated_not_cached(self, client, counted_runs):
+        req = {**_two_choice_req(max_steps=100000), "time_budget": 1e-6}
+        for _ in range(2):
+            resp = await client.post("/api/simulate", json=req)
+            assert resp.json()["truncated"] and "ETag" not in resp.headers
+        assert len(counted_runs) == 2
+
+
+@pytest.fixture
+def held_runs(monkeypatch):
+    """Count the simulations the routes run, holding each until released."""
+    from api import routes
+
+    runs, release = [], threading.Event()
+    original = routes._run_simulation
+
+    def held(req, rng=None, on_progress=None):
+        runs.append(req)
+        release.wait(5)
+        return original(req, rng, on_progress)
+
+    monkeypatch.setattr(routes, "_run_simulation", held)
+    yield runs, release
+    release.set()
+
+
+class TestCoalescing:
+    @pytest.mark.asyncio
+    async def test_burst_costs_one_run(self, client, held_runs):
+        from api import routes
+
+        runs, release = held_runs
+        req = _two_choice_req(max_steps=40)
+        paths = ["/api/simulate"] * 12 + ["/api/simulate/csv"] * 4 + ["/api/simulate/json"] * 4
+        burst = [asyncio.ensure_future(client.post(path, json=req)) for path in paths]
+        while not runs:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        release.set()
+        responses = await asyncio.gather(*burst)
+        assert len(runs) == 1
+        assert all(resp.status_code == 200 for resp in responses)
+        assert len({resp.content for resp in responses[:12]}) == 1
+        assert len({resp.content for resp in responses[12:16]}) == 1
+        assert routes._in_flight == {}
+
+    @pytest.mark.asyncio
+    async def test_waiting_duplicates_hold_no_thread(self, client, held_runs, monkeypatch):
+        from api import routes
+        from simulation.jobs import BoundedPool
+
+        runs, release = held_runs
+        pool = BoundedPool(workers=1, max_waiting=0)
+        monkeypatch.setattr(routes, "_simulation_pool", pool)
+        try:
+            burst = [asyncio.ensure_future(client.post("/api/simulate/csv", json=_two_choice_req())) for _ in range(10)]
+            while not runs:
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)
+            release.set()
+            assert [resp.status_code for resp in await asyncio.gather(*burst)] == [200] * 10
+            assert len(runs) == 1
+        finally:
+            pool.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_duplicates_share_errors(self, client, held_runs):
+        runs, release = held_runs
+        req = {**_two_choice_req(), "engine": "bogus"}
+        burst = [asyncio.ensure_future(client.post("/api/simulate", json=req)) for _ in range(3)]
+        while not runs:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        release.set()
+        assert [resp.status_code for resp in await asyncio.gather(*burst)] == [400] * 3
+        assert len(runs) == 1
+
+    @pytest.mark.asyncio
+    async def test_unseeded_requests_run_separately(self, client, counted_runs):
+        req = {**_two_choice_req(max_steps=20), "seed": None}
+        responses = await asyncio.gather(*(client.post("/api/simulate", json=req) for _ in range(3)))
+        assert all(resp.status_code == 200 for resp in responses)
+        assert len(counted_runs) == 3
+
+
 class TestCSVEndpoint:
     @pytest.mark.asyncio
     async def test_content_type(self, client):
@@ -182,6 +958,138 @@ class TestJSONEndpoint:
         assert len(sim_data["steps"]) == len(json_data["steps"])
 
 
+class TestColumnarShape:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("req", [_two_choice_req(max_steps=60), _grid_req(max_steps=60)])
+    async def test_decodes_to_rows(self, client, req):
+        from api.schemas import StepColumns
+
+        rows = (await client.post("/api/simulate", json=req)).json()
+        resp = await client.post("/api/simulate", params={"shape": "columnar"}, json=req)
+        data = resp.json()
+        assert "steps" not in data
+        assert {k: v for k, v in data.items() if k != "step_columns"} == {k: v for k, v in rows.items() if k != "steps"}
+        columns = StepColumns(**data["step_columns"])
+        decoded = [
+            {
+                "step": step,
+                "state": columns.state_names[state],
+                "action": columns.action_names[action],
+                "reinforced": reinforced,
+                "schedule_id": columns.schedule_names[schedule],
+                "condition": condition,
+            }
+            for step, state, action, reinforced, schedule, condition in zip(
+                columns.step, columns.state, columns.action, columns.reinforced, columns.schedule_id, columns.condition
+            )
+        ]
+        assert decoded == rows["steps"]
+        assert resp.headers["ETag"] != (await client.post("/api/simulate", json=req)).headers["ETag"]
+
+    @pytest.mark.asyncio
+    async def test_keyframed_run_id(self, client):
+        req = {**_two_choice_req(max_steps=40), "keyframe_every": 10, "seed": None}
+        run_id = (await client.post("/api/simulate", params={"shape": "columnar"}, json=req)).json()["run_id"]
+        assert (await client.get(f"/api/runs/{run_id}/state", params={"step": 15})).status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_unknown_shape(self, client):
+        resp = await client.post("/api/simulate", params={"shape": "tree"}, json=_two_choice_req())
+        assert resp.status_code == 400
+
+
+class TestCompactShape:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("req", [_two_choice_req(max_steps=60), _grid_req(max_steps=60)])
+    async def test_decodes_to_rows(self, client, req):
+        from api.schemas import StepCompact
+        from simulation.compact import decode_steps
+
+        rows = (await client.post("/api/simulate", json=req)).json()
+        resp = await client.post("/api/simulate", params={"shape": "compact"}, json=req)
+        data = resp.json()
+        assert "steps" not in data
+        assert {k: v for k, v in data.items() if k != "step_compact"} == {k: v for k, v in rows.items() if k != "steps"}
+        StepCompact(**data["step_compact"])
+        assert decode_steps(data["step_compact"]).to_dicts() == rows["steps"]
+
+    @pytest.mark.asyncio
+    async def test_multi_condition_boundaries(self, client):
+        req = {
+            **_two_choice_req(),
+            "conditions": [
+                {"label": "A", "max_steps": 30,
+                 "schedule_a": {"type": "FR", "value": 5}, "schedule_b": {"type": "FR", "value": 5}},
+                {"label": "B", "max_steps": 20,
+                 "schedule_a": {"type": "VI", "value": 10}, "schedule_b": {"type": "VI", "value": 10}},
+            ],
+        }
+        data = (await client.post("/api/simulate", params={"shape": "compact"}, json=req)).json()
+        compact = data["step_compact"]
+        assert compact["condition"] == {"values": [1, 2], "starts": [0, 30]}
+        assert [s + 1 for s in compact["condition"]["starts"]] == [c["start_step"] for c in data["condition_summaries"]]
+
+    @pytest.mark.asyncio
+    async def test_job_result(self, client):
+        req = _two_choice_req(max_steps=40)
+        job_id = (await client.post("/api/jobs", json=req)).json()["job_id"]
+        await _finished_job(client, job_id)
+        resp = await client.get(f"/api/jobs/{job_id}/result", params={"format": "compact"})
+        expected = await client.post("/api/simulate", params={"shape": "compact"}, json=req)
+        assert resp.json()["step_compact"] == expected.json()["step_compact"]
+
+
+class TestBinaryExports:
+    @pytest.mark.asyncio
+    async def test_npz_matches_rows(self, client):
+        import numpy as np
+
+        req = _grid_req(max_steps=60)
+        rows = (await client.post("/api/simulate", json=req)).json()
+        resp = await client.post("/api/simulate/npz", json=req)
+        assert resp.status_code == 200
+        assert resp.headers["content-disposition"] == "attachment; filename=simulation_results.npz"
+        data = np.load(io.BytesIO(resp.content))
+        assert [data["state_names"][code] for code in data["state"]] == [s["state"] for s in rows["steps"]]
+        assert [data["action_names"][code] for code in data["action"]] == [s["action"] for s in rows["steps"]]
+        assert json.loads(data["summary"].item()) == rows["summary"]
+        assert "ETag" in resp.headers
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("format", ["arrow", "parquet"])
+    async def test_arrow_formats(self, client, format):
+        pa = pytest.importorskip("pyarrow")
+        import pyarrow.parquet as pq
+
+        req = _two_choice_req(max_steps=60)
+        rows = (await client.post("/api/simulate", json=req)).json()
+        resp = await client.post(f"/api/simulate/{format}", json=req)
+        body = pa.BufferReader(resp.content)
+        table = pa.ipc.open_file(body).read_all() if format == "arrow" else pq.read_table(body)
+        assert table.to_pylist() == rows["steps"]
+
+    @pytest.mark.asyncio
+    async def test_job_result(self, client):
+        req = _two_choice_req(seed=11, max_steps=100)
+        job_id = (await client.post("/api/jobs", json=req)).json()["job_id"]
+        await _finished_job(client, job_id)
+        resp = await client.get(f"/api/jobs/{job_id}/result", params={"format": "npz"})
+        assert resp.content == (await client.post("/api/simulate/npz", json=req)).content
+
+    @pytest.mark.asyncio
+    async def test_unknown_format(self, client):
+        assert (await client.post("/api/simulate/xml", json=_two_choice_req())).status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_without_pyarrow(self, client, monkeypatch):
+        from api import routes
+
+        monkeypatch.setattr(routes, "PYARROW_AVAILABLE", False)
+        resp = await client.post("/api/simulate/parquet", json=_two_choice_req())
+        assert resp.status_code == 501 and "pyarrow" in resp.json()["detail"]
+        assert (await client.post("/api/simulate/npz", json=_two_choice_req())).status_code == 200
+
+
 # ── Error handling ──────────────────────────────────────────────────
 
 class TestErrors:
@@ -0,0 +1,107 @@
+"""Tests for checkpoint serialization."""
+
+import numpy as np
+import pytest
+from simulation.checkpoint import CheckpointFile, dump_checkpoint, load_checkpoint, merge_checkpoints
+
+
+def _rows(start, values):
+    return {"start": start, "columns": {"step": np.asarray(values, dtype=np.int64)}}
+
+
+class TestCheckpointFormat:
+    def test_round_trip(self):
+        payload = {"a": [1, 2, 3], "b": np.arange(4)}
+        restored = load_checkpoint(dump_checkpoint(payload))
+        assert restored["a"] == [1, 2, 3]
+        assert restored["b"].tolist() == [0, 1, 2, 3]
+
+    def test_shared_objects_stay_shared(self):
+        rng = np.random.default_rng(0)
+        restored = load_checkpoint(dump_checkpoint({"x": rng, "y": rng}))
+        assert restored["x"] is restored["y"]
+
+    def test_generator_state_preserved(self):
+        rng = np.random.default_rng(3)
+        rng.random(10)
+        restored = load_checkpoint(dump_checkpoint({"rng": rng}))["rng"]
+        assert restored.random() == rng.random()
+
+    def test_rejects_foreign_bytes(self):
+        with pytest.raises(ValueError):
+            load_checkpoint(b"not a checkpoint")
+
+    def test_rejects_unknown_version(self):
+        data = bytearray(dump_checkpoint({}))
+        data[8] = 99
+        with pytest.raises(ValueError):
+            load_checkpoint(bytes(data))
+
+    def test_rows_round_trip(self):
+        restored = load_checkpoint(dump_checkpoint({"a": 1}, _rows(3, [4, 5])))
+        assert restored["a"] == 1
+        assert restored["rows"]["start"] == 3
+        assert restored["rows"]["columns"]["step"].tolist() == [4, 5]
+
+
+class TestMergeCheckpoints:
+    def test_joins_rows_with_last_state(self):
+        chain = [
+            dump_checkpoint({"n": 1}, _rows(0, [1, 2])),
+            dump_checkpoint({"n": 2}, _rows(2, [3])),
+            dump_checkpoint({"n": 3}, _rows(3, [4, 5])),
+        ]
+        merged = load_checkpoint(merge_checkpoints(chain))
+        assert merged["n"] == 3
+        assert merged["rows"]["start"] == 0
+        assert merged["rows"]["columns"]["step"].tolist() == [1, 2, 3, 4, 5]
+
+    def test_later_rows_replace_overlap(self):
+        chain = [dump_checkpoint({}, _rows(0, [1, 2, 3])), dump_checkpoint({}, _rows(1, [7]))]
+        assert load_checkpoint(merge_checkpoints(chain))["rows"]["columns"]["step"].tolist() == [1, 7]
+
+    def test_rejects_gap(self):
+        chain = [dump_checkpoint({}, _rows(0, [1])), dump_checkpoint({}, _rows(2, [3]))]
+        with pytest.raises(ValueError):
+            merge_checkpoints(chain)
+
+
+class TestCheckpointFile:
+    def test_write_replaces_previous(self, tmp_path):
+        target = CheckpointFile(str(tmp_path / "run.ckpt"))
+        target(dump_checkpoint({"n": 1}))
+        target(dump_checkpoint({"n": 2}))
+        assert load_checkpoint(target.read()) == {"n": 2}
+        assert [p.name for p in tmp_path.iterdir()] == ["run.ckpt"]
+
+    def test_appends_rows(self, tmp_path):
+        target = CheckpointFile(str(tmp_path / "run.ckpt"))
+        target(dump_checkpoint({"n": 1}, _rows(0, [1, 2])))
+        target(dump_checkpoint({"n": 2}, _rows(2, [3, 4])))
+        # The latest checkpoint holds only its own rows
+        assert (tmp_path / "run.ckpt").stat().st_size < len(dump_checkpoint({"n": 2}, _rows(0, [1, 2, 3, 4])))
+        restored = load_checkpoint(target.read())
+        assert restored["n"] == 2
+        assert restored["rows"]["columns"]["step"].tolist() == [1, 2, 3, 4]
+
+    def test_rows_from_zero_start_afresh(self, tmp_path):
+        target = CheckpointFile(str(tmp_path / "run.ckpt"))
+        target(dump_checkpoint({}, _rows(0, [1, 2])))
+        target(dump_checkpoint({}, _rows(0, [9])))
+        assert load_checkpoint(target.read())["rows"]["columns"]["step"].tolist() == [9]
+
+    def test_ignores_unfinished_append(self, tmp_path):
+        path = str(tmp_path / "run.ckpt")
+        target = CheckpointFile(path)
+        target(dump_checkpoint({"n": 1}, _rows(0, [1, 2])))
+        target(dump_checkpoint({"n": 2}, _rows(2, [3])))
+        # A crash after appending rows, before replacing the checkpoint
+        with open(target.rows_path, "ab") as f:
+            f.write(b"\x05\x00")
+        restored = load_checkpoint(CheckpointFile(path).read())
+        assert restored["n"] == 2
+        assert restored["rows"]["columns"]["step"].tolist() == [1, 2, 3]
+        # A new writer cuts the partial frame off before appending
+        resumed = CheckpointFile(path)
+        resumed(dump_checkpoint({"n": 3}, _rows(3, [4])))
+        assert load_checkpoint(resumed.read())["rows"]["columns"]["step"].tolist() == [1, 2, 3, 4]
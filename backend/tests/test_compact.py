@@ -0,0 +1,102 @@
+"""Tests for the compact step log encoding."""
+
+import json
+
+import numpy as np
+
+from simulation.compact import (
+    compact_json,
+    decode_flags,
+    decode_runs,
+    decode_steps,
+    encode_flags,
+    encode_runs,
+    encode_steps,
+)
+from simulation.steplog import StepLog
+
+
+def _log(rows, step_offset=0):
+    log = StepLog(["left", "right"], capacity=len(rows))
+    for i, (state, action, reinforced, schedule_id, condition) in enumerate(rows):
+        log.state[i] = log.code_state(state)
+        log.action[i] = action
+        log.reinforced[i] = reinforced
+        log.schedule[i] = log.code_schedule(schedule_id)
+        log.condition[i] = condition
+    log.size = len(rows)
+    log.step[: log.size] = np.arange(step_offset + 1, step_offset + log.size + 1)
+    return log
+
+
+class TestRuns:
+    def test_round_trip(self):
+        values = np.array([3, 3, 3, 1, 1, 3, 2, 2], dtype=np.int16)
+        runs = encode_runs(values)
+        assert runs == {"values": [3, 1, 3, 2], "starts": [0, 3, 5, 6]}
+        decoded = decode_runs(runs, len(values), np.int16)
+        assert decoded.dtype == np.int16
+        assert decoded.tolist() == values.tolist()
+
+    def test_empty(self):
+        runs = encode_runs(np.zeros(0, dtype=np.int16))
+        assert runs == {"values": [], "starts": []}
+        assert len(decode_runs(runs, 0, np.int16)) == 0
+
+
+class TestFlags:
+    def test_dense_flags_are_bits(self):
+        flags = np.arange(1000) % 3 == 0
+        encoded = encode_flags(flags)
+        assert list(encoded) == ["bits"]
+        assert decode_flags(encoded, len(flags)).tolist() == flags.tolist()
+
+    def test_sparse_flags_are_indices(self):
+        flags = np.zeros(1000, dtype=np.bool_)
+        flags[[7, 500, 999]] = True
+        encoded = encode_flags(flags)
+        assert encoded == {"at": [7, 500, 999]}
+        assert decode_flags(encoded, len(flags)).tolist() == flags.tolist()
+
+    def test_bits_are_lowest_first(self):
+        flags = np.array([True, False, False, False, False, False, False, False, False, True])
+        # 0b00000001, 0b00000010
+        assert encode_flags(flags) == {"bits": "AQI="}
+
+
+class TestSteps:
+    def test_round_trip(self):
+        rows = [("s", k // 4 % 2, k % 5 == 0, "VR 3" if k < 30 else "FR 2", 1 + k // 30) for k in range(50)]
+        log = _log(rows, step_offset=100)
+        decoded = decode_steps(json.loads(compact_json(log)))
+        assert decoded.to_dicts() == log.to_dicts()
+
+    def test_runs_follow_the_log(self):
+        rows = [((0, 0), 0, False, "VI 5", 1)] * 3 + [((0, 1), 1, True, "FR 2", 2)] * 2
+        encoded = encode_steps(_log(rows))
+        assert encoded["size"] == 5
+        assert encoded["step"] == {"values": [1], "starts": [0]}
+        assert encoded["action"] == {"values": [0, 1], "starts": [0, 3]}
+        # Condition boundaries
+        assert encoded["condition"] == {"values": [1, 2], "starts": [0, 3]}
+        assert encoded["reinforced"] == {"bits": "GA=="}
+        assert encoded["state_names"] == ["(0, 0)", "(0, 1)"]
+        assert encoded["schedule_names"] == ["VI 5", "FR 2"]
+
+    def test_restarting_steps(self):
+        log = _log([("s", 0, False, "", 1)] * 4)
+        log.step[:4] = [1, 2, 1, 2]
+        encoded = encode_steps(log)
+        assert encoded["step"] == {"values": [1, -1], "starts": [0, 2]}
+        assert decode_steps(encoded).step[:4].tolist() == [1, 2, 1, 2]
+
+    def test_decoded_log_codes_names(self):
+        log = decode_steps(encode_steps(_log([("s", 1, True, "VR 3", 1)])))
+        assert log.code_schedule("VR 3") == 0
+        assert log.code_state("s") == 0
+
+    def test_empty_log(self):
+        log = StepLog(["a"])
+        decoded = decode_steps(json.loads(compact_json(log)))
+        assert decoded.size == 0
+        assert decoded.action_names == ["a"]
@@ -1,7 +1,9 @@
 """Tests for GridChamberEnvironment."""
 
+import numpy as np
 import pytest
 from schedules.reinforcement import FR, FI
+from environments.base import BatchStepBuffer, StepBuffer
 from environments.grid_chamber import GridChamberEnvironment
 
 
@@ -161,3 +163,86 @@ class TestGridChamberEnvironment:
     def test_name(self):
         env = self._make_env()
         assert env.name == "grid_chamber"
+
+
+class TestGridChamberStepInto:
+    def _make_env(self, **kwargs):
+        return GridChamberEnvironment(schedule=FR(1), max_steps=100, **kwargs)
+
+    def test_move_by_id(self):
+        env = self._make_env()
+        env.reset()
+        out = StepBuffer()
+        env.step_into(GridChamberEnvironment.ACTION_IDS["down"], out)
+        assert env.pos == (1, 0)
+        assert out.state == (1, 0)
+        assert out.action == GridChamberEnvironment.ACTION_IDS["down"]
+        assert not out.reinforced
+
+    def test_press_not_adjacent_reports_stay(self):
+        env = self._make_env(start_pos=(0, 0), lever_pos=(4, 4))
+        env.reset()
+        out = StepBuffer()
+        env.step_into(GridChamberEnvironment.PRESS_LEVER, out)
+        assert out.action == GridChamberEnvironment.STAY
+        assert out.schedule_id == ""
+
+    def test_press_adjacent_reinforced(self):
+        env = self._make_env(start_pos=(1, 1), lever_pos=(2, 2))
+        env.reset()
+        out = StepBuffer()
+        env.step_into(GridChamberEnvironment.PRESS_LEVER, out)
+        assert out.reinforced
+        assert out.schedule_id == "lever_schedule"
+
+    def test_records_visits(self):
+        env = self._make_env()
+        env.reset()
+        out = StepBuffer()
+        env.step_into(GridChamberEnvironment.ACTION_IDS["right"], out)
+        assert env.visit_counts[(0, 1)] == 1
+
+    def test_matches_string_step(self):
+        env_a = self._make_env(start_pos=(1, 1))
+        env_b = self._make_env(start_pos=(1, 1))
+        env_a.reset()
+        env_b.reset()
+        out = StepBuffer()
+        for name in ["down", "press_lever", "left", "left", "press_lever", "up"]:
+            r = env_a.step(name)
+            env_b.step_into(GridChamberEnvironment.ACTION_IDS[name], out)
+            assert (r.state, r.reinforced, r.schedule_id) == (out.state, out.reinforced, out.schedule_id)
+            assert r.action_taken == GridChamberEnvironment.ACTIONS[out.action]
+
+
+class TestGridChamberBatch:
+    def test_visit_counts_match_scalar(self):
+        moves = [["down", "right"], ["right", "press_lever"], ["press_lever", "down"], ["stay", "up"]]
+        env = GridChamberEnvironment(rows=3, cols=3, lever_pos=(1, 1), schedule=FR(1), max_steps=10)
+        env.reset_batch([np.random.default_rng(0)] * 2)
+        out = BatchStepBuffer.empty(2)
+        scalar = [GridChamberEnvironment(rows=3, cols=3, lever_pos=(1, 1), schedule=FR(1), max_steps=10)
+                  for _ in range(2)]
+        for s in scalar:
+            s.reset()
+        for names in moves:
+            env.step_batch(np.array([env.ACTION_IDS[n] for n in names]), out)
+            for k, name in enumerate(names):
+                r = scalar[k].step(name)
+                assert out.states[k] == r.state
+                assert env.ACTIONS[out.action[k]] == r.action_taken
+                assert out.reinforced[k] == r.reinforced
+        counts = env.get_batch_visit_counts()
+        for k in range(2):
+            assert list(counts[k].items()) == list(scalar[k].visit_counts.items())
+
+
+class TestGridChamberState:
+    def test_get_state(self):
+        env = GridChamberEnvironment(rows=3, cols=3, schedule=FR(2), max_steps=10)
+        env.reset()
+        env.step("right")
+        state = env.get_state()
+        assert state["position"] == [0, 1]
+        assert state["visit_counts"] == {"(0, 0)": 1, "(0, 1)": 1}
+        assert state["schedule"]["count"] == 0
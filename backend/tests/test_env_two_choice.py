@@ -1,7 +1,9 @@
 """Tests for TwoChoiceEnvironment."""
 
+import numpy as np
 import pytest
 from schedules.reinforcement import FR, FI
+from environments.base import BatchStepBuffer, StepBuffer
 from environments.two_choice import TwoChoiceEnvironment
 
 
@@ -90,3 +92,70 @@ class TestTwoChoiceEnvironment:
     def test_name(self):
         env = self._make_env()
         assert env.name == "two_choice"
+
+
+class TestTwoChoiceStepInto:
+    def test_writes_into_buffer(self):
+        env = TwoChoiceEnvironment(FR(1), FR(100), max_steps=1)
+        env.reset()
+        out = StepBuffer()
+        env.step_into(0, out)
+        assert out.state == "start"
+        assert out.action == 0
+        assert out.reinforced
+        assert out.schedule_id == "schedule_a"
+        assert out.done
+
+    def test_buffer_reused(self):
+        env = TwoChoiceEnvironment(FR(100), FR(1), max_steps=10)
+        env.reset()
+        out = StepBuffer()
+        env.step_into(1, out)
+        assert out.reinforced and out.schedule_id == "schedule_b"
+        env.step_into(0, out)
+        assert not out.reinforced and out.schedule_id == "schedule_a"
+        assert out.action == 0
+
+    def test_action_ids_match_names(self):
+        env = TwoChoiceEnvironment(FR(1), FR(1))
+        assert list(env.ACTIONS) == env.get_available_actions()
+
+
+class TestTwoChoiceBatch:
+    def test_step_batch_matches_scalar(self):
+        env = TwoChoiceEnvironment(FR(2), FI(3), max_steps=5)
+        env.reset_batch([np.random.default_rng(0)] * 2)
+        out = BatchStepBuffer.empty(2)
+        scalar = [TwoChoiceEnvironment(FR(2), FI(3), max_steps=5) for _ in range(2)]
+        for s in scalar:
+            s.reset()
+        for actions in ([0, 1], [0, 1], [1, 0], [1, 1], [0, 0]):
+            env.step_batch(np.array(actions), out)
+            for k, a in enumerate(actions):
+                r = scalar[k].step(env.ACTIONS[a])
+                assert out.reinforced[k] == r.reinforced
+                assert env.batch_schedule_ids[out.schedule[k]] == r.schedule_id
+        assert out.done.all()
+
+    def test_custom_schedule_falls_back_to_replicas(self):
+        class Always(FR):
+            pass
+
+        env = TwoChoiceEnvironment(Always(1), FR(1), max_steps=3)
+        states = env.reset_batch([np.random.default_rng(0)] * 3)
+        assert states == ["start"] * 3
+        out = BatchStepBuffer.empty(3)
+        env.step_batch(np.array([0, 1, 0]), out)
+        assert out.reinforced.all()
+        assert [env.batch_schedule_ids[c] for c in out.schedule] == ["schedule_a", "schedule_b", "schedule_a"]
+
+
+class TestTwoChoiceState:
+    def test_get_state(self):
+        env = TwoChoiceEnvironment(FR(3), FI(2), max_steps=10)
+        env.reset()
+        env.step("choice_a")
+        state = env.get_state()
+        assert state["step_count"] == 1
+        assert state["schedule_a"] == {"type": "FR", "value": 3, "count": 1}
+        assert state["schedule_b"]["type"] == "FI"
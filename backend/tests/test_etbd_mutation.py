@@ -21,19 +21,17 @@ class TestMutate:
             assert 0 <= result < 1024
 
     def test_seeded_deterministic(self):
-        np.random.seed(42)
-        r1 = mutate(500, 0.1)
-        np.random.seed(42)
-        r2 = mutate(500, 0.1)
+        r1 = mutate(500, 0.1, np.random.default_rng(42))
+        r2 = mutate(500, 0.1, np.random.default_rng(42))
         assert r1 == r2
 
     def test_statistical_bit_flip_rate(self):
-        np.random.seed(42)
+        rng = np.random.default_rng(42)
         flips = 0
         trials = 5000
         for _ in range(trials):
             original = 0
-            result = mutate(original, mutation_rate=0.5)
+            result = mutate(original, mutation_rate=0.5, rng=rng)
             flips += bin(result).count("1")
         rate = flips / (trials * BITS)
         assert 0.45 < rate < 0.55
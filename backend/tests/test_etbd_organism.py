@@ -2,6 +2,7 @@
 
 import numpy as np
 import pytest
+from etbd_internals.counters import OpCounters
 from etbd_internals.organism import Organism
 
 
@@ -52,8 +53,7 @@ class TestOrganism:
         assert len(o.population) == 50
 
     def test_drift_no_directional_shift(self):
-        np.random.seed(42)
-        o = Organism(population_size=200, mutation_rate=0.01)
+        o = Organism(population_size=200, mutation_rate=0.01, rng=np.random.default_rng(42))
         mean_before = np.mean(o.population)
         for _ in range(10):
             o.drift()
@@ -69,3 +69,35 @@ class TestOrganism:
         assert len(o.population) == 50
         # New random population, should not all be near 0
         assert np.mean(o.population) > 100
+
+
+class TestOrganismCounters:
+    def _organism(self, seed, mutation_rate=0.1):
+        return Organism(population_size=30, mutation_rate=mutation_rate, rng=np.random.default_rng(seed))
+
+    def test_counting_leaves_population_unchanged(self):
+        plain, counted = self._organism(4), self._organism(4)
+        counted.counters = OpCounters()
+        for o in (plain, counted):
+            o.reinforce(target=300)
+            o.drift()
+        assert counted.population == plain.population
+
+    def test_counts(self):
+        o = self._organism(4)
+        o.counters = OpCounters()
+        o.reinforce(target=300)
+        o.drift()
+        o.drift()
+        assert o.counters.generations == 3
+        assert o.counters.parent_draws == 3 * 2 * 30
+
+    @pytest.mark.parametrize("rate, flips", [(0.0, 0), (1.0, 10)])
+    def test_bit_flips(self, rate, flips):
+        o = self._organism(4, mutation_rate=rate)
+        o.counters = OpCounters()
+        o.drift()
+        assert o.counters.bit_flips == flips * 30
+
+    def test_no_counters_by_default(self):
+        assert self._organism(4).counters is None
@@ -19,20 +19,18 @@ class TestRecombine:
             assert 0 <= child < 1024
 
     def test_known_crossover_with_seed(self):
-        np.random.seed(42)
-        child = recombine(0b1111111111, 0b0000000000)
-        # With seed 42, crossover_point = np.random.randint(1, 10)
+        child = recombine(0b1111111111, 0b0000000000, np.random.default_rng(42))
+        # With seed 42, crossover_point = rng.integers(1, 10)
         # The result should be deterministic
-        np.random.seed(42)
-        child2 = recombine(0b1111111111, 0b0000000000)
+        child2 = recombine(0b1111111111, 0b0000000000, np.random.default_rng(42))
         assert child == child2
 
     def test_crossover_point_range(self):
         # crossover_point is in [1, BITS-1] = [1, 9]
-        np.random.seed(0)
+        rng = np.random.default_rng(0)
         points = set()
         for _ in range(1000):
-            point = np.random.randint(1, BITS)
+            point = rng.integers(1, BITS)
             points.add(point)
         assert min(points) >= 1
         assert max(points) <= BITS - 1
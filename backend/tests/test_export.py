@@ -0,0 +1,153 @@
+"""Tests for step log exports."""
+
+import csv
+import io
+import json
+
+import numpy as np
+import pytest
+
+from simulation.export import arrow_bytes, csv_chunks, npz_bytes, parquet_bytes, step_columns_json, steps_json
+from simulation.steplog import STEP_FIELDS, StepLog
+
+
+def _log(rows):
+    log = StepLog(["left", "right,quoted", 'say "hi"'], capacity=len(rows))
+    for i, (state, action, reinforced, schedule_id, condition) in enumerate(rows):
+        log.state[i] = log.code_state(state)
+        log.action[i] = action
+        log.reinforced[i] = reinforced
+        log.schedule[i] = log.code_schedule(schedule_id)
+        log.condition[i] = condition
+    log.size = len(rows)
+    log.step[: log.size] = np.arange(1, log.size + 1)
+    return log
+
+
+def _dict_writer(log):
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=STEP_FIELDS)
+    writer.writeheader()
+    writer.writerows(log.to_dicts())
+    return output.getvalue()
+
+
+class TestCSVChunks:
+    def test_matches_dict_writer(self):
+        log = _log([
+            ((0, 0), 0, False, "", 1),
+            ("start", 1, True, "VI 5", 1),
+            ("line\nbreak", 2, False, "FR,5", 2),
+            ((2, 3), 0, True, "", 2),
+        ])
+        assert "".join(csv_chunks(log)) == _dict_writer(log)
+
+    def test_chunked(self):
+        log = _log([("s", k % 3, k % 7 == 0, "VR 3", 1 + k // 50) for k in range(100)])
+        chunks = list(csv_chunks(log, rows=32))
+        # Header, then ceil(100 / 32) chunks of rows
+        assert len(chunks) == 5
+        assert chunks[0] == "step,state,action,reinforced,schedule_id,condition\r\n"
+        assert chunks[-1].count("\r\n") == 100 - 3 * 32
+        assert "".join(chunks) == _dict_writer(log)
+
+    def test_empty_log(self):
+        log = StepLog(["a"])
+        assert list(csv_chunks(log)) == [_dict_writer(log)]
+
+
+class TestStepsJSON:
+    def _log(self):
+        return _log([
+            ("début", 0, False, "", 1),
+            ((1, 2), 1, True, 'VI "5"', 1),
+            ("tab\there", 2, False, "FR 5", 2),
+        ])
+
+    def test_compact_matches_pydantic(self):
+        from pydantic import TypeAdapter
+
+        from api.schemas import StepData
+
+        log = self._log()
+        steps = TypeAdapter(list[StepData])
+        expected = steps.dump_json(steps.validate_python(log.to_dicts())).decode()
+        assert "".join(steps_json(log)) == expected
+        assert "".join(steps_json(log, rows=2)) == expected
+
+    def test_indented_matches_json_dumps(self):
+        log = self._log()
+        document = json.dumps({"steps": log.to_dicts()}, indent=2)
+        expected = document[len('{\n  "steps": '):-len("\n}")]
+        assert "".join(steps_json(log, indent=2, level=1, rows=2)) == expected
+
+    def test_empty(self):
+        assert "".join(steps_json(StepLog(["a"]))) == "[]"
+        assert "".join(steps_json(StepLog(["a"]), indent=2, level=1)) == "[]"
+
+
+class TestStepColumnsJSON:
+    def test_columns(self, monkeypatch):
+        import simulation.export as export
+
+        log = _log([("s", 2, True, "VR 3", 1), ((0, 1), 0, False, "VR 3", 2)])
+        expected = {
+            "step": [1, 2],
+            "state": [0, 1],
+            "action": [2, 0],
+            "reinforced": [True, False],
+            "schedule_id": [0, 0],
+            "condition": [1, 2],
+            "state_names": ["s", "(0, 1)"],
+            "action_names": ["left", "right,quoted", 'say "hi"'],
+            "schedule_names": ["VR 3"],
+        }
+        text = step_columns_json(log)
+        assert json.loads(text) == expected
+        monkeypatch.setattr(export, "ORJSON_AVAILABLE", False)
+        assert step_columns_json(log) == text
+
+
+def _binary_log():
+    return _log([((0, 0), 0, False, "", 1), ("s", 2, True, "VR 3", 1), ("s", 1, False, "", 2)])
+
+
+_METADATA = {"config": {"seed": 1}, "summary": {"total_steps": 3}, "condition_summaries": []}
+
+
+class TestBinaryExports:
+    def test_npz(self):
+        log = _binary_log()
+        data = np.load(io.BytesIO(npz_bytes(log, _METADATA)))
+        assert data["step"].tolist() == [1, 2, 3]
+        assert data["state"].dtype == np.int32 and data["action"].dtype == np.int16
+        assert [data["action_names"][code] for code in data["action"]] == ["left", 'say "hi"', "right,quoted"]
+        assert data["state_names"].tolist() == ["(0, 0)", "s"]
+        assert data["reinforced"].tolist() == [False, True, False]
+        assert json.loads(data["config"].item()) == {"seed": 1}
+
+    def test_npz_is_reproducible(self, monkeypatch):
+        import time
+
+        log = _binary_log()
+        first = npz_bytes(log, _METADATA)
+        monkeypatch.setattr(time, "time", lambda: 2e9)
+        assert npz_bytes(log, _METADATA) == first
+
+    def test_npz_empty_log(self):
+        data = np.load(io.BytesIO(npz_bytes(StepLog(["a"]), _METADATA)))
+        assert len(data["step"]) == 0 and data["state_names"].tolist() == []
+
+    @pytest.mark.parametrize("writer", [arrow_bytes, parquet_bytes])
+    def test_arrow_and_parquet(self, writer):
+        pa = pytest.importorskip("pyarrow")
+        import pyarrow.parquet as pq
+
+        log = _binary_log()
+        data = writer(log, _METADATA)
+        table = pa.ipc.open_file(data).read_all() if writer is arrow_bytes else pq.read_table(pa.BufferReader(data))
+        assert table.column("step").to_pylist() == [1, 2, 3]
+        assert pa.types.is_dictionary(table.schema.field("action").type)
+        rows = table.to_pylist()
+        assert [{k: row[k] for k in STEP_FIELDS} for row in rows] == log.to_dicts()
+        assert json.loads(table.schema.metadata[b"summary"]) == {"total_steps": 3}
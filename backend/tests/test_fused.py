@@ -0,0 +1,151 @@
+"""Tests for the fused condition kernels.
+
+Without Numba the kernels run as plain Python, so these tests check the
+kernels' logic either way.
+"""
+
+import pytest
+
+from agents.etbd import ETBDAgent
+from agents.mpr import MPRAgent
+from agents.q_learning import QLearningAgent
+from environments.base import StepBuffer
+from environments.grid_chamber import GridChamberEnvironment
+from environments.two_choice import TwoChoiceEnvironment
+from schedules.reinforcement import FI, FR, VI, VR, Schedule
+from simulation import fused
+from simulation.fused import fused_condition
+from simulation.runner import make_rng
+
+AGENTS = {
+    "q_learning": lambda env, rng: QLearningAgent(use_history_state=env == "two_choice", rng=rng),
+    "mpr": lambda env, rng: MPRAgent(environment_type=env, rng=rng),
+    "etbd": lambda env, rng: ETBDAgent(population_size=30, environment_type=env, rng=rng),
+}
+
+
+def _setup(algorithm, environment, schedule, seed=4, max_steps=250):
+    rng = make_rng(seed)
+    if environment == "two_choice":
+        env = TwoChoiceEnvironment(schedule(3, rng), VI(6, rng), max_steps=max_steps)
+    else:
+        env = GridChamberEnvironment(schedule=schedule(3, rng), max_steps=max_steps)
+    agent = AGENTS[algorithm](environment, rng)
+    agent.bind_actions(env.get_available_actions())
+    return agent, env, rng
+
+
+def _step_loop(agent, env, state):
+    out = StepBuffer()
+    steps = []
+    done = False
+    while not done:
+        action = agent.select_action_id(state)
+        env.step_into(action, out)
+        agent.update_id(state, out.action, out.reinforced, out.state)
+        steps.append((out.action, out.reinforced, out.state, out.schedule_id))
+        state = out.state
+        done = out.done
+    return steps
+
+
+def _assert_matches_step_loop(algorithm, environment, schedule):
+    agent, env, rng = _setup(algorithm, environment, schedule)
+    expected = _step_loop(agent, env, env.reset())
+    expected_state = (agent.get_state(), env.get_state(), rng.random())
+
+    agent, env, rng = _setup(algorithm, environment, schedule)
+    condition = fused_condition(agent, env, env.reset())
+    assert condition is not None
+    action, reinforced, state, schedule_id = condition.run()
+    steps = [
+        (a, r, condition.states[s], condition.schedule_ids[k])
+        for a, r, s, k in zip(action.tolist(), reinforced.tolist(), state.tolist(), schedule_id.tolist())
+    ]
+    assert steps == expected
+    assert (agent.get_state(), env.get_state(), rng.random()) == expected_state
+    return condition
+
+
+class TestFusedCondition:
+    @pytest.mark.parametrize("algorithm", sorted(AGENTS))
+    @pytest.mark.parametrize("environment", ["two_choice", "grid_chamber"])
+    @pytest.mark.parametrize("schedule", [FR, VR, FI, VI])
+    def test_matches_step_loop(self, algorithm, environment, schedule):
+        _assert_matches_step_loop(algorithm, environment, schedule)
+
+    @pytest.mark.parametrize("algorithm", sorted(AGENTS))
+    def test_runs_in_chunks(self, algorithm):
+        agent, env, rng = _setup(algorithm, "grid_chamber", VI)
+        expected = _step_loop(agent, env, env.reset())
+
+        agent, env, rng = _setup(algorithm, "grid_chamber", VI)
+        state, steps = env.reset(), []
+        condition = None
+        while condition is None or not condition.done:
+            condition = fused_condition(agent, env, state)
+            action, reinforced, states, _ = condition.run(40)
+            assert len(action) <= 40
+            steps += [
+                (a, r, condition.states[s])
+                for a, r, s in zip(action.tolist(), reinforced.tolist(), states.tolist())
+            ]
+            state = steps[-1][2]
+        assert steps == [(a, r, s) for a, r, s, _ in expected]
+
+    def test_continues_mid_condition(self):
+        agent, env, rng = _setup("q_learning", "grid_chamber", VR)
+        state = env.reset()
+        expected = _step_loop(agent, env, state)
+
+        agent, env, rng = _setup("q_learning", "grid_chamber", VR)
+        env.max_steps = 100
+        head = _step_loop(agent, env, env.reset())
+        env.max_steps = 250
+        condition = fused_condition(agent, env, head[-1][2])
+        action, reinforced, _, _ = condition.run()
+        assert [(a, r) for a, r, _, _ in head] + list(zip(action.tolist(), reinforced.tolist())) == [
+            (a, r) for a, r, _, _ in expected
+        ]
+
+    def test_unsupported_schedule(self):
+        class Always(Schedule):
+            def reset(self):
+                pass
+
+            def check(self, is_target_response):
+                return is_target_response
+
+            def tick(self):
+                pass
+
+        rng = make_rng(1)
+        env = TwoChoiceEnvironment(Always(1), FR(2), max_steps=10)
+        agent = MPRAgent(rng=rng)
+        agent.bind_actions(env.get_available_actions())
+        assert fused_condition(agent, env, env.reset()) is None
+
+    def test_schedule_with_own_generator(self):
+        rng = make_rng(1)
+        env = TwoChoiceEnvironment(VR(3, make_rng(2)), FR(2), max_steps=10)
+        agent = MPRAgent(rng=rng)
+        agent.bind_actions(env.get_available_actions())
+        assert fused_condition(agent, env, env.reset()) is None
+
+    def test_oversized_history_table(self):
+        rng = make_rng(1)
+        env = GridChamberEnvironment(schedule=FR(2, rng), max_steps=10)
+        agent = QLearningAgent(history_window=10, use_history_state=True, rng=rng)
+        agent.bind_actions(env.get_available_actions())
+        assert fused_condition(agent, env, env.reset()) is None
+
+
+class TestCompiledKernels:
+    @pytest.mark.parametrize("algorithm", sorted(AGENTS))
+    @pytest.mark.parametrize("environment, schedule", [("two_choice", VR), ("grid_chamber", FI)])
+    def test_match_step_loop(self, algorithm, environment, schedule):
+        pytest.importorskip("numba")
+        assert fused.NUMBA_AVAILABLE
+        condition = _assert_matches_step_loop(algorithm, environment, schedule)
+        # A Numba dispatcher, not the plain Python function
+        assert hasattr(condition.kernel, "py_func")
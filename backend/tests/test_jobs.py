@@ -0,0 +1,167 @@
+"""Tests for the background job queue."""
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import simulation.jobs as jobs_module
+from simulation.jobs import DONE, FAILED, QUEUED, RUNNING, BoundedPool, JobQueue, QueueFull
+
+
+def _wait(job, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while job.finished is None:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def queue():
+    queue = JobQueue(workers=1, max_queued=2)
+    yield queue
+    queue.shutdown()
+
+
+class TestJobQueue:
+    def test_runs_and_reports_progress(self, queue):
+        def fn(report):
+            report({"steps": 1})
+            report({"steps": 2})
+            return "result"
+
+        job = queue.submit(fn)
+        _wait(job)
+        assert job.status == DONE
+        assert job.result == "result"
+        assert job.progress == {"steps": 2}
+        assert job.reports == [{"steps": 1}, {"steps": 2}]
+        assert job.created <= job.started <= job.finished
+        assert queue.get(job.id) is job
+        assert job.to_dict()["job_id"] == job.id
+
+    def test_failure(self, queue):
+        job = queue.submit(lambda report: 1 / 0)
+        _wait(job)
+        assert job.status == FAILED
+        assert job.error == "division by zero"
+        assert job.result is None
+
+    def test_unknown_job(self, queue):
+        assert queue.get("nope") is None
+
+    def test_queue_depth_limit(self, queue):
+        release = threading.Event()
+        running = queue.submit(lambda report: release.wait(5))
+        while running.status != RUNNING:
+            time.sleep(0.01)
+        waiting = [queue.submit(lambda report: None) for _ in range(2)]
+        assert all(job.status == QUEUED for job in waiting)
+        with pytest.raises(QueueFull):
+            queue.submit(lambda report: None)
+        release.set()
+        for job in waiting:
+            _wait(job)
+        queue.submit(lambda report: None)
+
+    def test_ttl_expiry(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(jobs_module, "time", SimpleNamespace(time=lambda: now[0]))
+        expired = []
+        queue = JobQueue(ttl=60, on_expire=expired.append)
+        try:
+            job = queue.submit(lambda report: 1)
+            _wait(job)
+            now[0] += 59
+            assert queue.get(job.id) is job
+            now[0] += 2
+            assert queue.get(job.id) is None
+            assert expired == [job]
+        finally:
+            queue.shutdown()
+
+    def test_max_finished(self):
+        queue = JobQueue(max_finished=2)
+        try:
+            jobs = []
+            for k in range(3):
+                jobs.append(queue.submit(lambda report, k=k: k))
+                _wait(jobs[-1])
+            assert queue.get(jobs[0].id) is None
+            assert [queue.get(job.id).result for job in jobs[1:]] == [1, 2]
+        finally:
+            queue.shutdown()
+
+    def test_max_bytes(self):
+        expired = []
+        queue = JobQueue(max_bytes=10, sizeof=len, on_expire=expired.append)
+        try:
+            jobs = []
+            for result in ("aaaa", "bbbb", "cccc", "x" * 11):
+                jobs.append(queue.submit(lambda report, result=result: result))
+                _wait(jobs[-1])
+                assert queue.get(jobs[-1].id) is not None or len(result) > 10
+            # Finishing the third dropped the first; the oversized fourth went at once
+            assert expired == [jobs[0], jobs[3]]
+            assert [queue.get(job.id).result for job in jobs[1:3]] == ["bbbb", "cccc"]
+            assert queue.get(jobs[3].id) is None
+        finally:
+            queue.shutdown()
+
+
+class TestBoundedPool:
+    @pytest.mark.asyncio
+    async def test_runs_on_pool_thread(self):
+        pool = BoundedPool(workers=1, max_waiting=0)
+        try:
+            name = await pool.run(lambda: threading.current_thread().name)
+            assert name.startswith("simulate")
+            assert await pool.run(pow, 2, exp=10) == 1024
+            with pytest.raises(ZeroDivisionError):
+                await pool.run(lambda: 1 / 0)
+            assert pool.pending == 0
+        finally:
+            pool.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_saturated(self):
+        pool = BoundedPool(workers=1, max_waiting=1)
+        release = threading.Event()
+        try:
+            running = asyncio.ensure_future(pool.run(release.wait, 5))
+            waiting = asyncio.ensure_future(pool.run(lambda: "waited"))
+            await asyncio.sleep(0)
+            assert pool.pending == 2
+            with pytest.raises(QueueFull):
+                await pool.run(lambda: None)
+            release.set()
+            assert await running is True
+            assert await waiting == "waited"
+            assert pool.pending == 0
+        finally:
+            release.set()
+            pool.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_call_keeps_its_place(self):
+        pool = BoundedPool(workers=1, max_waiting=0)
+        release = threading.Event()
+        try:
+            call = asyncio.ensure_future(pool.run(release.wait, 5))
+            await asyncio.sleep(0.01)
+            call.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await call
+            # The thread is still busy, so there is still no room
+            with pytest.raises(QueueFull):
+                await pool.run(lambda: None)
+            release.set()
+            while pool.pending:
+                await asyncio.sleep(0.01)
+            assert await pool.run(lambda: 1) == 1
+        finally:
+            release.set()
+            pool.shutdown()
+
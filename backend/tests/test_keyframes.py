@@ -0,0 +1,51 @@
+"""Tests for keyframe recording and reconstruction."""
+
+import pytest
+from schedules.reinforcement import VI, VR
+from environments.two_choice import TwoChoiceEnvironment
+from agents.q_learning import QLearningAgent
+from simulation.checkpoint import load_checkpoint
+from simulation.keyframes import Keyframes
+
+
+def _frame(agent, env):
+    frames = Keyframes(every=5)
+    frames.record(0, agent, env, None, 0, False, None)
+    return frames
+
+
+class TestKeyframes:
+    def test_record_snapshots_state(self):
+        agent = QLearningAgent()
+        env = TwoChoiceEnvironment(VR(2), VI(2), max_steps=10)
+        frames = _frame(agent, env)
+        agent.update("s", "choice_a", True, "s")
+        restored = load_checkpoint(frames.frames[0])["agent"]
+        assert restored.history == []
+        assert frames.nbytes == len(frames.frames[0])
+
+    def test_duplicate_step_ignored(self):
+        agent = QLearningAgent()
+        env = TwoChoiceEnvironment(VR(2), VI(2), max_steps=10)
+        frames = _frame(agent, env)
+        frames.record(0, agent, env, None, 0, False, None)
+        assert len(frames) == 1
+
+    def test_step_out_of_range(self):
+        frames = _frame(QLearningAgent(), TwoChoiceEnvironment(VR(2), VI(2), max_steps=10))
+        frames.total_steps = 10
+        with pytest.raises(ValueError):
+            frames.reconstruct(11)
+        with pytest.raises(ValueError):
+            frames.reconstruct(-1)
+
+    def test_reconstruct_replays_from_frame(self):
+        env = TwoChoiceEnvironment(VR(2), VI(2), max_steps=10)
+        frames = _frame(QLearningAgent(), env)
+        frames.total_steps = 10
+        frames.condition_ends = [10]
+        snapshot = frames.reconstruct(4)
+        assert snapshot.step == 4
+        assert snapshot.condition == 1
+        assert snapshot.environment.step_count == 4
+        assert len(snapshot.agent.history) == 4
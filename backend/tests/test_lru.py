@@ -0,0 +1,35 @@
+"""Tests for the LRU store."""
+
+from simulation.lru import LRUStore
+
+
+class TestLRUStore:
+    def test_evicts_least_recently_used(self):
+        store = LRUStore(max_entries=2)
+        assert store.put("a", "1")
+        store.put("b", "2")
+        store.get("a")
+        store.put("c", "3")
+        assert "b" not in store and "a" in store and "c" in store
+
+    def test_on_evict_sees_every_dropped_value(self):
+        dropped = []
+        store = LRUStore(max_entries=2, max_bytes=10, on_evict=dropped.append)
+        store.put("a", "xx")
+        store.put("b", "yy")
+        store.put("c", "zz")
+        assert dropped == ["xx"]
+        store.put("b", "ww")
+        assert dropped == ["xx", "yy"]
+        assert not store.put("d", "x" * 11)
+        assert dropped[-1] == "x" * 11 and "d" not in store
+        store.clear()
+        assert sorted(dropped[-2:]) == ["ww", "zz"]
+
+    def test_pop_returns_without_evicting(self):
+        dropped = []
+        store = LRUStore(on_evict=dropped.append)
+        store.put("a", "xyz")
+        assert store.pop("a") == "xyz"
+        assert store.pop("a") is None
+        assert store.total_bytes == 0 and dropped == []
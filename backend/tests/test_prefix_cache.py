@@ -0,0 +1,51 @@
+"""Tests for the shared-prefix state cache."""
+
+from simulation.prefix_cache import PrefixCache, canonical_hash, prefix_key
+
+
+class TestCanonicalHash:
+    def test_key_order_irrelevant(self):
+        assert canonical_hash({"a": 1, "b": [1, 2]}) == canonical_hash({"b": [1, 2], "a": 1})
+
+    def test_values_matter(self):
+        assert canonical_hash({"seed": 1}) != canonical_hash({"seed": 2})
+
+    def test_prefix_keys_differ_by_length(self):
+        conds = [{"label": "A"}, {"label": "B"}]
+        assert prefix_key("k", conds[:1]) != prefix_key("k", conds)
+
+
+class TestPrefixCache:
+    def test_longest_prefix(self):
+        cache = PrefixCache()
+        conds = [{"label": "A"}, {"label": "B"}, {"label": "C"}]
+        cache.put(prefix_key("k", conds[:1]), b"one")
+        cache.put(prefix_key("k", conds[:2]), b"two")
+        assert cache.longest_prefix("k", conds) == (2, b"two")
+        assert cache.longest_prefix("k", [{"label": "A"}, {"label": "X"}]) == (1, b"one")
+        assert cache.longest_prefix("other", conds) == (0, None)
+        assert (cache.hits, cache.misses) == (2, 1)
+
+    def test_evicts_least_recently_used(self):
+        cache = PrefixCache(max_entries=2)
+        cache.put("a", b"1")
+        cache.put("b", b"2")
+        cache.get("a")
+        cache.put("c", b"3")
+        assert "a" in cache and "c" in cache and "b" not in cache
+
+    def test_byte_budget(self):
+        cache = PrefixCache(max_bytes=10)
+        cache.put("a", b"123456")
+        cache.put("b", b"123456")
+        assert len(cache) == 1 and cache.total_bytes == 6
+        cache.put("huge", b"x" * 11)
+        assert "huge" not in cache
+
+    def test_replace_updates_size(self):
+        cache = PrefixCache()
+        cache.put("a", b"12")
+        cache.put("a", b"1234")
+        assert cache.total_bytes == 4
+        cache.clear()
+        assert len(cache) == 0 and cache.total_bytes == 0
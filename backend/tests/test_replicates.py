@@ -0,0 +1,213 @@
+"""Tests for parallel replicates and their streaming aggregation."""
+
+from functools import partial
+
+import numpy as np
+import pytest
+
+from agents.mpr import MPRAgent
+from environments.two_choice import TwoChoiceEnvironment
+from schedules.reinforcement import VI, VR
+from simulation.replicates import (
+    PrecisionTarget,
+    QuantileSketch,
+    ReplicateAggregate,
+    ReplicateExecutor,
+    RunningStats,
+    replicate_seeds,
+    summary_metrics,
+    t_quantile,
+)
+from simulation.runner import SimulationRunner
+
+
+def _mpr_job(rng):
+    env = TwoChoiceEnvironment(VR(3, rng), VI(5, rng), max_steps=200)
+    result = SimulationRunner(MPRAgent(rng=rng), env).run(rng=rng, record_steps=False)
+    return summary_metrics(result, env.ACTIONS)
+
+
+class TestRunningStats:
+    def test_matches_numpy(self):
+        values = np.random.default_rng(1).normal(3, 2, size=500)
+        stats = RunningStats()
+        for x in values:
+            stats.update(x)
+        assert stats.count == 500
+        assert stats.mean == pytest.approx(values.mean())
+        assert stats.sd == pytest.approx(values.std(ddof=1))
+        assert (stats.min, stats.max) == (values.min(), values.max())
+
+    def test_single_value_has_no_sd(self):
+        stats = RunningStats()
+        stats.update(4.0)
+        assert stats.sd is None
+
+
+class TestQuantileSketch:
+    def test_exact_below_capacity(self):
+        sketch = QuantileSketch(k=64)
+        for x in range(1, 51):
+            sketch.update(float(x))
+        assert sketch.quantile(0.5) == 25
+        assert sketch.quantile(0.0) == 1
+        assert sketch.quantile(1.0) == 50
+
+    def test_approximate_and_bounded(self):
+        values = np.random.default_rng(2).random(20000)
+        sketch = QuantileSketch(k=128)
+        for x in values:
+            sketch.update(x)
+        assert sum(len(level) for level in sketch.levels) < 128 * 10
+        for q in (0.05, 0.5, 0.95):
+            assert sketch.quantile(q) == pytest.approx(np.quantile(values, q), abs=0.02)
+
+    def test_empty(self):
+        assert QuantileSketch().quantile(0.5) is None
+
+
+def _noise_job(sd, rng):
+    return {"x": float(rng.normal(0.0, sd))}
+
+
+class TestTQuantile:
+    @pytest.mark.parametrize("p,df,expected", [
+        (0.975, 1, 12.706205),
+        (0.975, 2, 4.302653),
+        (0.975, 3, 3.182446),
+        (0.995, 3, 5.840909),
+        (0.975, 9, 2.262157),
+        (0.95, 30, 1.697261),
+        (0.975, 1000, 1.962339),
+    ])
+    def test_table_values(self, p, df, expected):
+        assert t_quantile(p, df) == pytest.approx(expected, rel=1e-6)
+
+    def test_symmetric(self):
+        assert t_quantile(0.025, 5) == -t_quantile(0.975, 5)
+        assert t_quantile(0.5, 5) == 0
+
+
+class TestPrecisionTarget:
+    def _aggregate(self, values):
+        aggregate = ReplicateAggregate()
+        for index, x in enumerate(values):
+            aggregate.add(index, {"x": x})
+        return aggregate
+
+    def test_half_width(self):
+        values = [1.0, 2.0, 3.0, 4.0]
+        target = PrecisionTarget("x", 0.1)
+        expected = t_quantile(0.975, 3) * np.std(values, ddof=1) / 2
+        assert target.current_half_width(self._aggregate(values)) == pytest.approx(expected)
+
+    def test_next_wave_projects_needed_replicates(self):
+        target = PrecisionTarget("x", 0.5, min_replicates=4)
+        aggregate = self._aggregate([1.0, 2.0, 3.0, 4.0])
+        # Half-width 2.054 is 4.1 times the target: about 68 replicates needed
+        assert target.next_wave(aggregate, 1000) == 64
+        assert target.next_wave(aggregate, 10) == 6
+        assert target.next_wave(aggregate, 4) == 0
+
+    def test_stops_when_met(self):
+        target = PrecisionTarget("x", 0.5)
+        aggregate = self._aggregate([1.0, 1.1, 0.9])
+        assert target.next_wave(aggregate, 100) == 0
+        assert target.report(aggregate)["met"]
+
+    def test_unknown_metric(self):
+        with pytest.raises(ValueError, match="Unknown metric"):
+            PrecisionTarget("y", 0.5).next_wave(self._aggregate([1.0, 2.0]), 10)
+
+    @pytest.mark.parametrize("kwargs", [{"half_width": 0}, {"confidence": 1.0}, {"min_replicates": 1}])
+    def test_invalid(self, kwargs):
+        with pytest.raises(ValueError):
+            PrecisionTarget("x", **{"half_width": 0.1, **kwargs})
+
+
+class TestReplicateAggregate:
+    def test_independent_of_arrival_order(self):
+        metrics = [{"x": float(v), "y": float(v * v)} for v in np.random.default_rng(3).random(300)]
+        in_order, shuffled = ReplicateAggregate(sketch_size=32), ReplicateAggregate(sketch_size=32)
+        for index, m in enumerate(metrics):
+            in_order.add(index, m)
+        for index in np.random.default_rng(4).permutation(len(metrics)).tolist():
+            shuffled.add(index, metrics[index])
+        assert shuffled.folded == 300
+        assert shuffled.result() == in_order.result()
+
+    def test_waits_for_earlier_replicates(self):
+        aggregate = ReplicateAggregate()
+        aggregate.add(1, {"x": 1.0})
+        assert aggregate.folded == 0
+        assert aggregate.result() == {}
+        aggregate.add(0, {"x": 3.0})
+        assert aggregate.result()["x"]["mean"] == 2.0
+
+
+class TestReplicateExecutor:
+    def test_seeds_are_spawned_children(self):
+        entropy, seeds = replicate_seeds(9, 3)
+        assert entropy == 9
+        assert [s.spawn_key for s in seeds] == [(0,), (1,), (2,)]
+
+    def test_in_process(self):
+        result = ReplicateExecutor().run(_mpr_job, 5, seed=8)
+        assert result["seed"] == 8 and result["replicates"] == 5
+        stats = result["metrics"]["reinforcement_rate"]
+        assert stats["count"] == 5
+        assert stats["min"] <= stats["quantiles"]["0.5"] <= stats["max"]
+        assert set(result["metrics"]) == {
+            "total_steps", "total_reinforcements", "reinforcement_rate",
+            "proportion_choice_a", "proportion_choice_b",
+        }
+
+    def test_identical_for_any_worker_count(self):
+        expected = ReplicateExecutor().run(_mpr_job, 12, seed=8)
+        for workers in (1, 3):
+            with ReplicateExecutor(workers=workers) as executor:
+                assert executor.run(_mpr_job, 12, seed=8) == expected
+
+    def test_pool_is_reused(self):
+        with ReplicateExecutor(workers=1) as executor:
+            executor.run(_mpr_job, 2, seed=1)
+            pool = executor._pool
+            executor.run(_mpr_job, 2, seed=2)
+            assert executor._pool is pool
+        assert executor._pool is None
+
+
+class TestAdaptiveReplicates:
+    def test_stops_early_on_low_variance(self):
+        job = partial(_noise_job, 0.1)
+        result = ReplicateExecutor().run(job, 1000, seed=3, target=PrecisionTarget("x", 0.1))
+        assert result["replicates"] == 10
+        assert result["precision"]["met"]
+        assert result["precision"]["half_width"] <= 0.1
+
+    def test_more_replicates_for_noisier_jobs(self):
+        used = [
+            ReplicateExecutor().run(partial(_noise_job, sd), 5000, seed=3, target=PrecisionTarget("x", 0.05))
+            for sd in (0.1, 0.5, 1.0)
+        ]
+        counts = [r["replicates"] for r in used]
+        assert counts[0] < counts[1] < counts[2]
+        assert all(r["precision"]["met"] for r in used)
+        # The projection lands close to the (sd * 1.96 / 0.05)**2 needed
+        assert counts[2] < 1.5 * (1.96 / 0.05) ** 2
+
+    def test_capped_at_maximum(self):
+        result = ReplicateExecutor().run(partial(_noise_job, 1.0), 30, seed=3, target=PrecisionTarget("x", 0.01))
+        assert result["replicates"] == 30
+        assert not result["precision"]["met"]
+
+    def test_same_replicates_as_fixed_run(self):
+        adaptive = ReplicateExecutor().run(partial(_noise_job, 0.5), 500, seed=4, target=PrecisionTarget("x", 0.1))
+        fixed = ReplicateExecutor().run(partial(_noise_job, 0.5), adaptive["replicates"], seed=4)
+        assert adaptive["metrics"] == fixed["metrics"]
+
+    def test_identical_for_any_worker_count(self):
+        target = PrecisionTarget("reinforcement_rate", 0.01, min_replicates=4)
+        expected = ReplicateExecutor().run(_mpr_job, 40, seed=8, target=target)
+        with ReplicateExecutor(workers=2) as executor:
+            assert executor.run(_mpr_job, 40, seed=8, target=target) == expected
@@ -0,0 +1,77 @@
+"""Tests for the simulation result cache."""
+
+import gc
+import os
+
+from simulation.result_cache import ResultCache, result_nbytes
+from simulation.runner import SimulationResult
+from simulation.steplog import StepLog
+
+
+def _spilled_files(cache):
+    return os.listdir(cache.spill_dir)
+
+
+class TestResultCache:
+    def test_evicts_least_recently_used(self):
+        cache = ResultCache(max_entries=2, sizeof=len)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")
+        cache.put("c", "3")
+        assert "a" in cache and "c" in cache and "b" not in cache
+        assert cache.get("b") is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_byte_budget(self):
+        cache = ResultCache(max_bytes=10, sizeof=len)
+        cache.put("a", "x" * 6)
+        cache.put("b", "y" * 6)
+        assert "a" not in cache and cache.memory_bytes == 6
+        cache.put("huge", "z" * 11)
+        assert "huge" not in cache
+
+    def test_spill_and_reload(self, tmp_path):
+        cache = ResultCache(max_entries=1, spill_dir=str(tmp_path), sizeof=len)
+        cache.put("a", "first")
+        cache.put("b", "second")
+        assert "a" in cache and len(cache) == 2
+        assert len(_spilled_files(cache)) == 1 and cache.disk_bytes > 0
+        assert cache.get("a") == "first"
+        # Reloading "a" spilled "b" in its place
+        assert cache.get("b") == "second"
+        assert len(_spilled_files(cache)) == 1
+
+    def test_too_large_for_memory_is_spilled(self, tmp_path):
+        cache = ResultCache(max_bytes=4, spill_dir=str(tmp_path), sizeof=len)
+        cache.put("a", "x" * 5)
+        assert cache.memory_bytes == 0
+        assert cache.get("a") == "x" * 5
+
+    def test_disk_budget(self, tmp_path):
+        cache = ResultCache(max_entries=1, spill_dir=str(tmp_path), max_disk_bytes=100, sizeof=len)
+        cache.put("a", "x" * 60)
+        cache.put("b", "y" * 60)
+        cache.put("c", "z" * 60)
+        assert "a" not in cache and "b" in cache and "c" in cache
+        assert len(_spilled_files(cache)) == 1
+
+    def test_clear_and_cleanup(self, tmp_path):
+        cache = ResultCache(max_entries=1, spill_dir=str(tmp_path), sizeof=len)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.clear()
+        assert len(cache) == 0 and _spilled_files(cache) == []
+        cache.put("a", "1")
+        cache.put("b", "2")
+        spill_dir = cache.spill_dir
+        del cache
+        gc.collect()
+        assert not os.path.exists(spill_dir)
+        assert os.listdir(tmp_path) == []
+
+    def test_result_nbytes(self):
+        steps = StepLog(["A", "B"], capacity=100)
+        result = SimulationResult(config={}, steps=steps, summary={})
+        # step 8 + state 4 + action 2 + reinforced 1 + schedule 2 + condition 2 bytes
+        assert result_nbytes(result) == 100 * 19
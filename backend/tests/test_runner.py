@@ -1,13 +1,26 @@
 """Tests for SimulationRunner."""
 
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from types import SimpleNamespace
+
 import numpy as np
 import pytest
 from unittest.mock import MagicMock
-from schedules.reinforcement import FR, VI
+from schedules.reinforcement import FR, VR, VI
 from environments.two_choice import TwoChoiceEnvironment
 from environments.grid_chamber import GridChamberEnvironment
+from agents.base import AbstractAgent, ActionIdAdapter, action_id_agent
+from agents.etbd import ETBDAgent
+from agents.mpr import MPRAgent
 from agents.q_learning import QLearningAgent
-from simulation.runner import SimulationRunner
+from simulation.analytics import Changeovers, InterReinforcementIntervals, WindowedRates
+from simulation.checkpoint import CheckpointFile, load_checkpoint
+from simulation.prefix_cache import PrefixCache
+from simulation import fused
+from simulation import runner as runner_module
+from simulation.profiling import PhaseProfile
+from simulation.runner import SimulationRunner, make_rng
 
 
 class TestRunnerSingleCondition:
@@ -84,6 +97,43 @@ class TestRunnerSingleCondition:
         assert "visit_counts" in result.summary
 
 
+def _swap_vr_vi(env, cond):
+    """Swap function for conditions of ``{"max_steps", "value"}``: VR and VI at `value`."""
+    env.max_steps = cond["max_steps"]
+    env.schedule_a = VR(cond["value"])
+    env.schedule_b = VI(cond["value"])
+
+
+def _vr_vi_conditions(*specs):
+    """Conditions A, B, ... for `_swap_vr_vi`, from ``(max_steps, value)`` pairs."""
+    return [
+        {"label": chr(ord("A") + k), "max_steps": max_steps, "value": value}
+        for k, (max_steps, value) in enumerate(specs)
+    ]
+
+
+def _vr_vi_runner(agent, **kwargs):
+    """A runner of `agent` on a two-choice environment, for `_swap_vr_vi` conditions."""
+    return SimulationRunner(agent, TwoChoiceEnvironment(VR(2), VI(2), max_steps=40), **kwargs)
+
+
+def _run_conditions(agent, conditions, seed, **kwargs):
+    """Run `conditions` with `_vr_vi_runner(agent, **kwargs)`; returns the runner and the result."""
+    runner = _vr_vi_runner(agent, **kwargs)
+    return runner, runner.run_multi_condition(conditions, _swap_vr_vi, seed=seed)
+
+
+def _same(a, b):
+    assert a.steps.to_dicts() == b.steps.to_dicts()
+    assert a.summary == b.summary
+    assert a.condition_summaries == b.condition_summaries
+    # Including the order actions were first taken in
+    assert [list(s["action_counts"]) for s in a.condition_summaries] == [
+        list(s["action_counts"]) for s in b.condition_summaries
+    ]
+    assert a.config == b.config
+
+
 class TestRunnerMultiCondition:
     def _swap(self, env, cond):
         env.max_steps = cond["max_steps"]
@@ -103,6 +153,24 @@ class TestRunnerMultiCondition:
         assert len(result.condition_summaries) == 2
         assert result.summary["total_steps"] == 50
 
+    @pytest.mark.parametrize("seed", [1, 2, 3, 4])
+    def test_action_counts_in_first_taken_order(self, seed):
+        env = TwoChoiceEnvironment(FR(5), FR(5), max_steps=50)
+        runner = SimulationRunner(QLearningAgent(), env)
+        conditions = [
+            {"label": "A", "max_steps": 30, "schedule_a_value": 5, "schedule_b_value": 5},
+            {"label": "B", "max_steps": 20, "schedule_a_value": 3, "schedule_b_value": 3},
+        ]
+        result = runner.run_multi_condition(conditions, self._swap, seed=seed)
+
+        def first_taken(steps):
+            return list(dict.fromkeys(s["action"] for s in steps))
+
+        steps = result.steps.to_dicts()
+        assert list(result.summary["action_counts"]) == first_taken(steps)
+        for cs in result.condition_summaries:
+            assert list(cs["action_counts"]) == first_taken(s for s in steps if s["condition"] == cs["condition"])
+
     def test_agent_not_reset_between_conditions(self):
         agent = QLearningAgent()
         env = TwoChoiceEnvironment(FR(1), FR(1), max_steps=10)
@@ -178,3 +246,630 @@ class TestRunnerMultiCondition:
         result = runner.run_multi_condition(conditions, self._swap, seed=42)
         total = sum(cs["total_steps"] for cs in result.condition_summaries)
         assert result.summary["total_steps"] == total
+
+
+class StringOnlyAgent(AbstractAgent):
+    """Minimal agent without the integer action-id protocol."""
+
+    def __init__(self):
+        self.seen = []
+
+    def select_action(self, state, available_actions):
+        return available_actions[-1]
+
+    def update(self, state, action, reinforced, next_state):
+        self.seen.append(action)
+
+    def reset(self):
+        self.seen = []
+
+    def get_params(self):
+        return {}
+
+    @property
+    def name(self):
+        return "string_only"
+
+
+class TestRunnerActionIds:
+    def test_string_agent_runs_through_adapter(self):
+        agent = StringOnlyAgent()
+        env = TwoChoiceEnvironment(FR(1), FR(1), max_steps=10)
+        result = SimulationRunner(agent, env).run(seed=42)
+        assert agent.seen == ["choice_b"] * 10
+        assert result.summary["action_counts"] == {"choice_b": 10}
+        assert all(s["action"] == "choice_b" for s in result.steps)
+
+    def test_adapter_maps_ids(self):
+        adapter = ActionIdAdapter(StringOnlyAgent(), ["x", "y", "z"])
+        assert adapter.select_action_id("s") == 2
+        adapter.update_id("s", 0, False, "s")
+        assert adapter.agent.seen == ["x"]
+
+    def test_native_agents_not_wrapped(self):
+        agent = QLearningAgent()
+        assert action_id_agent(agent, ["choice_a", "choice_b"]) is agent
+        assert agent.action_names == ("choice_a", "choice_b")
+
+    def test_grid_log_records_taken_action(self):
+        env = GridChamberEnvironment(schedule=FR(1), max_steps=30, lever_pos=(4, 4))
+        result = SimulationRunner(StringOnlyAgent(), env).run(seed=1)
+        # press_lever far from the lever is recorded as "stay"
+        assert result.steps[0]["action"] == "stay"
+        assert result.steps[0]["state"] == "(0, 0)"
+
+    def test_steps_are_columnar(self):
+        env = TwoChoiceEnvironment(FR(2), FR(2), max_steps=25)
+        result = SimulationRunner(QLearningAgent(), env).run(seed=42)
+        assert len(result.steps) == 25
+        assert result.steps.step.tolist()[:25] == list(range(1, 26))
+        assert int(result.steps.reinforced[:25].sum()) == result.summary["total_reinforcements"]
+
+
+class TestRunnerBatch:
+    SEEDS = [3, 7, 11]
+
+    @pytest.mark.parametrize("make_agent", [
+        lambda: QLearningAgent(),
+        lambda: MPRAgent(environment_type="two_choice"),
+        lambda: ETBDAgent(population_size=10),
+    ])
+    def test_two_choice_matches_single_runs(self, make_agent):
+        def make_env():
+            return TwoChoiceEnvironment(VI(3), VR(4), max_steps=40)
+
+        batch = SimulationRunner(make_agent(), make_env()).run_batch(self.SEEDS)
+        for seed, result in zip(self.SEEDS, batch):
+            _same(result, SimulationRunner(make_agent(), make_env()).run(seed=seed))
+
+    @pytest.mark.parametrize("make_agent", [
+        lambda: QLearningAgent(use_history_state=False),
+        lambda: MPRAgent(environment_type="grid_chamber", schedule_type="VR"),
+    ])
+    def test_grid_matches_single_runs(self, make_agent):
+        def make_env():
+            return GridChamberEnvironment(rows=3, cols=4, lever_pos=(1, 1), schedule=VR(2), max_steps=60)
+
+        batch = SimulationRunner(make_agent(), make_env()).run_batch(self.SEEDS)
+        for seed, result in zip(self.SEEDS, batch):
+            _same(result, SimulationRunner(make_agent(), make_env()).run(seed=seed))
+
+    def test_without_step_logs(self):
+        env = TwoChoiceEnvironment(FR(2), FR(3), max_steps=30)
+        results = SimulationRunner(QLearningAgent(), env).run_batch([1, 2], record_steps=False)
+        assert all(len(r.steps) == 0 for r in results)
+        assert all(r.summary["total_steps"] == 30 for r in results)
+
+    def test_string_only_agent(self):
+        env = TwoChoiceEnvironment(FR(1), FR(1), max_steps=5)
+        results = SimulationRunner(StringOnlyAgent(), env).run_batch([1, 2])
+        assert [r.summary["action_counts"] for r in results] == [{"choice_b": 5}] * 2
+
+
+class TestRunnerRng:
+    def _make(self, kind):
+        if kind == "q_learning":
+            return SimulationRunner(QLearningAgent(), TwoChoiceEnvironment(VI(3), VR(4), max_steps=80))
+        if kind == "etbd":
+            return SimulationRunner(ETBDAgent(population_size=20), TwoChoiceEnvironment(VR(2), VI(5), max_steps=80))
+        return SimulationRunner(
+            MPRAgent(environment_type="grid_chamber", schedule_type="VR"),
+            GridChamberEnvironment(rows=3, cols=3, schedule=VR(2), max_steps=80),
+        )
+
+    def _run(self, kind, seed):
+        return self._make(kind).run(seed=seed).steps.to_dicts()
+
+    def test_explicit_rng_matches_seed(self):
+        by_seed = self._make("etbd").run(seed=7)
+        by_rng = self._make("etbd").run(rng=make_rng(7))
+        assert by_seed.steps.to_dicts() == by_rng.steps.to_dicts()
+
+    def test_global_state_not_used(self):
+        np.random.seed(1)
+        r1 = self._run("q_learning", 11)
+        np.random.seed(2)
+        r2 = self._run("q_learning", 11)
+        assert r1 == r2
+
+    def test_multi_condition_swapped_schedules_use_run_rng(self):
+        def swap(env, cond):
+            env.max_steps = cond["max_steps"]
+            env.schedule_a = VR(cond["value"])
+            env.schedule_b = VI(cond["value"])
+
+        def run():
+            env = TwoChoiceEnvironment(VR(2), VI(2), max_steps=30)
+            runner = SimulationRunner(QLearningAgent(), env)
+            conditions = [
+                {"label": "A", "max_steps": 30, "value": 2},
+                {"label": "B", "max_steps": 30, "value": 3},
+            ]
+            return runner.run_multi_condition(conditions, swap, seed=5).steps.to_dicts()
+
+        assert run() == run()
+
+    def test_concurrent_runs_match_sequential(self):
+        jobs = [(kind, seed) for kind in ("q_learning", "etbd", "mpr") for seed in range(4)]
+        expected = [self._run(kind, seed) for kind, seed in jobs]
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            got = list(pool.map(lambda job: self._run(*job), jobs))
+        assert got == expected
+
+
+class TestRunnerCheckpoint:
+    CONDITIONS = _vr_vi_conditions((40, 2), (35, 4))
+
+    @pytest.mark.parametrize("make", [
+        lambda: (QLearningAgent(), TwoChoiceEnvironment(VI(3), VR(4), max_steps=100)),
+        lambda: (ETBDAgent(population_size=20), TwoChoiceEnvironment(VR(2), VI(5), max_steps=100)),
+        lambda: (
+            MPRAgent(environment_type="grid_chamber", schedule_type="VR"),
+            GridChamberEnvironment(rows=3, cols=3, schedule=VR(2), max_steps=100),
+        ),
+    ])
+    def test_resume_matches_uninterrupted(self, make):
+        expected = SimulationRunner(*make()).run(seed=4)
+        snapshots = []
+        SimulationRunner(*make(), checkpoint_every=30, on_checkpoint=snapshots.append).run(seed=4)
+        assert len(snapshots) == 3
+        for k in range(len(snapshots)):
+            _same(SimulationRunner.from_checkpoint(snapshots[:k + 1]).resume(), expected)
+
+    def test_multi_condition_resume(self):
+        expected = _vr_vi_runner(QLearningAgent()).run_multi_condition(self.CONDITIONS, _swap_vr_vi, seed=8)
+        snapshots = []
+        _vr_vi_runner(QLearningAgent(), checkpoint_every=20, on_checkpoint=snapshots.append).run_multi_condition(
+            self.CONDITIONS, _swap_vr_vi, seed=8
+        )
+        # Steps 20 and 60; step 40 ends condition A and is not snapshotted
+        assert len(snapshots) == 2
+        for k in range(len(snapshots)):
+            resumed = SimulationRunner.from_checkpoint(snapshots[:k + 1]).resume(_swap_vr_vi)
+            _same(resumed, expected)
+
+    def test_extra_steps_extend_finished_run(self):
+        def make_runner():
+            return SimulationRunner(QLearningAgent(), TwoChoiceEnvironment(VI(3), VR(4), max_steps=60))
+
+        expected = make_runner().run(seed=2)
+        runner = make_runner()
+        runner.environment.max_steps = 45
+        runner.run(seed=2)
+        extended = SimulationRunner.from_checkpoint(runner.checkpoint()).resume(extra_steps=15)
+        _same(extended, expected)
+
+    def test_periodic_file_checkpoint(self, tmp_path):
+        target = CheckpointFile(str(tmp_path / "run.ckpt"))
+        env = TwoChoiceEnvironment(FR(2), FR(3), max_steps=50)
+        expected = SimulationRunner(QLearningAgent(), env, checkpoint_every=16, on_checkpoint=target).run(seed=1)
+        resumed = SimulationRunner.from_checkpoint(target.read())
+        assert resumed.progress.log.size == 48
+        _same(resumed.resume(), expected)
+
+    def test_periodic_checkpoints_hold_new_rows(self):
+        snapshots = []
+        env = TwoChoiceEnvironment(VI(3), VR(4), max_steps=100)
+        SimulationRunner(QLearningAgent(), env, checkpoint_every=30, on_checkpoint=snapshots.append).run(seed=6)
+        rows = [load_checkpoint(data)["rows"] for data in snapshots]
+        assert [part["start"] for part in rows] == [0, 30, 60]
+        assert [len(part["columns"]["step"]) for part in rows] == [30, 30, 30]
+
+    def test_resume_needs_earlier_checkpoints(self):
+        snapshots = []
+        env = TwoChoiceEnvironment(VI(3), VR(4), max_steps=90)
+        SimulationRunner(QLearningAgent(), env, checkpoint_every=30, on_checkpoint=snapshots.append).run(seed=6)
+        with pytest.raises(ValueError):
+            SimulationRunner.from_checkpoint(snapshots[1])
+
+    def test_resume_without_run(self):
+        runner = SimulationRunner(QLearningAgent(), TwoChoiceEnvironment(FR(1), FR(1)))
+        with pytest.raises(RuntimeError):
+            runner.resume()
+
+
+class TestRunnerPrefixCache:
+    def _run(self, conditions, **kwargs):
+        return _vr_vi_runner(ETBDAgent(population_size=15)).run_multi_condition(
+            conditions, _swap_vr_vi, seed=6, **kwargs
+        )
+
+    BASELINE = {"label": "Baseline", "max_steps": 30, "value": 2}
+
+    def test_suffix_reuses_prefix(self):
+        cache = PrefixCache()
+        first = [self.BASELINE, {"label": "Ext", "max_steps": 20, "value": 50}]
+        second = [self.BASELINE, {"label": "Alt", "max_steps": 25, "value": 4}]
+        self._run(first, prefix_cache=cache, cache_key="k")
+        assert len(cache) == 2
+        reused = self._run(second, prefix_cache=cache, cache_key="k")
+        assert cache.hits == 1
+        _same(reused, self._run(second))
+
+    def test_identical_request_fully_cached(self):
+        cache = PrefixCache()
+        conditions = [self.BASELINE, {"label": "B", "max_steps": 10, "value": 3}]
+        first = self._run(conditions, prefix_cache=cache, cache_key="k")
+        again = self._run(conditions, prefix_cache=cache, cache_key="k")
+        _same(first, again)
+
+    def test_longer_request_extends_cached_run(self):
+        cache = PrefixCache()
+        self._run([self.BASELINE], prefix_cache=cache, cache_key="k")
+        longer = [self.BASELINE, {"label": "B", "max_steps": 10, "value": 3}]
+        _same(self._run(longer, prefix_cache=cache, cache_key="k"), self._run(longer))
+
+    def test_requires_cache_key(self):
+        cache = PrefixCache()
+        self._run([self.BASELINE], prefix_cache=cache)
+        assert len(cache) == 0
+
+    def test_keyframed_run_skips_cache(self):
+        cache = PrefixCache()
+        runner = _vr_vi_runner(ETBDAgent(population_size=15), keyframe_every=5)
+        runner.run_multi_condition([self.BASELINE], _swap_vr_vi, seed=6, prefix_cache=cache, cache_key="k")
+        assert len(cache) == 0
+
+
+class TestRunnerKeyframes:
+    CONDITIONS = _vr_vi_conditions((21, 2), (14, 5))
+
+    def _view(self, snapshot):
+        return (
+            snapshot.agent.get_state(),
+            snapshot.environment.get_state(),
+            snapshot.condition,
+            snapshot.observation,
+        )
+
+    def _run(self, make_agent, **kwargs):
+        return _run_conditions(make_agent(), self.CONDITIONS, 3, **kwargs)
+
+    @pytest.mark.parametrize("make_agent", [
+        lambda: QLearningAgent(),
+        lambda: ETBDAgent(population_size=12),
+        lambda: MPRAgent(),
+    ])
+    def test_any_interval_gives_same_state(self, make_agent):
+        every_step, _ = self._run(make_agent, keyframe_every=1)
+        sparse, result = self._run(make_agent, keyframe_every=7)
+        assert sparse.keyframes.steps == [0, 7, 14, 21, 28, 35]
+        for step in range(result.summary["total_steps"] + 1):
+            assert self._view(sparse.reconstruct(step, _swap_vr_vi)) == self._view(
+                every_step.reconstruct(step, _swap_vr_vi)
+            )
+
+    def test_matches_checkpointed_run(self):
+        snapshots = []
+        runner, _ = self._run(
+            QLearningAgent, keyframe_every=8, checkpoint_every=1, on_checkpoint=snapshots.append
+        )
+        for k in range(len(snapshots)):
+            resumed = SimulationRunner.from_checkpoint(snapshots[:k + 1])
+            step = resumed.progress.log.size
+            snapshot = runner.reconstruct(step, _swap_vr_vi)
+            assert snapshot.agent.get_state() == resumed.agent.get_state()
+            assert snapshot.environment.get_state() == resumed.environment.get_state()
+
+    def test_final_step_matches_finished_run(self):
+        runner, result = self._run(ETBDAgent, keyframe_every=10)
+        snapshot = runner.reconstruct(result.summary["total_steps"], _swap_vr_vi)
+        assert snapshot.agent.get_state() == runner.agent.get_state()
+        assert snapshot.condition == 2
+
+    def test_step_zero_is_first_condition_start(self):
+        runner, result = self._run(QLearningAgent, keyframe_every=10)
+        snapshot = runner.reconstruct(0, _swap_vr_vi)
+        assert snapshot.condition == 1
+        assert snapshot.environment.step_count == 0
+        assert snapshot.environment.max_steps == 21
+
+    def test_result_carries_keyframes(self):
+        env = TwoChoiceEnvironment(FR(1), FR(1), max_steps=12)
+        runner = SimulationRunner(QLearningAgent(), env, keyframe_every=5)
+        result = runner.run(seed=1)
+        assert result.keyframes is runner.keyframes
+        assert result.keyframes.total_steps == 12
+        assert runner.reconstruct(7).environment.step_count == 7
+
+    def test_no_keyframes_by_default(self):
+        runner = SimulationRunner(QLearningAgent(), TwoChoiceEnvironment(FR(1), FR(1), max_steps=5))
+        assert runner.run(seed=1).keyframes is None
+        with pytest.raises(RuntimeError):
+            runner.reconstruct(1)
+
+
+class TestRunnerStability:
+    # Exclusive FR 1 on choice_b: responding settles quickly
+    STABLE = {"window": 20, "blocks": 3, "tolerance": 0.5, "metric": "reinforcement_rate"}
+
+    def _conditions(self, stability=None, first_steps=400):
+        first = {"label": "A", "max_steps": first_steps, "value": 1}
+        if stability:
+            first["stability"] = stability
+        return [first, {"label": "B", "max_steps": 30, "value": 3}]
+
+    def _run(self, conditions, **kwargs):
+        return _run_conditions(QLearningAgent(), conditions, 4, **kwargs)
+
+    def test_ends_condition_early(self):
+        _, result = self._run(self._conditions(self.STABLE))
+        first, second = result.condition_summaries
+        assert first["total_steps"] < 400
+        assert first["total_steps"] % 20 == 0
+        assert first["stable_step"] == first["end_step"]
+        assert second["start_step"] == first["end_step"] + 1
+        assert "stable_step" not in second
+
+    def test_same_as_fixed_length_condition(self):
+        _, early = self._run(self._conditions(self.STABLE))
+        stopped_at = early.condition_summaries[0]["total_steps"]
+        _, fixed = self._run(self._conditions(first_steps=stopped_at))
+        assert early.steps.to_dicts() == fixed.steps.to_dicts()
+
+    def test_unmet_criterion_runs_to_max_steps(self):
+        strict = dict(self.STABLE, tolerance=0.0, min_steps=10000)
+        _, result = self._run(self._conditions(strict))
+        assert result.condition_summaries[0]["total_steps"] == 400
+        assert result.condition_summaries[0]["stable_step"] is None
+
+    def test_resume_and_keyframes_across_early_end(self):
+        snapshots = []
+        runner, expected = self._run(
+            self._conditions(self.STABLE),
+            checkpoint_every=7, on_checkpoint=snapshots.append, keyframe_every=9,
+        )
+        for k in range(0, len(snapshots), 5):
+            resumed = SimulationRunner.from_checkpoint(snapshots[:k + 1]).resume(_swap_vr_vi)
+            assert resumed.steps.to_dicts() == expected.steps.to_dicts()
+            assert resumed.condition_summaries == expected.condition_summaries
+        dense, _ = self._run(self._conditions(self.STABLE), keyframe_every=1)
+        for step in range(expected.summary["total_steps"] + 1):
+            a, b = runner.reconstruct(step, _swap_vr_vi), dense.reconstruct(step, _swap_vr_vi)
+            assert a.agent.get_state() == b.agent.get_state()
+            assert a.condition == b.condition
+
+
+class TestRunnerAnalytics:
+    ANALYTICS = (WindowedRates, Changeovers, InterReinforcementIntervals)
+
+    CONDITIONS = _vr_vi_conditions((230, 3), (170, 8))
+
+    def _run(self, record_steps=True, **kwargs):
+        runner = _vr_vi_runner(MPRAgent(environment_type="two_choice"), analytics=self.ANALYTICS, **kwargs)
+        return runner.run_multi_condition(self.CONDITIONS, _swap_vr_vi, seed=12, record_steps=record_steps)
+
+    def test_results_per_condition(self):
+        result = self._run()
+        for summary in result.condition_summaries:
+            rows = [r for r in result.steps.to_dicts() if r["condition"] == summary["condition"]]
+            actions = [r["action"] for r in rows]
+            switches = sum(a != b for a, b in zip(actions, actions[1:]))
+            analytics = summary["analytics"]
+            assert set(analytics) == {"windowed_rates", "changeovers", "inter_reinforcement"}
+            assert analytics["changeovers"]["count"] == switches
+            reinforced_at = [k for k, r in enumerate(rows) if r["reinforced"]]
+            assert analytics["inter_reinforcement"]["count"] == len(reinforced_at) - 1
+            assert analytics["inter_reinforcement"]["max"] == max(np.diff(reinforced_at))
+            assert analytics["windowed_rates"]["steps"] == list(range(100, len(rows) + 1, 100))
+
+    def test_without_step_log(self):
+        recorded, unrecorded = self._run(), self._run(record_steps=False)
+        assert len(unrecorded.steps) == 0
+        assert unrecorded.condition_summaries == recorded.condition_summaries
+        assert unrecorded.summary == recorded.summary
+
+    def test_resume_without_step_log(self):
+        snapshots = []
+        expected = self._run(record_steps=False, checkpoint_every=60, on_checkpoint=snapshots.append)
+        resumed = SimulationRunner.from_checkpoint(snapshots[:4]).resume(_swap_vr_vi)
+        assert len(resumed.steps) == 0
+        assert resumed.condition_summaries == expected.condition_summaries
+
+    def test_no_analytics_by_default(self):
+        env = TwoChoiceEnvironment(FR(2), FR(2), max_steps=30)
+        result = SimulationRunner(QLearningAgent(), env).run(seed=1)
+        assert "analytics" not in result.condition_summaries[0]
+
+
+class TestRunnerTelemetry:
+    CONDITIONS = _vr_vi_conditions((95, 3), (60, 8))
+
+    def _run(self, agent, **kwargs):
+        return _run_conditions(agent, self.CONDITIONS, 21, **kwargs)
+
+    @pytest.mark.parametrize("make_agent", [
+        QLearningAgent,
+        lambda: MPRAgent(environment_type="two_choice"),
+        lambda: ETBDAgent(population_size=20),
+    ])
+    def test_samples_match_reconstructed_agent(self, make_agent):
+        _, plain = self._run(make_agent())
+        runner, result = self._run(make_agent(), telemetry_every=10, keyframe_every=25)
+        assert result.steps.to_dicts() == plain.steps.to_dicts()
+        telemetry = result.telemetry
+        assert telemetry.steps[:len(telemetry)].tolist() == list(range(10, 151, 10))
+        for k, step in enumerate(telemetry.steps[:len(telemetry)]):
+            snapshot = runner.reconstruct(int(step), _swap_vr_vi)
+            expected = snapshot.agent.telemetry(snapshot.observation)
+            assert np.array_equal(telemetry.values[k], expected)
+
+    def test_resume_continues_telemetry(self):
+        snapshots = []
+        _, expected = self._run(
+            QLearningAgent(), telemetry_every=7, checkpoint_every=40, on_checkpoint=snapshots.append,
+        )
+        resumed = SimulationRunner.from_checkpoint(snapshots[:3]).resume(_swap_vr_vi)
+        assert resumed.telemetry.to_dict() == expected.telemetry.to_dict()
+
+    def test_columnar_dict(self):
+        env = TwoChoiceEnvironment(FR(1), FR(1), max_steps=30)
+        result = SimulationRunner(MPRAgent(), env, telemetry_every=10).run(seed=3)
+        data = result.telemetry.to_dict()
+        assert data["steps"] == [10, 20, 30]
+        assert set(data["values"]) == {"coupling_choice_a", "coupling_choice_b"}
+        assert all(len(v) == 3 for v in data["values"].values())
+
+    def test_off_by_default_and_for_string_agents(self):
+        env = TwoChoiceEnvironment(FR(1), FR(1), max_steps=30)
+        assert SimulationRunner(QLearningAgent(), env).run(seed=3).telemetry is None
+        result = SimulationRunner(StringOnlyAgent(), env, telemetry_every=5).run(seed=3)
+        assert result.telemetry is None
+
+
+class TestRunnerTimeBudget:
+    CONDITIONS = _vr_vi_conditions((200, 3), (150, 8))
+
+    def _runner(self, **kwargs):
+        return _vr_vi_runner(QLearningAgent(), **kwargs)
+
+    def test_spent_budget_stops_at_first_check(self):
+        env = TwoChoiceEnvironment(FR(2), FR(2), max_steps=500)
+        result = SimulationRunner(QLearningAgent(), env, time_budget=0).run(seed=5)
+        full = SimulationRunner(QLearningAgent(), TwoChoiceEnvironment(FR(2), FR(2), max_steps=500)).run(seed=5)
+        assert result.truncated
+        assert result.summary["truncated"] is True
+        assert result.summary["total_steps"] == SimulationRunner.deadline_check_every
+        assert result.condition_summaries[0]["truncated"] is True
+        assert result.steps.to_dicts() == full.steps.to_dicts()[:len(result.steps)]
+
+    def test_stops_in_later_condition(self, monkeypatch):
+        # Each clock reading advances one second
+        clock = count()
+        monkeypatch.setattr(runner_module, "time", SimpleNamespace(monotonic=lambda: next(clock)))
+        result = self._runner(time_budget=3.5).run_multi_condition(self.CONDITIONS, _swap_vr_vi, seed=8)
+        first, second = result.condition_summaries
+        assert "truncated" not in first
+        assert second["truncated"] is True
+        assert result.summary["total_steps"] == 4 * SimulationRunner.deadline_check_every
+
+    def test_resume_finishes_truncated_run(self):
+        expected = self._runner().run_multi_condition(self.CONDITIONS, _swap_vr_vi, seed=8)
+        runner = self._runner(time_budget=0, keyframe_every=50)
+        partial = runner.run_multi_condition(self.CONDITIONS, _swap_vr_vi, seed=8)
+        assert partial.truncated
+        last = runner.reconstruct(partial.summary["total_steps"], _swap_vr_vi)
+        assert last.condition == 1
+        runner.time_budget = None
+        resumed = runner.resume(_swap_vr_vi)
+        assert not resumed.truncated
+        assert resumed.steps.to_dicts() == expected.steps.to_dicts()
+        assert resumed.condition_summaries == expected.condition_summaries
+
+    def test_no_budget(self):
+        result = self._runner().run_multi_condition(self.CONDITIONS, _swap_vr_vi, seed=8)
+        assert not result.truncated
+        assert "truncated" not in result.summary
+
+
+class TestRunnerFusedEngine:
+    CONDITIONS = _vr_vi_conditions((120, 3), (90, 8))
+
+    def _run(self, make_agent, **kwargs):
+        return _run_conditions(make_agent(), self.CONDITIONS, 17, **kwargs)
+
+    @pytest.mark.parametrize("kernels", [False, True])
+    @pytest.mark.parametrize("make_agent", [
+        QLearningAgent,
+        lambda: MPRAgent(environment_type="two_choice"),
+        lambda: ETBDAgent(population_size=20),
+    ])
+    def test_matches_python_engine(self, monkeypatch, kernels, make_agent):
+        # kernels=True runs the kernels even without Numba, as plain Python
+        monkeypatch.setattr(fused, "NUMBA_AVAILABLE", kernels or fused.NUMBA_AVAILABLE)
+        analytics = (WindowedRates, Changeovers)
+        python_runner, expected = self._run(make_agent, analytics=analytics)
+        runner, result = self._run(make_agent, analytics=analytics, engine="numba")
+        assert result.steps.to_dicts() == expected.steps.to_dicts()
+        assert result.condition_summaries == expected.condition_summaries
+        assert result.summary == expected.summary
+        assert runner.agent.get_state() == python_runner.agent.get_state()
+        assert runner.environment.get_state() == python_runner.environment.get_state()
+
+    @pytest.mark.parametrize("kernels", [False, True])
+    def test_progress_reports_match_python_engine(self, monkeypatch, kernels):
+        monkeypatch.setattr(fused, "NUMBA_AVAILABLE", kernels or fused.NUMBA_AVAILABLE)
+        expected, reports = [], []
+        _, python_result = self._run(QLearningAgent, progress_every=25, on_progress=expected.append)
+        _, result = self._run(QLearningAgent, engine="numba", progress_every=25, on_progress=reports.append)
+        assert reports == expected
+        assert result.steps.to_dicts() == python_result.steps.to_dicts()
+
+    def test_per_step_hooks_use_python_loop(self, monkeypatch):
+        monkeypatch.setattr(fused, "NUMBA_AVAILABLE", True)
+        monkeypatch.setattr(fused, "fused_condition", MagicMock(side_effect=AssertionError))
+        _, expected = self._run(QLearningAgent)
+        for kwargs in ({"keyframe_every": 25}, {"telemetry_every": 10}, {"time_budget": 60}):
+            _, result = self._run(QLearningAgent, engine="numba", **kwargs)
+            assert result.steps.to_dicts() == expected.steps.to_dicts()
+
+    def test_unsupported_agent_uses_python_loop(self, monkeypatch):
+        monkeypatch.setattr(fused, "NUMBA_AVAILABLE", True)
+        env = TwoChoiceEnvironment(FR(2), FR(3), max_steps=30)
+        result = SimulationRunner(StringOnlyAgent(), env, engine="numba").run(seed=2)
+        assert result.summary["total_steps"] == 30
+
+    def test_unknown_engine(self):
+        env = TwoChoiceEnvironment(FR(2), FR(3), max_steps=30)
+        with pytest.raises(ValueError, match="Unknown engine"):
+            SimulationRunner(QLearningAgent(), env, engine="cuda")
+
+
+class TestRunnerProfile:
+    CONDITIONS = _vr_vi_conditions((60, 3), (40, 8))
+
+    def _run(self, agent, **kwargs):
+        return _run_conditions(agent, self.CONDITIONS, 6, **kwargs)[1]
+
+    def test_phase_counts_and_times(self):
+        result = self._run(QLearningAgent(), profile=True)
+        profile = result.summary["profile"]
+        assert set(profile["phases"]) == set(PhaseProfile.PHASES)
+        for phase in profile["phases"].values():
+            assert phase["calls"] == 100
+            assert phase["seconds"] >= 0
+        assert sum(p["seconds"] for p in profile["phases"].values()) <= profile["total_seconds"]
+        assert "operations" not in profile
+
+    def test_etbd_operation_counts(self):
+        agent = ETBDAgent(population_size=20)
+        result = self._run(agent, profile=True)
+        operations = result.summary["profile"]["operations"]
+        assert operations["generations"] == 100
+        assert operations["parent_draws"] == 100 * 2 * 20
+        assert operations["bit_flips"] > 0
+        assert agent.organism.counters is None
+
+    def test_same_results_and_off_by_default(self):
+        plain = self._run(ETBDAgent(population_size=20))
+        profiled = self._run(ETBDAgent(population_size=20), profile=True)
+        assert "profile" not in plain.summary
+        assert profiled.steps.to_dicts() == plain.steps.to_dicts()
+        assert profiled.condition_summaries == plain.condition_summaries
+
+
+class TestRunnerProgress:
+    CONDITIONS = _vr_vi_conditions((60, 3), (45, 8))
+
+    def _run(self, **kwargs):
+        return _run_conditions(QLearningAgent(), self.CONDITIONS, 6, **kwargs)[1]
+
+    def test_reports_every_n_steps_and_at_condition_ends(self):
+        reports = []
+        result = self._run(progress_every=25, on_progress=reports.append)
+        assert [(r["steps"], r["condition"], r["condition_steps"]) for r in reports] == [
+            (25, 1, 25), (50, 1, 50), (60, 1, 60), (75, 2, 15), (100, 2, 40), (105, 2, 45),
+        ]
+        first, second = result.condition_summaries
+        assert reports[2]["action_counts"] == first["action_counts"]
+        assert reports[2]["total_reinforcements"] == first["total_reinforcements"]
+        assert reports[-1]["action_counts"] == second["action_counts"]
+        assert sum(reports[3]["action_counts"].values()) == 15
+
+    def test_same_results_and_off_without_callback(self):
+        plain = self._run()
+        reported = self._run(progress_every=7, on_progress=lambda report: None)
+        assert reported.steps.to_dicts() == plain.steps.to_dicts()
+        assert reported.condition_summaries == plain.condition_summaries
+        assert SimulationRunner(QLearningAgent(), TwoChoiceEnvironment(FR(2), FR(2)), progress_every=7).progress_every == 0
+
@@ -0,0 +1,66 @@
+"""Tests for the array schedule replicates in schedules.batch."""
+
+import numpy as np
+import pytest
+from schedules.reinforcement import FR, VR, FI, VI, Schedule
+from schedules.batch import batch_schedule, FRBatch, ScheduleBatch, VIBatch
+
+
+def _scalar_trace(schedule, rng, targets):
+    schedule.set_rng(rng)
+    schedule.reset()
+    out = []
+    for t in targets:
+        schedule.tick()
+        out.append(schedule.check(bool(t)))
+    return out
+
+
+@pytest.mark.parametrize("cls", [FR, VR, FI, VI])
+def test_matches_scalar_replicates(cls):
+    seeds = [0, 1, 2, 3]
+    targets = np.random.default_rng(7).random((200, len(seeds))) < 0.6
+    batch = batch_schedule(cls(4), [np.random.default_rng(s) for s in seeds])
+    batch_trace = []
+    for row in targets:
+        batch.tick()
+        batch_trace.append(batch.check(row))
+    batch_trace = np.array(batch_trace)
+    for k, seed in enumerate(seeds):
+        expected = _scalar_trace(cls(4), np.random.default_rng(seed), targets[:, k])
+        assert batch_trace[:, k].tolist() == expected
+
+
+def test_check_is_abstract():
+    class NoCheck(ScheduleBatch):
+        def reset(self):
+            pass
+
+    with pytest.raises(TypeError):
+        NoCheck(FR(2), [np.random.default_rng(0)])
+
+
+def test_factory_types():
+    rngs = [np.random.default_rng(0)]
+    assert isinstance(batch_schedule(FR(2), rngs), FRBatch)
+    assert isinstance(batch_schedule(VI(2), rngs), VIBatch)
+
+
+def test_unknown_schedule_has_no_batch():
+    class Always(Schedule):
+        def reset(self):
+            pass
+
+        def check(self, is_target_response):
+            return is_target_response
+
+        def tick(self):
+            pass
+
+    assert batch_schedule(Always(1), [np.random.default_rng(0)]) is None
+
+
+def test_fr_counts_only_targets():
+    batch = FRBatch(FR(2), [np.random.default_rng(0)] * 2)
+    assert batch.check(np.array([True, False])).tolist() == [False, False]
+    assert batch.check(np.array([True, True])).tolist() == [True, False]
@@ -54,18 +54,15 @@ class TestFR:
 
 class TestVR:
     def test_seeded_deterministic(self):
-        np.random.seed(42)
-        s1 = VR(5)
+        s1 = VR(5, np.random.default_rng(42))
         results1 = [s1.check(True) for _ in range(50)]
 
-        np.random.seed(42)
-        s2 = VR(5)
+        s2 = VR(5, np.random.default_rng(42))
         results2 = [s2.check(True) for _ in range(50)]
         assert results1 == results2
 
     def test_minimum_ratio_is_1(self):
-        np.random.seed(42)
-        s = VR(1)
+        s = VR(1, np.random.default_rng(42))
         # next_ratio should always be >= 1
         assert s.next_ratio >= 1
 
@@ -141,15 +138,13 @@ class TestFI:
 
 class TestVI:
     def test_seeded_deterministic(self):
-        np.random.seed(42)
-        s1 = VI(5)
+        s1 = VI(5, np.random.default_rng(42))
         results1 = []
         for _ in range(50):
             s1.tick()
             results1.append(s1.check(True))
 
-        np.random.seed(42)
-        s2 = VI(5)
+        s2 = VI(5, np.random.default_rng(42))
         results2 = []
         for _ in range(50):
             s2.tick()
@@ -157,8 +152,7 @@ class TestVI:
         assert results1 == results2
 
     def test_minimum_interval_is_1(self):
-        np.random.seed(42)
-        s = VI(1)
+        s = VI(1, np.random.default_rng(42))
         assert s.next_interval >= 1
 
     def test_arms_and_resamples_after_reinforcement(self):
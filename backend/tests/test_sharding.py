@@ -0,0 +1,224 @@
+"""Tests for sweep expansion, the cell brokers and sharding workers."""
+
+import multiprocessing
+import os
+from types import SimpleNamespace
+
+import pytest
+
+import simulation.sharding as sharding
+from simulation.sharding import (
+    BrokerError,
+    BrokerServer,
+    SQLiteBroker,
+    TCPBroker,
+    connect,
+    expand_sweep,
+    run_worker,
+)
+
+
+def _square(payload):
+    if payload.get("crash_marker") and not os.path.exists(payload["crash_marker"]):
+        open(payload["crash_marker"], "w").close()
+        os._exit(1)
+    if payload.get("raise"):
+        raise ValueError("bad cell")
+    return {"square": payload["x"] ** 2, "pid": os.getpid()}
+
+
+def _work(url, lease, poll):
+    run_worker(connect(url), _square, lease=lease, poll=poll)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(sharding, "time", SimpleNamespace(time=lambda: now[0], sleep=lambda s: None))
+    return now
+
+
+@pytest.fixture(params=["sqlite", "tcp"])
+def broker(request, tmp_path):
+    local = SQLiteBroker(str(tmp_path / "sweep.db"))
+    if request.param == "sqlite":
+        yield local
+        return
+    server = BrokerServer(local).start()
+    client = TCPBroker(*server.address)
+    yield client
+    client.close()
+    server.stop()
+
+
+class TestExpandSweep:
+    def test_factorial_row_major(self):
+        cells = expand_sweep({"algorithm": "mpr", "seed": 3}, {"algorithm": ["mpr", "etbd"], "max_steps": [10, 20]})
+        assert [(c["algorithm"], c["max_steps"]) for c in cells] == [
+            ("mpr", 10), ("mpr", 20), ("etbd", 10), ("etbd", 20)
+        ]
+        assert all(c["seed"] == 3 for c in cells)
+
+    def test_nested_factor_copies_base(self):
+        base = {"agent_params": {"epsilon": 0.1, "alpha": 0.5}}
+        cells = expand_sweep(base, {"agent_params.epsilon": [0.0, 0.2]})
+        assert [c["agent_params"] for c in cells] == [{"epsilon": 0.0, "alpha": 0.5}, {"epsilon": 0.2, "alpha": 0.5}]
+        assert base == {"agent_params": {"epsilon": 0.1, "alpha": 0.5}}
+
+    def test_nested_factor_under_scalar(self):
+        with pytest.raises(ValueError):
+            expand_sweep({"seed": 1}, {"seed.x": [1]})
+
+    def test_no_factors_is_one_cell(self):
+        assert expand_sweep({"a": 1}, {}) == [{"a": 1}]
+
+
+class TestBroker:
+    def test_claim_complete(self, broker):
+        assert broker.submit([{"x": 1}, {"x": 2}]) == [1, 2]
+        first = broker.claim("w1", 60)
+        second = broker.claim("w2", 60)
+        assert (first["id"], first["payload"]) == (1, {"x": 1})
+        assert (second["id"], second["payload"]) == (2, {"x": 2})
+        assert broker.claim("w3", 60) is None
+        assert broker.status() == {"pending": 0, "leased": 2, "done": 0, "failed": 0}
+        assert not broker.finished()
+
+        assert broker.complete(first["id"], first["token"], {"y": 1})
+        assert broker.complete(second["id"], second["token"], {"y": 4})
+        assert broker.finished()
+        assert [(r["status"], r["result"]) for r in broker.results()] == [("done", {"y": 1}), ("done", {"y": 4})]
+
+    def test_wrong_token_rejected(self, broker):
+        broker.submit([{"x": 1}])
+        cell = broker.claim("w1", 60)
+        assert not broker.complete(cell["id"], "stale", {})
+        assert not broker.renew(cell["id"], "stale", 60)
+        assert broker.renew(cell["id"], cell["token"], 60)
+
+    def test_fail_retries_then_gives_up(self, broker):
+        broker.submit([{"x": 1}])
+        for _ in range(3):
+            cell = broker.claim("w1", 60)
+            assert broker.fail(cell["id"], cell["token"], "ValueError: bad")
+        assert broker.claim("w1", 60) is None
+        [row] = broker.results()
+        assert (row["status"], row["error"]) == ("failed", "ValueError: bad")
+        assert broker.finished()
+
+
+class TestLeases:
+    def test_expired_lease_reissued(self, tmp_path, clock):
+        broker = SQLiteBroker(str(tmp_path / "sweep.db"))
+        broker.submit([{"x": 1}])
+        crashed = broker.claim("w1", 10)
+        clock[0] += 5
+        assert broker.claim("w2", 10) is None
+        clock[0] += 6
+        reissued = broker.claim("w2", 10)
+        assert reissued["id"] == crashed["id"]
+        assert not broker.complete(crashed["id"], crashed["token"], {"late": True})
+        assert broker.complete(reissued["id"], reissued["token"], {"late": False})
+        assert broker.results()[0]["result"] == {"late": False}
+
+    def test_renewal_keeps_lease(self, tmp_path, clock):
+        broker = SQLiteBroker(str(tmp_path / "sweep.db"))
+        broker.submit([{"x": 1}])
+        cell = broker.claim("w1", 10)
+        for _ in range(3):
+            clock[0] += 8
+            assert broker.renew(cell["id"], cell["token"], 10)
+            assert broker.claim("w2", 10) is None
+
+    def test_expired_past_max_attempts_fails(self, tmp_path, clock):
+        broker = SQLiteBroker(str(tmp_path / "sweep.db"), max_attempts=2)
+        broker.submit([{"x": 1}])
+        for _ in range(2):
+            assert broker.claim("w", 10) is not None
+            clock[0] += 11
+        assert broker.claim("w", 10) is None
+        assert broker.status()["failed"] == 1
+        assert broker.results()[0]["error"] == "Lease expired"
+
+
+class TestTCPBroker:
+    def test_remote_error(self, tmp_path):
+        server = BrokerServer(SQLiteBroker(str(tmp_path / "sweep.db"))).start()
+        client = TCPBroker(*server.address)
+        try:
+            with pytest.raises(BrokerError, match="TypeError"):
+                client._call("claim")
+            with pytest.raises(BrokerError, match="Unknown method"):
+                client._call("__init__")
+            assert client.status()["pending"] == 0
+        finally:
+            client.close()
+            server.stop()
+
+
+class TestConnect:
+    def test_urls(self, tmp_path):
+        assert isinstance(connect(f"sqlite:///{tmp_path}/sweep.db"), SQLiteBroker)
+        client = connect("tcp://127.0.0.1:7600")
+        assert isinstance(client, TCPBroker) and client.address == ("127.0.0.1", 7600)
+
+    @pytest.mark.parametrize("url", ["tcp://localhost", "http://host:1"])
+    def test_bad_urls(self, url):
+        with pytest.raises(ValueError):
+            connect(url)
+
+
+class TestRunWorker:
+    def test_runs_until_finished(self, broker):
+        broker.submit([{"x": x} for x in range(5)] + [{"x": 0, "raise": True}])
+        done = run_worker(broker, _square, worker="w", lease=60, poll=0)
+        assert done == 5
+        results = broker.results()
+        assert [r["result"]["square"] for r in results[:5]] == [0, 1, 4, 9, 16]
+        assert results[5]["status"] == "failed"
+        assert results[5]["error"] == "ValueError: bad cell"
+
+    def test_heartbeat_renews_long_cell(self, tmp_path):
+        broker = SQLiteBroker(str(tmp_path / "sweep.db"))
+        broker.submit([{"x": 3}])
+        renewals = []
+        renew = broker.renew
+
+        def slow(payload):
+            import time
+            time.sleep(0.3)
+            return _square(payload)
+
+        broker.renew = lambda *args: renewals.append(args) or renew(*args)
+        assert run_worker(broker, slow, lease=0.15, poll=0) == 1
+        assert renewals
+        assert broker.results()[0]["result"]["square"] == 9
+
+    @pytest.mark.parametrize("transport", ["sqlite", "tcp"])
+    def test_several_processes_with_a_crash(self, tmp_path, transport):
+        local = SQLiteBroker(str(tmp_path / "sweep.db"))
+        local.submit(
+            [{"x": x} for x in range(12)] + [{"x": 12, "crash_marker": str(tmp_path / "crashed")}]
+        )
+        server = None
+        if transport == "tcp":
+            server = BrokerServer(local).start()
+            url = "tcp://%s:%d" % server.address
+        else:
+            url = f"sqlite:///{local.path}"
+        ctx = multiprocessing.get_context("spawn")
+        workers = [ctx.Process(target=_work, args=(url, 0.5, 0.05)) for _ in range(3)]
+        try:
+            for p in workers:
+                p.start()
+            for p in workers:
+                p.join(timeout=60)
+            assert sorted(p.exitcode for p in workers) == [0, 0, 1]
+        finally:
+            for p in workers:
+                p.kill()
+            if server is not None:
+                server.stop()
+        results = local.results()
+        assert local.status() == {"pending": 0, "leased": 0, "done": 13, "failed": 0}
+        assert [r["result"]["square"] for r in results] == [x * x for x in range(13)]
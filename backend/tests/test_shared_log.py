@@ -0,0 +1,98 @@
+"""Tests for shared-memory step log transfer."""
+
+import gc
+import os
+
+import numpy as np
+import pytest
+from multiprocessing import shared_memory
+
+from agents.q_learning import QLearningAgent
+from environments.grid_chamber import GridChamberEnvironment
+from schedules.reinforcement import FR
+from simulation.replicates import ReplicateExecutor, replicate_seeds
+from simulation.runner import SimulationRunner
+from simulation.shared_log import SharedLog, share_log
+
+
+def _run(rng, max_steps=300):
+    env = GridChamberEnvironment(schedule=FR(2, rng), max_steps=max_steps)
+    return SimulationRunner(QLearningAgent(use_history_state=False, rng=rng), env).run(rng=rng)
+
+
+def _log_job(rng):
+    steps = _run(rng).steps
+    return steps.size, share_log(steps)
+
+
+def _segments() -> set[str]:
+    return set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+
+
+class TestSharedLog:
+    def test_round_trip(self):
+        log = _run(np.random.default_rng(1)).steps
+        with share_log(log).attach() as shared:
+            assert shared.log.to_dicts() == log.to_dicts()
+            assert len(shared.log) == len(log)
+            assert shared.nbytes >= len(log) * 8
+
+    def test_columns_are_read_only_views(self):
+        with share_log(_run(np.random.default_rng(1)).steps).attach() as shared:
+            assert not shared.log.action.flags.owndata
+            with pytest.raises(ValueError):
+                shared.log.action[0] = 1
+
+    def test_empty_log(self):
+        log = _run(np.random.default_rng(1)).steps
+        log.size = 0
+        with share_log(log).attach() as shared:
+            assert shared.log.to_dicts() == []
+
+    def test_release_unlinks(self):
+        handle = share_log(_run(np.random.default_rng(1)).steps)
+        shared = handle.attach()
+        shared.release()
+        assert shared.released and shared.log is None
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(handle.name)
+
+    def test_garbage_collection_releases(self):
+        handle = share_log(_run(np.random.default_rng(1)).steps)
+        handle.attach()
+        gc.collect()
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(handle.name)
+
+    def test_release_with_live_views(self):
+        shared = share_log(_run(np.random.default_rng(1)).steps).attach()
+        actions = shared.log.action
+        shared.release()
+        assert len(actions) == 300
+
+    def test_discard(self):
+        handle = share_log(_run(np.random.default_rng(1)).steps)
+        handle.discard()
+        with pytest.raises(FileNotFoundError):
+            SharedLog(handle)
+
+
+class TestSharedLogFromWorkers:
+    def test_logs_from_worker_processes(self):
+        _, seeds = replicate_seeds(3, 4)
+        with ReplicateExecutor(workers=2) as executor:
+            for seed, (size, handle) in zip(seeds, executor.map(_log_job, seeds)):
+                with handle.attach() as shared:
+                    expected = _run(np.random.default_rng(seed)).steps
+                    assert size == len(shared.log)
+                    assert shared.log.to_dicts() == expected.to_dicts()
+
+    def test_unconsumed_results_are_discarded(self):
+        before = _segments()
+        _, seeds = replicate_seeds(3, 6)
+        with ReplicateExecutor(workers=2) as executor:
+            results = executor.map(_log_job, seeds)
+            _, handle = next(results)
+            handle.discard()
+            results.close()
+        assert _segments() <= before
@@ -0,0 +1,63 @@
+"""Tests for the stability (steady-state) criterion."""
+
+import pytest
+from simulation.stability import StabilityTracker
+
+ACTIONS = ["choice_a", "choice_b"]
+
+
+def _feed(tracker, proportions):
+    """Observe one block per proportion of choice_a responses; return the results."""
+    counts = [0, 0]
+    results = []
+    for n, p in enumerate(proportions, start=1):
+        counts[0] += round(p * tracker.window)
+        results.append(tracker.observe(n * tracker.window, counts, 0))
+    return results
+
+
+class TestStabilityTracker:
+    def test_from_config_defaults(self):
+        tracker = StabilityTracker.from_config({"window": 10}, ACTIONS)
+        assert (tracker.blocks, tracker.tolerance, tracker.min_steps) == (3, 0.1, 0)
+        assert tracker.metric == "choice_proportion"
+        assert tracker.action_id == 0
+
+    def test_from_config_named_action(self):
+        tracker = StabilityTracker.from_config({"window": 10, "action": "choice_b"}, ACTIONS)
+        assert tracker.action_id == 1
+
+    def test_unknown_action(self):
+        with pytest.raises(ValueError, match="Unknown stability action"):
+            StabilityTracker.from_config({"window": 10, "action": "lever"}, ACTIONS)
+
+    def test_unknown_metric(self):
+        with pytest.raises(ValueError, match="Unknown stability metric"):
+            StabilityTracker(window=10, metric="latency")
+
+    def test_needs_full_set_of_blocks(self):
+        tracker = StabilityTracker(window=100, blocks=3, tolerance=0.1)
+        assert _feed(tracker, [0.5, 0.5, 0.5]) == [False, False, True]
+        assert tracker.stable_step == 300
+
+    def test_spread_relative_to_mean(self):
+        tracker = StabilityTracker(window=100, blocks=3, tolerance=0.2)
+        # Spread 0.08 around mean 0.5 is within 20%; 0.46 -> 0.6 is not
+        assert _feed(tracker, [0.2, 0.6, 0.46, 0.54, 0.5]) == [False, False, False, False, True]
+
+    def test_min_steps(self):
+        tracker = StabilityTracker(window=100, blocks=2, tolerance=0.1, min_steps=350)
+        assert _feed(tracker, [0.5, 0.5, 0.5, 0.5]) == [False, False, False, True]
+        assert tracker.stable_step == 400
+
+    def test_reinforcement_rate(self):
+        tracker = StabilityTracker(window=10, blocks=2, tolerance=0.0, metric="reinforcement_rate")
+        assert not tracker.observe(10, [0, 0], 3)
+        assert not tracker.observe(20, [0, 0], 5)
+        assert tracker.observe(30, [0, 0], 7)
+
+    def test_next_boundary(self):
+        tracker = StabilityTracker(window=50)
+        assert tracker.next_boundary(0) == 50
+        assert tracker.next_boundary(49) == 50
+        assert tracker.next_boundary(50) == 100
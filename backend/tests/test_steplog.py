@@ -0,0 +1,59 @@
+"""Tests for the columnar StepLog."""
+
+import numpy as np
+import pytest
+from simulation.steplog import StepLog, STEP_FIELDS
+
+
+def _fill(log, rows):
+    log.reserve(len(rows))
+    for state, action, reinforced, schedule_id in rows:
+        i = log.size
+        log.state[i] = log.code_state(state)
+        log.action[i] = action
+        log.reinforced[i] = reinforced
+        log.schedule[i] = log.code_schedule(schedule_id)
+        log.size += 1
+    log.step[: log.size] = np.arange(1, log.size + 1)
+    log.condition[: log.size] = 1
+
+
+class TestStepLog:
+    def test_empty(self):
+        log = StepLog(["a", "b"])
+        assert len(log) == 0
+        assert log.to_dicts() == []
+
+    def test_row_view(self):
+        log = StepLog(["a", "b"])
+        _fill(log, [("start", 0, False, "s_a"), ("start", 1, True, "s_b")])
+        assert log[1] == {
+            "step": 2, "state": "start", "action": "b",
+            "reinforced": True, "schedule_id": "s_b", "condition": 1,
+        }
+        assert log[-1] == log[1]
+        assert set(log[0]) == set(STEP_FIELDS)
+
+    def test_index_error(self):
+        log = StepLog(["a"])
+        with pytest.raises(IndexError):
+            log[0]
+
+    def test_states_coded_once(self):
+        log = StepLog(["a"])
+        _fill(log, [((0, 0), 0, False, ""), ((0, 1), 0, False, ""), ((0, 0), 0, False, "")])
+        assert log.state_names == ["(0, 0)", "(0, 1)"]
+        assert [s["state"] for s in log] == ["(0, 0)", "(0, 1)", "(0, 0)"]
+
+    def test_reserve_grows_and_keeps_data(self):
+        log = StepLog(["a", "b"], capacity=1)
+        _fill(log, [("s", 1, True, "x")])
+        log.reserve(100)
+        assert log.capacity >= 101
+        assert log[0]["action"] == "b"
+
+    def test_slice_and_iter_match_to_dicts(self):
+        log = StepLog(["a", "b"])
+        _fill(log, [("s", i % 2, bool(i % 3), "x") for i in range(10)])
+        assert list(log) == log.to_dicts()
+        assert log[2:5] == log.to_dicts()[2:5]
@@ -1,5 +1,26 @@
 import { describe, it, expect, vi, beforeEach } from 'vitest'
-import { runSimulation, downloadCSV, downloadJSON } from '../client'
+import { runSimulation, decodeCompactSteps, submitJob, watchJob, downloadCSV, downloadJSON } from '../client'
+
+const compact = {
+  size: 5,
+  step: { values: [1], starts: [0] },
+  state: { values: [0], starts: [0] },
+  action: { values: [0, 1], starts: [0, 3] },
+  reinforced: { bits: 'GA==' },
+  schedule_id: { values: [0, 1], starts: [0, 3] },
+  condition: { values: [1, 2], starts: [0, 3] },
+  state_names: ['start'],
+  action_names: ['choice_a', 'choice_b'],
+  schedule_names: ['', 'FR'],
+}
+
+const rows = [
+  { step: 1, state: 'start', action: 'choice_a', reinforced: false, schedule_id: '', condition: 1 },
+  { step: 2, state: 'start', action: 'choice_a', reinforced: false, schedule_id: '', condition: 1 },
+  { step: 3, state: 'start', action: 'choice_a', reinforced: false, schedule_id: '', condition: 1 },
+  { step: 4, state: 'start', action: 'choice_b', reinforced: true, schedule_id: 'FR', condition: 2 },
+  { step: 5, state: 'start', action: 'choice_b', reinforced: true, schedule_id: 'FR', condition: 2 },
+]
 
 describe('API client', () => {
   beforeEach(() => {
@@ -30,6 +51,89 @@ describe('API client', () => {
 
       await expect(runSimulation({})).rejects.toThrow('Bad request')
     })
+
+    it('decodes compact steps', async () => {
+      global.fetch = vi.fn().mockResolvedValue({
+        ok: true,
+        json: () => Promise.resolve({ summary: { total_steps: 5 }, step_compact: compact }),
+      })
+
+      const result = await runSimulation({ environment: 'two_choice' }, { compact: true })
+      expect(result).toEqual({ summary: { total_steps: 5 }, steps: rows })
+      expect(fetch).toHaveBeenCalledWith('/api/simulate?shape=compact', expect.anything())
+    })
+  })
+
+  describe('decodeCompactSteps', () => {
+    it('expands runs and bit-packed flags', () => {
+      expect(decodeCompactSteps(compact)).toEqual(rows)
+    })
+
+    it('expands reinforced indices', () => {
+      expect(decodeCompactSteps({ ...compact, reinforced: { at: [3, 4] } })).toEqual(rows)
+    })
+
+    it('handles an empty log', () => {
+      const empty = { ...compact, size: 0, step: { values: [], starts: [] }, reinforced: { bits: '' } }
+      expect(decodeCompactSteps(empty)).toEqual([])
+    })
+  })
+
+  describe('submitJob', () => {
+    it('posts the config to the job queue', async () => {
+      global.fetch = vi.fn().mockResolvedValue({
+        ok: true,
+        json: () => Promise.resolve({ job_id: 'abc', status: 'queued' }),
+      })
+
+      const status = await submitJob({ environment: 'two_choice' })
+      expect(status.job_id).toBe('abc')
+      expect(fetch).toHaveBeenCalledWith('/api/jobs', expect.objectContaining({ method: 'POST' }))
+    })
+  })
+
+  describe('watchJob', () => {
+    class FakeEventSource {
+      constructor(url) {
+        this.url = url
+        this.listeners = {}
+        this.closed = false
+        FakeEventSource.last = this
+      }
+      addEventListener(type, fn) {
+        this.listeners[type] = fn
+      }
+      emit(type, data) {
+        this.listeners[type]({ data: JSON.stringify(data) })
+      }
+      close() {
+        this.closed = true
+      }
+    }
+
+    beforeEach(() => {
+      global.EventSource = FakeEventSource
+    })
+
+    it('reports progress and resolves when done', async () => {
+      const onProgress = vi.fn()
+      const watching = watchJob('abc', { onProgress, interval: 0.2 })
+      const source = FakeEventSource.last
+      expect(source.url).toBe('/api/jobs/abc/events?interval=0.2')
+
+      source.emit('progress', { steps: 1000, cumulative_record: [] })
+      source.emit('done', { job_id: 'abc', status: 'done' })
+
+      await expect(watching).resolves.toEqual({ job_id: 'abc', status: 'done' })
+      expect(onProgress).toHaveBeenCalledWith({ steps: 1000, cumulative_record: [] })
+      expect(source.closed).toBe(true)
+    })
+
+    it('rejects when the job fails', async () => {
+      const watching = watchJob('abc')
+      FakeEventSource.last.emit('failed', { status: 'failed', error: 'bad schedule' })
+      await expect(watching).rejects.toThrow('bad schedule')
+    })
   })
 
   describe('downloadCSV', () => {
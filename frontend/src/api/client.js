@@ -1,7 +1,56 @@
 const API_BASE = '/api';
 
-export async function runSimulation(config) {
-  const res = await fetch(`${API_BASE}/simulate`, {
+// Expand runs ({ values, starts }) into one value per step.
+function expandRuns(runs, size) {
+  const out = new Array(size);
+  for (let k = 0; k < runs.starts.length; k++) {
+    const end = k + 1 < runs.starts.length ? runs.starts[k + 1] : size;
+    out.fill(runs.values[k], runs.starts[k], end);
+  }
+  return out;
+}
+
+// Expand reinforced flags: a base64 bitmap, lowest bit first, or indices.
+function expandFlags(flags, size) {
+  const out = new Array(size).fill(false);
+  if (flags.at) {
+    for (const i of flags.at) out[i] = true;
+    return out;
+  }
+  const bytes = atob(flags.bits);
+  for (let i = 0; i < size; i++) {
+    out[i] = ((bytes.charCodeAt(i >> 3) >> (i & 7)) & 1) === 1;
+  }
+  return out;
+}
+
+// Decode the `step_compact` of a shape=compact response into step objects.
+export function decodeCompactSteps(compact) {
+  const { size } = compact;
+  const step = expandRuns(compact.step, size);
+  const state = expandRuns(compact.state, size);
+  const action = expandRuns(compact.action, size);
+  const reinforced = expandFlags(compact.reinforced, size);
+  const schedule = expandRuns(compact.schedule_id, size);
+  const condition = expandRuns(compact.condition, size);
+  const steps = new Array(size);
+  for (let i = 0; i < size; i++) {
+    steps[i] = {
+      step: step[i] + i,
+      state: compact.state_names[state[i]],
+      action: compact.action_names[action[i]],
+      reinforced: reinforced[i],
+      schedule_id: compact.schedule_names[schedule[i]],
+      condition: condition[i],
+    };
+  }
+  return steps;
+}
+
+// With `compact`, the steps are sent in the compact encoding and decoded here.
+export async function runSimulation(config, { compact = false } = {}) {
+  const url = compact ? `${API_BASE}/simulate?shape=compact` : `${API_BASE}/simulate`;
+  const res = await fetch(url, {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
     body: JSON.stringify(config),
@@ -10,9 +59,46 @@ export async function runSimulation(config) {
     const err = await res.json();
     throw new Error(err.detail || 'Simulation failed');
   }
+  if (!compact) return res.json();
+  const { step_compact: stepCompact, ...result } = await res.json();
+  return { ...result, steps: decodeCompactSteps(stepCompact) };
+}
+
+// Queue a simulation in the background; resolves to its JobStatus.
+export async function submitJob(config) {
+  const res = await fetch(`${API_BASE}/jobs`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(config),
+  });
+  if (!res.ok) {
+    const err = await res.json();
+    throw new Error(err.detail || 'Job submission failed');
+  }
   return res.json();
 }
 
+// Follow a job's progress events, at most one every `interval` seconds.
+// Resolves to the final JobStatus once the job is done; rejects if it fails.
+export function watchJob(jobId, { onProgress, interval = 0.5 } = {}) {
+  return new Promise((resolve, reject) => {
+    const source = new EventSource(`${API_BASE}/jobs/${jobId}/events?interval=${interval}`);
+    source.addEventListener('progress', (e) => onProgress?.(JSON.parse(e.data)));
+    source.addEventListener('done', (e) => {
+      source.close();
+      resolve(JSON.parse(e.data));
+    });
+    source.addEventListener('failed', (e) => {
+      source.close();
+      reject(new Error(JSON.parse(e.data).error || 'Simulation failed'));
+    });
+    source.onerror = () => {
+      source.close();
+      reject(new Error('Lost connection to the job'));
+    };
+  });
+}
+
 export async function downloadCSV(config) {
   const res = await fetch(`${API_BASE}/simulate/csv`, {
     method: 'POST',
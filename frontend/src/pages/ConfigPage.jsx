@@ -93,7 +93,7 @@ export default function ConfigPage({ onResults }) {
     setError('');
     try {
       const req = buildRequest();
-      const result = await runSimulation(req);
+      const result = await runSimulation(req, { compact: true });
       onResults({ result, request: req });
     } catch (e) {
       setError(e.message);